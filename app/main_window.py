@@ -13,13 +13,15 @@ from PyQt5.QtWidgets import (
     QMessageBox, QMenuBar, QStatusBar, QAction,
     QSplitter, QScrollArea, QProgressDialog, QApplication
 )
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSize
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal, QSize, QEvent
 from PyQt5.QtGui import QFont, QIcon, QPixmap, QKeySequence
 
 import config
 from core.auth.login_manager import auth_manager
 from core.utils.logger import log_user_action
-from core.backup.backup_manager import backup_manager
+from core.utils.telemetry import span
+from core.backup.backup_manager import get_backup_manager
+from core.backup.backup_service import get_backup_service
 from core.utils.responsive_design import responsive
 
 
@@ -42,6 +44,8 @@ class MainWindow(QMainWindow):
         self.setup_menu_bar()
         self.setup_status_bar()
         self.setup_session_timer()
+        self.setup_backup_service()
+        self.setup_settings_sync()
         
         # عرض الصفحة الرئيسية
         self.show_dashboard()
@@ -673,9 +677,10 @@ class MainWindow(QMainWindow):
             # تحديث حالة الأزرار
             self.update_sidebar_buttons(page_name)
 
-            # عرض الصفحة
+            # عرض الصفحة (مع قياس زمن التبديل وما يتبعه من تحميل)
             page_widget = self.pages[page_name]
-            self.pages_stack.setCurrentWidget(page_widget)
+            with span(f"MainWindow.navigate_to_page:{page_name}"):
+                self.pages_stack.setCurrentWidget(page_widget)
 
             # تحديث عنوان الصفحة
             self.update_page_title(page_name)
@@ -803,6 +808,37 @@ class MainWindow(QMainWindow):
         except Exception as e:
             logging.error(f"خطأ في إعداد مؤقت الجلسة: {e}")
     
+    def setup_settings_sync(self):
+        """التحقق من تعديل الإعدادات من عملية أخرى عند العودة إلى التطبيق"""
+        try:
+            QApplication.instance().applicationStateChanged.connect(self.on_application_state_changed)
+            
+        except Exception as e:
+            logging.error(f"خطأ في إعداد مزامنة الإعدادات: {e}")
+    
+    def on_application_state_changed(self, state):
+        if state == Qt.ApplicationActive:
+            from core.utils.settings_manager import settings_manager
+            settings_manager.refresh_if_changed()
+    
+    def setup_backup_service(self):
+        """تشغيل خدمة النسخ الاحتياطي في الخلفية (دوري، عند الخمول، عند الخروج)"""
+        try:
+            self.backup_service = get_backup_service()
+            self.backup_service.start()
+            # رصد نشاط المستخدم لتأجيل نسخ الخمول
+            QApplication.instance().installEventFilter(self)
+            
+        except Exception as e:
+            self.backup_service = None
+            logging.error(f"خطأ في تشغيل خدمة النسخ الاحتياطي: {e}")
+    
+    def eventFilter(self, obj, event):
+        """رصد ضغطات المفاتيح والفأرة كنشاط للمستخدم"""
+        if event.type() in (QEvent.KeyPress, QEvent.MouseButtonPress) and self.backup_service:
+            self.backup_service.notify_activity()
+        return super().eventFilter(obj, event)
+    
     def check_session(self):
         """التحقق من حالة الجلسة"""
         try:
@@ -1119,7 +1155,7 @@ class MainWindow(QMainWindow):
                     self,
                     "إغلاق التطبيق",
                     "هل تريد إغلاق التطبيق؟\n\n"
-                    "🔄 سيتم إنشاء نسخة احتياطية تلقائية قبل الإغلاق.",
+                    "🔄 سيتم إنشاء نسخة احتياطية تلقائية في الخلفية عند الإغلاق.",
                     QMessageBox.Yes | QMessageBox.No,
                     QMessageBox.No
                 )
@@ -1129,7 +1165,7 @@ class MainWindow(QMainWindow):
                     self,
                     "إغلاق التطبيق",
                     "هل تريد إغلاق التطبيق؟\n\n"
-                    "🔄 سيتم إنشاء نسخة احتياطية تلقائية قبل الإغلاق.",
+                    "🔄 سيتم إنشاء نسخة احتياطية تلقائية في الخلفية عند الإغلاق.",
                     QMessageBox.Yes | QMessageBox.No,
                     QMessageBox.No
                 )
@@ -1152,6 +1188,8 @@ class MainWindow(QMainWindow):
                     if backup_success is False:
                         event.ignore()
                         return
+                elif self.backup_service:
+                    self.backup_service.shutdown(wait=False)
                 
                 # تنظيف الموارد
                 if hasattr(self, 'session_timer'):
@@ -1222,7 +1260,7 @@ class MainWindow(QMainWindow):
             description = f"نسخة احتياطية سريعة - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
             
             # إنشاء النسخة الاحتياطية
-            success, message = backup_manager.create_backup(description)
+            success, message = get_backup_manager().create_backup(description)
 
             # إغلاق حوار التقدم
             progress.close()
@@ -1256,85 +1294,30 @@ class MainWindow(QMainWindow):
             )
 
     def create_auto_backup_on_exit(self):
-        """إنشاء نسخة احتياطية تلقائية عند الخروج"""
+        """
+        جدولة نسخة احتياطية تلقائية عند الخروج دون حجب الواجهة
+        
+        تُضاف المهمة إلى خدمة النسخ الاحتياطي وتُخفى النافذة فوراً؛ يكمل خيط
+        الخدمة العمل قبل انتهاء العملية، وتُستأنف المهمة عند التشغيل التالي
+        إذا انقطعت. غالباً ما تكون النسخة فارغة لأن النسخ الدوري ونسخ الخمول
+        قد التقطا التغييرات مسبقاً.
+        """
         try:
-            # عرض حوار التقدم بتصميم مخصص للخروج
-            progress = QProgressDialog(
-                "🔄 جاري إنشاء نسخة احتياطية تلقائية قبل الإغلاق...\nيرجى الانتظار قليلاً...",
-                None, 0, 0, self
-            )
-            progress.setWindowTitle("نسخ احتياطي تلقائي")
-            progress.setModal(True)
-            progress.setMinimumDuration(0)  # عرض فوري
-            progress.show()
-            
-            # معالجة الأحداث لضمان عرض شريط التقدم
-            QApplication.processEvents()
+            if self.backup_service is None:
+                logging.warning("خدمة النسخ الاحتياطي غير متاحة، سيتم إغلاق التطبيق بدون نسخة احتياطية")
+                return True
             
-            # إنشاء وصف للنسخة الاحتياطية التلقائية
             description = f"نسخة احتياطية تلقائية عند الخروج - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+            self.backup_service.submit("exit", description)
             
-            # إنشاء النسخة الاحتياطية
-            success, message = backup_manager.create_backup(description)
-            
-            # تأخير قصير لضمان إكمال العملية
-            QTimer.singleShot(500, lambda: None)
-            QApplication.processEvents()
+            # إخفاء النافذة ثم إنهاء الخدمة بعد إكمال الطابور
+            self.hide()
+            QApplication.instance().removeEventFilter(self)
+            self.backup_service.shutdown(wait=False)
             
-            # إغلاق حوار التقدم
-            progress.close()
+            log_user_action("backup auto-exit", description)
             
-            if success:
-                # عرض إشعار النجاح إذا كان مفعلاً في الإعدادات
-                if config.AUTO_BACKUP_SHOW_SUCCESS_MESSAGE:
-                    success_msg = QMessageBox(self)
-                    success_msg.setWindowTitle("نجح النسخ الاحتياطي")
-                    success_msg.setText("✅ تم إنشاء النسخة الاحتياطية التلقائية بنجاح")
-                    success_msg.setIcon(QMessageBox.Information)
-                    success_msg.setStandardButtons(QMessageBox.Ok)
-                    success_msg.setDefaultButton(QMessageBox.Ok)
-                    
-                    # إغلاق الرسالة تلقائياً بعد ثانيتين
-                    QTimer.singleShot(2000, success_msg.accept)
-                    success_msg.exec_()
-                
-                # تسجيل الإجراء
-                log_user_action("backup auto-exit", description)
-                
-            else:
-                # في حالة فشل النسخ الاحتياطي، اسأل المستخدم
-                if "disabled" in message.lower():
-                    # النظام معطل - لا نوقف الإغلاق
-                    logging.warning("نظام النسخ الاحتياطي معطل، سيتم إغلاق التطبيق بدون نسخة احتياطية")
-                else:
-                    # خطأ آخر - اسأل المستخدم
-                    reply = QMessageBox.question(
-                        self,
-                        "فشل في النسخ الاحتياطي التلقائي", 
-                        f"❌ فشل في إنشاء النسخة الاحتياطية التلقائية:\n\n{message}\n\n"
-                        "هل تريد المتابعة والخروج من التطبيق بدون نسخة احتياطية؟",
-                        QMessageBox.Yes | QMessageBox.No,
-                        QMessageBox.No
-                    )
-                    
-                    if reply == QMessageBox.No:
-                        # المستخدم لا يريد الخروج بدون نسخة احتياطية
-                        return False
-                
         except Exception as e:
             logging.error(f"خطأ في النسخ الاحتياطي التلقائي عند الخروج: {e}")
-            
-            # في حالة خطأ، اسأل المستخدم
-            reply = QMessageBox.question(
-                self,
-                "خطأ في النسخ الاحتياطي التلقائي",
-                f"⚠️ حدث خطأ أثناء النسخ الاحتياطي التلقائي:\n\n{e}\n\n"
-                "هل تريد المتابعة والخروج من التطبيق؟",
-                QMessageBox.Yes | QMessageBox.No,
-                QMessageBox.No
-            )
-            
-            if reply == QMessageBox.No:
-                return False
         
         return True
\ No newline at end of file
@@ -16,6 +16,11 @@ RESOURCES_DIR = BASE_DIR / "app" / "resources"
 DATABASE_NAME = "schools.db"
 DATABASE_PATH = DATABASE_DIR / DATABASE_NAME
 
+# أرشيف الأعوام الدراسية المنتهية (ملف قاعدة لكل عام)
+ARCHIVE_DIR = DATABASE_DIR / "archives"
+ARCHIVE_MMAP_SIZE = 256 * 1024 * 1024  # حجم الربط بالذاكرة لكل أرشيف مرفق
+ARCHIVE_MAX_ATTACHED = 8  # SQLite يسمح افتراضياً بعشر قواعد مرفقة فقط
+
 # إعدادات التطبيق
 APP_NAME = "حسابات المدارس الأهلية"
 APP_VERSION = "1.0.0"
@@ -36,17 +41,65 @@ BUTTON_FONT_SIZE = 14
 PASSWORD_MIN_LENGTH = 6
 SESSION_TIMEOUT = 3600  # ساعة واحدة بالثواني
 
+# إعدادات السجلات
+LOG_LEVEL = "INFO"  # DEBUG لتفعيل رسائل التتبع التفصيلية
+AUDIT_LOG_FILE = LOGS_DIR / "audit.jsonl"  # سجل تدقيق منظم (سطر JSON لكل حدث)
+AUDIT_FLUSH_BATCH = 50  # عدد الأحداث في كل دفعة كتابة
+AUDIT_FLUSH_INTERVAL = 2.0  # أقصى مدة بالثواني قبل كتابة الدفعة
+
+# قياس الأداء أثناء التشغيل
+TELEMETRY_ENABLED = True
+TELEMETRY_BUFFER_SIZE = 5000  # عدد العينات المحفوظة في الذاكرة
+
+# ميزانية بدء التشغيل
+STARTUP_BUDGET_MS = 2500  # أقصى زمن من بدء العملية حتى ظهور نافذة تسجيل الدخول
+STARTUP_IMPORT_BUDGET_MS = 1200  # أقصى زمن لاستيراد وحدات بدء التشغيل (يقاس بـ python -X importtime)
+STARTUP_MODULES = (  # الوحدات التي تُستورد قبل نافذة تسجيل الدخول
+    "core.database.connection",
+    "core.auth.login_manager",
+    "core.printing.print_safety_patches",
+    "ui.auth.login_window",
+    "app.main_window",
+)
+STARTUP_DEFERRED_MODULES = (  # مكتبات ثقيلة يجب ألا تُحمّل قبل أول استخدام
+    "reportlab",
+    "jinja2",
+    "numpy",
+    "arabic_reshaper",
+    "bidi",
+    "PyQt5.QtWebEngineWidgets",
+    "supabase",
+    "openpyxl",
+)
+
 # إعدادات النسخ الاحتياطي
 BACKUP_INTERVAL_DAYS = 7
 MAX_BACKUP_FILES = 30
+BACKUP_CODEC = "zip"  # zip | gzip | bz2 | xz | zstd
+BACKUP_COMPRESSION_LEVEL = 6
+BACKUP_UPLOAD_CHUNK_SIZE = 6 * 1024 * 1024  # حجم دفعة الرفع (يتطلبه Supabase للرفع المجزأ)
 
 # إعدادات النسخ الاحتياطي التلقائي عند الخروج
 AUTO_BACKUP_ON_EXIT = True  # تفعيل النسخ الاحتياطي التلقائي عند إغلاق التطبيق
 AUTO_BACKUP_SHOW_SUCCESS_MESSAGE = True  # عرض رسالة نجاح النسخ الاحتياطي
 AUTO_BACKUP_CONFIRMATION_DIALOG = True  # عرض حوار تأكيد قبل الخروج
 
+# خدمة النسخ الاحتياطي في الخلفية
+BACKUP_PERIODIC_INTERVAL_MINUTES = 60  # نسخة دورية كل ساعة (0 للتعطيل)
+BACKUP_IDLE_SECONDS = 300  # نسخة بعد 5 دقائق من الخمول (0 للتعطيل)
+BACKUP_JOBS_FILE = BACKUPS_DIR / "backup_jobs.json"  # حالة مهام النسخ لاستئنافها
+BACKUP_CATALOG_PATH = BACKUPS_DIR / "backup_catalog.db"  # فهرس محلي لقائمة النسخ
+
+# سياسة الاحتفاظ بالنسخ (الجد - الأب - الابن)
+BACKUP_KEEP_DAILY = 7  # عدد الأيام الأخيرة المحتفظ بنسخها اليومية
+BACKUP_KEEP_WEEKLY = 4  # عدد الأسابيع الأخيرة المحتفظ بنسخها الأسبوعية
+BACKUP_KEEP_MONTHLY = 12  # نسخة لكل شهر من الأشهر السابقة
+
+# التقارير الموحدة لعدة مدارس
+REPORT_WORKERS = min(4, os.cpu_count() or 1)  # عدد الخيوط التي تجمع أقسام المدارس بالتوازي
+
 # إنشاء المجلدات المطلوبة
-for directory in [DATA_DIR, DATABASE_DIR, UPLOADS_DIR, BACKUPS_DIR, EXPORTS_DIR, LOGS_DIR]:
+for directory in [DATA_DIR, DATABASE_DIR, ARCHIVE_DIR, UPLOADS_DIR, BACKUPS_DIR, EXPORTS_DIR, LOGS_DIR]:
     directory.mkdir(parents=True, exist_ok=True)
 
 # إنشاء مجلدات فرعية للرفوعات
@@ -1,82 +1,71 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-مدير النسخ الاحتياطية - Supabase Storage
-يدير عمليات رفع وعرض النسخ الاحتياطية من قاعدة البيانات على Supabase
+مدير النسخ الاحتياطية
+ينشئ النسخ ويعرضها ويحذفها عبر مخزن قابل للتبديل (Supabase أو مجلد محلي)
+ويطبق سياسة الاحتفاظ بالنسخ
 """
 
 import os
 import shutil
-import sqlite3
+import stat
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
 import tempfile
-import zipfile
-
-try:
-    from supabase import create_client  # type: ignore
-except ImportError:
-    create_client = None
-    logging.warning("supabase library not installed; backup functionality disabled.")
-"""StorageException for handling storage errors; using generic Exception as fallback."""
-StorageException = Exception
 
 import config
+from core.backup.snapshot import create_snapshot, verify_snapshot
+from core.backup.incremental import BACKUP_CATEGORIES, IncrementalBackup, read_database_fingerprint
+from core.backup.pipeline import CODEC_EXTENSIONS, backup_extension, run_pipeline
+from core.backup.retention import RetentionPolicy, plan_retention
+from core.backup.storage import (
+    ARCHIVES_FOLDER, BackupStorage, LocalStorage, backup_info, create_default_storage
+)
+from core.backup.catalog import BackupCatalog
+from core.backup import restore
+from core.utils.telemetry import timed
 
 
 class BackupManager:
     """مدير النسخ الاحتياطية"""
     
-    def __init__(self):
-        """تهيئة مدير النسخ الاحتياطية"""
-        self.logger = logging.getLogger(__name__)
-        # تحقق من توفر عميل Supabase
-        if create_client is None:
-            self.logger.error("Supabase client not available; backup functionality is disabled.")
-            raise Exception("مكتبة Supabase غير مثبتة. يرجى تثبيتها باستخدام: pip install supabase")
+    def __init__(self, storage: Optional[BackupStorage] = None,
+                 incremental: Optional[IncrementalBackup] = None,
+                 retention_policy: Optional[RetentionPolicy] = None,
+                 catalog: Optional[BackupCatalog] = None):
+        """
+        تهيئة مدير النسخ الاحتياطية
         
-        # تهيئة عميل Supabase
-        try:
-            self.supabase = create_client(config.SUPABASE_URL, config.SUPABASE_KEY)
-            self.bucket_name = config.SUPABASE_BUCKET
-            self.setup_storage()
-        except Exception as e:
-            self.logger.error(f"فشل في تهيئة Supabase: {e}")
-            raise Exception(f"فشل في الاتصال بـ Supabase: {e}")
-    
-    def setup_storage(self):
-        """إعداد التخزين على Supabase"""
-        try:
-            # التحقق من وجود البكت بدون محاولة إنشاؤه
-            self.logger.info(f"محاولة الاتصال بـ Supabase Storage...")
-            
-            # نجرب فقط الوصول للبكت الموجود
-            # إذا كان موجود سيعمل، إذا لم يكن موجود فسنتعامل مع الخطأ في create_backup
-            self.logger.info(f"سنستخدم بكت التخزين: {self.bucket_name}")
-                
-        except Exception as e:
-            self.logger.warning(f"تحذير في إعداد التخزين: {type(e).__name__}: {e}")
-            # لا نرمي خطأ هنا، فقط تحذير
-    
-    def _get_safe_organization_folder_name(self, organization_name: str) -> str:
-        """إنشاء اسم مجلد آمن من اسم المؤسسة"""
-        if not organization_name:
-            return "organization"
-        import re
-        # إزالة الأحرف غير المسموح بها
-        safe_org_name = re.sub(r'[<>:"/\\|?*]', '', organization_name)
-        # استبدال الفراغات ب underscore
-        safe_org_name = safe_org_name.strip().replace(' ', '_')
-        return safe_org_name
+        Args:
+            storage: مخزن النسخ (الافتراضي Supabase مع الرجوع إلى المخزن المحلي)
+            incremental: النسخ التزايدي المحلي
+            retention_policy: سياسة الاحتفاظ بالنسخ
+            catalog: الفهرس المحلي لقائمة النسخ
+        """
+        self.logger = logging.getLogger(__name__)
+        self.storage = storage or create_default_storage()
+        self.incremental = incremental or IncrementalBackup()
+        self.retention_policy = retention_policy or RetentionPolicy()
+        self.catalog = catalog or BackupCatalog()
+        self.logger.info(f"مخزن النسخ الاحتياطية: {self.storage.name}")
     
-    def create_backup(self, description: str = "") -> Tuple[bool, str]:
+    @timed("BackupManager.create_backup")
+    def create_backup(self, description: str = "",
+                      progress_callback: Optional[Callable[[str, int, int], None]] = None,
+                      force: bool = False, category: str = "manual") -> Tuple[bool, str]:
         """
-        إنشاء نسخة احتياطية جديدة ورفعها على Supabase
+        إنشاء نسخة احتياطية جديدة وحفظها في المخزن
+        
+        تُحفظ اللقطة أيضاً محلياً كنسخة تزايدية، ويُتخطى النسخ بالكامل إذا لم
+        تتغير قاعدة البيانات منذ آخر نسخة تم رفعها
         
         Args:
             description: وصف النسخة الاحتياطية
+            progress_callback: دالة تستدعى بـ (رسالة المرحلة، المنجز، الإجمالي)
+            force: إنشاء النسخة حتى لو لم تتغير القاعدة
+            category: فئة النسخة (daily | weekly | manual)
             
         Returns:
             tuple: (نجح العملية, رسالة النتيجة)
@@ -86,249 +75,165 @@ class BackupManager:
             if not config.DATABASE_PATH.exists():
                 return False, "قاعدة البيانات غير موجودة"
             
+            # تخطي النسخ إذا لم تتغير القاعدة منذ آخر نسخة مرفوعة
+            if not force and self.incremental.is_unchanged(uploaded_only=True):
+                self.logger.info("لم تتغير قاعدة البيانات منذ آخر نسخة مرفوعة؛ تم تخطي النسخ الاحتياطي")
+                return True, "لا توجد تغييرات منذ آخر نسخة احتياطية"
+            fingerprint = read_database_fingerprint(config.DATABASE_PATH)
+            
             # إنشاء اسم الملف بالتاريخ والوقت
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"backup_{timestamp}.zip"
+            codec = config.BACKUP_CODEC
+            backup_filename = f"backup_{timestamp}{backup_extension(codec)}"
+            
+            # ملف مؤقت للقطة فقط؛ الأرشيف المضغوط لا يُكتب على القرص
+            fd, snapshot_path = tempfile.mkstemp(suffix='.db', prefix='snapshot_')
+            os.close(fd)
             
-            # إنشاء ملف مؤقت للنسخة الاحتياطية
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.zip') as temp_file:
-                temp_path = temp_file.name
+            def report(message, done=0, total=0):
+                if progress_callback:
+                    progress_callback(message, done, total)
             
             try:
-                # إنشاء أرشيف ZIP يحتوي على قاعدة البيانات
-                with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    # إضافة قاعدة البيانات
-                    zip_file.write(config.DATABASE_PATH, "schools.db")
-                    
-                    # إضافة ملف معلومات النسخة الاحتياطية
-                    backup_info = {
-                        "created_at": datetime.now().isoformat(),
-                        "description": description,
-                        "database_size": os.path.getsize(config.DATABASE_PATH),
-                        "version": config.APP_VERSION
-                    }
-                    
-                    info_content = "\n".join([
-                        f"تاريخ الإنشاء: {backup_info['created_at']}",
-                        f"الوصف: {backup_info['description']}",
-                        f"حجم قاعدة البيانات: {backup_info['database_size']} بايت",
-                        f"إصدار التطبيق: {backup_info['version']}"
-                    ])
-                    
-                    zip_file.writestr("backup_info.txt", info_content.encode('utf-8'))
-                
-                # رفع على Supabase - طريقة مبسطة مثل المثال الناجح
-                self.logger.info("محاولة رفع النسخة الاحتياطية على Supabase...")
+                # لقطة متسقة من القاعدة أثناء التشغيل بدلاً من نسخ الملف الحي
+                report("جاري أخذ لقطة من قاعدة البيانات...")
+                success, message = create_snapshot(
+                    snapshot_path,
+                    progress_callback=lambda done, total: report(
+                        "جاري أخذ لقطة من قاعدة البيانات...", done, total)
+                )
+                if not success:
+                    return False, message
                 
-                # الحصول على اسم المؤسسة من الإعدادات
-                from core.utils.settings_manager import settings_manager
-                organization_name = settings_manager.get_organization_name()
+                report("جاري فحص سلامة اللقطة...")
+                success, message = verify_snapshot(snapshot_path)
+                if not success:
+                    return False, message
                 
-                # الحصول على اسم مجلد آمن
-                safe_org_name = self._get_safe_organization_folder_name(organization_name)
+                # حفظ نسخة تزايدية محلية (الأجزاء المتغيرة فقط)
+                manifest, changed = self.incremental.store_snapshot(
+                    snapshot_path, description, category, fingerprint,
+                    progress_callback=lambda done, total: report(
+                        "جاري حفظ النسخة المحلية...", done, total)
+                )
+                if not changed and manifest.get("remote_path") and not force:
+                    return True, "لا توجد تغييرات منذ آخر نسخة احتياطية"
                 
-                # مسار المجلد الجديد: اسم المؤسسة مباشرة
-                folder_path = f"backups/{safe_org_name}"
-                file_path = f"{folder_path}/{backup_filename}"
+                # ملف معلومات النسخة الاحتياطية
+                info_content = "\n".join([
+                    f"تاريخ الإنشاء: {datetime.now().isoformat()}",
+                    f"الوصف: {description}",
+                    f"حجم قاعدة البيانات: {os.path.getsize(snapshot_path)} بايت",
+                    f"إصدار التطبيق: {config.APP_VERSION}"
+                ])
                 
-                # قراءة الملف كما في المثال الناجح
-                with open(temp_path, 'rb') as f:
-                    data = f.read()
+                storage_label = "Supabase" if self.storage.is_remote else "التخزين المحلي"
+                file_path = self.storage.object_path(category, backup_filename)
                 
-                # رفع الملف بنفس الطريقة البسيطة
-                upload_result = self.supabase.storage.from_(self.bucket_name).upload(file_path, data)
+                # ضغط وكتابة متدفقة على دفعات مع تداخل الضغط والرفع
+                self.logger.info(f"محاولة حفظ النسخة الاحتياطية على {storage_label}...")
+                sink = self.storage.open_writer(category, backup_filename)
+                stats = run_pipeline(
+                    snapshot_path, sink, codec=codec,
+                    level=config.BACKUP_COMPRESSION_LEVEL,
+                    info_text=info_content,
+                    progress_callback=lambda done, total: report(
+                        "جاري ضغط ورفع النسخة الاحتياطية...", done, total)
+                )
                 
-                # التحقق من النتيجة مثل المثال الناجح
-                if hasattr(upload_result, 'error') and upload_result.error:
-                    error_msg = f"فشل في رفع النسخة الاحتياطية: {upload_result.error}"
-                    self.logger.error(error_msg)
-                    return False, error_msg
+                self.logger.info(f"تم إنشاء النسخة الاحتياطية على {storage_label}: {file_path} - {stats.summary()}")
                 
-                self.logger.info(f"تم إنشاء النسخة الاحتياطية على Supabase: {file_path}, النتيجة: {upload_result}")
+                self.incremental.mark_uploaded(manifest, file_path)
+                self._catalog_add(backup_info(backup_filename, file_path, category,
+                                              stats.output_bytes, self.storage.name), description)
                 
-                # حفظ اسم آخر نسخة تم رفعها لاستخدامها في list_backups
-                self._last_uploaded_backup = backup_filename
+                # أرشيفات الأعوام التي لم تُرفع بعد (فشلها لا يُفشل النسخة)
+                report("جاري رفع أرشيفات الأعوام الدراسية...")
+                self.upload_archives()
                 
-                return True, f"تم إنشاء النسخة الاحتياطية بنجاح على Supabase\nالملف: {backup_filename}"
+                return True, (f"تم إنشاء النسخة الاحتياطية بنجاح على {storage_label}\nالملف: {backup_filename}\n"
+                              f"{stats.summary()}")
                     
             finally:
-                # حذف الملف المؤقت
-                if os.path.exists(temp_path):
-                    os.unlink(temp_path)
+                # حذف اللقطة المؤقتة
+                if os.path.exists(snapshot_path):
+                    os.unlink(snapshot_path)
                     
-        except StorageException as e:
-            error_msg = f"خطأ في التخزين: {e}"
-            self.logger.error(error_msg)
-            return False, error_msg
-            
         except Exception as e:
             error_msg = f"خطأ في إنشاء النسخة الاحتياطية: {e}"
             self.logger.error(error_msg)
             return False, error_msg
     
-    def list_backups(self) -> List[Dict]:
+    def list_backups(self, category: Optional[str] = None) -> List[Dict]:
         """
-        قائمة بجميع النسخ الاحتياطية المتاحة على Supabase - إصدار مُصلح
+        قائمة بجميع النسخ الاحتياطية المتاحة في المخزن
         
+        Args:
+            category: فئة محددة (daily | weekly | manual) أو None للجميع
+            
         Returns:
-            قائمة بالنسخ الاحتياطية مع معلوماتها
+            قائمة بالنسخ الاحتياطية مع معلوماتها (الأحدث أولاً)
         """
         try:
-            # الحصول على اسم المؤسسة
-            from core.utils.settings_manager import settings_manager
-            organization_name = settings_manager.get_organization_name()
-            
-            if not organization_name:
-                self.logger.warning("لم يتم العثور على اسم المؤسسة")
-                return []
-            
-            safe_org_name = self._get_safe_organization_folder_name(organization_name)
-            backups = []
-            
-            self.logger.info(f"البحث عن النسخ في مجلد: {safe_org_name}")
-            
-            try:
-                # البحث في مجلد المؤسسة مباشرة
-                org_folder_path = f"backups/{safe_org_name}"
-                files = self.supabase.storage.from_(self.bucket_name).list(org_folder_path)
-                
-                self.logger.info(f"عدد الملفات في مجلد المؤسسة: {len(files) if files else 0}")
-                
-                if files:
-                    for file_item in files:
-                        if file_item and isinstance(file_item, dict):
-                            filename = file_item.get('name', '')
-                            self.logger.info(f"فحص الملف: {filename}")
-                            
-                            # التحقق من أن هذا ملف نسخة احتياطية
-                            if filename.endswith('.zip') and 'backup_' in filename:
-                                backup_info = self._parse_backup_info_fixed(
-                                    f"{org_folder_path}/{filename}",
-                                    file_item
-                                )
-                                if backup_info:
-                                    backups.append(backup_info)
-                                    self.logger.info(f"تم إضافة النسخة: {filename}")
-                
-            except Exception as folder_e:
-                self.logger.error(f"خطأ في البحث في مجلد المؤسسة: {folder_e}")
-                
-                # محاولة البحث في جميع المجلدات
-                try:
-                    all_backups_folders = self.supabase.storage.from_(self.bucket_name).list("backups")
-                    
-                    for folder_item in all_backups_folders:
-                        if folder_item and isinstance(folder_item, dict):
-                            folder_name = folder_item.get('name', '')
-                            
-                            # البحث في كل مجلد
-                            try:
-                                folder_files = self.supabase.storage.from_(self.bucket_name).list(f"backups/{folder_name}")
-                                
-                                for file_item in folder_files:
-                                    if file_item and isinstance(file_item, dict):
-                                        filename = file_item.get('name', '')
-                                        
-                                        if filename.endswith('.zip') and 'backup_' in filename:
-                                            backup_info = self._parse_backup_info_fixed(
-                                                f"backups/{folder_name}/{filename}",
-                                                file_item
-                                            )
-                                            if backup_info:
-                                                backups.append(backup_info)
-                                                
-                            except Exception as subfolder_e:
-                                self.logger.warning(f"خطأ في البحث في مجلد {folder_name}: {subfolder_e}")
-                                
-                except Exception as fallback_e:
-                    self.logger.error(f"خطأ في البحث العام: {fallback_e}")
-            
-            # ترتيب النسخ حسب التاريخ (الأحدث أولاً)
-            backups.sort(key=lambda x: x.get('created_at', datetime.min), reverse=True)
-            
+            backups = self.storage.list_backups(category)
             self.logger.info(f"تم العثور على {len(backups)} نسخة احتياطية")
             return backups
-            
         except Exception as e:
             self.logger.error(f"خطأ في جلب قائمة النسخ الاحتياطية: {e}")
             return []
     
-    def _is_backup_folder(self, item: Dict) -> bool:
-        """التحقق من أن العنصر مجلد وليس ملف"""
-        return item.get('id') is None and 'name' in item
-    
-    def _parse_backup_info_fixed(self, file_path: str, file_item: Dict) -> Optional[Dict]:
-        """استخراج معلومات النسخة الاحتياطية - إصدار مُصلح"""
+    def list_cached_backups(self, offset: int = 0, limit: int = 50,
+                            category: Optional[str] = None) -> List[Dict]:
+        """
+        صفحة من قائمة النسخ من الفهرس المحلي (دون الاتصال بالمخزن)
+        
+        Args:
+            offset: بداية الصفحة
+            limit: عدد النسخ في الصفحة
+            category: فئة محددة أو None للجميع
+        """
         try:
-            filename = file_item.get('name', '')
-            
-            if filename.startswith('backup_') and filename.endswith('.zip'):
-                timestamp_str = filename[7:-4]  # إزالة 'backup_' و '.zip'
-                
-                try:
-                    # تحويل timestamp إلى datetime
-                    backup_date = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                except ValueError:
-                    backup_date = datetime.now()
-                
-                # حجم الملف من metadata
-                size = 0
-                if file_item.get('metadata') and isinstance(file_item['metadata'], dict):
-                    size = file_item['metadata'].get('size', 0)
-                
-                return {
-                    'filename': filename,
-                    'path': file_path,
-                    'created_at': backup_date,
-                    'size': size,
-                    'formatted_date': backup_date.strftime("%Y-%m-%d %H:%M:%S"),
-                    'formatted_size': self._format_file_size(size)
-                }
-                
+            return self.catalog.page(self.storage.name, offset, limit, category)
         except Exception as e:
-            self.logger.error(f"خطأ في استخراج معلومات النسخة الاحتياطية: {e}")
-            
-        return None
+            self.logger.error(f"خطأ في قراءة فهرس النسخ الاحتياطية: {e}")
+            return []
     
-    def _parse_backup_info(self, file_path: str, file_item: Dict) -> Optional[Dict]:
-        """استخراج معلومات النسخة الاحتياطية"""
+    def count_cached_backups(self, category: Optional[str] = None) -> int:
         try:
-            filename = file_item['name']
-            
-            # استخراج التاريخ من اسم الملف
-            if filename.startswith('backup_') and filename.endswith('.zip'):
-                timestamp_str = filename[7:-4]  # إزالة 'backup_' و '.zip'
-                
-                try:
-                    # تحويل timestamp إلى datetime
-                    backup_date = datetime.strptime(timestamp_str, "%Y%m%d_%H%M%S")
-                except ValueError:
-                    backup_date = datetime.now()
-                
-                return {
-                    'filename': filename,
-                    'path': file_path,
-                    'created_at': backup_date,
-                    'size': file_item.get('metadata', {}).get('size', 0),
-                    'formatted_date': backup_date.strftime("%Y-%m-%d %H:%M:%S"),
-                    'formatted_size': self._format_file_size(
-                        file_item.get('metadata', {}).get('size', 0)
-                    )
-                }
-                
+            return self.catalog.count(self.storage.name, category)
         except Exception as e:
-            self.logger.error(f"خطأ في استخراج معلومات النسخة الاحتياطية: {e}")
-            
-        return None
+            self.logger.error(f"خطأ في قراءة فهرس النسخ الاحتياطية: {e}")
+            return 0
     
-    def _format_file_size(self, size_bytes: int) -> str:
-        """تنسيق حجم الملف"""
-        if size_bytes < 1024:
-            return f"{size_bytes} بايت"
-        elif size_bytes < 1024 * 1024:
-            return f"{size_bytes / 1024:.1f} كيلوبايت"
-        else:
-            return f"{size_bytes / (1024 * 1024):.1f} ميجابايت"
+    def reconcile_catalog(self) -> Tuple[bool, str]:
+        """
+        مطابقة الفهرس المحلي مع المخزن فئة بفئة
+        
+        Returns:
+            tuple: (هل تغير الفهرس, رسالة النتيجة)
+        """
+        added = removed = 0
+        for category in BACKUP_CATEGORIES:
+            try:
+                listing = self.storage.list_backups(category)
+            except Exception as e:
+                self.logger.warning(f"تعذر جلب نسخ الفئة {category}: {e}")
+                continue
+            category_added, category_removed = self.catalog.reconcile(
+                listing, self.storage.name, category)
+            added += category_added
+            removed += category_removed
+        message = f"مطابقة فهرس النسخ: إضافة {added} وإزالة {removed}"
+        self.logger.info(message)
+        return bool(added or removed), message
+    
+    def _catalog_add(self, info: Optional[Dict], description: str = ""):
+        """تسجيل نسخة جديدة في الفهرس؛ الخطأ هنا لا يُفشل النسخ"""
+        try:
+            if info:
+                self.catalog.add(info, description)
+        except Exception as e:
+            self.logger.warning(f"تعذر تحديث فهرس النسخ الاحتياطية: {e}")
     
     def get_backup_url(self, file_path: str, expires_in: int = 3600) -> Optional[str]:
         """
@@ -341,21 +246,11 @@ class BackupManager:
         Returns:
             رابط التحميل أو None في حالة الخطأ
         """
-        if self.supabase is None:
-            return None
-        try:
-            result = self.supabase.storage.from_(self.bucket_name).create_signed_url(
-                file_path, expires_in
-            )
-            return result.get('signedURL')
-            
-        except Exception as e:
-            self.logger.error(f"خطأ في إنشاء رابط التحميل: {e}")
-            return None
+        return self.storage.get_url(file_path, expires_in)
     
     def delete_backup(self, file_path: str) -> Tuple[bool, str]:
         """
-        حذف نسخة احتياطية من Supabase
+        حذف نسخة احتياطية من المخزن
         
         Args:
             file_path: مسار الملف
@@ -364,9 +259,8 @@ class BackupManager:
             tuple: (نجح العملية, رسالة النتيجة)
         """
         try:
-            result = self.supabase.storage.from_(self.bucket_name).remove([file_path])
-            
-            if result:
+            if self.storage.delete(file_path):
+                self.catalog.remove(file_path)
                 self.logger.info(f"تم حذف النسخة الاحتياطية: {file_path}")
                 return True, "تم حذف النسخة الاحتياطية بنجاح"
             else:
@@ -379,7 +273,7 @@ class BackupManager:
     
     def cleanup_old_backups(self, keep_days: int = 30) -> Tuple[bool, str]:
         """
-        تنظيف النسخ الاحتياطية القديمة على Supabase
+        حذف النسخ الاحتياطية الأقدم من عدد محدد من الأيام
         
         Args:
             keep_days: عدد الأيام للاحتفاظ بالنسخ
@@ -390,7 +284,7 @@ class BackupManager:
         try:
             backups = self.list_backups()
             cutoff_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-            cutoff_date = cutoff_date.replace(day=cutoff_date.day - keep_days)
+            cutoff_date -= timedelta(days=keep_days)
             
             deleted_count = 0
             for backup in backups:
@@ -408,48 +302,245 @@ class BackupManager:
             self.logger.error(error_msg)
             return False, error_msg
     
-    def get_backup_url(self, file_path: str, expires_in: int = 3600) -> Optional[str]:
+    def fetch_backup(self, file_path: str, dest_path: str) -> Tuple[bool, str]:
         """
-        الحصول على رابط تحميل النسخة الاحتياطية من Supabase
+        تحضير ملف قاعدة من نسخة في المخزن
+        
+        تُجمع النسخة من الأجزاء المحلية إن وُجدت (دون تحميل)، وإلا تُحمل بشكل
+        متدفق من المخزن ثم يُفك ضغطها
         
-        Args:
-            file_path: مسار الملف
-            expires_in: مدة صلاحية الرابط بالثواني
-            
         Returns:
-            رابط التحميل أو None في حالة الخطأ
+            tuple: (نجح العملية, رسالة النتيجة)
+        """
+        manifest = next((m for m in self.incremental.store.list_manifests()
+                         if m.get("remote_path") == file_path), None)
+        if manifest is not None:
+            success, message = self.incremental.restore_to(manifest["name"], dest_path)
+            if success:
+                return success, message
+            self.logger.warning(f"تعذر التجميع من الأجزاء المحلية، سيتم التحميل: {message}")
+        
+        return self._download(file_path, dest_path)
+    
+    def _download(self, file_path: str, dest_path: str) -> Tuple[bool, str]:
+        """تحميل ملف من المخزن بشكل متدفق ثم فك ضغطه إلى dest_path"""
+        # الإبقاء على امتداد الأرشيف لمعرفة طريقة الضغط عند فكه
+        fd, archive_path = tempfile.mkstemp(suffix=f"_{os.path.basename(file_path)}", prefix="download_")
+        os.close(fd)
+        try:
+            with self.storage.open_reader(file_path) as reader, open(archive_path, "wb") as f:
+                shutil.copyfileobj(reader, f, 1024 * 1024)
+            return restore.stage_backup(archive_path, dest_path)
+        except Exception as e:
+            error_msg = f"خطأ في تحميل النسخة الاحتياطية: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
+        finally:
+            if os.path.exists(archive_path):
+                os.unlink(archive_path)
+    
+    @staticmethod
+    def _archive_file_name(remote_name: str) -> Optional[str]:
+        """'year_2023_2024.db.zip' -> 'year_2023_2024.db'"""
+        for extension in sorted(CODEC_EXTENSIONS.values(), key=len, reverse=True):
+            if remote_name.endswith(extension):
+                name = remote_name[:-len(extension)]
+                return name if name.startswith("year_") and name.endswith(".db") else None
+        return None
+    
+    def upload_archives(self, root=None) -> Tuple[bool, str]:
+        """
+        رفع ملفات أرشيف الأعوام الدراسية التي لم تُرفع بعد
+        
+        ملف الأرشيف لا يتغير بعد إنشائه، فيُرفع مرة واحدة ويبقى في مجلد
+        archives خارج سياسة الاحتفاظ
+        
+        Returns:
+            tuple: (نجح العملية, رسالة النتيجة)
         """
+        from core.database.archive import list_archives
+        
         try:
-            result = self.supabase.storage.from_(self.bucket_name).create_signed_url(
-                file_path, expires_in
-            )
-            return result.get('signedURL')
+            uploaded = {self._archive_file_name(item['name'])
+                        for item in self.storage.list_files(ARCHIVES_FOLDER)}
+            codec = config.BACKUP_CODEC
+            count = 0
+            for archive in list_archives(root):
+                path = archive['path']
+                if path.name in uploaded:
+                    continue
+                sink = self.storage.open_writer(ARCHIVES_FOLDER, f"{path.name}{backup_extension(codec)}")
+                run_pipeline(str(path), sink, codec=codec, level=config.BACKUP_COMPRESSION_LEVEL,
+                             info_text=f"أرشيف العام الدراسي: {archive['academic_year']}")
+                count += 1
+            message = f"تم رفع {count} ملف أرشيف للأعوام الدراسية"
+            if count:
+                self.logger.info(message)
+            return True, message
+        except Exception as e:
+            error_msg = f"خطأ في رفع أرشيفات الأعوام الدراسية: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
+    
+    def restore_archives(self, root=None) -> Tuple[bool, str]:
+        """
+        تحميل ملفات أرشيف الأعوام المرفوعة غير الموجودة محلياً (بعد استعادة القاعدة)
+        
+        Returns:
+            tuple: (نجح العملية, رسالة النتيجة)
+        """
+        folder = Path(root or config.ARCHIVE_DIR)
+        folder.mkdir(parents=True, exist_ok=True)
+        try:
+            count = 0
+            for item in self.storage.list_files(ARCHIVES_FOLDER):
+                name = self._archive_file_name(item['name'])
+                if name is None or (folder / name).exists():
+                    continue
+                staging_path = folder / f"{name}.part"
+                success, message = self._download(item['path'], str(staging_path))
+                if success:
+                    success, message = verify_snapshot(str(staging_path))
+                if not success:
+                    if staging_path.exists():
+                        staging_path.unlink()
+                    return False, f"تعذر استعادة أرشيف {name}: {message}"
+                os.replace(staging_path, folder / name)
+                os.chmod(folder / name, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+                count += 1
+            return True, f"تمت استعادة {count} ملف أرشيف للأعوام الدراسية"
+        except Exception as e:
+            error_msg = f"خطأ في استعادة أرشيفات الأعوام الدراسية: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
+    
+    def restore_backup(self, file_path: str,
+                       progress_callback: Optional[Callable[[str], None]] = None) -> Tuple[bool, str]:
+        """
+        استعادة نسخة من المخزن مكان القاعدة الحالية بعد فحصها
+        
+        Returns:
+            tuple: (نجح العملية, رسالة النتيجة)
+        """
+        staging_path = restore.create_staging_path()
+        try:
+            if progress_callback:
+                progress_callback("جاري تحضير النسخة الاحتياطية...")
+            success, message = self.fetch_backup(file_path, staging_path)
+            if not success:
+                return False, message
+            success, message = restore.restore_staged(staging_path, progress_callback=progress_callback)
+            if not success:
+                return False, message
+            # البيانات المؤرشفة ليست في القاعدة، فتُستعاد ملفاتها معها
+            if progress_callback:
+                progress_callback("جاري استعادة أرشيفات الأعوام الدراسية...")
+            archives_ok, archives_message = self.restore_archives()
+            return True, f"{message}\n{archives_message}" if archives_ok else f"{message}\nتحذير: {archives_message}"
+        except Exception as e:
+            error_msg = f"خطأ في استعادة النسخة الاحتياطية: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
+        finally:
+            if os.path.exists(staging_path):
+                os.unlink(staging_path)
+    
+    def open_backup_for_inspection(self, file_path: str, alias: str = "restored",
+                                   progress_callback: Optional[Callable[[str], None]] = None) -> Tuple[bool, str]:
+        """
+        استعادة نسخة إلى قاعدة جانبية وإرفاقها للمعاينة دون استبدال البيانات الحية
+        
+        Returns:
+            tuple: (نجح العملية, رسالة النتيجة)
+        """
+        side_path = restore.side_database_path(os.path.basename(file_path),
+                                               self.incremental.store.root)
+        try:
+            if progress_callback:
+                progress_callback("جاري تحضير النسخة الاحتياطية...")
+            restore.detach_side_database(alias)
+            success, message = self.fetch_backup(file_path, str(side_path))
+            if not success:
+                return False, message
+            if progress_callback:
+                progress_callback("جاري فحص سلامة النسخة...")
+            success, message = restore.check_database_file(side_path)
+            if not success:
+                return False, message
+            success, message = restore.attach_side_database(side_path, alias)
+            if success:
+                message = f"{message}\nالملف: {side_path}"
+            return success, message
+        except Exception as e:
+            error_msg = f"خطأ في فتح النسخة للمعاينة: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
+    
+    def apply_retention(self, policy: Optional[RetentionPolicy] = None,
+                        now: Optional[datetime] = None) -> Tuple[bool, str]:
+        """
+        تطبيق سياسة الاحتفاظ على النسخ في المخزن وعلى النسخ التزايدية المحلية
+        
+        ترقى أحدث نسخة يومية من كل أسبوع منتهٍ إلى weekly، ثم تُحذف النسخ
+        الزائدة، وأخيراً الأجزاء المحلية التي لم تعد أي نسخة تشير إليها
+        
+        Returns:
+            tuple: (نجح العملية, رسالة النتيجة)
+        """
+        try:
+            policy = policy or self.retention_policy
+            
+            promote, delete = plan_retention(self.storage.list_backups(), policy, now)
+            for backup in promote:
+                new_path = self.storage.move(backup['path'], 'weekly')
+                self.catalog.relocate(backup['path'], new_path, 'weekly')
+            deleted_count = sum(1 for backup in delete if self.delete_backup(backup['path'])[0])
+            
+            store = self.incremental.store
+            manifests = []
+            for manifest in store.list_manifests():
+                try:
+                    created_at = datetime.fromisoformat(manifest.get('created_at', ''))
+                except ValueError:
+                    continue
+                manifests.append({'name': manifest['name'], 'category': manifest['category'],
+                                  'created_at': created_at})
+            promote_local, delete_local = plan_retention(manifests, policy, now)
+            for manifest in promote_local:
+                store.move_manifest(manifest['name'], 'weekly')
+            for manifest in delete_local:
+                store.delete_manifest(manifest['name'])
+            removed_chunks = store.collect_garbage()
+            
+            message = (f"تم حذف {deleted_count} نسخة احتياطية وترقية {len(promote)} نسخة إلى أسبوعية، "
+                       f"وحذف {len(delete_local)} نسخة محلية و{removed_chunks} جزء غير مستخدم")
+            self.logger.info(message)
+            return True, message
             
         except Exception as e:
-            self.logger.error(f"خطأ في إنشاء رابط التحميل: {e}")
-            return None
+            error_msg = f"خطأ في تطبيق سياسة الاحتفاظ بالنسخ: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
 
 
 # إنشاء مثيل مشترك من مدير النسخ الاحتياطية - تجنب None
-backup_manager = None
+_backup_manager = None
 
 def get_backup_manager():
     """الحصول على مثيل من مدير النسخ الاحتياطية مع إعادة المحاولة"""
-    global backup_manager
-    if backup_manager is None:
+    global _backup_manager
+    if _backup_manager is None:
         try:
-            backup_manager = BackupManager()
+            _backup_manager = BackupManager()
         except Exception as e:
-            import logging
             logging.error(f"فشل في تهيئة مدير النسخ الاحتياطية: {e}")
-            # إرجاع كائن وهمي بدلاً من None لتجنب NoneType errors
-            class DummyBackupManager:
-                def create_backup(self, description=""):
-                    return False, f"فشل في تهيئة النظام: {e}"
-                def list_backups(self):
-                    return []
-            backup_manager = DummyBackupManager()
-    return backup_manager
+            # الرجوع إلى المخزن المحلي حتى تبقى النسخ الاحتياطية متاحة
+            _backup_manager = BackupManager(LocalStorage())
+    return _backup_manager
+
 
-# تهيئة فورية
-backup_manager = get_backup_manager()
+def __getattr__(name):
+    # المثيل المشترك يُنشأ عند أول استخدام وليس عند استيراد الوحدة أثناء بدء التشغيل
+    if name == "backup_manager":
+        return get_backup_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
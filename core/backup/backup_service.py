@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خدمة النسخ الاحتياطي في الخلفية
+خيط عامل وطابور مهام للنسخ الدوري وعند الخمول وعند الخروج، مع حفظ حالة
+المهام على القرص لاستئناف أي نسخة مقطوعة عند التشغيل التالي
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# عدد المهام المنتهية المحفوظة في ملف الحالة
+_FINISHED_HISTORY = 50
+
+_STOP = object()
+
+
+@dataclass
+class BackupJob:
+    """مهمة نسخ احتياطي في الطابور"""
+    kind: str  # periodic | idle | exit | manual | prune
+    description: str = ""
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    status: str = JOB_PENDING
+    attempts: int = 0
+    message: str = ""
+    finished_at: Optional[str] = None
+
+
+def _default_runner(job: BackupJob) -> Tuple[bool, str]:
+    from core.backup.backup_manager import get_backup_manager
+    manager = get_backup_manager()
+    if job.kind == "prune":
+        return manager.apply_retention()
+    # النسخ التلقائية يومية وتخضع لسياسة الاحتفاظ، واليدوية منفصلة عنها
+    category = "manual" if job.kind == "manual" else "daily"
+    success, message = manager.create_backup(job.description, category=category)
+    if success:
+        # تقليم النسخ القديمة في خيط الخدمة نفسه؛ فشله لا يُفشل النسخة
+        pruned, prune_message = manager.apply_retention()
+        if not pruned:
+            logging.getLogger(__name__).warning(prune_message)
+    return success, message
+
+
+class BackupService:
+    """خدمة نسخ احتياطي تعمل في خيط مستقل عن واجهة المستخدم"""
+
+    def __init__(self, runner: Optional[Callable[[BackupJob], Tuple[bool, str]]] = None,
+                 state_path=None,
+                 periodic_interval: float = config.BACKUP_PERIODIC_INTERVAL_MINUTES * 60,
+                 idle_seconds: float = config.BACKUP_IDLE_SECONDS,
+                 max_attempts: int = 3):
+        """
+        Args:
+            runner: دالة تنفذ المهمة وتعيد (نجح العملية, رسالة)
+            state_path: ملف حفظ حالة المهام
+            periodic_interval: الفاصل بين النسخ الدورية بالثواني (0 للتعطيل)
+            idle_seconds: مدة الخمول قبل أخذ نسخة (0 للتعطيل)
+            max_attempts: عدد محاولات المهمة قبل التخلي عنها
+        """
+        self.logger = logging.getLogger(__name__)
+        self.runner = runner or _default_runner
+        self.state_path = Path(state_path or config.BACKUP_JOBS_FILE)
+        self.periodic_interval = periodic_interval
+        self.idle_seconds = idle_seconds
+        self.max_attempts = max_attempts
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._jobs: Dict[str, BackupJob] = {}
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[BackupJob], None]] = []
+        self._worker: Optional[threading.Thread] = None
+        self._scheduler: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._idle = threading.Event()
+        self._last_activity = time.monotonic()
+        self._last_periodic = time.monotonic()
+        self._idle_done = False
+
+    # ------------------------------------------------------------------
+    # التشغيل والإيقاف
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """بدء الخدمة واستئناف المهام غير المكتملة من التشغيل السابق"""
+        if self._worker is not None:
+            return
+        self._load_state()
+        # خيط غير خفي: يكمل بايثون المهام المعلقة بعد إغلاق النافذة قبل إنهاء العملية
+        self._worker = threading.Thread(target=self._work, name="backup-service", daemon=False)
+        self._worker.start()
+        if self.periodic_interval or self.idle_seconds:
+            self._scheduler = threading.Thread(target=self._schedule, name="backup-scheduler", daemon=True)
+            self._scheduler.start()
+
+    def shutdown(self, wait: bool = False, timeout: Optional[float] = None):
+        """
+        إيقاف استقبال المهام الدورية وإنهاء العامل بعد إكمال الطابور
+
+        Args:
+            wait: انتظار انتهاء العامل
+            timeout: أقصى مدة للانتظار
+        """
+        self._stopping.set()
+        if self._worker is not None:
+            self._queue.put(_STOP)
+            if wait:
+                self._worker.join(timeout)
+
+    def is_running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    # ------------------------------------------------------------------
+    # المهام
+    # ------------------------------------------------------------------
+
+    def submit(self, kind: str, description: str = "") -> BackupJob:
+        """إضافة مهمة إلى الطابور (تُدمج مع مهمة معلقة من النوع نفسه)"""
+        with self._lock:
+            job = next((job for job in self._jobs.values()
+                        if job.kind == kind and job.status == JOB_PENDING), None)
+            if job is None:
+                job = BackupJob(kind=kind, description=description or self._describe(kind))
+                self._jobs[job.id] = job
+                self._save_state()
+        self._idle.clear()
+        self._queue.put(job.id)
+        return job
+
+    def pending_jobs(self) -> List[BackupJob]:
+        with self._lock:
+            return [job for job in self._jobs.values() if job.status in (JOB_PENDING, JOB_RUNNING)]
+
+    def add_listener(self, callback: Callable[[BackupJob], None]):
+        """تسجيل دالة تستدعى عند انتهاء كل مهمة (من خيط الخدمة)"""
+        self._listeners.append(callback)
+
+    def notify_activity(self):
+        """إبلاغ الخدمة بنشاط المستخدم (لتأجيل نسخ الخمول)"""
+        self._last_activity = time.monotonic()
+        self._idle_done = False
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """انتظار فراغ الطابور (للاختبارات والإغلاق المنظم)"""
+        return self._idle.wait(timeout)
+
+    @staticmethod
+    def _describe(kind: str) -> str:
+        labels = {
+            "periodic": "نسخة احتياطية دورية",
+            "idle": "نسخة احتياطية أثناء الخمول",
+            "exit": "نسخة احتياطية تلقائية عند الخروج",
+            "manual": "نسخة احتياطية يدوية",
+            "prune": "تطبيق سياسة الاحتفاظ بالنسخ",
+        }
+        return f"{labels.get(kind, 'نسخة احتياطية')} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+
+    def _work(self):
+        while True:
+            if self._queue.empty():
+                self._idle.set()
+            item = self._queue.get()
+            if item is _STOP:
+                # إكمال ما تبقى في الطابور قبل الخروج
+                remaining = []
+                while not self._queue.empty():
+                    next_item = self._queue.get_nowait()
+                    if next_item is not _STOP:
+                        remaining.append(next_item)
+                for job_id in remaining:
+                    self._run_job(job_id)
+                self._idle.set()
+                break
+            self._run_job(item)
+
+    def _run_job(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status != JOB_PENDING:
+                return
+            job.status = JOB_RUNNING
+            job.attempts += 1
+            self._save_state()
+
+        try:
+            success, message = self.runner(job)
+        except Exception as e:
+            success, message = False, f"خطأ في تنفيذ مهمة النسخ الاحتياطي: {e}"
+
+        with self._lock:
+            job.message = message
+            job.finished_at = datetime.now().isoformat()
+            if success:
+                job.status = JOB_DONE
+            elif job.attempts < self.max_attempts:
+                # تبقى معلقة: تُعاد مع أول مهمة جديدة من النوع نفسه أو عند البدء التالي
+                job.status = JOB_PENDING
+            else:
+                job.status = JOB_FAILED
+            self._save_state()
+
+        if success:
+            self.logger.info(f"اكتملت مهمة النسخ الاحتياطي ({job.kind}): {message}")
+        else:
+            self.logger.error(f"فشلت مهمة النسخ الاحتياطي ({job.kind}): {message}")
+
+        for callback in list(self._listeners):
+            try:
+                callback(job)
+            except Exception as e:
+                self.logger.warning(f"خطأ في مستمع خدمة النسخ الاحتياطي: {e}")
+
+    def _schedule(self):
+        """جدولة النسخ الدوري ونسخ الخمول"""
+        tick = max(1.0, min(30.0, (self.idle_seconds or self.periodic_interval) / 4))
+        while not self._stopping.wait(tick):
+            now = time.monotonic()
+            if self.periodic_interval and now - self._last_periodic >= self.periodic_interval:
+                self._last_periodic = now
+                self.submit("periodic")
+            if (self.idle_seconds and not self._idle_done
+                    and now - self._last_activity >= self.idle_seconds):
+                self._idle_done = True
+                self.submit("idle")
+
+    # ------------------------------------------------------------------
+    # حفظ الحالة
+    # ------------------------------------------------------------------
+
+    def _load_state(self):
+        """تحميل المهام المحفوظة وإعادة جدولة غير المكتملة منها"""
+        if not self.state_path.exists():
+            return
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"تعذر قراءة حالة مهام النسخ الاحتياطي: {e}")
+            return
+
+        resumed = 0
+        with self._lock:
+            for data in saved.get("jobs", []):
+                try:
+                    job = BackupJob(**data)
+                except TypeError:
+                    continue
+                if job.status == JOB_RUNNING:
+                    # انقطعت أثناء التنفيذ في التشغيل السابق
+                    job.status = JOB_PENDING
+                if job.status == JOB_PENDING and job.attempts >= self.max_attempts:
+                    job.status = JOB_FAILED
+                self._jobs[job.id] = job
+                if job.status == JOB_PENDING:
+                    self._queue.put(job.id)
+                    resumed += 1
+        if resumed:
+            self.logger.info(f"استئناف {resumed} مهمة نسخ احتياطي من التشغيل السابق")
+
+    def _save_state(self):
+        with self._lock:
+            active = [job for job in self._jobs.values() if job.status in (JOB_PENDING, JOB_RUNNING)]
+            finished = sorted((job for job in self._jobs.values() if job.status in (JOB_DONE, JOB_FAILED)),
+                              key=lambda j: j.finished_at or "", reverse=True)[:_FINISHED_HISTORY]
+            self._jobs = {job.id: job for job in active + finished}
+            data = {"jobs": [asdict(job) for job in active + finished]}
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.state_path.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.state_path)
+        except OSError as e:
+            self.logger.warning(f"تعذر حفظ حالة مهام النسخ الاحتياطي: {e}")
+
+
+# مثيل مشترك يُنشأ عند أول استخدام
+_backup_service: Optional[BackupService] = None
+
+
+def get_backup_service() -> BackupService:
+    """الحصول على خدمة النسخ الاحتياطي المشتركة"""
+    global _backup_service
+    if _backup_service is None:
+        _backup_service = BackupService()
+    return _backup_service
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+فهرس محلي للنسخ الاحتياطية
+قاعدة SQLite صغيرة في مجلد النسخ تُحدَّث عند كل نسخة وحذف، وتُطابق مع
+المخزن في الخلفية، لتُعرض قائمة النسخ فوراً ومجزأة على صفحات
+"""
+
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import config
+from core.backup.storage import format_file_size
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    path TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    storage TEXT NOT NULL,
+    category TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    size INTEGER DEFAULT 0,
+    description TEXT DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_backups_storage_created
+    ON backups (storage, created_at DESC);
+CREATE TABLE IF NOT EXISTS catalog_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class BackupCatalog:
+    """فهرس النسخ الاحتياطية المحلي"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or config.BACKUP_CATALOG_PATH)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._connection.row_factory = sqlite3.Row
+            self._connection.executescript(_SCHEMA)
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    # ------------------------------------------------------------------
+    # التحديث
+    # ------------------------------------------------------------------
+
+    def add(self, info: Dict, description: str = ""):
+        """تسجيل نسخة (أو تحديثها) في الفهرس"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("""
+                    INSERT INTO backups (path, filename, storage, category, created_at, size, description)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(path) DO UPDATE SET
+                        category = excluded.category,
+                        size = excluded.size,
+                        description = CASE WHEN excluded.description != ''
+                                           THEN excluded.description ELSE backups.description END
+                """, (info['path'], info['filename'], info.get('storage', ''), info['category'],
+                      info['created_at'].isoformat(), info.get('size', 0), description))
+
+    def remove(self, path: str):
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM backups WHERE path = ?", (path,))
+
+    def relocate(self, old_path: str, new_path: str, category: str):
+        """تحديث مسار نسخة بعد نقلها إلى فئة أخرى"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("UPDATE backups SET path = ?, category = ? WHERE path = ?",
+                             (new_path, category, old_path))
+
+    def reconcile(self, listing: List[Dict], storage: str,
+                  category: Optional[str] = None) -> Tuple[int, int]:
+        """
+        مطابقة الفهرس مع قائمة المخزن لفئة واحدة (أو للجميع)
+
+        Returns:
+            (عدد النسخ المضافة، عدد النسخ المحذوفة من الفهرس)
+        """
+        listed = {info['path']: info for info in listing}
+        with self._lock:
+            conn = self._connect()
+            query = "SELECT path FROM backups WHERE storage = ?"
+            params = [storage]
+            if category:
+                query += " AND category = ?"
+                params.append(category)
+            known = {row['path'] for row in conn.execute(query, params)}
+
+            added = [info for path, info in listed.items() if path not in known]
+            removed = [path for path in known if path not in listed]
+            with conn:
+                conn.executemany("""
+                    INSERT OR IGNORE INTO backups (path, filename, storage, category, created_at, size)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, [(info['path'], info['filename'], storage, info['category'],
+                       info['created_at'].isoformat(), info.get('size', 0)) for info in added])
+                conn.executemany("DELETE FROM backups WHERE path = ?", [(path,) for path in removed])
+                conn.execute("INSERT OR REPLACE INTO catalog_state (key, value) VALUES (?, ?)",
+                             (f"reconciled:{storage}:{category or '*'}", datetime.now().isoformat()))
+        return len(added), len(removed)
+
+    # ------------------------------------------------------------------
+    # القراءة
+    # ------------------------------------------------------------------
+
+    def page(self, storage: str, offset: int = 0, limit: int = 50,
+             category: Optional[str] = None) -> List[Dict]:
+        """صفحة من النسخ مرتبة من الأحدث إلى الأقدم"""
+        query = "SELECT * FROM backups WHERE storage = ?"
+        params: list = [storage]
+        if category:
+            query += " AND category = ?"
+            params.append(category)
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        params.extend([limit, offset])
+        with self._lock:
+            rows = self._connect().execute(query, params).fetchall()
+
+        backups = []
+        for row in rows:
+            created_at = datetime.fromisoformat(row['created_at'])
+            backups.append({
+                'filename': row['filename'],
+                'path': row['path'],
+                'category': row['category'],
+                'storage': row['storage'],
+                'created_at': created_at,
+                'size': row['size'],
+                'description': row['description'] or '',
+                'formatted_date': created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                'formatted_size': format_file_size(row['size'] or 0)
+            })
+        return backups
+
+    def count(self, storage: str, category: Optional[str] = None) -> int:
+        query = "SELECT COUNT(*) FROM backups WHERE storage = ?"
+        params: list = [storage]
+        if category:
+            query += " AND category = ?"
+            params.append(category)
+        with self._lock:
+            return self._connect().execute(query, params).fetchone()[0]
+
+    def last_reconciled(self, storage: str) -> Optional[datetime]:
+        """وقت آخر مطابقة كاملة مع المخزن"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT MIN(value) FROM catalog_state WHERE key LIKE ?",
+                (f"reconciled:{storage}:%",)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+النسخ الاحتياطي التزايدي المحلي
+يتخطى النسخ عندما لا تتغير قاعدة البيانات، ويقسم اللقطة إلى أجزاء محددة
+بالمحتوى تُخزن حسب بصمتها، مع ملف وصف (manifest) لكل نسخة، بحيث لا يُكتب
+إلا ما تغير من أجزاء
+"""
+
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import config
+from core.backup.snapshot import create_snapshot, verify_snapshot
+
+
+# حدود تقسيم الأجزاء بعدد صفحات SQLite
+CHUNK_MIN_PAGES = 4
+CHUNK_MAX_PAGES = 64
+# حد القطع: متوسط طول الجزء نحو 16 صفحة
+CHUNK_BOUNDARY_MASK = 0x0F
+
+# فئات النسخ (مجلدات فرعية في BACKUPS_DIR)
+BACKUP_CATEGORIES = ("daily", "weekly", "manual")
+
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def read_database_fingerprint(db_path) -> Optional[Tuple[int, int, int]]:
+    """
+    بصمة رخيصة لحالة قاعدة البيانات من ترويسة الملف دون فتح اتصال
+
+    Returns:
+        (عداد التغييرات، عدد الصفحات، حجم الملف) أو None إذا تعذرت القراءة
+        أو كان هناك ملف WAL غير مدمج (فلا يمكن الاعتماد على العداد)
+    """
+    db_path = Path(db_path)
+    try:
+        wal_path = Path(f"{db_path}-wal")
+        if wal_path.exists() and wal_path.stat().st_size > 0:
+            return None
+        with open(db_path, "rb") as f:
+            header = f.read(100)
+        if len(header) < 100 or not header.startswith(_SQLITE_HEADER):
+            return None
+        change_counter, page_count = struct.unpack(">II", header[24:32])
+        return change_counter, page_count, db_path.stat().st_size
+    except OSError:
+        return None
+
+
+def _read_page_size(path) -> int:
+    with open(path, "rb") as f:
+        header = f.read(18)
+    page_size = struct.unpack(">H", header[16:18])[0]
+    return 65536 if page_size == 1 else page_size
+
+
+def iter_content_chunks(path, page_size: Optional[int] = None) -> Iterator[bytes]:
+    """
+    تقسيم ملف قاعدة البيانات إلى أجزاء محددة بالمحتوى
+
+    يُحدد نهاية الجزء من بصمة محتوى الصفحة نفسها (مع حد أدنى وأقصى للطول)،
+    فتبقى حدود الأجزاء ثابتة حول الصفحات غير المتغيرة
+    """
+    page_size = page_size or _read_page_size(path)
+    buffer: List[bytes] = []
+    with open(path, "rb") as f:
+        while True:
+            page = f.read(page_size)
+            if not page:
+                break
+            buffer.append(page)
+            at_boundary = (zlib.crc32(page) & CHUNK_BOUNDARY_MASK) == 0
+            if len(buffer) >= CHUNK_MAX_PAGES or (len(buffer) >= CHUNK_MIN_PAGES and at_boundary):
+                yield b"".join(buffer)
+                buffer = []
+    if buffer:
+        yield b"".join(buffer)
+
+
+class LocalChunkStore:
+    """مخزن محلي للأجزاء حسب البصمة وملفات الوصف ضمن config.BACKUPS_DIR"""
+
+    # قفل مشترك بين كل المخازن: كتابة أجزاء نسخة وحفظ وصفها عملية واحدة
+    # لا يتداخل معها جمع الأجزاء غير المستخدمة (collect_garbage)
+    lock = threading.RLock()
+
+    def __init__(self, root=None):
+        self.root = Path(root or config.BACKUPS_DIR)
+        self.chunks_dir = self.root / "chunks"
+        self.chunks_dir.mkdir(parents=True, exist_ok=True)
+        for category in BACKUP_CATEGORIES:
+            (self.root / category).mkdir(parents=True, exist_ok=True)
+
+    # الأجزاء -----------------------------------------------------------
+
+    def _chunk_path(self, digest: str) -> Path:
+        return self.chunks_dir / digest[:2] / digest
+
+    def has_chunk(self, digest: str) -> bool:
+        return self._chunk_path(digest).exists()
+
+    def put_chunk(self, digest: str, data: bytes) -> int:
+        """كتابة جزء مضغوط بشكل ذري؛ يعيد عدد البايتات المكتوبة"""
+        path = self._chunk_path(digest)
+        if path.exists():
+            return 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        compressed = zlib.compress(data, 6)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(temp_path, path)
+        return len(compressed)
+
+    def get_chunk(self, digest: str) -> bytes:
+        with open(self._chunk_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def iter_chunk_digests(self) -> Iterator[str]:
+        for path in self.chunks_dir.glob("*/*"):
+            if path.suffix != ".tmp":
+                yield path.name
+
+    def delete_chunk(self, digest: str):
+        try:
+            self._chunk_path(digest).unlink()
+        except OSError:
+            pass
+
+    # ملفات الوصف --------------------------------------------------------
+
+    def save_manifest(self, manifest: Dict, category: str = "manual") -> Path:
+        path = self.root / category / f"{manifest['name']}.json"
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, path)
+        return path
+
+    def unique_manifest_name(self, created_at: datetime) -> str:
+        """اسم نسخة بالتاريخ والوقت مع لاحقة عند تكرار النسخ في الثانية نفسها"""
+        base = f"backup_{created_at.strftime('%Y%m%d_%H%M%S')}"
+        name, counter = base, 1
+        while self.load_manifest(name) is not None:
+            name = f"{base}_{counter}"
+            counter += 1
+        return name
+
+    def load_manifest(self, name: str) -> Optional[Dict]:
+        for category in BACKUP_CATEGORIES:
+            path = self.root / category / f"{name}.json"
+            if path.exists():
+                with open(path, encoding="utf-8") as f:
+                    return json.load(f)
+        return None
+
+    def list_manifests(self, category: Optional[str] = None) -> List[Dict]:
+        """قائمة ملفات الوصف مرتبة من الأحدث إلى الأقدم"""
+        manifests = []
+        for cat in ([category] if category else BACKUP_CATEGORIES):
+            for path in (self.root / cat).glob("backup_*.json"):
+                try:
+                    with open(path, encoding="utf-8") as f:
+                        manifest = json.load(f)
+                    manifest["category"] = cat
+                    manifests.append(manifest)
+                except (OSError, ValueError) as e:
+                    logging.warning(f"تعذر قراءة ملف وصف النسخة {path}: {e}")
+        manifests.sort(key=lambda m: m.get("created_at", ""), reverse=True)
+        return manifests
+
+    def latest_manifest(self) -> Optional[Dict]:
+        manifests = self.list_manifests()
+        return manifests[0] if manifests else None
+
+    def delete_manifest(self, name: str) -> bool:
+        for category in BACKUP_CATEGORIES:
+            path = self.root / category / f"{name}.json"
+            if path.exists():
+                path.unlink()
+                return True
+        return False
+
+    def move_manifest(self, name: str, category: str) -> bool:
+        """نقل ملف وصف إلى فئة أخرى (ترقية نسخة يومية إلى أسبوعية)"""
+        for current in BACKUP_CATEGORIES:
+            path = self.root / current / f"{name}.json"
+            if path.exists():
+                os.replace(path, self.root / category / path.name)
+                return True
+        return False
+
+    def collect_garbage(self) -> int:
+        """
+        حذف الأجزاء التي لم تعد أي نسخة تشير إليها
+
+        ينتظر انتهاء أي نسخة قيد الكتابة، لأن أجزاءها لا تظهر في ملف وصف
+        حتى يُحفظ
+        """
+        with self.lock:
+            referenced = set()
+            for manifest in self.list_manifests():
+                referenced.update(manifest.get("chunks", []))
+            removed = 0
+            for digest in list(self.iter_chunk_digests()):
+                if digest not in referenced:
+                    self.delete_chunk(digest)
+                    removed += 1
+            return removed
+
+
+class IncrementalBackup:
+    """نسخ احتياطي تزايدي يعتمد على المخزن المحلي للأجزاء"""
+
+    def __init__(self, store: Optional[LocalChunkStore] = None, db_path=None):
+        self.store = store or LocalChunkStore()
+        self.db_path = Path(db_path or config.DATABASE_PATH)
+        self.logger = logging.getLogger(__name__)
+
+    def is_unchanged(self, uploaded_only: bool = False) -> bool:
+        """
+        هل قاعدة البيانات بلا تغيير منذ آخر نسخة؟ (فحص الترويسة فقط)
+
+        Args:
+            uploaded_only: اعتبار آخر نسخة فقط إذا تم رفعها إلى التخزين السحابي
+        """
+        latest = self.store.latest_manifest()
+        fingerprint = read_database_fingerprint(self.db_path)
+        if not latest or fingerprint is None:
+            return False
+        if uploaded_only and not latest.get("remote_path"):
+            return False
+        return list(fingerprint) == latest.get("fingerprint")
+
+    def mark_uploaded(self, manifest: Dict, remote_path: str):
+        """تسجيل مسار الرفع السحابي في ملف وصف النسخة"""
+        manifest = dict(manifest)
+        category = manifest.pop("category", "manual")
+        manifest["remote_path"] = remote_path
+        self.store.save_manifest(manifest, category)
+
+    def store_snapshot(self, snapshot_path, description: str = "", category: str = "manual",
+                       fingerprint=None,
+                       progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[Optional[Dict], bool]:
+        """
+        تخزين لقطة جاهزة على شكل أجزاء
+
+        Returns:
+            (ملف الوصف، هل تغير المحتوى عن آخر نسخة)
+        """
+        total_size = os.path.getsize(snapshot_path)
+        page_size = _read_page_size(snapshot_path)
+        content_hash = hashlib.sha256()
+        chunks: List[str] = []
+        new_chunks = 0
+        stored_bytes = 0
+        done = 0
+
+        with self.store.lock:
+            for chunk in iter_content_chunks(snapshot_path, page_size):
+                content_hash.update(chunk)
+                digest = hashlib.sha256(chunk).hexdigest()
+                chunks.append(digest)
+                if not self.store.has_chunk(digest):
+                    stored_bytes += self.store.put_chunk(digest, chunk)
+                    new_chunks += 1
+                done += len(chunk)
+                if progress_callback:
+                    progress_callback(done, total_size)
+
+            sha256 = content_hash.hexdigest()
+            latest = self.store.latest_manifest()
+            if latest and latest.get("sha256") == sha256:
+                return latest, False
+
+            now = datetime.now()
+            manifest = {
+                "name": self.store.unique_manifest_name(now),
+                "created_at": now.isoformat(),
+                "description": description,
+                "version": config.APP_VERSION,
+                "page_size": page_size,
+                "size": total_size,
+                "sha256": sha256,
+                "fingerprint": list(fingerprint) if fingerprint else None,
+                "codec": "zlib",
+                "chunks": chunks,
+                "new_chunks": new_chunks,
+                "stored_bytes": stored_bytes,
+            }
+            self.store.save_manifest(manifest, category)
+        # الفئة لا تُحفظ داخل الملف (تُستنتج من مجلده كما في list_manifests)
+        return {**manifest, "category": category}, True
+
+    def create_backup(self, description: str = "", category: str = "manual", force: bool = False,
+                      progress_callback: Optional[Callable[[str, int, int], None]] = None) -> Tuple[bool, str]:
+        """
+        إنشاء نسخة تزايدية محلية
+
+        Args:
+            description: وصف النسخة
+            category: daily أو weekly أو manual
+            force: إنشاء النسخة حتى لو لم تتغير القاعدة
+            progress_callback: دالة تستدعى بـ (رسالة المرحلة، المنجز، الإجمالي)
+
+        Returns:
+            tuple: (نجح العملية, رسالة النتيجة)
+        """
+        def report(message, done=0, total=0):
+            if progress_callback:
+                progress_callback(message, done, total)
+
+        if not self.db_path.exists():
+            return False, "قاعدة البيانات غير موجودة"
+
+        fingerprint = read_database_fingerprint(self.db_path)
+        if not force and self.is_unchanged():
+            self.logger.info("لم تتغير قاعدة البيانات منذ آخر نسخة؛ تم تخطي النسخ الاحتياطي")
+            return True, "لا توجد تغييرات منذ آخر نسخة احتياطية"
+
+        fd, snapshot_path = tempfile.mkstemp(suffix=".db", prefix="snapshot_")
+        os.close(fd)
+        try:
+            report("جاري أخذ لقطة من قاعدة البيانات...")
+            success, message = create_snapshot(
+                snapshot_path, self.db_path,
+                progress_callback=lambda done, total: report(
+                    "جاري أخذ لقطة من قاعدة البيانات...", done, total)
+            )
+            if not success:
+                return False, message
+
+            report("جاري فحص سلامة اللقطة...")
+            success, message = verify_snapshot(snapshot_path)
+            if not success:
+                return False, message
+
+            manifest, changed = self.store_snapshot(
+                snapshot_path, description, category, fingerprint,
+                progress_callback=lambda done, total: report(
+                    "جاري حفظ الأجزاء المتغيرة...", done, total)
+            )
+            if not changed and not force:
+                return True, "لا توجد تغييرات منذ آخر نسخة احتياطية"
+
+            message = (f"تم إنشاء النسخة التزايدية: {manifest['name']}\n"
+                       f"الأجزاء الجديدة: {manifest['new_chunks']} من {len(manifest['chunks'])}")
+            self.logger.info(message)
+            return True, message
+
+        except Exception as e:
+            error_msg = f"خطأ في النسخ الاحتياطي التزايدي: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
+
+        finally:
+            if os.path.exists(snapshot_path):
+                os.unlink(snapshot_path)
+
+    def restore_to(self, name: str, dest_path) -> Tuple[bool, str]:
+        """إعادة تجميع نسخة في ملف مع التحقق من بصمتها"""
+        manifest = self.store.load_manifest(name)
+        if manifest is None:
+            return False, "النسخة الاحتياطية غير موجودة"
+        try:
+            content_hash = hashlib.sha256()
+            temp_path = f"{dest_path}.tmp"
+            with open(temp_path, "wb") as f:
+                for digest in manifest["chunks"]:
+                    chunk = self.store.get_chunk(digest)
+                    content_hash.update(chunk)
+                    f.write(chunk)
+            if content_hash.hexdigest() != manifest["sha256"]:
+                os.unlink(temp_path)
+                return False, "بصمة النسخة المستعادة لا تطابق ملف الوصف"
+            os.replace(temp_path, dest_path)
+            return True, "تم تجميع النسخة الاحتياطية بنجاح"
+        except Exception as e:
+            error_msg = f"خطأ في تجميع النسخة الاحتياطية: {e}"
+            self.logger.error(error_msg)
+            return False, error_msg
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+خط نسخ احتياطي متدفق: لقطة ← ضغط ← رفع أو كتابة على دفعات
+يعمل الضغط والكتابة في خيطين متوازيين عبر طابور محدود الحجم، فتبقى
+الذاكرة المستخدمة ثابتة مهما كان حجم قاعدة البيانات
+"""
+
+import base64
+import bz2
+import io
+import logging
+import lzma
+import os
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+import zipfile
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+import config
+
+try:
+    import zstandard  # type: ignore
+except ImportError:
+    zstandard = None
+
+
+# امتداد الملف لكل طريقة ضغط
+CODEC_EXTENSIONS: Dict[str, str] = {
+    "zip": ".zip",
+    "gzip": ".db.gz",
+    "bz2": ".db.bz2",
+    "xz": ".db.xz",
+    "zstd": ".db.zst",
+}
+
+# حجم القراءة من اللقطة في كل خطوة
+DEFAULT_READ_SIZE = 1024 * 1024
+
+# عدد الكتل المضغوطة المسموح بانتظارها بين الضاغط والكاتب
+DEFAULT_QUEUE_DEPTH = 8
+
+_END = object()
+
+
+def available_codecs() -> List[str]:
+    """طرق الضغط المتاحة في هذه البيئة"""
+    return [codec for codec in CODEC_EXTENSIONS if codec != "zstd" or zstandard is not None]
+
+
+def backup_extension(codec: str) -> str:
+    return CODEC_EXTENSIONS.get(codec, ".zip")
+
+
+def split_backup_filename(filename: str) -> Optional[str]:
+    """استخراج الطابع الزمني من اسم ملف نسخة احتياطية بأي امتداد معروف"""
+    if not filename.startswith("backup_"):
+        return None
+    for extension in sorted(CODEC_EXTENSIONS.values(), key=len, reverse=True):
+        if filename.endswith(extension):
+            return filename[len("backup_"):-len(extension)]
+    return None
+
+
+@dataclass
+class PipelineStats:
+    """إحصائيات تشغيل خط النسخ"""
+    codec: str
+    input_bytes: int = 0
+    output_bytes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.output_bytes / self.input_bytes if self.input_bytes else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """سرعة المعالجة بالميجابايت في الثانية (من حجم اللقطة)"""
+        return self.input_bytes / (1024 * 1024) / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.input_bytes / (1024 * 1024):.1f} ميجابايت ← "
+                f"{self.output_bytes / (1024 * 1024):.1f} ميجابايت "
+                f"({self.codec}، {self.throughput:.1f} ميجابايت/ثانية)")
+
+
+# ----------------------------------------------------------------------
+# المخارج (Sinks)
+# ----------------------------------------------------------------------
+
+class FileSink:
+    """كتابة الناتج المضغوط إلى ملف محلي (مع إعادة تسمية ذرية عند الانتهاء)"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._temp_path = f"{self.path}.part"
+        self._file = open(self._temp_path, "wb")
+
+    def write_chunk(self, data: bytes):
+        self._file.write(data)
+
+    def close(self) -> str:
+        self._file.close()
+        os.replace(self._temp_path, self.path)
+        return self.path
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._temp_path):
+            os.unlink(self._temp_path)
+
+
+class TusUploadSink:
+    """
+    رفع مجزأ عبر بروتوكول TUS (المستخدم في Supabase Storage للرفع القابل للاستئناف)
+    الطول النهائي غير معروف مسبقاً لذلك يُرسل مع آخر دفعة (Upload-Defer-Length)
+    """
+
+    def __init__(self, endpoint: str, bucket: str, object_name: str,
+                 headers: Optional[Dict[str, str]] = None,
+                 chunk_size: int = config.BACKUP_UPLOAD_CHUNK_SIZE,
+                 content_type: str = "application/octet-stream",
+                 timeout: float = 120):
+        self.endpoint = endpoint
+        self.object_name = object_name
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.headers = {"Tus-Resumable": "1.0.0", **(headers or {})}
+        self.offset = 0
+        self._buffer = bytearray()
+        self._location = self._create(bucket, object_name, content_type)
+
+    @classmethod
+    def for_supabase(cls, object_name: str, **kwargs) -> "TusUploadSink":
+        return cls(
+            f"{config.SUPABASE_URL}/storage/v1/upload/resumable",
+            config.SUPABASE_BUCKET,
+            object_name,
+            headers={
+                "Authorization": f"Bearer {config.SUPABASE_KEY}",
+                "apikey": config.SUPABASE_KEY,
+            },
+            **kwargs
+        )
+
+    @staticmethod
+    def _encode(value: str) -> str:
+        return base64.b64encode(value.encode("utf-8")).decode("ascii")
+
+    def _request(self, method: str, url: str, data: bytes = b"", headers=None):
+        request = urllib.request.Request(url, data=data, method=method,
+                                         headers={**self.headers, **(headers or {})})
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _create(self, bucket: str, object_name: str, content_type: str) -> str:
+        metadata = ",".join([
+            f"bucketName {self._encode(bucket)}",
+            f"objectName {self._encode(object_name)}",
+            f"contentType {self._encode(content_type)}",
+        ])
+        with self._request("POST", self.endpoint, headers={
+            "Upload-Defer-Length": "1",
+            "Upload-Metadata": metadata,
+        }) as response:
+            location = response.headers.get("Location")
+        if not location:
+            raise RuntimeError("لم يُرجع خادم التخزين عنوان الرفع")
+        return urllib.parse.urljoin(self.endpoint, location)
+
+    def _patch(self, data: bytes, final: bool = False):
+        headers = {
+            "Content-Type": "application/offset+octet-stream",
+            "Upload-Offset": str(self.offset),
+        }
+        if final:
+            headers["Upload-Length"] = str(self.offset + len(data))
+        with self._request("PATCH", self._location, data=data, headers=headers) as response:
+            new_offset = response.headers.get("Upload-Offset")
+        self.offset = int(new_offset) if new_offset is not None else self.offset + len(data)
+
+    def write_chunk(self, data: bytes):
+        self._buffer.extend(data)
+        while len(self._buffer) > self.chunk_size:
+            chunk = bytes(self._buffer[:self.chunk_size])
+            del self._buffer[:self.chunk_size]
+            self._patch(chunk)
+
+    def close(self) -> str:
+        self._patch(bytes(self._buffer), final=True)
+        self._buffer = bytearray()
+        return self.object_name
+
+    def abort(self):
+        try:
+            self._request("DELETE", self._location).close()
+        except Exception:
+            pass
+
+
+# ----------------------------------------------------------------------
+# الضغط
+# ----------------------------------------------------------------------
+
+class _QueueWriter(io.RawIOBase):
+    """كائن ملف للكتابة فقط يمرر البيانات إلى الطابور (يستخدمه zipfile)"""
+
+    def __init__(self, out_queue: "queue.Queue", stats: PipelineStats):
+        self._queue = out_queue
+        self._stats = stats
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if data:
+            self._queue.put(bytes(data))
+            self._stats.output_bytes += len(data)
+        return len(data)
+
+
+def _stream_compressor(codec: str, level: int):
+    if codec == "gzip":
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if codec == "bz2":
+        return bz2.BZ2Compressor(max(1, min(level, 9)))
+    if codec == "xz":
+        return lzma.LZMACompressor(preset=max(0, min(level, 9)))
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("مكتبة zstandard غير مثبتة. يرجى تثبيتها باستخدام: pip install zstandard")
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    raise ValueError(f"طريقة ضغط غير معروفة: {codec}")
+
+
+def run_pipeline(snapshot_path, sink, codec: str = config.BACKUP_CODEC,
+                 level: int = config.BACKUP_COMPRESSION_LEVEL,
+                 info_text: str = "",
+                 read_size: int = DEFAULT_READ_SIZE,
+                 queue_depth: int = DEFAULT_QUEUE_DEPTH,
+                 progress_callback: Optional[Callable[[int, int], None]] = None) -> PipelineStats:
+    """
+    ضغط اللقطة وتمريرها إلى المخرج على دفعات
+
+    Args:
+        snapshot_path: مسار اللقطة المتسقة
+        sink: مخرج يوفر write_chunk و close و abort
+        codec: طريقة الضغط (zip, gzip, bz2, xz, zstd)
+        level: مستوى الضغط
+        info_text: نص ملف backup_info.txt (لأرشيف zip فقط)
+        read_size: حجم القراءة من اللقطة
+        queue_depth: أقصى عدد للكتل المنتظرة بين الضاغط والكاتب
+        progress_callback: دالة تستدعى بـ (البايتات المعالجة، حجم اللقطة)
+
+    Returns:
+        إحصائيات التشغيل
+    """
+    stats = PipelineStats(codec=codec)
+    total_size = os.path.getsize(snapshot_path)
+    out_queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_depth))
+    writer_error: List[BaseException] = []
+
+    def writer():
+        try:
+            while True:
+                item = out_queue.get()
+                if item is _END:
+                    break
+                if not writer_error:
+                    sink.write_chunk(item)
+        except BaseException as e:  # noqa: B902 - يُعاد رفعه في الخيط الرئيسي
+            writer_error.append(e)
+            # تفريغ الطابور حتى لا يتوقف الضاغط
+            while out_queue.get() is not _END:
+                pass
+
+    writer_thread = threading.Thread(target=writer, name="backup-writer", daemon=True)
+    started = time.perf_counter()
+    writer_thread.start()
+
+    def read_blocks():
+        with open(snapshot_path, "rb") as f:
+            while True:
+                if writer_error:
+                    raise writer_error[0]
+                block = f.read(read_size)
+                if not block:
+                    break
+                stats.input_bytes += len(block)
+                yield block
+                if progress_callback:
+                    progress_callback(stats.input_bytes, total_size)
+
+    try:
+        if codec == "zip":
+            with zipfile.ZipFile(_QueueWriter(out_queue, stats), "w", zipfile.ZIP_DEFLATED,
+                                 compresslevel=level) as archive:
+                with archive.open("schools.db", "w", force_zip64=True) as entry:
+                    for block in read_blocks():
+                        entry.write(block)
+                if info_text:
+                    archive.writestr("backup_info.txt", info_text.encode("utf-8"))
+        else:
+            compressor = _stream_compressor(codec, level)
+            for block in read_blocks():
+                data = compressor.compress(block)
+                if data:
+                    out_queue.put(data)
+                    stats.output_bytes += len(data)
+            data = compressor.flush()
+            if data:
+                out_queue.put(data)
+                stats.output_bytes += len(data)
+    except BaseException:
+        out_queue.put(_END)
+        writer_thread.join()
+        sink.abort()
+        raise
+
+    out_queue.put(_END)
+    writer_thread.join()
+    if writer_error:
+        sink.abort()
+        raise writer_error[0]
+
+    sink.close()
+    stats.elapsed = time.perf_counter() - started
+    logging.info(f"خط النسخ الاحتياطي: {stats.summary()}")
+    return stats
+
+
+def decompress_backup(source, dest_path, codec: Optional[str] = None):
+    """فك ضغط ملف نسخة احتياطية بأي طريقة مدعومة إلى ملف قاعدة بيانات"""
+    source = str(source)
+    if codec is None:
+        codec = next((name for name, ext in sorted(CODEC_EXTENSIONS.items(), key=lambda i: -len(i[1]))
+                      if source.endswith(ext)), "zip")
+    if codec == "zip":
+        with zipfile.ZipFile(source) as archive, archive.open("schools.db") as src, \
+                open(dest_path, "wb") as dst:
+            while True:
+                block = src.read(DEFAULT_READ_SIZE)
+                if not block:
+                    break
+                dst.write(block)
+        return
+
+    if codec == "gzip":
+        decompressor = zlib.decompressobj(31)
+    elif codec == "bz2":
+        decompressor = bz2.BZ2Decompressor()
+    elif codec == "xz":
+        decompressor = lzma.LZMADecompressor()
+    elif codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("مكتبة zstandard غير مثبتة. يرجى تثبيتها باستخدام: pip install zstandard")
+        decompressor = zstandard.ZstdDecompressor().decompressobj()
+    else:
+        raise ValueError(f"طريقة ضغط غير معروفة: {codec}")
+
+    with open(source, "rb") as src, open(dest_path, "wb") as dst:
+        while True:
+            block = src.read(DEFAULT_READ_SIZE)
+            if not block:
+                break
+            dst.write(decompressor.decompress(block))
+        if hasattr(decompressor, "flush"):
+            dst.write(decompressor.flush())
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+استعادة النسخ الاحتياطية داخل التطبيق
+تُفك النسخة بشكل متدفق في ملف مرحلي بجوار القاعدة الحية، وتُفحص سلامتها
+وإصدار مخططها، ثم يُستبدل الملف الحي بشكل ذري أثناء إيقاف الاتصال المشترك،
+مع تسخين الذاكرة المؤقتة بعد الاستبدال. ويمكن بدلاً من ذلك إرفاق النسخة
+كقاعدة جانبية (ATTACH) لمعاينتها دون المساس بالبيانات الحية
+"""
+
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import config
+from core.backup.pipeline import CODEC_EXTENSIONS, decompress_backup
+from core.backup.snapshot import create_snapshot, verify_snapshot
+
+
+# جداول يجب أن تحتويها أي نسخة صالحة للاستعادة
+REQUIRED_TABLES = ("schools", "students", "installments")
+
+_SQLITE_HEADER = b"SQLite format 3\x00"
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def _is_sqlite_file(path) -> bool:
+    with open(path, "rb") as f:
+        return f.read(len(_SQLITE_HEADER)) == _SQLITE_HEADER
+
+
+def stage_backup(source_path, staging_path) -> Tuple[bool, str]:
+    """
+    تحضير ملف قاعدة مرحلي من نسخة (أرشيف مضغوط أو ملف قاعدة مباشرة)
+
+    Returns:
+        tuple: (نجح العملية, رسالة النتيجة)
+    """
+    try:
+        source_path = str(source_path)
+        if _is_sqlite_file(source_path):
+            shutil.copyfile(source_path, staging_path)
+        elif any(source_path.endswith(ext) for ext in CODEC_EXTENSIONS.values()):
+            decompress_backup(source_path, staging_path)
+        else:
+            return False, "صيغة ملف النسخة الاحتياطية غير معروفة"
+        return True, "تم تحضير النسخة الاحتياطية"
+    except Exception as e:
+        error_msg = f"خطأ في فك النسخة الاحتياطية: {e}"
+        logging.error(error_msg)
+        return False, error_msg
+
+
+def check_database_file(path) -> Tuple[bool, str]:
+    """
+    فحص ما قبل الاستعادة: السلامة (integrity_check) وإصدار المخطط والجداول الأساسية
+
+    Returns:
+        tuple: (صالحة للاستعادة, رسالة النتيجة)
+    """
+    from core.database.connection import SCHEMA_VERSION
+
+    if not _is_sqlite_file(path):
+        return False, "الملف ليس قاعدة بيانات SQLite"
+
+    success, message = verify_snapshot(path)
+    if not success:
+        return False, message
+
+    conn = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+    if version > SCHEMA_VERSION:
+        return False, (f"النسخة من إصدار أحدث من التطبيق (إصدار المخطط {version})، "
+                       f"يرجى تحديث التطبيق قبل الاستعادة")
+    missing = [table for table in REQUIRED_TABLES if table not in tables]
+    if missing:
+        return False, f"النسخة لا تحتوي على الجداول الأساسية: {', '.join(missing)}"
+    return True, "النسخة سليمة وصالحة للاستعادة"
+
+
+def warm_cache(db=None) -> int:
+    """قراءة جداول القاعدة مرة واحدة لتحميل صفحاتها في ذاكرة النظام؛ يعيد عدد الصفوف"""
+    db = _get_db(db)
+    rows = 0
+    with db.get_cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+        for (table,) in cursor.fetchall():
+            cursor.execute(f'SELECT COUNT(*) FROM "{table}"')
+            rows += cursor.fetchone()[0]
+    return rows
+
+
+def _replace_file(source, target, attempts: int = 5):
+    """استبدال ذري مع إعادة المحاولة (على ويندوز قد يبقى الملف مفتوحاً لحظياً)"""
+    for attempt in range(attempts):
+        try:
+            os.replace(source, target)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.2 * (attempt + 1))
+
+
+def swap_in_database(staging_path, db=None,
+                     progress_callback: Optional[Callable[[str], None]] = None) -> Tuple[bool, str]:
+    """
+    استبدال القاعدة الحية بملف مرحلي تم فحصه
+
+    تؤخذ لقطة من القاعدة الحالية أولاً (للتراجع)، ثم يُستبدل الملف أثناء إيقاف
+    الاتصال المشترك، ثم تُحدَّث الجداول للمخطط الحالي وتُسخن الذاكرة المؤقتة
+    """
+    db = _get_db(db)
+    live_path = Path(db.db_path)
+
+    def report(message):
+        if progress_callback:
+            progress_callback(message)
+
+    # لقطة من القاعدة الحالية للتراجع عن الاستعادة يدوياً إن لزم
+    rollback_path = f"{live_path}.before_restore"
+    if live_path.exists():
+        report("جاري حفظ نسخة من القاعدة الحالية...")
+        success, message = create_snapshot(rollback_path, live_path)
+        if not success:
+            return False, message
+
+    report("جاري استبدال قاعدة البيانات...")
+    with db.paused():
+        _replace_file(staging_path, live_path)
+        # ملفات السجل المتبقية تخص القاعدة القديمة ولا يجوز تطبيقها على الجديدة
+        for suffix in ("-journal", "-wal", "-shm"):
+            leftover = Path(f"{live_path}{suffix}")
+            if leftover.exists():
+                leftover.unlink()
+
+    report("جاري تحديث مخطط قاعدة البيانات...")
+    db.create_tables()
+
+    report("جاري تحميل البيانات في الذاكرة...")
+    rows = warm_cache(db)
+    
+    # الإعدادات المحملة في الذاكرة تخص القاعدة السابقة
+    from core.utils.settings_manager import settings_manager
+    if settings_manager.db is db:
+        settings_manager.reload()
+    logging.info(f"تمت استعادة قاعدة البيانات ({rows} صف)؛ نسخة التراجع: {rollback_path}")
+    return True, "تمت استعادة النسخة الاحتياطية بنجاح"
+
+
+def restore_staged(staging_path, db=None,
+                   progress_callback: Optional[Callable[[str], None]] = None) -> Tuple[bool, str]:
+    """فحص ملف مرحلي ثم استبداله بالقاعدة الحية"""
+    if progress_callback:
+        progress_callback("جاري فحص سلامة النسخة...")
+    success, message = check_database_file(staging_path)
+    if not success:
+        return False, message
+    return swap_in_database(staging_path, db, progress_callback)
+
+
+def create_staging_path(db=None) -> str:
+    """ملف مرحلي في مجلد القاعدة الحية (ليكون الاستبدال ذرياً على نفس القرص)"""
+    live_path = Path(_get_db(db).db_path)
+    live_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, staging_path = tempfile.mkstemp(suffix=".restore", prefix="staging_", dir=str(live_path.parent))
+    os.close(fd)
+    return staging_path
+
+
+def restore_from_file(source_path, db=None,
+                      progress_callback: Optional[Callable[[str], None]] = None) -> Tuple[bool, str]:
+    """استعادة كاملة من ملف نسخة محلي (أرشيف مضغوط أو ملف قاعدة)"""
+    staging_path = create_staging_path(db)
+    try:
+        if progress_callback:
+            progress_callback("جاري فك النسخة الاحتياطية...")
+        success, message = stage_backup(source_path, staging_path)
+        if not success:
+            return False, message
+        return restore_staged(staging_path, db, progress_callback)
+    finally:
+        if os.path.exists(staging_path):
+            os.unlink(staging_path)
+
+
+# ----------------------------------------------------------------------
+# قاعدة جانبية للمعاينة
+# ----------------------------------------------------------------------
+
+def side_database_path(name: str, root=None) -> Path:
+    """مسار ملف القاعدة الجانبية لنسخة معينة ضمن مجلد النسخ"""
+    folder = Path(root or config.BACKUPS_DIR) / "restored"
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"{Path(name).name.split('.')[0]}.db"
+
+
+def attach_side_database(path, alias: str = "restored", db=None) -> Tuple[bool, str]:
+    """
+    إرفاق قاعدة مستعادة بالاتصال المشترك باسم مستعار للمعاينة
+
+    بعد الإرفاق يمكن الاستعلام مثل: SELECT * FROM restored.students
+    """
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", alias):
+        return False, "اسم مستعار غير صالح للقاعدة الجانبية"
+    db = _get_db(db)
+    try:
+        detach_side_database(alias, db)
+        with db.get_cursor() as cursor:
+            cursor.execute(f"ATTACH DATABASE ? AS {alias}", (str(path),))
+        return True, f"تم إرفاق النسخة للمعاينة باسم {alias}"
+    except Exception as e:
+        error_msg = f"خطأ في إرفاق النسخة للمعاينة: {e}"
+        logging.error(error_msg)
+        return False, error_msg
+
+
+def detach_side_database(alias: str = "restored", db=None) -> bool:
+    """فصل قاعدة جانبية مرفقة (إن وجدت)"""
+    db = _get_db(db)
+    with db.get_cursor() as cursor:
+        cursor.execute("PRAGMA database_list")
+        if alias not in {row[1] for row in cursor.fetchall()}:
+            return False
+        cursor.execute(f"DETACH DATABASE {alias}")
+    return True
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+سياسة الاحتفاظ بالنسخ الاحتياطية (الجد - الأب - الابن)
+نسخة لكل يوم من الأيام الأخيرة، ونسخة لكل أسبوع، ثم نسخة لكل شهر،
+مع حد أقصى لعدد النسخ اليدوية
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+
+@dataclass
+class RetentionPolicy:
+    """أعداد النسخ المحتفظ بها لكل مستوى"""
+    daily: int = config.BACKUP_KEEP_DAILY
+    weekly: int = config.BACKUP_KEEP_WEEKLY
+    monthly: int = config.BACKUP_KEEP_MONTHLY
+    manual: int = config.MAX_BACKUP_FILES
+
+
+def _week_of(moment: datetime) -> Tuple[int, int]:
+    iso = moment.isocalendar()
+    return iso[0], iso[1]
+
+
+def plan_retention(backups: List[Dict], policy: Optional[RetentionPolicy] = None,
+                   now: Optional[datetime] = None) -> Tuple[List[Dict], List[Dict]]:
+    """
+    حساب النسخ المطلوب ترقيتها وحذفها دون تنفيذ أي تغيير
+
+    كل عنصر يحتوي على 'created_at' (datetime) و 'category'
+    (daily | weekly | manual). أحدث نسخة يومية من كل أسبوع منتهٍ لا توجد
+    له نسخة أسبوعية تُرقى إلى weekly.
+
+    Returns:
+        (النسخ المطلوب نقلها إلى weekly، النسخ المطلوب حذفها)
+    """
+    policy = policy or RetentionPolicy()
+    now = now or datetime.now()
+    current_week = _week_of(now)
+
+    def newest_first(category):
+        return sorted((b for b in backups if b.get('category') == category),
+                      key=lambda b: b['created_at'], reverse=True)
+
+    weekly = newest_first('weekly')
+    weeks_covered = {_week_of(b['created_at']) for b in weekly}
+    promote, delete = [], []
+
+    # الأبناء: نسخة لكل يوم من الأيام الأخيرة
+    kept_days = set()
+    for backup in newest_first('daily'):
+        week = _week_of(backup['created_at'])
+        if week != current_week and week not in weeks_covered:
+            weeks_covered.add(week)
+            promote.append(backup)
+            continue
+        day = backup['created_at'].date()
+        if day not in kept_days and len(kept_days) < policy.daily:
+            kept_days.add(day)
+            continue
+        delete.append(backup)
+
+    # الآباء ثم الأجداد: نسخة لكل أسبوع ثم نسخة لكل شهر
+    kept_weeks, kept_months = set(), set()
+    promoted_ids = {id(b) for b in promote}
+    for backup in sorted(weekly + promote, key=lambda b: b['created_at'], reverse=True):
+        week = _week_of(backup['created_at'])
+        month = (backup['created_at'].year, backup['created_at'].month)
+        if week not in kept_weeks and len(kept_weeks) < policy.weekly:
+            kept_weeks.add(week)
+            continue
+        if week not in kept_weeks and month not in kept_months and len(kept_months) < policy.monthly:
+            kept_months.add(month)
+            continue
+        if id(backup) in promoted_ids:
+            promote = [b for b in promote if b is not backup]
+        delete.append(backup)
+
+    # النسخ اليدوية: الأحدث فقط حتى الحد الأقصى
+    if policy.manual > 0:
+        delete.extend(newest_first('manual')[policy.manual:])
+
+    return promote, delete
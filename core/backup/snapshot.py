@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+لقطة متسقة لقاعدة البيانات أثناء التشغيل
+تستخدم واجهة النسخ الاحتياطي في SQLite (sqlite3.Connection.backup) لنسخ
+الصفحات على دفعات مع إفساح المجال للكاتب بين الدفعات، ثم تفحص سلامة اللقطة
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import config
+
+
+# عدد الصفحات المنسوخة في كل خطوة (الصفحة الافتراضية 4 كيلوبايت)
+DEFAULT_PAGES_PER_STEP = 256
+
+# مدة الاستراحة بين الخطوات لإتاحة الكتابة للاتصال الرئيسي
+DEFAULT_STEP_PAUSE = 0.005
+
+
+def create_snapshot(dest_path, source_path=None,
+                    pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+                    step_pause: float = DEFAULT_STEP_PAUSE,
+                    progress_callback: Optional[Callable[[int, int], None]] = None) -> Tuple[bool, str]:
+    """
+    إنشاء لقطة متسقة من قاعدة البيانات دون إيقاف التطبيق
+
+    تُقرأ القاعدة عبر اتصال مستقل للقراءة فقط، فلا تظهر في اللقطة إلا
+    المعاملات المكتملة. إذا كتب اتصال آخر أثناء النسخ تعيد SQLite
+    النسخ تلقائياً بحيث تبقى اللقطة متسقة.
+
+    Args:
+        dest_path: مسار ملف اللقطة
+        source_path: مسار قاعدة البيانات (الافتراضي config.DATABASE_PATH)
+        pages_per_step: عدد الصفحات في كل خطوة
+        step_pause: مدة الاستراحة بين الخطوات بالثواني
+        progress_callback: دالة تستدعى بـ (الصفحات المنسوخة، إجمالي الصفحات)
+
+    Returns:
+        tuple: (نجح العملية, رسالة النتيجة)
+    """
+    source_path = Path(source_path or config.DATABASE_PATH)
+    dest_path = Path(dest_path)
+    if not source_path.exists():
+        return False, "قاعدة البيانات غير موجودة"
+
+    def on_step(status, remaining, total):
+        if progress_callback:
+            progress_callback(total - remaining, total)
+        if remaining and step_pause:
+            # إفساح المجال للاتصال الرئيسي بين الخطوات
+            time.sleep(step_pause)
+
+    source = None
+    dest = None
+    try:
+        if dest_path.exists():
+            dest_path.unlink()
+        source = sqlite3.connect(f"{source_path.resolve().as_uri()}?mode=ro", uri=True)
+        dest = sqlite3.connect(str(dest_path))
+        source.backup(dest, pages=max(1, pages_per_step), progress=on_step)
+        dest.close()
+        dest = None
+        logging.info(f"تم إنشاء لقطة من قاعدة البيانات في: {dest_path}")
+        return True, "تم إنشاء اللقطة بنجاح"
+
+    except Exception as e:
+        logging.error(f"خطأ في إنشاء لقطة قاعدة البيانات: {e}")
+        if dest is not None:
+            dest.close()
+            dest = None
+        if dest_path.exists():
+            try:
+                os.unlink(dest_path)
+            except OSError:
+                pass
+        return False, f"خطأ في إنشاء لقطة قاعدة البيانات: {e}"
+
+    finally:
+        if source is not None:
+            source.close()
+        if dest is not None:
+            dest.close()
+
+
+def verify_snapshot(snapshot_path) -> Tuple[bool, str]:
+    """
+    فحص سلامة اللقطة قبل أرشفتها باستخدام PRAGMA integrity_check
+
+    Returns:
+        tuple: (اللقطة سليمة, رسالة النتيجة)
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(f"{Path(snapshot_path).resolve().as_uri()}?mode=ro", uri=True)
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+        problems = [row[0] for row in rows if row[0] != "ok"]
+        if problems:
+            message = "فشل فحص سلامة اللقطة: " + "; ".join(problems[:5])
+            logging.error(message)
+            return False, message
+        return True, "اللقطة سليمة"
+
+    except Exception as e:
+        logging.error(f"خطأ في فحص سلامة اللقطة: {e}")
+        return False, f"خطأ في فحص سلامة اللقطة: {e}"
+
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def create_verified_snapshot(dest_path, source_path=None,
+                             progress_callback: Optional[Callable[[int, int], None]] = None,
+                             **kwargs) -> Tuple[bool, str]:
+    """إنشاء لقطة ثم فحص سلامتها، مع حذف اللقطة إذا فشل الفحص"""
+    success, message = create_snapshot(dest_path, source_path,
+                                       progress_callback=progress_callback, **kwargs)
+    if not success:
+        return success, message
+
+    success, message = verify_snapshot(dest_path)
+    if not success:
+        try:
+            os.unlink(dest_path)
+        except OSError:
+            pass
+    return success, message
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مخازن النسخ الاحتياطية القابلة للتبديل
+واجهة موحدة لمخزن محلي ضمن config.BACKUPS_DIR ومخزن Supabase Storage،
+مع فئات daily و weekly و manual لكل منهما، ومجلد archives لملفات أرشيف
+الأعوام الدراسية (خارج سياسة الاحتفاظ)
+"""
+
+import logging
+import os
+import re
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional
+
+import config
+from core.backup.incremental import BACKUP_CATEGORIES
+from core.backup.pipeline import FileSink, TusUploadSink, split_backup_filename
+
+
+# مجلد ملفات أرشيف الأعوام الدراسية في المخزن؛ ليس فئة نسخ فلا تحذفه سياسة الاحتفاظ
+ARCHIVES_FOLDER = "archives"
+
+def format_file_size(size_bytes: int) -> str:
+    """تنسيق حجم الملف"""
+    if size_bytes < 1024:
+        return f"{size_bytes} بايت"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes / 1024:.1f} كيلوبايت"
+    else:
+        return f"{size_bytes / (1024 * 1024):.1f} ميجابايت"
+
+
+def safe_folder_name(organization_name: str) -> str:
+    """إنشاء اسم مجلد آمن من اسم المؤسسة"""
+    if not organization_name:
+        return "organization"
+    # إزالة الأحرف غير المسموح بها واستبدال الفراغات ب underscore
+    safe_name = re.sub(r'[<>:"/\\|?*]', '', organization_name)
+    return safe_name.strip().replace(' ', '_')
+
+
+def backup_info(filename: str, path: str, category: str, size: int = 0,
+                storage: str = "") -> Optional[Dict]:
+    """بناء معلومات نسخة احتياطية من اسم الملف، أو None إذا لم يكن ملف نسخة"""
+    timestamp_str = split_backup_filename(filename)
+    if timestamp_str is None:
+        return None
+    try:
+        backup_date = datetime.strptime(timestamp_str[:15], "%Y%m%d_%H%M%S")
+    except ValueError:
+        backup_date = datetime.now()
+    return {
+        'filename': filename,
+        'path': path,
+        'category': category,
+        'storage': storage,
+        'created_at': backup_date,
+        'size': size,
+        'formatted_date': backup_date.strftime("%Y-%m-%d %H:%M:%S"),
+        'formatted_size': format_file_size(size)
+    }
+
+
+class BackupStorage:
+    """الواجهة الأساسية لمخزن النسخ الاحتياطية"""
+
+    name = "base"
+    is_remote = False
+
+    def open_writer(self, category: str, filename: str):
+        """فتح مخرج كتابة متدفق (write_chunk / close / abort) لنسخة جديدة"""
+        raise NotImplementedError
+
+    def object_path(self, category: str, filename: str) -> str:
+        raise NotImplementedError
+
+    def list_backups(self, category: Optional[str] = None) -> List[Dict]:
+        raise NotImplementedError
+
+    def list_files(self, folder: str) -> List[Dict]:
+        """كل الملفات في مجلد من المخزن: name و path و size"""
+        raise NotImplementedError
+
+    def delete(self, path: str) -> bool:
+        raise NotImplementedError
+
+    def move(self, path: str, category: str) -> Optional[str]:
+        """نقل نسخة إلى فئة أخرى؛ يعيد المسار الجديد"""
+        raise NotImplementedError
+
+    def get_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
+        raise NotImplementedError
+
+    def open_reader(self, path: str) -> BinaryIO:
+        """فتح النسخة للقراءة المتدفقة"""
+        raise NotImplementedError
+
+
+class LocalStorage(BackupStorage):
+    """مخزن محلي في مجلدات BACKUPS_DIR/daily و weekly و manual"""
+
+    name = "local"
+
+    def __init__(self, root=None):
+        self.root = Path(root or config.BACKUPS_DIR)
+        for category in (*BACKUP_CATEGORIES, ARCHIVES_FOLDER):
+            (self.root / category).mkdir(parents=True, exist_ok=True)
+
+    def object_path(self, category: str, filename: str) -> str:
+        return str(self.root / category / filename)
+
+    def list_files(self, folder: str) -> List[Dict]:
+        return [{'name': path.name, 'path': str(path), 'size': path.stat().st_size}
+                for path in sorted((self.root / folder).glob("*"))
+                if path.is_file() and not path.name.endswith(".part")]
+
+    def open_writer(self, category: str, filename: str):
+        return FileSink(self.object_path(category, filename))
+
+    def list_backups(self, category: Optional[str] = None) -> List[Dict]:
+        backups = []
+        for cat in ([category] if category else BACKUP_CATEGORIES):
+            for path in (self.root / cat).glob("backup_*"):
+                try:
+                    size = path.stat().st_size
+                except OSError:
+                    continue
+                info = backup_info(path.name, str(path), cat, size, self.name)
+                if info:
+                    backups.append(info)
+        backups.sort(key=lambda x: x['created_at'], reverse=True)
+        return backups
+
+    def delete(self, path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except OSError as e:
+            logging.error(f"خطأ في حذف النسخة المحلية {path}: {e}")
+            return False
+
+    def move(self, path: str, category: str) -> Optional[str]:
+        new_path = self.object_path(category, Path(path).name)
+        os.replace(path, new_path)
+        return new_path
+
+    def get_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
+        return Path(path).resolve().as_uri() if os.path.exists(path) else None
+
+    def open_reader(self, path: str) -> BinaryIO:
+        return open(path, "rb")
+
+
+class SupabaseStorage(BackupStorage):
+    """مخزن Supabase Storage ضمن backups/<اسم المؤسسة>/"""
+
+    name = "supabase"
+    is_remote = True
+
+    def __init__(self):
+        # مكتبة Supabase ثقيلة، فتُستورد عند إنشاء المخزن لا عند بدء التشغيل
+        try:
+            from supabase import create_client  # type: ignore
+        except ImportError:
+            raise RuntimeError("مكتبة Supabase غير مثبتة. يرجى تثبيتها باستخدام: pip install supabase")
+        self.client = create_client(config.SUPABASE_URL, config.SUPABASE_KEY)
+        self.bucket_name = config.SUPABASE_BUCKET
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def bucket(self):
+        return self.client.storage.from_(self.bucket_name)
+
+    def _prefix(self) -> str:
+        from core.utils.settings_manager import settings_manager
+        return f"backups/{safe_folder_name(settings_manager.get_organization_name())}"
+
+    def _folder(self, category: str) -> str:
+        # النسخ اليدوية في جذر مجلد المؤسسة كما في النسخ السابقة
+        prefix = self._prefix()
+        return prefix if category == "manual" else f"{prefix}/{category}"
+
+    def object_path(self, category: str, filename: str) -> str:
+        return f"{self._folder(category)}/{filename}"
+
+    def open_writer(self, category: str, filename: str):
+        return TusUploadSink.for_supabase(self.object_path(category, filename))
+
+    def list_backups(self, category: Optional[str] = None) -> List[Dict]:
+        backups = []
+        for cat in ([category] if category else BACKUP_CATEGORIES):
+            folder = self._folder(cat)
+            try:
+                files = self.bucket.list(folder) or []
+            except Exception as e:
+                self.logger.warning(f"خطأ في البحث في مجلد {folder}: {e}")
+                continue
+            for file_item in files:
+                if not isinstance(file_item, dict):
+                    continue
+                metadata = file_item.get('metadata') or {}
+                size = metadata.get('size', 0) if isinstance(metadata, dict) else 0
+                info = backup_info(file_item.get('name', ''), f"{folder}/{file_item.get('name', '')}",
+                                   cat, size, self.name)
+                if info:
+                    backups.append(info)
+        backups.sort(key=lambda x: x['created_at'], reverse=True)
+        return backups
+
+    def list_files(self, folder: str) -> List[Dict]:
+        path = self._folder(folder)
+        files = []
+        for file_item in self.bucket.list(path) or []:
+            if not isinstance(file_item, dict) or not file_item.get('name'):
+                continue
+            metadata = file_item.get('metadata') or {}
+            size = metadata.get('size', 0) if isinstance(metadata, dict) else 0
+            files.append({'name': file_item['name'], 'path': f"{path}/{file_item['name']}", 'size': size})
+        return files
+
+    def delete(self, path: str) -> bool:
+        try:
+            return bool(self.bucket.remove([path]))
+        except Exception as e:
+            self.logger.error(f"خطأ في حذف النسخة الاحتياطية {path}: {e}")
+            return False
+
+    def move(self, path: str, category: str) -> Optional[str]:
+        new_path = self.object_path(category, path.rsplit("/", 1)[-1])
+        self.bucket.move(path, new_path)
+        return new_path
+
+    def get_url(self, path: str, expires_in: int = 3600) -> Optional[str]:
+        try:
+            result = self.bucket.create_signed_url(path, expires_in)
+            return result.get('signedURL') or result.get('signedUrl')
+        except Exception as e:
+            self.logger.error(f"خطأ في إنشاء رابط التحميل: {e}")
+            return None
+
+    def open_reader(self, path: str) -> BinaryIO:
+        url = self.get_url(path, 600)
+        if not url:
+            raise RuntimeError("فشل في إنشاء رابط التحميل")
+        return urllib.request.urlopen(url, timeout=120)
+
+
+def create_default_storage() -> BackupStorage:
+    """مخزن Supabase إن أمكن، وإلا المخزن المحلي حتى تعمل النسخ دون اتصال"""
+    try:
+        return SupabaseStorage()
+    except Exception as e:
+        logging.warning(f"تعذر تهيئة Supabase، سيتم استخدام التخزين المحلي للنسخ الاحتياطية: {e}")
+        return LocalStorage()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+أرشفة الأعوام الدراسية المنتهية
+تُنقل صفوف العام المغلق (الطلاب وأقساطهم ورسومهم الإضافية وجداول استحقاقهم) إلى ملف SQLite
+مستقل لكل عام، فتبقى القاعدة الحية صغيرة. ملفات الأرشيف للقراءة فقط وتُرفق
+(ATTACH) بالاتصال المشترك عند الحاجة لتقارير الأعوام السابقة وسجل الطالب
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import stat
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import config
+from core.finance.rollups import set_rollups_paused
+
+
+# الجداول المؤرشفة بترتيب الإدراج (الآباء أولاً) مع شرط اختيار صفوف العام
+ARCHIVE_TABLES = {
+    "schools": "id IN (SELECT school_id FROM main.students WHERE academic_year = ?)",
+    "students": "academic_year = ?",
+    "installments": "student_id IN (SELECT id FROM main.students WHERE academic_year = ?)",
+    "additional_fees": "student_id IN (SELECT id FROM main.students WHERE academic_year = ?)",
+    "installment_plans": "student_id IN (SELECT id FROM main.students WHERE academic_year = ?)",
+}
+
+# المدارس تُنسخ للأرشيف ليبقى مقروءاً وحده، لكنها لا تُحذف من القاعدة الحية
+DELETED_TABLES = ("installment_plans", "additional_fees", "installments", "students")
+
+_BUILD_ALIAS = "archive_build"
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def _year_key(academic_year: str) -> str:
+    """'2023 - 2024' -> '2023_2024'"""
+    key = re.sub(r"\W+", "_", academic_year, flags=re.ASCII).strip("_")
+    if not key:
+        raise ValueError(f"عام دراسي غير صالح: {academic_year!r}")
+    return key
+
+
+def archive_alias(academic_year: str) -> str:
+    """الاسم المستعار للأرشيف عند إرفاقه، مثل archive_2023_2024"""
+    return f"archive_{_year_key(academic_year)}"
+
+
+def archive_path(academic_year: str, root=None) -> Path:
+    """مسار ملف أرشيف العام الدراسي"""
+    folder = Path(root or config.ARCHIVE_DIR)
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"year_{_year_key(academic_year)}.db"
+
+
+def _copy_schema_sql(sql: str, alias: str) -> str:
+    """إعادة كتابة تعريف جدول أو فهرس من main ليُنشأ داخل القاعدة المرفقة"""
+    return re.sub(r"^CREATE\s+(UNIQUE\s+)?(TABLE|INDEX)\s+(IF\s+NOT\s+EXISTS\s+)?",
+                  lambda m: f"CREATE {m.group(1) or ''}{m.group(2)} {alias}.",
+                  sql.strip(), count=1, flags=re.IGNORECASE)
+
+
+def _create_archive_schema(cursor, alias: str):
+    tables = tuple(ARCHIVE_TABLES)
+    placeholders = ", ".join("?" * len(tables))
+    cursor.execute(f"""
+        SELECT type, sql FROM main.sqlite_master
+        WHERE tbl_name IN ({placeholders}) AND type IN ('table', 'index') AND sql IS NOT NULL
+        ORDER BY CASE type WHEN 'table' THEN 0 ELSE 1 END
+    """, tables)
+    for _, sql in cursor.fetchall():
+        cursor.execute(_copy_schema_sql(sql, alias))
+    cursor.execute(f"CREATE TABLE {alias}.archive_info (key TEXT PRIMARY KEY, value TEXT)")
+
+
+def archive_academic_year(academic_year: str, db=None, root=None,
+                          current_year: Optional[str] = None, vacuum: bool = True) -> Tuple[bool, str]:
+    """
+    نقل صفوف عام دراسي منتهٍ إلى ملف أرشيف مستقل
+
+    النسخ إلى الأرشيف والحذف من القاعدة الحية يتمان في معاملة واحدة تشمل
+    الملفين، فإما أن يكتمل النقل كله أو لا يتغير شيء
+
+    Returns:
+        tuple: (نجح العملية, رسالة النتيجة)
+    """
+    from core.database.connection import SCHEMA_VERSION
+
+    db = _get_db(db)
+    if current_year is None:
+        from core.utils.settings_manager import settings_manager
+        current_year = settings_manager.get_academic_year()
+    if academic_year == current_year:
+        return False, "لا يمكن أرشفة العام الدراسي الحالي"
+
+    path = archive_path(academic_year, root)
+    if path.exists():
+        return False, f"العام الدراسي {academic_year} مؤرشف مسبقاً"
+
+    counts = {}
+    try:
+        with db.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM students WHERE academic_year = ?", (academic_year,))
+            if cursor.fetchone()[0] == 0:
+                return False, f"لا توجد بيانات للعام الدراسي {academic_year}"
+
+            cursor.execute(f"ATTACH DATABASE ? AS {_BUILD_ALIAS}", (str(path),))
+            try:
+                _create_archive_schema(cursor, _BUILD_ALIAS)
+                for table, condition in ARCHIVE_TABLES.items():
+                    cursor.execute(f"INSERT INTO {_BUILD_ALIAS}.{table} SELECT * FROM main.{table} WHERE {condition}",
+                                   (academic_year,))
+                    counts[table] = cursor.rowcount
+                # الأقساط المؤرشفة تبقى ضمن التجميع المالي الشهري
+                set_rollups_paused(cursor, True)
+                for table in DELETED_TABLES:
+                    cursor.execute(f"DELETE FROM main.{table} WHERE {ARCHIVE_TABLES[table]}", (academic_year,))
+                set_rollups_paused(cursor, False)
+                # مجاميع دفعات الطلاب المؤرشفين تصبح صفرية بعد حذف أقساطهم
+                cursor.execute("""
+                    DELETE FROM main.student_payment_totals
+                    WHERE student_id NOT IN (SELECT id FROM main.students)
+                """)
+                cursor.executemany(f"INSERT INTO {_BUILD_ALIAS}.archive_info (key, value) VALUES (?, ?)", [
+                    ("academic_year", academic_year),
+                    ("archived_at", datetime.now().isoformat(timespec="seconds")),
+                    *((f"{table}_count", str(count)) for table, count in counts.items()),
+                ])
+                cursor.execute(f"PRAGMA {_BUILD_ALIAS}.user_version = {SCHEMA_VERSION}")
+                cursor.connection.commit()
+            except Exception:
+                cursor.connection.rollback()
+                raise
+            finally:
+                cursor.execute(f"DETACH DATABASE {_BUILD_ALIAS}")
+    except Exception as e:
+        if path.exists():
+            path.unlink()
+        error_msg = f"خطأ في أرشفة العام الدراسي {academic_year}: {e}"
+        logging.error(error_msg)
+        return False, error_msg
+
+    # ملف الأرشيف لا يتغير بعد إنشائه
+    os.chmod(path, stat.S_IREAD | stat.S_IRGRP | stat.S_IROTH)
+
+    if vacuum:
+        # إعادة المساحة المحررة لتصغير ملف القاعدة الحية
+        with db.get_cursor() as cursor:
+            cursor.execute("VACUUM")
+
+    message = (f"تمت أرشفة العام الدراسي {academic_year}: {counts['students']} طالب، "
+               f"{counts['installments']} قسط، {counts['additional_fees']} رسم إضافي")
+    logging.info(f"{message} ({path})")
+    return True, message
+
+
+# ----------------------------------------------------------------------
+# قراءة الأرشيف
+# ----------------------------------------------------------------------
+
+def _archive_uri(path: Path) -> str:
+    # immutable: لا أقفال ولا فحص تغييرات، والملف يُقرأ عبر mmap دون نسخ
+    return f"{path.resolve().as_uri()}?mode=ro&immutable=1"
+
+
+def list_archives(root=None) -> List[Dict]:
+    """ملفات الأرشيف المتوفرة، الأحدث أولاً"""
+    archives = []
+    for path in Path(root or config.ARCHIVE_DIR).glob("year_*.db"):
+        try:
+            conn = sqlite3.connect(_archive_uri(path), uri=True)
+            try:
+                info = dict(conn.execute("SELECT key, value FROM archive_info").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logging.warning(f"تعذر قراءة ملف الأرشيف {path}: {e}")
+            continue
+        year = info.get("academic_year")
+        if not year:
+            continue
+        archives.append({
+            'academic_year': year,
+            'alias': archive_alias(year),
+            'path': path,
+            'archived_at': info.get("archived_at"),
+            'students': int(info.get("students_count", 0)),
+        })
+    archives.sort(key=lambda a: a['academic_year'], reverse=True)
+    return archives
+
+
+def attached_archives(db=None) -> List[str]:
+    """الأسماء المستعارة للأرشيفات المرفقة حالياً"""
+    with _get_db(db).get_cursor() as cursor:
+        cursor.execute("PRAGMA database_list")
+        return [row[1] for row in cursor.fetchall() if row[1].startswith("archive_")]
+
+
+def attach_archives(db=None, root=None, limit: int = config.ARCHIVE_MAX_ATTACHED) -> List[Dict]:
+    """
+    إرفاق ملفات الأرشيف بالاتصال المشترك (للقراءة فقط مع تفعيل mmap)
+
+    SQLite يحد عدد القواعد المرفقة، لذا تُرفق أحدث الأعوام فقط حتى الحد المحدد
+    """
+    db = _get_db(db)
+    archives = list_archives(root)[:limit]
+    already = set(attached_archives(db))
+    with db.get_cursor() as cursor:
+        for archive in archives:
+            alias = archive['alias']
+            if alias in already:
+                continue
+            cursor.execute(f"ATTACH DATABASE ? AS {alias}", (_archive_uri(archive['path']),))
+            cursor.execute(f"PRAGMA {alias}.mmap_size = {int(config.ARCHIVE_MMAP_SIZE)}")
+    return archives
+
+
+def detach_archives(db=None):
+    """فصل كل الأرشيفات المرفقة"""
+    db = _get_db(db)
+    aliases = attached_archives(db)
+    with db.get_cursor() as cursor:
+        for alias in aliases:
+            cursor.execute(f"DETACH DATABASE {alias}")
+
+
+def attached_schemas(db=None, root=None) -> List[str]:
+    """القاعدة الحية ثم الأرشيفات المرفقة"""
+    return ["main"] + [archive['alias'] for archive in attach_archives(db, root)]
+
+
+def yearly_summary(db=None, root=None) -> List[Dict]:
+    """
+    ملخص لكل عام دراسي عبر القاعدة الحية والأرشيفات:
+    عدد الطلاب، إجمالي الرسوم، المدفوع من الأقساط
+    """
+    db = _get_db(db)
+    parts = [f"""
+        SELECT s.academic_year AS academic_year, '{schema}' AS source,
+               COUNT(*) AS students, COALESCE(SUM(s.total_fee), 0) AS total_fees,
+               COALESCE(SUM(p.paid), 0) AS total_paid
+        FROM {schema}.students s
+        LEFT JOIN (SELECT student_id, SUM(amount) AS paid FROM {schema}.installments GROUP BY student_id) p
+            ON p.student_id = s.id
+        GROUP BY s.academic_year
+    """ for schema in attached_schemas(db, root)]
+    rows = db.execute_query(" UNION ALL ".join(parts) + " ORDER BY academic_year DESC")
+    return [dict(row) for row in rows]
+
+
+def student_history(national_id_number: Optional[str] = None, name: Optional[str] = None,
+                    db=None, root=None) -> List[Dict]:
+    """
+    سجل الطالب في كل الأعوام (الحالية والمؤرشفة) حسب رقم الهوية أو الاسم
+
+    Returns:
+        list: صف لكل عام مع الصف والشعبة والرسوم والمدفوع
+    """
+    if national_id_number:
+        condition, value = "s.national_id_number = ?", national_id_number
+    elif name:
+        condition, value = "s.name = ?", name
+    else:
+        return []
+
+    db = _get_db(db)
+    schemas = attached_schemas(db, root)
+    parts = [f"""
+        SELECT s.id, s.name, s.academic_year, s.grade, s.section, s.total_fee, s.status,
+               sc.name_ar AS school_name, '{schema}' AS source,
+               COALESCE((SELECT SUM(i.amount) FROM {schema}.installments i WHERE i.student_id = s.id), 0) AS paid
+        FROM {schema}.students s
+        LEFT JOIN {schema}.schools sc ON sc.id = s.school_id
+        WHERE {condition}
+    """ for schema in schemas]
+    rows = db.execute_query(" UNION ALL ".join(parts) + " ORDER BY academic_year DESC",
+                            tuple([value] * len(schemas)))
+    return [dict(row) for row in rows]
+
+
+def archivable_years(db=None, current_year: Optional[str] = None) -> List[str]:
+    """الأعوام الدراسية الموجودة في القاعدة الحية عدا العام الحالي"""
+    if current_year is None:
+        from core.utils.settings_manager import settings_manager
+        current_year = settings_manager.get_academic_year()
+    rows = _get_db(db).execute_query(
+        "SELECT DISTINCT academic_year FROM students WHERE academic_year IS NOT NULL AND academic_year != ? "
+        "ORDER BY academic_year", (current_year,))
+    return [row[0] for row in rows]
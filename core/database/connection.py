@@ -7,11 +7,18 @@
 import sqlite3
 import logging
 import os
+import threading
+import time
 from pathlib import Path
 from contextlib import contextmanager
 from typing import Optional, List, Dict, Any
 
 import config
+from core.utils.telemetry import telemetry
+
+
+# إصدار مخطط قاعدة البيانات (PRAGMA user_version)؛ يُرفع عند تغيير الجداول
+SCHEMA_VERSION = 6
 
 
 class DatabaseManager:
@@ -21,6 +28,10 @@ class DatabaseManager:
         """تهيئة مدير قاعدة البيانات"""
         self.db_path = config.DATABASE_PATH
         self.connection = None
+        # يزداد مع كل اتصال جديد ليميز الذاكرات المؤقتة بين الاتصالات المتعاقبة
+        self.connection_generation = 0
+        # بوابة تمنع استخدام الاتصال المشترك أثناء استبدال ملف القاعدة
+        self._gate = threading.RLock()
         
     def get_connection(self) -> sqlite3.Connection:
         """الحصول على اتصال قاعدة البيانات"""
@@ -31,6 +42,7 @@ class DatabaseManager:
                     check_same_thread=False
                 )
                 self.connection.row_factory = sqlite3.Row
+                self.connection_generation += 1
                 # تفعيل المفاتيح الأجنبية
                 self.connection.execute("PRAGMA foreign_keys = ON")
                 
@@ -43,17 +55,30 @@ class DatabaseManager:
     @contextmanager
     def get_cursor(self):
         """الحصول على cursor مع إدارة تلقائية للموارد"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        try:
-            yield cursor
-            conn.commit()
-        except Exception as e:
-            conn.rollback()
-            logging.error(f"خطأ في قاعدة البيانات: {e}")
-            raise
-        finally:
-            cursor.close()
+        with self._gate:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            try:
+                yield cursor
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logging.error(f"خطأ في قاعدة البيانات: {e}")
+                raise
+            finally:
+                cursor.close()
+    
+    @contextmanager
+    def paused(self):
+        """
+        إيقاف الاتصال المشترك مؤقتاً (لاستبدال ملف القاعدة)
+        
+        ينتظر انتهاء العمليات الجارية، ثم يغلق الاتصال ويمنع فتح اتصال جديد
+        عبر get_cursor حتى الخروج من السياق
+        """
+        with self._gate:
+            self.close_connection()
+            yield
     
     def close_connection(self):
         """إغلاق اتصال قاعدة البيانات"""
@@ -261,6 +286,31 @@ class DatabaseManager:
                 # إنشاء الفهارس لتحسين الأداء
                 self.create_indexes(cursor)
                 
+                # جداول التجميع المالي الشهري ومحفزاتها
+                from core.finance.rollups import install_rollups
+                install_rollups(cursor)
+                
+                # ملخصات إحصائيات الرواتب لكل معلم وموظف
+                from core.finance.salary_stats import install_salary_stats
+                install_salary_stats(cursor)
+                
+                # جداول استحقاق الأقساط ومجاميع دفعات الطلاب
+                from core.finance.installment_plans import install_installment_plans
+                install_installment_plans(cursor)
+                
+                # دفعات تعيين الرسوم الإضافية ومنع تكرارها في نفس الفصل
+                from core.finance.fee_assignment import install_fee_assignment
+                install_fee_assignment(cursor)
+                
+                # أرقام إصدار الجداول لإبطال الذاكرات المؤقتة عند الكتابة
+                from core.database.table_versions import install_table_versions
+                install_table_versions(cursor)
+                
+                # تسجيل إصدار المخطط (يُستخدم للتحقق من النسخ قبل استعادتها)
+                cursor.execute("PRAGMA user_version")
+                if cursor.fetchone()[0] < SCHEMA_VERSION:
+                    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+                
                 logging.info("تم إنشاء جداول قاعدة البيانات بنجاح")
                 
         except Exception as e:
@@ -296,11 +346,13 @@ class DatabaseManager:
             # فهارس الإيرادات الخارجية
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_income_school_id ON external_income(school_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_income_date ON external_income(income_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_income_school_date ON external_income(school_id, income_date)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_external_income_category ON external_income(category)")
             
             # فهارس المصروفات
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_school_id ON expenses(school_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(expense_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_school_date ON expenses(school_id, expense_date)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_expenses_type ON expenses(expense_type)")
             
             # فهارس الرواتب
@@ -310,6 +362,7 @@ class DatabaseManager:
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_payment_date ON salaries(payment_date)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_from_date ON salaries(from_date)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_to_date ON salaries(to_date)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_salaries_staff_period ON salaries(staff_type, staff_id, from_date, to_date)")
             
             logging.info("تم إنشاء فهارس قاعدة البيانات بنجاح")
             
@@ -317,22 +370,38 @@ class DatabaseManager:
             logging.error(f"خطأ في إنشاء فهارس قاعدة البيانات: {e}")
             raise
     
+    def _timed_execute(self, cursor, query: str, params: tuple = ()):
+        """تنفيذ استعلام مع تسجيل زمنه في إحصائيات الأداء"""
+        start = time.perf_counter()
+        try:
+            cursor.execute(query, params)
+        finally:
+            telemetry.record_statement(query, (time.perf_counter() - start) * 1000)
+    
     def execute_query(self, query: str, params: tuple = ()) -> List[sqlite3.Row]:
         """تنفيذ استعلام SELECT وإرجاع النتائج"""
         try:
             with self.get_cursor() as cursor:
-                cursor.execute(query, params)
+                self._timed_execute(cursor, query, params)
                 return cursor.fetchall()
                 
         except Exception as e:
             logging.error(f"خطأ في تنفيذ الاستعلام: {e}")
             raise
 
+    def execute_cached_query(self, query: str, params: tuple = (), tables=None) -> List[sqlite3.Row]:
+        """
+        تنفيذ استعلام SELECT عبر ذاكرة الاستعلامات المؤقتة
+        (تُعاد النتيجة المحفوظة ما دامت الجداول المقروءة لم تتغير)
+        """
+        from core.database.query_cache import query_cache
+        return query_cache.fetch(query, params, tables, db=self)
+
     def execute_fetch_one(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
         """تنفيذ استعلام SELECT وإرجاع صف واحد"""
         try:
             with self.get_cursor() as cursor:
-                cursor.execute(query, params)
+                self._timed_execute(cursor, query, params)
                 return cursor.fetchone()
                 
         except Exception as e:
@@ -343,7 +412,7 @@ class DatabaseManager:
         """تنفيذ استعلام INSERT/UPDATE/DELETE وإرجاع عدد الصفوف المتأثرة"""
         try:
             with self.get_cursor() as cursor:
-                cursor.execute(query, params)
+                self._timed_execute(cursor, query, params)
                 return cursor.rowcount
                 
         except Exception as e:
@@ -354,7 +423,7 @@ class DatabaseManager:
         """تنفيذ استعلام INSERT وإرجاع ID السجل الجديد"""
         try:
             with self.get_cursor() as cursor:
-                cursor.execute(query, params)
+                self._timed_execute(cursor, query, params)
                 return cursor.lastrowid
                 
         except Exception as e:
@@ -373,11 +442,22 @@ class DatabaseManager:
             logging.error(f"خطأ في الحصول على معلومات الجدول {table_name}: {e}")
             raise
     
-    def backup_database(self, backup_path: str) -> bool:
-        """إنشاء نسخة احتياطية من قاعدة البيانات"""
+    def backup_database(self, backup_path: str, progress_callback=None) -> bool:
+        """
+        إنشاء نسخة احتياطية متسقة من قاعدة البيانات أثناء التشغيل
+        
+        Args:
+            backup_path: مسار ملف النسخة
+            progress_callback: دالة تستدعى بـ (الصفحات المنسوخة، إجمالي الصفحات)
+        """
         try:
-            import shutil
-            shutil.copy2(str(self.db_path), backup_path)
+            from core.backup.snapshot import create_verified_snapshot
+            success, message = create_verified_snapshot(
+                backup_path, self.db_path, progress_callback=progress_callback
+            )
+            if not success:
+                logging.error(message)
+                return False
             logging.info(f"تم إنشاء نسخة احتياطية في: {backup_path}")
             return True
             
@@ -386,15 +466,17 @@ class DatabaseManager:
             return False
     
     def restore_database(self, backup_path: str) -> bool:
-        """استعادة قاعدة البيانات من نسخة احتياطية"""
+        """
+        استعادة قاعدة البيانات من نسخة احتياطية (ملف قاعدة أو أرشيف مضغوط)
+        
+        تُفك النسخة في ملف مرحلي وتُفحص قبل استبدال الملف الحي بشكل ذري
+        """
         try:
-            import shutil
-            # إغلاق الاتصال الحالي
-            self.close_connection()
-            
-            # استعادة النسخة الاحتياطية
-            shutil.copy2(backup_path, str(self.db_path))
-            
+            from core.backup.restore import restore_from_file
+            success, message = restore_from_file(backup_path, db=self)
+            if not success:
+                logging.error(message)
+                return False
             logging.info(f"تم استعادة قاعدة البيانات من: {backup_path}")
             return True
             
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ذاكرة مؤقتة لنتائج الاستعلامات
+تحفظ نتيجة كل استعلام قراءة بمفتاح (نص الاستعلام بعد توحيد المسافات، المعاملات)
+مع أرقام إصدار الجداول التي يقرؤها، فتُعاد النتيجة المحفوظة ما دامت تلك
+الجداول لم تتغير. مناسبة لقوائم المدارس والمعلمين والموظفين والطلاب التي
+تُعاد قراءتها مع كل صفحة ونافذة
+"""
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.database.table_versions import TableVersionTracker, table_versions
+from core.utils.telemetry import telemetry
+
+
+_WHITESPACE = re.compile(r"\s+")
+_TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+([A-Za-z_]\w*)", re.IGNORECASE)
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def normalize_sql(query: str) -> str:
+    """توحيد المسافات في نص الاستعلام"""
+    return _WHITESPACE.sub(" ", query).strip()
+
+
+def referenced_tables(query: str) -> Tuple[str, ...]:
+    """أسماء الجداول المذكورة بعد FROM أو JOIN"""
+    return tuple(sorted({name.lower() for name in _TABLE_REFERENCE.findall(query)}))
+
+
+class QueryCache:
+    """
+    ذاكرة مؤقتة للقراءة عبرها (read-through) مع حد أقصى للمدخلات
+
+    الاستعلام الذي يقرأ جدولاً غير متتبع الإصدار لا يُحفظ ويُنفذ مباشرة
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[Tuple, List]]" = OrderedDict()
+        self._trackers: Dict[int, TableVersionTracker] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _tracker(self, db) -> TableVersionTracker:
+        if db is table_versions.db:
+            return table_versions
+        with self._lock:
+            return self._trackers.setdefault(id(db), TableVersionTracker(db))
+
+    def fetch(self, query: str, params: tuple = (), tables: Optional[Iterable[str]] = None, db=None) -> List:
+        """
+        نتيجة الاستعلام من الذاكرة إن كانت جداوله لم تتغير، وإلا من القاعدة
+
+        Args:
+            query: استعلام SELECT
+            params: معاملات الاستعلام
+            tables: الجداول التي يقرؤها (تُستخرج من النص إذا لم تُحدد)
+
+        Returns:
+            list: نسخة من صفوف النتيجة
+        """
+        db = _get_db(db)
+        tables = tuple(tables) if tables else referenced_tables(query)
+        versions = self._tracker(db).versions(tables) if tables else None
+        key = (id(db), normalize_sql(query), tuple(params))
+
+        if versions is not None:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == versions:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    telemetry.count("query_cache.hit")
+                    return list(entry[1])
+
+        with self._lock:
+            self.misses += 1
+        telemetry.count("query_cache.miss")
+        rows = db.execute_query(query, params)
+
+        if versions is not None:
+            with self._lock:
+                self._entries[key] = (versions, list(rows))
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return list(rows)
+
+    def stats(self) -> Dict:
+        """عدد الإصابات والإخفاقات والمدخلات المحفوظة"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def clear(self):
+        """مسح كل النتائج المحفوظة"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+        logging.debug("تم مسح ذاكرة الاستعلامات")
+
+
+# ذاكرة مشتركة لقاعدة البيانات الرئيسية
+query_cache = QueryCache()
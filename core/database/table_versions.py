@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+أرقام إصدار الجداول
+جدول table_versions يحتفظ برقم لكل جدول تزيده محفزات مع كل إضافة أو تعديل
+أو حذف، بما في ذلك الحذف المتتالي عبر المفاتيح الأجنبية والكتابة من عمليات
+أخرى. تعتمد عليه الذاكرات المؤقتة لمعرفة متى تصبح نتيجة محفوظة قديمة
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+
+# الجداول التي تُتتبع إصداراتها
+TRACKED_TABLES = (
+    "schools",
+    "students",
+    "installments",
+    "additional_fees",
+    "teachers",
+    "employees",
+    "external_income",
+    "expenses",
+    "salaries",
+)
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def install_table_versions(cursor):
+    """إنشاء جدول الإصدارات ومحفزاته (يُستدعى من create_tables)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS table_versions (
+            name TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    for table in TRACKED_TABLES:
+        cursor.execute("INSERT OR IGNORE INTO table_versions (name, version) VALUES (?, 0)", (table,))
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            # FOR EACH STATEMENT غير مدعوم في SQLite؛ المحفز يعمل لكل صف
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS trg_version_{table}_{event.lower()} AFTER {event} ON {table}
+                BEGIN
+                    UPDATE table_versions SET version = version + 1 WHERE name = '{table}';
+                END
+            """)
+
+
+class TableVersionTracker:
+    """
+    قراءة أرقام الإصدار مع تجنب الاستعلام عند عدم حدوث أي كتابة
+
+    تُحفظ آخر قراءة مع total_changes للاتصال وPRAGMA data_version، فلا يُعاد
+    قراءة الجدول إلا إذا كتب هذا الاتصال أو اتصال آخر في القاعدة
+    """
+
+    def __init__(self, db=None):
+        self._db = db
+        self._lock = threading.Lock()
+        self._marker: Optional[Tuple] = None
+        self._versions: Dict[str, int] = {}
+
+    @property
+    def db(self):
+        return _get_db(self._db)
+
+    def _read(self) -> Dict[str, int]:
+        with self.db.get_cursor() as cursor:
+            connection = cursor.connection
+            cursor.execute("PRAGMA data_version")
+            marker = (self.db.connection_generation, connection.total_changes, cursor.fetchone()[0])
+            with self._lock:
+                if marker == self._marker:
+                    return self._versions
+            cursor.execute("SELECT name, version FROM table_versions")
+            versions = {row['name']: row['version'] for row in cursor.fetchall()}
+            # total_changes لا يتغير بقراءة، فالعلامة ما زالت صالحة بعد الاستعلام
+        with self._lock:
+            self._marker, self._versions = marker, versions
+        return versions
+
+    def versions(self, tables: Iterable[str]) -> Optional[Tuple[int, ...]]:
+        """
+        أرقام إصدار الجداول المطلوبة مسبوقة برقم الاتصال، فأي إعادة فتح
+        للقاعدة (استعادة نسخة أو تغيير الملف) تُبطل كل ما حُفظ قبلها
+
+        Returns:
+            tuple أو None إذا تعذرت القراءة أو كان أحد الجداول غير متتبع
+            (فلا يجوز استخدام الذاكرة المؤقتة)
+        """
+        try:
+            current = self._read()
+        except Exception as e:
+            logging.error(f"خطأ في قراءة إصدارات الجداول: {e}")
+            return None
+        result = tuple(current.get(table) for table in tables)
+        return None if None in result else (self.db.connection_generation, *result)
+
+    def reset(self):
+        """نسيان آخر قراءة (بعد استبدال ملف القاعدة مثلاً)"""
+        with self._lock:
+            self._marker, self._versions = None, {}
+
+
+# متتبع مشترك لقاعدة البيانات الرئيسية
+table_versions = TableVersionTracker()
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+"""
+محرك التصدير المتدفق المشترك (CSV / XLSX)
+"""
+
+from .streaming_export import (
+    ExportColumn,
+    ExportDefinition,
+    ExportSummary,
+    XLSX_AVAILABLE,
+    DEFAULT_BATCH_SIZE,
+    open_readonly_connection,
+    fetch_summary,
+    export_to_file
+)
+from .definitions import (
+    EXPENSES_EXPORT,
+    EXTERNAL_INCOME_EXPORT,
+    ADDITIONAL_FEES_EXPORT,
+    INSTALLMENTS_EXPORT
+)
+
+__all__ = [
+    'ExportColumn', 'ExportDefinition', 'ExportSummary', 'XLSX_AVAILABLE',
+    'DEFAULT_BATCH_SIZE', 'open_readonly_connection', 'fetch_summary', 'export_to_file',
+    'EXPENSES_EXPORT', 'EXTERNAL_INCOME_EXPORT', 'ADDITIONAL_FEES_EXPORT',
+    'INSTALLMENTS_EXPORT'
+]
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تعريفات التصدير لكل صفحة
+أسماء الجداول المستعارة (aliases) تطابق استعلامات الصفحات حتى يمكن
+تمرير شرط الفلترة نفسه الذي تبنيه الصفحة دون تعديل
+"""
+
+from .streaming_export import ExportColumn, ExportDefinition
+
+
+# المصروفات: expenses e + schools s
+EXPENSES_EXPORT = ExportDefinition(
+    title="تقرير المصروفات",
+    file_prefix="Expenses_Report",
+    from_clause="FROM expenses e LEFT JOIN schools s ON e.school_id = s.id",
+    columns=[
+        ExportColumn("id", "المعرف", "e.id"),
+        ExportColumn("expense_type", "نوع المصروف", "e.expense_type"),
+        ExportColumn("amount", "المبلغ (د.ع)", "e.amount", "amount"),
+        ExportColumn("description", "الوصف", "e.description"),
+        ExportColumn("expense_date", "التاريخ", "e.expense_date"),
+        ExportColumn("school_name", "المدرسة", "COALESCE(s.name_ar, 'عام')"),
+        ExportColumn("notes", "الملاحظات", "e.notes"),
+    ],
+    order_by="e.id DESC",
+    amount_expression="e.amount",
+)
+
+# الواردات الخارجية: external_income ei + schools s
+EXTERNAL_INCOME_EXPORT = ExportDefinition(
+    title="تقرير الواردات الخارجية",
+    file_prefix="External_Income_Report",
+    from_clause="FROM external_income ei LEFT JOIN schools s ON ei.school_id = s.id",
+    columns=[
+        ExportColumn("id", "المعرف", "ei.id"),
+        ExportColumn("income_type", "نوع الوارد", "ei.income_type"),
+        ExportColumn("description", "الوصف", "ei.description"),
+        ExportColumn("amount", "المبلغ (د.ع)", "ei.amount", "amount"),
+        ExportColumn("category", "الفئة", "ei.category"),
+        ExportColumn("income_date", "التاريخ", "ei.income_date"),
+        ExportColumn("school_name", "المدرسة", "COALESCE(s.name_ar, 'عام')"),
+        ExportColumn("notes", "الملاحظات", "ei.notes"),
+    ],
+    order_by="ei.id DESC",
+    amount_expression="ei.amount",
+)
+
+# الرسوم الإضافية: additional_fees af + students s + schools sc
+ADDITIONAL_FEES_EXPORT = ExportDefinition(
+    title="تقرير الرسوم الإضافية",
+    file_prefix="Additional_Fees_Report",
+    from_clause=(
+        "FROM additional_fees af "
+        "JOIN students s ON af.student_id = s.id "
+        "JOIN schools sc ON s.school_id = sc.id"
+    ),
+    columns=[
+        ExportColumn("id", "المعرف", "af.id"),
+        ExportColumn("student_name", "اسم الطالب", "s.name"),
+        ExportColumn("school_name", "المدرسة", "sc.name_ar"),
+        ExportColumn("fee_type", "نوع الرسم", "af.fee_type"),
+        ExportColumn("amount", "المبلغ (د.ع)", "af.amount", "amount"),
+        ExportColumn("paid", "الحالة", "af.paid", "paid"),
+        ExportColumn("payment_date", "تاريخ الدفع", "af.payment_date"),
+        ExportColumn("notes", "الملاحظات", "af.notes"),
+        ExportColumn("created_at", "تاريخ الإضافة", "af.created_at"),
+    ],
+    order_by="af.created_at DESC",
+    amount_expression="af.amount",
+    paid_expression="af.paid",
+)
+
+# سجل الأقساط: installments i + students s + schools sc
+INSTALLMENTS_EXPORT = ExportDefinition(
+    title="سجل الأقساط",
+    file_prefix="Installments_Report",
+    from_clause=(
+        "FROM installments i "
+        "LEFT JOIN students s ON i.student_id = s.id "
+        "LEFT JOIN schools sc ON s.school_id = sc.id"
+    ),
+    columns=[
+        ExportColumn("id", "رقم الوصل", "i.id"),
+        ExportColumn("student_name", "الطالب", "s.name"),
+        ExportColumn("school_name", "المدرسة", "sc.name_ar"),
+        ExportColumn("grade", "الصف", "s.grade"),
+        ExportColumn("section", "الشعبة", "s.section"),
+        ExportColumn("amount", "المبلغ (د.ع)", "i.amount", "amount"),
+        ExportColumn("payment_date", "تاريخ الدفع", "i.payment_date"),
+        ExportColumn("payment_time", "وقت الدفع", "i.payment_time"),
+        ExportColumn("notes", "الملاحظات", "i.notes"),
+    ],
+    order_by="i.payment_date DESC, i.created_at DESC",
+    amount_expression="i.amount",
+)
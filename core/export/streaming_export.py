@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+محرك تصدير متدفق مشترك بين الصفحات
+يقرأ الصفوف من مؤشر SQLite على دفعات (fetchmany) ويكتبها مباشرة إلى CSV
+أو XLSX (وضع الكتابة فقط)، دون تحميل النتيجة كاملة في الذاكرة
+"""
+
+import csv
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import config
+
+try:
+    from openpyxl import Workbook  # type: ignore
+    XLSX_AVAILABLE = True
+except ImportError:
+    Workbook = None
+    XLSX_AVAILABLE = False
+    logging.warning("openpyxl غير مثبت؛ سيقتصر التصدير على CSV")
+
+
+# حجم الدفعة الافتراضي لـ fetchmany
+DEFAULT_BATCH_SIZE = 2000
+
+
+@dataclass
+class ExportColumn:
+    """عمود قابل للتصدير"""
+    key: str
+    title: str
+    expression: str
+    kind: str = "text"  # text | amount | paid
+
+
+@dataclass
+class ExportDefinition:
+    """تعريف تقرير قابل للتصدير: مصدر البيانات والأعمدة والترتيب"""
+    title: str
+    file_prefix: str
+    from_clause: str
+    columns: List[ExportColumn]
+    order_by: str = ""
+    amount_expression: Optional[str] = None
+    paid_expression: Optional[str] = None
+
+    def column_titles(self) -> Dict[str, str]:
+        """قاموس المفتاح -> العنوان لاستخدامه في ColumnSelectionDialog"""
+        return {column.key: column.title for column in self.columns}
+
+    def selected_columns(self, selected_keys: Optional[Sequence[str]] = None) -> List[ExportColumn]:
+        if not selected_keys:
+            return list(self.columns)
+        wanted = set(selected_keys)
+        return [column for column in self.columns if column.key in wanted]
+
+    def build_select(self, columns: Sequence[ExportColumn], where_clause: str = "") -> str:
+        """بناء استعلام التصدير بنفس شرط الفلترة الخاص بالصفحة"""
+        select_list = ", ".join(f"{column.expression} AS {column.key}" for column in columns)
+        query = f"SELECT {select_list} {self.from_clause} WHERE 1=1{where_clause}"
+        if self.order_by:
+            query += f" ORDER BY {self.order_by}"
+        return query
+
+    def build_summary(self, where_clause: str = "") -> str:
+        """استعلام تجميعي واحد لإحصائيات التقرير (العدد والمجاميع)"""
+        amount = self.amount_expression or "0"
+        parts = [
+            "COUNT(*)",
+            f"COALESCE(SUM({amount}), 0)",
+            f"COALESCE(AVG({amount}), 0)",
+            f"COALESCE(MAX({amount}), 0)",
+            f"COALESCE(MIN({amount}), 0)",
+        ]
+        if self.paid_expression:
+            parts.append(f"COALESCE(SUM(CASE WHEN {self.paid_expression} THEN {amount} ELSE 0 END), 0)")
+        return f"SELECT {', '.join(parts)} {self.from_clause} WHERE 1=1{where_clause}"
+
+
+@dataclass
+class ExportSummary:
+    """إحصائيات التقرير المحسوبة في SQL"""
+    count: int = 0
+    total: float = 0
+    average: float = 0
+    maximum: float = 0
+    minimum: float = 0
+    paid_total: Optional[float] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+def open_readonly_connection(db_path=None) -> sqlite3.Connection:
+    """فتح اتصال قراءة فقط مستقل عن الاتصال المشترك (آمن للخيوط الخلفية)"""
+    path = Path(db_path or config.DATABASE_PATH).resolve()
+    conn = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True, check_same_thread=False)
+    return conn
+
+
+def fetch_summary(conn: sqlite3.Connection, definition: ExportDefinition,
+                  where_clause: str = "", params: Sequence[Any] = ()) -> ExportSummary:
+    """حساب إحصائيات التقرير باستعلام تجميعي واحد"""
+    row = conn.execute(definition.build_summary(where_clause), tuple(params)).fetchone()
+    summary = ExportSummary(
+        count=row[0] or 0,
+        total=row[1] or 0,
+        average=row[2] or 0,
+        maximum=row[3] or 0,
+        minimum=row[4] or 0,
+    )
+    if definition.paid_expression:
+        summary.paid_total = row[5] or 0
+    return summary
+
+
+def iter_batches(cursor: sqlite3.Cursor, batch_size: int = DEFAULT_BATCH_SIZE):
+    """توليد الصفوف على دفعات من المؤشر"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def _format_cell(value: Any, kind: str, for_csv: bool) -> Any:
+    if kind == "paid":
+        return "مدفوع" if value else "غير مدفوع"
+    if value is None:
+        return ""
+    if kind == "amount" and for_csv:
+        try:
+            return f"{float(value):,.2f}"
+        except (TypeError, ValueError):
+            return value
+    return value
+
+
+def _summary_lines(definition: ExportDefinition, summary: ExportSummary) -> List[List[Any]]:
+    lines = [
+        ["عدد السجلات", summary.count],
+        ["إجمالي المبلغ", round(summary.total, 2)],
+    ]
+    if summary.paid_total is not None:
+        lines.append(["المبلغ المدفوع", round(summary.paid_total, 2)])
+        lines.append(["المبلغ المتبقي", round(summary.total - summary.paid_total, 2)])
+    if summary.count:
+        lines.append(["متوسط المبلغ", round(summary.average, 2)])
+        lines.append(["أكبر مبلغ", round(summary.maximum, 2)])
+        lines.append(["أصغر مبلغ", round(summary.minimum, 2)])
+    return lines
+
+
+def export_to_file(conn: sqlite3.Connection,
+                   definition: ExportDefinition,
+                   output_path: str,
+                   where_clause: str = "",
+                   params: Sequence[Any] = (),
+                   selected_keys: Optional[Sequence[str]] = None,
+                   file_format: str = "csv",
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   progress_callback: Optional[Callable[[int, int], None]] = None,
+                   cancel_check: Optional[Callable[[], bool]] = None) -> Tuple[int, ExportSummary]:
+    """
+    تصدير نتيجة استعلام إلى ملف بطريقة متدفقة
+
+    Args:
+        conn: اتصال SQLite (يفضل أن يكون للقراءة فقط)
+        definition: تعريف التقرير
+        output_path: مسار الملف الناتج
+        where_clause: شرط الفلترة من الصفحة بصيغة " AND ..."
+        params: معاملات الشرط
+        selected_keys: الأعمدة المختارة (الكل إذا كانت فارغة)
+        file_format: csv أو xlsx
+        batch_size: حجم دفعة fetchmany
+        progress_callback: دالة تستدعى بـ (الصفوف المكتوبة، الإجمالي)
+        cancel_check: دالة تعيد True لإيقاف التصدير
+
+    Returns:
+        (عدد الصفوف المكتوبة، إحصائيات التقرير)
+    """
+    columns = definition.selected_columns(selected_keys)
+    if not columns:
+        raise ValueError("لم يتم اختيار أي عمود للتصدير")
+
+    summary = fetch_summary(conn, definition, where_clause, params)
+    cursor = conn.execute(definition.build_select(columns, where_clause), tuple(params))
+    header = [column.title for column in columns]
+    kinds = [column.kind for column in columns]
+    report_title = f"{definition.title} - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+    written = 0
+    if progress_callback:
+        progress_callback(0, summary.count)
+
+    def rows_out(for_csv: bool):
+        nonlocal written
+        for batch in iter_batches(cursor, batch_size):
+            if cancel_check and cancel_check():
+                raise InterruptedError("تم إلغاء التصدير")
+            for row in batch:
+                yield [_format_cell(value, kind, for_csv) for value, kind in zip(row, kinds)]
+            written += len(batch)
+            if progress_callback:
+                progress_callback(written, summary.count)
+
+    try:
+        if file_format == "xlsx":
+            if not XLSX_AVAILABLE:
+                raise RuntimeError("مكتبة openpyxl غير مثبتة. يرجى تثبيتها باستخدام: pip install openpyxl")
+            workbook = Workbook(write_only=True)
+            sheet = workbook.create_sheet(title=definition.file_prefix[:31])
+            sheet.sheet_view.rightToLeft = True
+            sheet.append([report_title])
+            sheet.append([])
+            sheet.append(header)
+            for out_row in rows_out(for_csv=False):
+                sheet.append(out_row)
+            stats_sheet = workbook.create_sheet(title="الإحصائيات")
+            for line in _summary_lines(definition, summary):
+                stats_sheet.append(line)
+            workbook.save(output_path)
+        else:
+            with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+                writer = csv.writer(f, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+                writer.writerow([report_title])
+                writer.writerow([f"إجمالي عدد السجلات: {summary.count}"])
+                writer.writerow([f"إجمالي المبلغ: {summary.total:,.2f} د.ع"])
+                writer.writerow([])
+                writer.writerow(header)
+                writer.writerows(rows_out(for_csv=True))
+                writer.writerow([])
+                writer.writerow(["الإحصائيات:"])
+                writer.writerows(_summary_lines(definition, summary))
+    finally:
+        cursor.close()
+
+    logging.info(f"تم تصدير {written} سجل إلى: {output_path}")
+    return written, summary
@@ -0,0 +1 @@
+# ملف فارغ لجعل finance مودول Python
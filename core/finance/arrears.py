@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تحليلات المتأخرات المالية وتوقع التحصيل
+تُحمَّل بيانات الطلاب والأقساط والرسوم الإضافية دفعة واحدة في مصفوفات NumPy،
+ثم تُحسب الأرصدة المتبقية وأعمار الديون ونسب التحصيل حسب المدرسة والصف
+والشعبة والتحصيل المتوقع حتى نهاية العام بعمليات متجهة بدلاً من حلقات لكل طالب
+"""
+
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    logging.warning("مكتبة numpy غير متاحة - تحليلات المتأخرات معطلة")
+
+
+# حدود فئات عمر الدين بالأيام منذ آخر دفعة (أو تاريخ المباشرة إن لم يدفع)
+AGING_EDGES = (30, 60, 90)
+AGING_LABELS = ("حتى 30 يوماً", "31 - 60 يوماً", "61 - 90 يوماً", "أكثر من 90 يوماً")
+
+# نافذة حساب سرعة التحصيل الأخيرة للتوقع
+FORECAST_WINDOW_DAYS = 90
+
+# نهاية العام الدراسي (الشهر، اليوم) من السنة الثانية في "2025 - 2026"
+TERM_END = (6, 30)
+
+GROUP_LEVELS = {
+    "school": ("school_name",),
+    "grade": ("school_name", "grade"),
+    "section": ("school_name", "grade", "section"),
+}
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def _require_numpy():
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError("مكتبة numpy غير مثبتة. قم بتثبيتها باستخدام: pip install numpy")
+
+
+def term_end_date(academic_year: Optional[str], as_of: date) -> date:
+    """تاريخ نهاية العام الدراسي من نص مثل "2025 - 2026" مع بديل من تاريخ الاحتساب"""
+    month, day = TERM_END
+    try:
+        end_year = int(str(academic_year).split("-")[-1].strip())
+        return date(end_year, month, day)
+    except (ValueError, TypeError):
+        end = date(as_of.year, month, day)
+        return end if end >= as_of else date(as_of.year + 1, month, day)
+
+
+def _to_days(values) -> "np.ndarray":
+    """تحويل نصوص التواريخ إلى datetime64[D] مع NaT للقيم الفارغة أو غير الصالحة"""
+    cleaned = [str(v)[:10].replace("/", "-") if v else "NaT" for v in values]
+    try:
+        return np.array(cleaned, dtype="datetime64[D]")
+    except ValueError:
+        result = np.empty(len(cleaned), dtype="datetime64[D]")
+        for i, value in enumerate(cleaned):
+            try:
+                result[i] = np.datetime64(value, "D")
+            except ValueError:
+                result[i] = np.datetime64("NaT")
+        return result
+
+
+class StudentLedger:
+    """
+    لقطة عمودية لأرصدة الطلاب: كل خاصية مصفوفة بطول عدد الطلاب بنفس الترتيب
+    """
+
+    def __init__(self, students, installments, fees, as_of: date):
+        n = len(students)
+        self.as_of_date = as_of
+        self.as_of = np.datetime64(as_of, "D")
+        self.ids = np.array([row['id'] for row in students], dtype=np.int64)
+        self.names = np.array([row['name'] for row in students], dtype=object)
+        self.school_ids = np.array([row['school_id'] for row in students], dtype=np.int64)
+        self.school_names = np.array([row['school_name'] or "" for row in students], dtype=object)
+        self.grades = np.array([row['grade'] or "" for row in students], dtype=object)
+        self.sections = np.array([row['section'] or "" for row in students], dtype=object)
+        self.total_fees = np.array([row['total_fee'] or 0 for row in students], dtype=np.float64)
+        self.start_dates = _to_days([row['start_date'] for row in students])
+
+        # الطلاب مرتبون حسب المعرف من الاستعلام، فيكفي searchsorted لربط الحركات بهم
+        pay_idx = self._positions([row['student_id'] for row in installments])
+        pay_amounts = np.array([row['amount'] or 0 for row in installments], dtype=np.float64)
+        pay_days = _to_days([row['payment_date'] for row in installments])
+        self.paid = np.bincount(pay_idx, weights=pay_amounts, minlength=n)
+
+        recent = pay_days >= self.as_of - np.timedelta64(FORECAST_WINDOW_DAYS, "D")
+        self.recent_paid = np.bincount(pay_idx[recent], weights=pay_amounts[recent], minlength=n)
+
+        # آخر دفعة لكل طالب: أكبر تاريخ عبر maximum.at على الأعداد الصحيحة
+        nat = np.iinfo(np.int64).min
+        last = np.full(n, nat, dtype=np.int64)
+        valid = ~np.isnat(pay_days)
+        np.maximum.at(last, pay_idx[valid], pay_days[valid].astype(np.int64))
+        self.last_payment = np.where(last == nat, np.datetime64("NaT"), last.astype("datetime64[D]"))
+
+        fee_idx = self._positions([row['student_id'] for row in fees])
+        fee_amounts = np.array([row['amount'] or 0 for row in fees], dtype=np.float64)
+        fee_paid = np.array([bool(row['paid']) for row in fees], dtype=bool)
+        self.fees_total = np.bincount(fee_idx, weights=fee_amounts, minlength=n)
+        self.fees_unpaid = np.bincount(fee_idx[~fee_paid], weights=fee_amounts[~fee_paid], minlength=n)
+
+        self.billed = self.total_fees + self.fees_total
+        self.collected = self.paid + (self.fees_total - self.fees_unpaid)
+        self.outstanding = np.clip(self.total_fees - self.paid, 0, None) + self.fees_unpaid
+
+        # عمر الدين من آخر دفعة، أو من تاريخ المباشرة لمن لم يدفع شيئاً
+        reference = np.where(np.isnat(self.last_payment), self.start_dates, self.last_payment)
+        age = (self.as_of - reference).astype(np.int64)
+        self.age_days = np.where(np.isnat(reference), 0, np.clip(age, 0, None))
+
+    def _positions(self, student_ids) -> "np.ndarray":
+        return np.searchsorted(self.ids, np.array(student_ids, dtype=np.int64))
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def load_ledger(academic_year: Optional[str] = None, school_id: Optional[int] = None,
+                as_of: Optional[date] = None, db=None) -> StudentLedger:
+    """
+    تحميل أرصدة الطلاب بثلاثة استعلامات فقط مهما كان عددهم
+
+    Args:
+        academic_year: العام الدراسي (None لكل الأعوام)
+        school_id: تقييد بمدرسة واحدة
+        as_of: تاريخ الاحتساب (الافتراضي: اليوم)
+    """
+    _require_numpy()
+    db = _get_db(db)
+    conditions, params = [], []
+    if academic_year:
+        conditions.append("s.academic_year = ?")
+        params.append(academic_year)
+    if school_id is not None:
+        conditions.append("s.school_id = ?")
+        params.append(school_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params = tuple(params)
+
+    students = db.execute_query(f"""
+        SELECT s.id, s.name, s.school_id, sc.name_ar AS school_name, s.grade, s.section,
+               s.total_fee, s.start_date
+        FROM students s
+        LEFT JOIN schools sc ON sc.id = s.school_id
+        {where}
+        ORDER BY s.id
+    """, params)
+    installments = db.execute_query(f"""
+        SELECT i.student_id, i.amount, i.payment_date
+        FROM installments i JOIN students s ON s.id = i.student_id
+        {where}
+    """, params)
+    fees = db.execute_query(f"""
+        SELECT f.student_id, f.amount, f.paid
+        FROM additional_fees f JOIN students s ON s.id = f.student_id
+        {where}
+    """, params)
+    return StudentLedger(students, installments, fees, as_of or date.today())
+
+
+def aging_buckets(ledger: StudentLedger) -> List[Dict]:
+    """توزيع المتأخرات على فئات عمر الدين"""
+    owing = ledger.outstanding > 0
+    bucket = np.digitize(ledger.age_days[owing], AGING_EDGES, right=True)
+    amounts = np.bincount(bucket, weights=ledger.outstanding[owing], minlength=len(AGING_LABELS))
+    counts = np.bincount(bucket, minlength=len(AGING_LABELS))
+    total = amounts.sum()
+    return [{
+        'label': label,
+        'students': int(counts[i]),
+        'amount': float(amounts[i]),
+        'share': float(amounts[i] / total * 100) if total else 0.0,
+    } for i, label in enumerate(AGING_LABELS)]
+
+
+def _projected(ledger: StudentLedger, term_end: date) -> "np.ndarray":
+    """التحصيل المتوقع لكل طالب حتى نهاية العام بسرعة دفعه في النافذة الأخيرة"""
+    days_left = max((np.datetime64(term_end, "D") - ledger.as_of).astype(np.int64), 0)
+    daily_rate = ledger.recent_paid / FORECAST_WINDOW_DAYS
+    return np.minimum(ledger.outstanding, daily_rate * days_left)
+
+
+def collection_rates(ledger: StudentLedger, level: str = "section",
+                     term_end: Optional[date] = None) -> List[Dict]:
+    """
+    نسب التحصيل والمتأخرات مجمعة حسب المدرسة أو الصف أو الشعبة
+
+    Args:
+        level: school | grade | section
+        term_end: نهاية العام لحساب التحصيل المتوقع (بدونه يساوي صفراً)
+    """
+    if level not in GROUP_LEVELS:
+        raise ValueError(f"مستوى تجميع غير معروف: {level}")
+    if not len(ledger):
+        return []
+
+    # ترميز كل مستوى ثم دمج الرموز في مفتاح واحد لتجميع كل المستويات بتمريرة واحدة
+    columns = {'school_name': ledger.school_names, 'grade': ledger.grades, 'section': ledger.sections}
+    keys = np.zeros(len(ledger), dtype=np.int64)
+    uniques = []
+    for name in GROUP_LEVELS[level]:
+        values, codes = np.unique(columns[name].astype(str), return_inverse=True)
+        keys = keys * len(values) + codes
+        uniques.append((name, values))
+    group_keys, inverse = np.unique(keys, return_inverse=True)
+
+    def total(weights):
+        return np.bincount(inverse, weights=weights, minlength=len(group_keys))
+
+    billed = total(ledger.billed)
+    collected = total(ledger.collected)
+    outstanding = total(ledger.outstanding)
+    owing = np.bincount(inverse, weights=(ledger.outstanding > 0).astype(np.float64), minlength=len(group_keys))
+    students = np.bincount(inverse, minlength=len(group_keys))
+    projected = total(_projected(ledger, term_end)) if term_end else np.zeros(len(group_keys))
+
+    # فك المفتاح المدمج إلى قيم المستويات
+    labels = {}
+    remainder = group_keys.copy()
+    for name, values in reversed(uniques):
+        labels[name] = values[remainder % len(values)]
+        remainder //= len(values)
+
+    rows = []
+    for i in range(len(group_keys)):
+        row = {name: str(labels[name][i]) for name, _ in uniques}
+        row.update({
+            'students': int(students[i]),
+            'owing_students': int(owing[i]),
+            'billed': float(billed[i]),
+            'collected': float(collected[i]),
+            'outstanding': float(outstanding[i]),
+            'collection_rate': float(collected[i] / billed[i] * 100) if billed[i] else 0.0,
+            'projected': float(projected[i]),
+        })
+        rows.append(row)
+    return rows
+
+
+def top_debtors(ledger: StudentLedger, limit: int = 50) -> List[Dict]:
+    """أعلى الطلاب رصيداً متبقياً"""
+    owing = np.flatnonzero(ledger.outstanding > 0)
+    if not len(owing):
+        return []
+    order = owing[np.argsort(-ledger.outstanding[owing], kind="stable")][:limit]
+    return [{
+        'id': int(ledger.ids[i]),
+        'name': ledger.names[i],
+        'school_name': ledger.school_names[i],
+        'grade': ledger.grades[i],
+        'section': ledger.sections[i],
+        'outstanding': float(ledger.outstanding[i]),
+        'age_days': int(ledger.age_days[i]),
+        'last_payment': None if np.isnat(ledger.last_payment[i]) else str(ledger.last_payment[i]),
+    } for i in order]
+
+
+def collection_forecast(ledger: StudentLedger, term_end: date) -> Dict:
+    """التحصيل المتوقع حتى نهاية العام والعجز المتوقع"""
+    projected = _projected(ledger, term_end)
+    outstanding = float(ledger.outstanding.sum())
+    expected = float(projected.sum())
+    return {
+        'term_end': term_end.isoformat(),
+        'days_left': max((term_end - ledger.as_of_date).days, 0),
+        'window_days': FORECAST_WINDOW_DAYS,
+        'outstanding': outstanding,
+        'projected': expected,
+        'shortfall': outstanding - expected,
+        'projected_rate': float((ledger.collected.sum() + expected) / ledger.billed.sum() * 100)
+        if ledger.billed.sum() else 0.0,
+    }
+
+
+def arrears_report_data(academic_year: Optional[str] = None, school_id: Optional[int] = None,
+                        as_of: Optional[date] = None, level: str = "section",
+                        limit: int = 50, db=None) -> Dict:
+    """بيانات قالب تقرير المتأخرات (ARREARS_REPORT)"""
+    as_of = as_of or date.today()
+    ledger = load_ledger(academic_year, school_id, as_of, db)
+    term_end = term_end_date(academic_year, as_of)
+    billed, collected = float(ledger.billed.sum()), float(ledger.collected.sum())
+    logging.info(f"تحليل المتأخرات: {len(ledger)} طالب حتى {as_of.isoformat()}")
+    return {
+        'academic_year': academic_year,
+        'as_of': as_of.isoformat(),
+        'arrears': {
+            'students': len(ledger),
+            'owing_students': int((ledger.outstanding > 0).sum()),
+            'billed': billed,
+            'collected': collected,
+            'outstanding': float(ledger.outstanding.sum()),
+            'collection_rate': collected / billed * 100 if billed else 0.0,
+            'aging': aging_buckets(ledger),
+            'groups': collection_rates(ledger, level, term_end),
+            'group_level': level,
+            'debtors': top_debtors(ledger, limit),
+            'forecast': collection_forecast(ledger, term_end),
+        },
+    }
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+التقرير الموحد لعدة مدارس
+لكل مدرسة قسم بمجاميعها (الطلاب، الأقساط المحصلة والمتبقية، الرسوم الإضافية،
+الإيرادات الخارجية، المصروفات، الرواتب) ثم مجموع كلي. تُجمع الأقسام بالتوازي
+في مجموعة خيوط، لكل خيط اتصال قراءة فقط خاص به، وكل استعلام مقيد بمدرسة
+واحدة على أعمدة مفهرسة، فيزداد الزمن خطياً مع عدد المدارس
+"""
+
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence
+
+import config
+from core.export import open_readonly_connection
+
+
+# حدود التاريخ عند عدم تحديد الفترة (تبقي الشرط على العمود المفهرس)
+_MIN_DATE = "0000-01-01"
+_MAX_DATE = "9999-12-31"
+
+# الحقول التي تُجمع في المجموع الكلي
+TOTAL_FIELDS = (
+    "students", "fees_billed", "fees_collected", "fees_outstanding",
+    "installments", "additional_fees_paid", "additional_fees_unpaid",
+    "external_income", "expenses", "salaries", "income", "outflow", "net",
+)
+
+
+def _scalar(conn: sqlite3.Connection, sql: str, params: Sequence) -> float:
+    row = conn.execute(sql, tuple(params)).fetchone()
+    return (row[0] or 0) if row else 0
+
+
+def school_section(conn: sqlite3.Connection, school_id: int, school_name: str,
+                   date_from: Optional[str] = None, date_to: Optional[str] = None) -> Dict:
+    """
+    مجاميع مدرسة واحدة للفترة (التواريخ شاملة بصيغة YYYY-MM-DD)
+
+    أرصدة الأقساط (المستحق والمحصل والمتبقي) للطلاب النشطين بغض النظر عن
+    الفترة، أما الحركات المالية فمقيدة بالفترة
+    """
+    start, end = date_from or _MIN_DATE, date_to or _MAX_DATE
+    students, billed, collected, outstanding = conn.execute("""
+        SELECT COUNT(*), COALESCE(SUM(total_fee), 0), COALESCE(SUM(paid), 0),
+               COALESCE(SUM(MAX(total_fee - paid, 0)), 0)
+        FROM (
+            SELECT s.total_fee, COALESCE(SUM(i.amount), 0) AS paid
+            FROM students s
+            LEFT JOIN installments i ON i.student_id = s.id
+            WHERE s.school_id = ? AND s.status = 'نشط'
+            GROUP BY s.id
+        )
+    """, (school_id,)).fetchone()
+
+    installments = _scalar(conn, """
+        SELECT SUM(i.amount) FROM installments i JOIN students s ON s.id = i.student_id
+        WHERE s.school_id = ? AND i.payment_date >= ? AND i.payment_date <= ?
+    """, (school_id, start, end))
+    fees_paid, fees_unpaid = conn.execute("""
+        SELECT COALESCE(SUM(CASE WHEN f.paid AND COALESCE(f.payment_date, f.created_at) BETWEEN ? AND ?
+                                 THEN f.amount END), 0),
+               COALESCE(SUM(CASE WHEN NOT COALESCE(f.paid, 0) THEN f.amount END), 0)
+        FROM additional_fees f JOIN students s ON s.id = f.student_id
+        WHERE s.school_id = ?
+    """, (start, f"{end} 23:59:59", school_id)).fetchone()
+    external_income = _scalar(conn, """
+        SELECT SUM(amount) FROM external_income WHERE school_id = ? AND income_date >= ? AND income_date <= ?
+    """, (school_id, start, end))
+    expenses = _scalar(conn, """
+        SELECT SUM(amount) FROM expenses WHERE school_id = ? AND expense_date >= ? AND expense_date <= ?
+    """, (school_id, start, end))
+    salaries = _scalar(conn, """
+        SELECT SUM(paid_amount) FROM salaries WHERE school_id = ? AND payment_date >= ? AND payment_date <= ?
+    """, (school_id, start, end))
+
+    income = installments + fees_paid + external_income
+    outflow = expenses + salaries
+    return {
+        'school_id': school_id,
+        'school_name': school_name,
+        'students': students,
+        'fees_billed': billed,
+        'fees_collected': collected,
+        'fees_outstanding': outstanding,
+        'installments': installments,
+        'additional_fees_paid': fees_paid,
+        'additional_fees_unpaid': fees_unpaid,
+        'external_income': external_income,
+        'expenses': expenses,
+        'salaries': salaries,
+        'income': income,
+        'outflow': outflow,
+        'net': income - outflow,
+    }
+
+
+def grand_total(sections: List[Dict]) -> Dict:
+    """جمع أقسام المدارس في مجموع كلي"""
+    return {name: sum(section[name] for section in sections) for name in TOTAL_FIELDS}
+
+
+def build_consolidated_report(date_from: Optional[str] = None, date_to: Optional[str] = None,
+                              school_ids: Optional[Sequence[int]] = None,
+                              workers: Optional[int] = None, db_path=None,
+                              on_section: Optional[Callable[[Dict, int, int], None]] = None,
+                              cancel_check: Optional[Callable[[], bool]] = None) -> Dict:
+    """
+    بناء التقرير الموحد بتوزيع المدارس على مجموعة خيوط
+
+    Args:
+        date_from, date_to: حدود الفترة (شاملة)، بلا حد إذا لم تُحدد
+        school_ids: المدارس المطلوبة (الكل إذا لم تُحدد)
+        workers: عدد الخيوط (الافتراضي config.REPORT_WORKERS)
+        on_section: تُستدعى مع كل قسم فور اكتماله (القسم، المكتمل، الإجمالي)
+        cancel_check: تُرجع True لإيقاف البناء (يُرفع InterruptedError)
+
+    Returns:
+        dict: الأقسام مرتبة حسب اسم المدرسة، والمجموع الكلي، وبيانات الفترة
+    """
+    conn = open_readonly_connection(db_path)
+    try:
+        schools = conn.execute("SELECT id, name_ar FROM schools ORDER BY name_ar").fetchall()
+    finally:
+        conn.close()
+    if school_ids is not None:
+        wanted = set(school_ids)
+        schools = [school for school in schools if school[0] in wanted]
+    order = {school[0]: index for index, school in enumerate(schools)}
+
+    local = threading.local()
+    connections: List[sqlite3.Connection] = []
+    lock = threading.Lock()
+
+    def worker_connection() -> sqlite3.Connection:
+        if not hasattr(local, "conn"):
+            local.conn = open_readonly_connection(db_path)
+            with lock:
+                connections.append(local.conn)
+        return local.conn
+
+    def build(school) -> Dict:
+        if cancel_check and cancel_check():
+            raise InterruptedError("تم إلغاء بناء التقرير")
+        return school_section(worker_connection(), school[0], school[1], date_from, date_to)
+
+    sections: List[Dict] = []
+    started = datetime.now()
+    max_workers = max(1, min(workers or config.REPORT_WORKERS, len(schools) or 1))
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="consolidated") as pool:
+            futures = [pool.submit(build, school) for school in schools]
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    section = future.result()
+                    sections.append(section)
+                    if on_section:
+                        on_section(section, done, len(schools))
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        for connection in connections:
+            connection.close()
+
+    sections.sort(key=lambda section: order[section['school_id']])
+    elapsed = (datetime.now() - started).total_seconds()
+    logging.info(f"تم بناء التقرير الموحد لـ {len(sections)} مدرسة في {elapsed:.2f} ثانية ({max_workers} خيوط)")
+    return {
+        'sections': sections,
+        'grand_total': grand_total(sections),
+        'date_from': date_from,
+        'date_to': date_to,
+        'date_range': f"{date_from or 'البداية'} - {date_to or 'اليوم'}",
+    }
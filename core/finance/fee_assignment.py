@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+تعيين الرسوم الإضافية للطلاب دفعة واحدة
+يُحدد الطلاب بفلتر (المدرسة، الصف، الشعبة، الحالة، الجنس)، وتُعرض معاينة بعدد
+الطلاب والمجموع قبل التنفيذ، ثم يُدرج الرسم للجميع بعبارة INSERT ... SELECT
+واحدة. كل تعيين يُسجل كدفعة في fee_batches ويُربط كل رسم بها عبر batch_id،
+فيمكن التراجع عن الدفعة كاملة. الفهرس الفريد على (الطالب، نوع الرسم، الفصل)
+يمنع تكرار نفس الرسم لنفس الطالب في نفس الفصل
+"""
+
+import logging
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+# الأعمدة المضافة إلى جدول الرسوم الإضافية
+_FEE_COLUMNS = {
+    "term": "TEXT",
+    "batch_id": "INTEGER",
+}
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def install_fee_assignment(cursor):
+    """إنشاء جدول الدفعات وأعمدة الفصل والدفعة وفهارسها (يُستدعى من create_tables)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fee_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            fee_type TEXT NOT NULL,
+            amount DECIMAL(10,2) NOT NULL,
+            term TEXT NOT NULL,
+            target TEXT,
+            students_count INTEGER NOT NULL DEFAULT 0,
+            total_amount DECIMAL(10,2) NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            undone_at TIMESTAMP
+        )
+    """)
+    cursor.execute("PRAGMA table_info(additional_fees)")
+    existing = {row[1] for row in cursor.fetchall()}
+    for column, column_type in _FEE_COLUMNS.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE additional_fees ADD COLUMN {column} {column_type}")
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_additional_fees_student_type_term
+        ON additional_fees(student_id, fee_type, term) WHERE term IS NOT NULL
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_additional_fees_batch_id
+        ON additional_fees(batch_id) WHERE batch_id IS NOT NULL
+    """)
+
+
+def current_term() -> str:
+    """الفصل الافتراضي للرسوم: العام الدراسي الحالي من الإعدادات"""
+    from core.utils.settings_manager import settings_manager
+    return settings_manager.get_academic_year()
+
+
+@dataclass
+class FeeTarget:
+    """فلتر الطلاب المستهدفين (الحقول الفارغة لا تُقيد)"""
+    school_id: Optional[int] = None
+    grade: Optional[str] = None
+    section: Optional[str] = None
+    status: Optional[str] = "نشط"
+    gender: Optional[str] = None
+
+    def where(self, alias: str = "s") -> Tuple[str, List]:
+        """شرط WHERE ومعاملاته لجدول الطلاب"""
+        conditions, params = [], []
+        for column, value in asdict(self).items():
+            if value not in (None, ""):
+                conditions.append(f"{alias}.{column} = ?")
+                params.append(value)
+        return (" AND ".join(conditions) or "1 = 1"), params
+
+    def describe(self) -> str:
+        """وصف الفلتر للعرض وللسجل"""
+        labels = {"school_id": "المدرسة", "grade": "الصف", "section": "الشعبة",
+                  "status": "الحالة", "gender": "الجنس"}
+        parts = [f"{labels[column]}: {value}" for column, value in asdict(self).items() if value not in (None, "")]
+        return "، ".join(parts) or "جميع الطلاب"
+
+
+def _not_charged(fee_alias: str = "f") -> str:
+    return f"""NOT EXISTS (SELECT 1 FROM additional_fees {fee_alias}
+                          WHERE {fee_alias}.student_id = s.id AND {fee_alias}.fee_type = ?
+                            AND {fee_alias}.term = ?)"""
+
+
+def preview_fee_assignment(target: FeeTarget, fee_type: str, amount: float,
+                           term: Optional[str] = None, db=None) -> Dict:
+    """
+    معاينة التعيين دون كتابة
+
+    Returns:
+        dict: matched (الطلاب المطابقون)، duplicates (المعين لهم الرسم مسبقاً
+              في نفس الفصل)، new (من سيُضاف لهم)، total (مجموع المبالغ الجديدة)، term
+    """
+    term = term or current_term()
+    condition, params = target.where()
+    row = _get_db(db).execute_query(f"""
+        SELECT COUNT(*) AS matched, COALESCE(SUM({_not_charged()}), 0) AS new
+        FROM students s
+        WHERE {condition}
+    """, (fee_type, term, *params))[0]
+    matched, new = row['matched'], row['new']
+    return {
+        'matched': matched,
+        'duplicates': matched - new,
+        'new': new,
+        'total': new * float(amount),
+        'term': term,
+    }
+
+
+def assign_fee(target: FeeTarget, fee_type: str, amount: float, term: Optional[str] = None,
+               notes: Optional[str] = None, db=None) -> Tuple[bool, str, Optional[int]]:
+    """
+    تعيين رسم لكل الطلاب المطابقين بعبارة INSERT ... SELECT واحدة في معاملة واحدة
+
+    الطلاب الذين لديهم نفس نوع الرسم في نفس الفصل يُتخطون
+
+    Returns:
+        tuple: (نجاح العملية، رسالة، معرف الدفعة)
+    """
+    fee_type = (fee_type or "").strip()
+    if not fee_type:
+        return False, "يجب تحديد نوع الرسم", None
+    if amount <= 0:
+        return False, "يجب أن يكون مبلغ الرسم أكبر من صفر", None
+
+    term = term or current_term()
+    condition, params = target.where()
+    try:
+        with _get_db(db).get_cursor() as cursor:
+            cursor.execute("""
+                INSERT INTO fee_batches (fee_type, amount, term, target) VALUES (?, ?, ?, ?)
+            """, (fee_type, amount, term, target.describe()))
+            batch_id = cursor.lastrowid
+            cursor.execute(f"""
+                INSERT INTO additional_fees (student_id, fee_type, amount, paid, notes, term, batch_id)
+                SELECT s.id, ?, ?, 0, ?, ?, ?
+                FROM students s
+                WHERE {condition} AND {_not_charged()}
+            """, (fee_type, amount, notes, term, batch_id, *params, fee_type, term))
+            added = cursor.rowcount
+            if added == 0:
+                cursor.execute("DELETE FROM fee_batches WHERE id = ?", (batch_id,))
+                return False, "لا يوجد طلاب جدد لتعيين الرسم لهم (جميع المطابقين معين لهم مسبقاً)", None
+            cursor.execute("""
+                UPDATE fee_batches SET students_count = ?, total_amount = ? WHERE id = ?
+            """, (added, added * amount, batch_id))
+
+        message = f"تم تعيين رسم {fee_type} لـ {added} طالب بمجموع {added * amount:,.0f} د.ع"
+        logging.info(f"{message} - {target.describe()} - الفصل {term} (دفعة {batch_id})")
+        return True, message, batch_id
+
+    except Exception as e:
+        logging.error(f"خطأ في تعيين الرسوم للطلاب: {e}")
+        return False, f"فشل تعيين الرسوم: {e}", None
+
+
+def undo_fee_batch(batch_id: int, db=None) -> Tuple[bool, str]:
+    """
+    التراجع عن دفعة تعيين كاملة بحذف رسومها في معاملة واحدة
+
+    يُرفض التراجع إذا دُفع أي رسم من الدفعة، حتى لا تُحذف مبالغ محصلة
+    """
+    try:
+        with _get_db(db).get_cursor() as cursor:
+            cursor.execute("SELECT undone_at FROM fee_batches WHERE id = ?", (batch_id,))
+            batch = cursor.fetchone()
+            if batch is None:
+                return False, "دفعة الرسوم غير موجودة"
+            if batch['undone_at']:
+                return False, "تم التراجع عن هذه الدفعة مسبقاً"
+            cursor.execute("SELECT COUNT(*) FROM additional_fees WHERE batch_id = ? AND paid", (batch_id,))
+            paid = cursor.fetchone()[0]
+            if paid:
+                return False, f"لا يمكن التراجع: تم دفع {paid} رسم من هذه الدفعة"
+            cursor.execute("DELETE FROM additional_fees WHERE batch_id = ?", (batch_id,))
+            removed = cursor.rowcount
+            cursor.execute("UPDATE fee_batches SET undone_at = ? WHERE id = ?",
+                           (datetime.now().isoformat(timespec="seconds"), batch_id))
+
+        logging.info(f"تم التراجع عن دفعة الرسوم {batch_id}: حذف {removed} رسم")
+        return True, f"تم التراجع عن الدفعة وحذف {removed} رسم"
+
+    except Exception as e:
+        logging.error(f"خطأ في التراجع عن دفعة الرسوم {batch_id}: {e}")
+        return False, f"فشل التراجع عن الدفعة: {e}"
+
+
+def recent_batches(limit: int = 20, db=None) -> List[Dict]:
+    """آخر دفعات التعيين مع عدد الرسوم المدفوعة منها"""
+    rows = _get_db(db).execute_query("""
+        SELECT b.id, b.fee_type, b.amount, b.term, b.target, b.students_count, b.total_amount,
+               b.created_at, b.undone_at,
+               (SELECT COUNT(*) FROM additional_fees f WHERE f.batch_id = b.id AND f.paid) AS paid_count
+        FROM fee_batches b
+        ORDER BY b.id DESC
+        LIMIT ?
+    """, (limit,))
+    return [dict(row) for row in rows]
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+جداول استحقاق الأقساط
+جدول installment_plans يحفظ لكل طالب مواعيد الاستحقاق ومبالغها مع المجموع
+التراكمي حتى كل موعد، وجدول student_payment_totals يحتفظ بمجموع ما دفعه كل
+طالب وتحدّثه محفزات على جدول الأقساط. الموعد مسدد إذا لم يتجاوز مجموعه
+التراكمي ما دفعه الطالب، فيُقرأ "المستحق هذا الأسبوع" و"المتأخر" بمسح مدى على
+فهرس تاريخ الاستحقاق وربط بالمفتاح الأساسي دون المرور على سجل الدفعات
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# حدود التاريخ عند عدم تحديد بداية المدى (تبقي الشرط على العمود المفهرس)
+_MIN_DATE = "0000-01-01"
+
+# عدد أيام نافذة "المستحق هذا الأسبوع" بدءاً من اليوم
+WEEK_DAYS = 7
+
+STATUS_PAID = "مسدد"
+STATUS_PARTIAL = "مسدد جزئياً"
+STATUS_OVERDUE = "متأخر"
+STATUS_DUE = "مستحق"
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def _as_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def _trigger_statements():
+    add = """
+        INSERT INTO student_payment_totals (student_id, paid)
+        VALUES (NEW.student_id, COALESCE(NEW.amount, 0))
+        ON CONFLICT (student_id) DO UPDATE SET paid = paid + excluded.paid;"""
+    remove = """
+        UPDATE student_payment_totals SET paid = paid - COALESCE(OLD.amount, 0)
+        WHERE student_id = OLD.student_id;"""
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_payment_totals_insert AFTER INSERT ON installments
+            BEGIN {add}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_payment_totals_delete AFTER DELETE ON installments
+            BEGIN {remove}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_payment_totals_update
+            AFTER UPDATE OF student_id, amount ON installments
+            BEGIN {remove} {add}
+            END""",
+    ]
+
+
+def _rebuild(cursor):
+    cursor.execute("DELETE FROM student_payment_totals")
+    cursor.execute("""
+        INSERT INTO student_payment_totals (student_id, paid)
+        SELECT student_id, COALESCE(SUM(amount), 0) FROM installments GROUP BY student_id
+    """)
+
+
+def install_installment_plans(cursor):
+    """
+    إنشاء جداول الاستحقاق ومجاميع الدفعات ومحفزاتها (يُستدعى من create_tables)
+
+    عند الإنشاء لأول مرة تُملأ مجاميع الدفعات من الأقساط الموجودة
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_payment_totals'")
+    first_install = cursor.fetchone() is None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS installment_plans (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            sequence INTEGER NOT NULL,
+            due_date DATE NOT NULL,
+            amount DECIMAL(10,2) NOT NULL,
+            cumulative_amount DECIMAL(10,2) NOT NULL,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (student_id, sequence),
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_installment_plans_due_date ON installment_plans(due_date)")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS student_payment_totals (
+            student_id INTEGER PRIMARY KEY,
+            paid REAL NOT NULL DEFAULT 0
+        )
+    """)
+    for statement in _trigger_statements():
+        cursor.execute(statement)
+
+    if first_install:
+        _rebuild(cursor)
+        logging.info("تم إنشاء جداول استحقاق الأقساط")
+
+
+def rebuild_payment_totals(db=None):
+    """
+    إعادة حساب مجاميع دفعات الطلاب بالكامل من جدول الأقساط
+
+    Returns:
+        tuple: (نجح العملية, رسالة النتيجة)
+    """
+    try:
+        with _get_db(db).get_cursor() as cursor:
+            _rebuild(cursor)
+        return True, "تمت إعادة حساب مجاميع دفعات الطلاب"
+    except Exception as e:
+        error_msg = f"خطأ في إعادة حساب مجاميع الدفعات: {e}"
+        logging.error(error_msg)
+        return False, error_msg
+
+
+def split_amount(total: float, count: int) -> List[float]:
+    """تقسيم المبلغ على عدد الأقساط بمبالغ صحيحة، والباقي على القسط الأخير"""
+    if count < 1:
+        raise ValueError("عدد الأقساط يجب أن يكون 1 على الأقل")
+    part = float(int(total // count))
+    return [part] * (count - 1) + [round(total - part * (count - 1), 2)]
+
+
+def build_schedule(total: float, count: int, first_due, interval_days: int = 30) -> List[Dict]:
+    """
+    مواعيد الاستحقاق ومبالغها (للمعاينة والحفظ)
+
+    Returns:
+        list: لكل قسط الرقم وتاريخ الاستحقاق والمبلغ والمجموع التراكمي
+    """
+    first_due = _as_date(first_due)
+    schedule, cumulative = [], 0.0
+    for index, amount in enumerate(split_amount(total, count)):
+        cumulative = round(cumulative + amount, 2)
+        schedule.append({
+            'sequence': index + 1,
+            'due_date': (first_due + timedelta(days=index * interval_days)).isoformat(),
+            'amount': amount,
+            'cumulative_amount': cumulative,
+        })
+    return schedule
+
+
+def _write_plans(cursor, students: Sequence[Tuple[int, float]], count: int, first_due,
+                 interval_days: int, notes: Optional[str]) -> int:
+    """استبدال جداول الطلاب المعطاة (المعرف، المبلغ الكلي) داخل المعاملة الحالية"""
+    ids = [student_id for student_id, _ in students]
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        cursor.execute(f"DELETE FROM installment_plans WHERE student_id IN ({','.join('?' * len(chunk))})",
+                       chunk)
+    rows = [(student_id, item['sequence'], item['due_date'], item['amount'], item['cumulative_amount'], notes)
+            for student_id, total in students
+            for item in build_schedule(total, count, first_due, interval_days)]
+    cursor.executemany("""
+        INSERT INTO installment_plans (student_id, sequence, due_date, amount, cumulative_amount, notes)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, rows)
+    return len(rows)
+
+
+def generate_grade_plans(school_id: int, grade: str, count: int, first_due, interval_days: int = 30,
+                         section: Optional[str] = None, total_amount: Optional[float] = None,
+                         replace: bool = False, notes: Optional[str] = None, db=None) -> Tuple[bool, str, int]:
+    """
+    إنشاء جداول الاستحقاق لكل الطلاب النشطين في صف (أو شعبة) في معاملة واحدة
+
+    Args:
+        total_amount: المبلغ المقسط لكل طالب (القسط الكلي للطالب إذا لم يُحدد)
+        replace: استبدال الجداول الموجودة، وإلا يُتخطى الطلاب الذين لديهم جدول
+
+    Returns:
+        tuple: (نجاح العملية، رسالة، عدد الطلاب الذين أُنشئت جداولهم)
+    """
+    sql = """
+        SELECT s.id, s.total_fee, EXISTS (SELECT 1 FROM installment_plans p WHERE p.student_id = s.id) AS planned
+        FROM students s
+        WHERE s.school_id = ? AND s.grade = ? AND s.status = 'نشط'
+    """
+    params = [school_id, grade]
+    if section:
+        sql += " AND s.section = ?"
+        params.append(section)
+
+    try:
+        with _get_db(db).get_cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            skipped = sum(1 for row in rows if row['planned'] and not replace)
+            students = [(row['id'], float(total_amount if total_amount is not None else row['total_fee'] or 0))
+                        for row in rows if replace or not row['planned']]
+            students = [(student_id, total) for student_id, total in students if total > 0]
+            if not students:
+                return False, "لا يوجد طلاب بحاجة إلى جدول استحقاق في هذا الصف", 0
+            installments = _write_plans(cursor, students, count, first_due, interval_days, notes)
+
+        message = f"تم إنشاء جداول استحقاق لـ {len(students)} طالب ({installments} قسط)"
+        if skipped:
+            message += f"، وتُخطي {skipped} طالب لديهم جداول سابقة"
+        logging.info(f"{message} - الصف {grade} في المدرسة {school_id}")
+        return True, message, len(students)
+
+    except Exception as e:
+        logging.error(f"خطأ في إنشاء جداول الاستحقاق: {e}")
+        return False, f"فشل إنشاء جداول الاستحقاق: {e}", 0
+
+
+def create_student_plan(student_id: int, count: int, first_due, interval_days: int = 30,
+                        total_amount: Optional[float] = None, notes: Optional[str] = None,
+                        db=None) -> Tuple[bool, str]:
+    """
+    إنشاء (أو استبدال) جدول استحقاق طالب واحد
+
+    Returns:
+        tuple: (نجاح العملية، رسالة)
+    """
+    try:
+        with _get_db(db).get_cursor() as cursor:
+            cursor.execute("SELECT total_fee FROM students WHERE id = ?", (student_id,))
+            row = cursor.fetchone()
+            if row is None:
+                return False, "الطالب غير موجود"
+            total = float(total_amount if total_amount is not None else row['total_fee'] or 0)
+            if total <= 0:
+                return False, "يجب أن يكون المبلغ المقسط أكبر من صفر"
+            installments = _write_plans(cursor, [(student_id, total)], count, first_due, interval_days, notes)
+        return True, f"تم إنشاء جدول استحقاق من {installments} قسط"
+    except Exception as e:
+        logging.error(f"خطأ في إنشاء جدول استحقاق الطالب {student_id}: {e}")
+        return False, f"فشل إنشاء جدول الاستحقاق: {e}"
+
+
+def delete_student_plan(student_id: int, db=None) -> Tuple[bool, str]:
+    """حذف جدول استحقاق طالب"""
+    try:
+        with _get_db(db).get_cursor() as cursor:
+            cursor.execute("DELETE FROM installment_plans WHERE student_id = ?", (student_id,))
+            deleted = cursor.rowcount
+        return True, f"تم حذف {deleted} موعد استحقاق"
+    except Exception as e:
+        logging.error(f"خطأ في حذف جدول استحقاق الطالب {student_id}: {e}")
+        return False, f"فشل حذف جدول الاستحقاق: {e}"
+
+
+def student_plan(student_id: int, today: Optional[date] = None, db=None) -> List[Dict]:
+    """
+    جدول استحقاق طالب مع المسدد والمتبقي وحالة كل موعد
+
+    الدفعات تُوزع على المواعيد بترتيبها، فالأقدم يُسدد أولاً
+    """
+    today = (today or date.today()).isoformat()
+    rows = _get_db(db).execute_query("""
+        SELECT p.id, p.sequence, p.due_date, p.amount, p.cumulative_amount, p.notes,
+               COALESCE(t.paid, 0) AS paid_total
+        FROM installment_plans p
+        LEFT JOIN student_payment_totals t ON t.student_id = p.student_id
+        WHERE p.student_id = ?
+        ORDER BY p.sequence
+    """, (student_id,))
+
+    plan = []
+    for row in rows:
+        amount = float(row['amount'])
+        covered = min(max(float(row['paid_total']) - (float(row['cumulative_amount']) - amount), 0.0), amount)
+        remaining = round(amount - covered, 2)
+        if remaining <= 0:
+            status = STATUS_PAID
+        elif covered > 0:
+            status = STATUS_PARTIAL
+        else:
+            status = STATUS_OVERDUE if row['due_date'] < today else STATUS_DUE
+        plan.append({
+            'id': row['id'],
+            'sequence': row['sequence'],
+            'due_date': row['due_date'],
+            'amount': amount,
+            'paid': round(covered, 2),
+            'remaining': remaining,
+            'status': status,
+            'notes': row['notes'],
+        })
+    return plan
+
+
+def outstanding_dues(date_from: Optional[str], date_to: str, school_id: Optional[int] = None,
+                     db=None) -> List[Dict]:
+    """
+    المواعيد غير المسددة التي يقع استحقاقها في المدى [date_from, date_to)
+
+    Returns:
+        list: لكل موعد الطالب ومدرسته وصفه وتاريخ الاستحقاق والمبلغ والمتبقي منه
+    """
+    sql = """
+        SELECT p.id, p.student_id, s.name AS student_name, s.grade, s.section,
+               sc.name_ar AS school_name, p.sequence, p.due_date, p.amount,
+               MIN(p.amount, p.cumulative_amount - COALESCE(t.paid, 0)) AS remaining
+        FROM installment_plans p
+        JOIN students s ON s.id = p.student_id
+        LEFT JOIN schools sc ON sc.id = s.school_id
+        LEFT JOIN student_payment_totals t ON t.student_id = p.student_id
+        WHERE p.due_date >= ? AND p.due_date < ?
+          AND p.cumulative_amount > COALESCE(t.paid, 0)
+    """
+    params = [date_from or _MIN_DATE, date_to]
+    if school_id:
+        sql += " AND s.school_id = ?"
+        params.append(school_id)
+    sql += " ORDER BY p.due_date, s.name"
+    return [dict(row) for row in _get_db(db).execute_query(sql, tuple(params))]
+
+
+def due_this_week(today: Optional[date] = None, school_id: Optional[int] = None, db=None) -> List[Dict]:
+    """المواعيد غير المسددة المستحقة خلال الأيام السبعة القادمة (بما فيها اليوم)"""
+    today = today or date.today()
+    return outstanding_dues(today.isoformat(), (today + timedelta(days=WEEK_DAYS)).isoformat(), school_id, db)
+
+
+def overdue(today: Optional[date] = None, school_id: Optional[int] = None, db=None) -> List[Dict]:
+    """المواعيد غير المسددة التي مضى تاريخ استحقاقها"""
+    return outstanding_dues(None, (today or date.today()).isoformat(), school_id, db)
+
+
+def due_summary(today: Optional[date] = None, school_id: Optional[int] = None, db=None) -> Dict:
+    """
+    عدد ومبالغ المستحق هذا الأسبوع والمتأخر باستعلام تجميعي واحد
+
+    Returns:
+        dict: week_count, week_amount, overdue_count, overdue_amount, overdue_students
+    """
+    today = today or date.today()
+    sql = """
+        SELECT SUM(NOT late) AS week_count,
+               SUM(CASE WHEN NOT late THEN remaining END) AS week_amount,
+               SUM(late) AS overdue_count,
+               SUM(CASE WHEN late THEN remaining END) AS overdue_amount,
+               COUNT(DISTINCT CASE WHEN late THEN student_id END) AS overdue_students
+        FROM (
+            SELECT p.student_id, p.due_date < ? AS late,
+                   MIN(p.amount, p.cumulative_amount - COALESCE(t.paid, 0)) AS remaining
+            FROM installment_plans p
+            JOIN students s ON s.id = p.student_id
+            LEFT JOIN student_payment_totals t ON t.student_id = p.student_id
+            WHERE p.due_date < ? AND p.cumulative_amount > COALESCE(t.paid, 0)
+    """
+    params = [today.isoformat(), (today + timedelta(days=WEEK_DAYS)).isoformat()]
+    if school_id:
+        sql += " AND s.school_id = ?"
+        params.append(school_id)
+    row = _get_db(db).execute_query(sql + ")", tuple(params))[0]
+    return {
+        'week_count': row['week_count'] or 0,
+        'week_amount': float(row['week_amount'] or 0),
+        'overdue_count': row['overdue_count'] or 0,
+        'overdue_amount': float(row['overdue_amount'] or 0),
+        'overdue_students': row['overdue_students'] or 0,
+    }
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مسير الرواتب الشهري
+يجهز رواتب كل معلمي وموظفي مدرسة لشهر محدد من الراتب الشهري المسجل مع
+احتساب نسبي حسب عدد الأيام، ويكشف تداخل الفترات مع رواتب مدفوعة سابقاً عبر
+فهرس فترات، ثم يدرج المسير كاملاً في معاملة واحدة
+"""
+
+import calendar
+import logging
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+STAFF_TYPE_LABELS = {
+    "teacher": "معلم",
+    "employee": "موظف",
+}
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def _as_date(value) -> date:
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def month_period(year: int, month: int) -> Tuple[date, date]:
+    """أول وآخر يوم في الشهر"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+class IntervalIndex:
+    """
+    فهرس فترات مغلقة [from, to] لكل مفتاح
+    الفترات مرتبة حسب البداية مع أكبر نهاية تراكمية، فالبحث عن التداخل
+    يبدأ بـ bisect ويتوقف بمجرد أن تصبح أكبر نهاية سابقة قبل بداية الاستعلام
+    """
+
+    def __init__(self, intervals: Iterable[Tuple[object, date, date, object]] = ()):
+        grouped: Dict[object, List[Tuple[date, date, object]]] = {}
+        for key, start, end, payload in intervals:
+            grouped.setdefault(key, []).append((start, end, payload))
+        self._entries = {}
+        for key, items in grouped.items():
+            items.sort(key=lambda item: item[0])
+            max_ends, running = [], None
+            for _, end, _ in items:
+                running = end if running is None or end > running else running
+                max_ends.append(running)
+            self._entries[key] = ([item[0] for item in items], max_ends, items)
+
+    def overlapping(self, key, start: date, end: date) -> List[object]:
+        """الفترات المسجلة للمفتاح التي تتقاطع مع [start, end]"""
+        if key not in self._entries:
+            return []
+        starts, max_ends, items = self._entries[key]
+        result = []
+        i = bisect_right(starts, end) - 1
+        while i >= 0 and max_ends[i] >= start:
+            if items[i][1] >= start:
+                result.append(items[i][2])
+            i -= 1
+        result.reverse()
+        return result
+
+
+@dataclass
+class PayrollLine:
+    """سطر واحد في مسير الرواتب"""
+    staff_type: str
+    staff_id: int
+    name: str
+    school_id: int
+    school_name: str
+    position: str
+    monthly_salary: float
+    from_date: date
+    to_date: date
+    month_days: int
+    amount: float = 0.0
+    include: bool = True
+    overlaps: List[Dict] = field(default_factory=list)
+
+    @property
+    def days_count(self) -> int:
+        return (self.to_date - self.from_date).days + 1
+
+    def prorate(self):
+        """المبلغ المستحق نسبةً لعدد أيام الفترة من أيام الشهر"""
+        if self.days_count >= self.month_days:
+            self.amount = float(self.monthly_salary)
+        else:
+            self.amount = round(float(self.monthly_salary) * self.days_count / self.month_days, 2)
+        return self.amount
+
+    def set_period(self, from_date, to_date):
+        self.from_date, self.to_date = _as_date(from_date), _as_date(to_date)
+        self.prorate()
+
+    def trim_to_unpaid(self) -> bool:
+        """
+        إذا غطت الرواتب السابقة بداية الفترة فقط، تُقصر الفترة على الأيام غير
+        المدفوعة بعدها ويُحتسب المبلغ نسبياً
+
+        Returns:
+            bool: True إذا بقيت فترة غير متداخلة
+        """
+        paid_from = min(_as_date(o['from_date']) for o in self.overlaps)
+        paid_to = max(_as_date(o['to_date']) for o in self.overlaps)
+        if paid_from > self.from_date or paid_to >= self.to_date:
+            return False
+        self.set_period(paid_to + timedelta(days=1), self.to_date)
+        return True
+
+
+def load_salary_index(start: date, end: date, school_id: Optional[int] = None,
+                      staff: Optional[Tuple[str, int]] = None, db=None, cursor=None) -> IntervalIndex:
+    """فهرس الرواتب المدفوعة التي تتقاطع فترتها مع [start, end]"""
+    sql = """
+        SELECT id, staff_type, staff_id, from_date, to_date, paid_amount, payment_date
+        FROM salaries
+        WHERE from_date <= ? AND to_date >= ?
+    """
+    params = [end.isoformat(), start.isoformat()]
+    if school_id is not None:
+        sql += " AND school_id = ?"
+        params.append(school_id)
+    if staff is not None:
+        sql += " AND staff_type = ? AND staff_id = ?"
+        params.extend(staff)
+    if cursor is not None:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    else:
+        rows = _get_db(db).execute_query(sql, tuple(params))
+
+    intervals = []
+    for row in rows:
+        try:
+            intervals.append(((row['staff_type'], row['staff_id']), _as_date(row['from_date']),
+                              _as_date(row['to_date']), dict(row)))
+        except ValueError:
+            logging.warning(f"فترة راتب بتاريخ غير صالح: {row['id']}")
+    return IntervalIndex(intervals)
+
+
+def find_overlapping_salaries(staff_type: str, staff_id: int, from_date, to_date,
+                              exclude_id: Optional[int] = None, db=None) -> List[Dict]:
+    """الرواتب المدفوعة لنفس الشخص التي تتداخل فترتها مع الفترة المعطاة"""
+    start, end = _as_date(from_date), _as_date(to_date)
+    index = load_salary_index(start, end, staff=(staff_type, staff_id), db=db)
+    return [row for row in index.overlapping((staff_type, staff_id), start, end) if row['id'] != exclude_id]
+
+
+def describe_overlaps(overlaps: Sequence[Dict]) -> str:
+    """نص تحذير يسرد الفترات المتداخلة"""
+    return "\n".join(f"• {o['from_date']} إلى {o['to_date']} ({float(o['paid_amount'] or 0):,.0f} د.ع)"
+                     for o in overlaps)
+
+
+def overlap_warning(staff_type: str, staff_id: int, from_date, to_date,
+                    exclude_id: Optional[int] = None, db=None) -> Optional[str]:
+    """
+    نص تأكيد حفظ راتب تتداخل فترته مع رواتب مدفوعة سابقاً
+
+    Returns:
+        نص السؤال لعرضه على المستخدم، أو None إذا لم يوجد تداخل
+    """
+    overlaps = find_overlapping_salaries(staff_type, staff_id, from_date, to_date,
+                                         exclude_id=exclude_id, db=db)
+    if not overlaps:
+        return None
+    return f"الفترة تتداخل مع رواتب مدفوعة سابقاً:\n{describe_overlaps(overlaps)}\n\nهل تريد المتابعة؟"
+
+
+def prepare_payroll_run(school_id: int, year: int, month: int, db=None) -> List[PayrollLine]:
+    """
+    تجهيز مسير الرواتب لمدرسة وشهر
+
+    الأسطر المتداخلة مع رواتب سابقة تُستبعد افتراضياً (include=False)
+    مع إرفاق الفترات المتداخلة للمراجعة
+    """
+    db = _get_db(db)
+    start, end = month_period(year, month)
+    staff = db.execute_query("""
+        SELECT 'teacher' AS staff_type, t.id, t.name, t.school_id, sc.name_ar AS school_name,
+               'معلم' AS position, t.monthly_salary
+        FROM teachers t JOIN schools sc ON sc.id = t.school_id
+        WHERE t.school_id = ?
+        UNION ALL
+        SELECT 'employee', e.id, e.name, e.school_id, sc.name_ar, e.job_type, e.monthly_salary
+        FROM employees e JOIN schools sc ON sc.id = e.school_id
+        WHERE e.school_id = ?
+        ORDER BY 1 DESC, 3
+    """, (school_id, school_id))
+
+    # الرواتب السابقة تُبحث لكل المدارس لأن الشخص قد يكون نُقل بينها
+    index = load_salary_index(start, end, db=db)
+    lines = []
+    for row in staff:
+        line = PayrollLine(
+            staff_type=row['staff_type'], staff_id=row['id'], name=row['name'],
+            school_id=row['school_id'], school_name=row['school_name'] or "",
+            position=row['position'] or STAFF_TYPE_LABELS[row['staff_type']],
+            monthly_salary=float(row['monthly_salary'] or 0),
+            from_date=start, to_date=end, month_days=(end - start).days + 1,
+        )
+        line.prorate()
+        line.overlaps = index.overlapping((line.staff_type, line.staff_id), start, end)
+        line.include = line.monthly_salary > 0 and (not line.overlaps or line.trim_to_unpaid())
+        lines.append(line)
+    logging.info(f"تجهيز مسير رواتب {year}-{month:02d}: {len(lines)} شخص، "
+                 f"{sum(1 for line in lines if line.overlaps)} متداخل")
+    return lines
+
+
+def commit_payroll_run(lines: Sequence[PayrollLine], payment_date=None, notes: Optional[str] = None,
+                       db=None) -> Tuple[bool, str, List[int]]:
+    """
+    إدراج أسطر المسير المختارة في معاملة واحدة
+
+    يُعاد فحص التداخل داخل المعاملة نفسها، فإن وُجد أي تداخل لا يُدرج شيء
+
+    Returns:
+        tuple: (نجاح العملية، رسالة، معرفات الرواتب المضافة)
+    """
+    selected = [line for line in lines if line.include]
+    if not selected:
+        return False, "لا توجد رواتب محددة في المسير", []
+
+    db = _get_db(db)
+    payment_date = _as_date(payment_date or date.today()).isoformat()
+    payment_time = datetime.now().strftime("%H:%M:%S")
+    start = min(line.from_date for line in selected)
+    end = max(line.to_date for line in selected)
+
+    try:
+        with db.get_cursor() as cursor:
+            index = load_salary_index(start, end, cursor=cursor)
+            conflicts = [line.name for line in selected
+                         if index.overlapping((line.staff_type, line.staff_id), line.from_date, line.to_date)]
+            seen = set()
+            for line in selected:
+                key = (line.staff_type, line.staff_id)
+                if key in seen:
+                    conflicts.append(line.name)
+                seen.add(key)
+            if conflicts:
+                return False, f"توجد فترات متداخلة لـ {len(conflicts)} شخص: {'، '.join(conflicts[:5])}", []
+
+            ids = []
+            for line in selected:
+                cursor.execute("""
+                    INSERT INTO salaries
+                    (staff_type, staff_id, base_salary, paid_amount,
+                     from_date, to_date, days_count, payment_date, payment_time, notes, school_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (line.staff_type, line.staff_id, line.monthly_salary, line.amount,
+                      line.from_date.isoformat(), line.to_date.isoformat(), line.days_count,
+                      payment_date, payment_time, notes, line.school_id))
+                ids.append(cursor.lastrowid)
+
+        total = sum(line.amount for line in selected)
+        logging.info(f"تم إدراج مسير رواتب: {len(ids)} راتب بمجموع {total:,.0f}")
+        return True, f"تم صرف {len(ids)} راتب بمجموع {total:,.0f} د.ع", ids
+
+    except Exception as e:
+        logging.error(f"خطأ في إدراج مسير الرواتب: {e}")
+        return False, f"فشل إدراج مسير الرواتب: {e}", []
+
+
+def salary_slips(salary_ids: Sequence[int], db=None) -> List[Dict]:
+    """بيانات قسائم الرواتب (SALARY_SLIP) لمجموعة رواتب"""
+    if not salary_ids:
+        return []
+    db = _get_db(db)
+    placeholders = ",".join("?" * len(salary_ids))
+    rows = db.execute_query(f"""
+        SELECT s.id, s.staff_type, s.base_salary, s.paid_amount, s.from_date, s.to_date, s.days_count,
+               s.payment_date, COALESCE(t.name, e.name) AS name, e.job_type, sc.name_ar AS school_name
+        FROM salaries s
+        LEFT JOIN teachers t ON s.staff_type = 'teacher' AND t.id = s.staff_id
+        LEFT JOIN employees e ON s.staff_type = 'employee' AND e.id = s.staff_id
+        LEFT JOIN schools sc ON sc.id = s.school_id
+        WHERE s.id IN ({placeholders})
+        ORDER BY s.staff_type DESC, name
+    """, tuple(salary_ids))
+
+    slips = []
+    for row in rows:
+        base, paid = float(row['base_salary'] or 0), float(row['paid_amount'] or 0)
+        slips.append({
+            'id': row['id'],
+            'employee_name': row['name'] or "",
+            'position': row['job_type'] or STAFF_TYPE_LABELS.get(row['staff_type'], ""),
+            'department': row['school_name'] or "",
+            'month_year': str(row['from_date'])[:7],
+            'period': f"{row['from_date']} - {row['to_date']}",
+            'days_count': row['days_count'],
+            'payment_date': row['payment_date'],
+            'basic_salary': base,
+            'allowances': max(paid - base, 0),
+            'deductions': max(base - paid, 0),
+            'net_salary': paid,
+        })
+    return slips
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مجاميع الفترات الزمنية للدفاتر
+تحوّل الشهر أو السنة إلى مدى نصف مفتوح [البداية، النهاية) على عمود التاريخ
+المفهرس بدلاً من strftime على العمود (التي تمنع استخدام الفهرس)، وتحفظ
+النتائج لكل (دفتر، مدرسة، فترة) حتى تتغير أرقام إصدار الجدول
+"""
+
+import logging
+import threading
+from datetime import date
+from typing import Dict, Optional, Tuple, Union
+
+from core.database.table_versions import TableVersionTracker, table_versions
+
+
+# الدفاتر: (الجدول، عمود المبلغ، عمود التاريخ)
+PERIOD_LEDGERS = {
+    "expenses": ("expenses", "amount", "expense_date"),
+    "external_income": ("external_income", "amount", "income_date"),
+    "salaries": ("salaries", "paid_amount", "payment_date"),
+}
+
+# قيمة فلتر المدرسة للحركات العامة غير المرتبطة بمدرسة (school_id IS NULL)
+GENERAL_SCHOOL = "general"
+
+SchoolFilter = Union[None, int, str]
+
+_cache: Dict[Tuple, Tuple[Tuple[int, ...], float]] = {}
+_cache_lock = threading.Lock()
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def period_bounds(year: int, month: Optional[int] = None) -> Tuple[str, str]:
+    """
+    حدود الفترة كمدى نصف مفتوح بصيغة ISO
+
+    Returns:
+        tuple: (أول يوم في الفترة، أول يوم بعدها)
+    """
+    if month is None:
+        return date(year, 1, 1).isoformat(), date(year + 1, 1, 1).isoformat()
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def _school_condition(school_id: SchoolFilter):
+    if school_id is None:
+        return "", ()
+    if school_id == GENERAL_SCHOOL:
+        return " AND school_id IS NULL", ()
+    return " AND school_id = ?", (school_id,)
+
+
+def range_total(ledger: str, start: str, end: str, school_id: SchoolFilter = None, db=None) -> float:
+    """مجموع مبالغ الدفتر في المدى [start, end) مع فلتر المدرسة"""
+    if ledger not in PERIOD_LEDGERS:
+        raise ValueError(f"دفتر غير معروف: {ledger}")
+    table, amount_column, date_column = PERIOD_LEDGERS[ledger]
+
+    tracker = table_versions if db is None else TableVersionTracker(db)
+    versions = tracker.versions((table,))
+    key = (id(tracker.db), ledger, school_id, start, end)
+    if versions is not None:
+        with _cache_lock:
+            cached = _cache.get(key)
+        if cached and cached[0] == versions:
+            return cached[1]
+
+    condition, params = _school_condition(school_id)
+    rows = _get_db(db).execute_query(f"""
+        SELECT COALESCE(SUM({amount_column}), 0) AS total FROM {table}
+        WHERE {date_column} >= ? AND {date_column} < ?{condition}
+    """, (start, end, *params))
+    total = float(rows[0]['total'] or 0)
+
+    if versions is not None:
+        with _cache_lock:
+            _cache[key] = (versions, total)
+    return total
+
+
+def period_total(ledger: str, year: int, month: Optional[int] = None,
+                 school_id: SchoolFilter = None, db=None) -> float:
+    """مجموع الدفتر لشهر (أو لسنة كاملة إذا لم يُحدد الشهر)"""
+    return range_total(ledger, *period_bounds(year, month), school_id=school_id, db=db)
+
+
+def current_period_totals(ledger: str, school_id: SchoolFilter = None,
+                          today: Optional[date] = None, db=None) -> Dict[str, float]:
+    """مجموع الشهر الحالي والسنة الحالية"""
+    today = today or date.today()
+    return {
+        'month': period_total(ledger, today.year, today.month, school_id, db),
+        'year': period_total(ledger, today.year, None, school_id, db),
+    }
+
+
+def clear_period_cache():
+    """مسح الذاكرة المؤقتة للمجاميع"""
+    with _cache_lock:
+        _cache.clear()
+    logging.debug("تم مسح ذاكرة مجاميع الفترات")
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+محرك التجميع المالي الشهري
+جدول financial_rollups يحتفظ بمجموع كل دفتر (الأقساط، الرسوم الإضافية المدفوعة،
+الإيرادات الخارجية، المصروفات، الرواتب) لكل مدرسة ولكل شهر، وتحدّثه محفزات
+(triggers) تلقائياً مع كل إضافة أو تعديل أو حذف. تُبنى عليه تقارير التدفق
+النقدي والأرباح والخسائر ومقارنة الأعوام دون المرور على الجداول الأصلية
+"""
+
+import logging
+from datetime import date
+from typing import Dict, List, Optional
+
+
+# الدفاتر: (الجدول، نوع الحركة، عمود المبلغ، عمود التاريخ، الأعمدة المؤثرة عند التعديل)
+LEDGERS = {
+    "installments": ("installments", "income", "amount", "payment_date",
+                     ("student_id", "amount", "payment_date")),
+    "additional_fees": ("additional_fees", "income", "amount", "COALESCE({row}.payment_date, {row}.created_at)",
+                        ("student_id", "amount", "paid", "payment_date")),
+    "external_income": ("external_income", "income", "amount", "income_date",
+                        ("school_id", "amount", "income_date")),
+    "expenses": ("expenses", "outflow", "amount", "expense_date",
+                 ("school_id", "amount", "expense_date")),
+    "salaries": ("salaries", "outflow", "paid_amount", "payment_date",
+                 ("school_id", "paid_amount", "payment_date")),
+}
+
+LEDGER_LABELS = {
+    "installments": "الأقساط",
+    "additional_fees": "الرسوم الإضافية",
+    "external_income": "الإيرادات الخارجية",
+    "expenses": "المصروفات",
+    "salaries": "الرواتب",
+}
+
+INCOME_LEDGERS = tuple(name for name, spec in LEDGERS.items() if spec[1] == "income")
+OUTFLOW_LEDGERS = tuple(name for name, spec in LEDGERS.items() if spec[1] == "outflow")
+
+# دفاتر مرتبطة بالطالب (المدرسة تؤخذ من جدول الطلاب)
+STUDENT_LEDGERS = ("installments", "additional_fees")
+
+_NOT_PAUSED = "(SELECT value FROM financial_rollup_state WHERE key = 'paused') IS NOT 1"
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def _month_sql(expr: str) -> str:
+    """الشهر بصيغة YYYY-MM من عمود تاريخ (مع تحمل الصيغ غير القياسية)"""
+    return (f"COALESCE(strftime('%Y-%m', {expr}), substr(replace({expr}, '/', '-'), 1, 7), "
+            f"strftime('%Y-%m', 'now'))")
+
+
+def _ledger_parts(ledger: str, row: str):
+    """تعبيرات (المدرسة، الشهر، المبلغ، الشرط) لصف NEW أو OLD داخل المحفز"""
+    _, _, amount_column, date_column, _ = LEDGERS[ledger]
+    date_expr = date_column.format(row=row) if "{row}" in date_column else f"{row}.{date_column}"
+    if ledger in STUDENT_LEDGERS:
+        school = f"(SELECT school_id FROM students WHERE id = {row}.student_id)"
+        # أثناء حذف الطالب تكون المبالغ قد طُرحت مسبقاً في محفز الطلاب
+        condition = f"EXISTS (SELECT 1 FROM students WHERE id = {row}.student_id)"
+        if ledger == "additional_fees":
+            condition += f" AND {row}.paid = 1"
+    else:
+        school = f"COALESCE({row}.school_id, 0)"
+        condition = "1"
+    return school, _month_sql(date_expr), f"COALESCE({row}.{amount_column}, 0)", condition
+
+
+def _apply_sql(ledger: str, row: str, sign: str) -> str:
+    school, month, amount, condition = _ledger_parts(ledger, row)
+    return f"""
+        INSERT INTO financial_rollups (month, school_id, ledger, amount, entries)
+        SELECT {month}, {school}, '{ledger}', {sign}{amount}, {sign}1 WHERE {condition}
+        ON CONFLICT (month, school_id, ledger) DO UPDATE SET
+            amount = amount + excluded.amount, entries = entries + excluded.entries;"""
+
+
+def _student_move_sql(school: str, sign: str, student: str) -> str:
+    """إضافة أو طرح كل أقساط ورسوم طالب (عند حذفه أو نقله لمدرسة أخرى)"""
+    fee_month = _month_sql("COALESCE(payment_date, created_at)")
+    return f"""
+        INSERT INTO financial_rollups (month, school_id, ledger, amount, entries)
+        SELECT {_month_sql('payment_date')} AS m, {school}, 'installments', {sign}SUM(amount), {sign}COUNT(*)
+        FROM installments WHERE student_id = {student} GROUP BY m
+        ON CONFLICT (month, school_id, ledger) DO UPDATE SET
+            amount = amount + excluded.amount, entries = entries + excluded.entries;
+        INSERT INTO financial_rollups (month, school_id, ledger, amount, entries)
+        SELECT {fee_month} AS m, {school}, 'additional_fees', {sign}SUM(amount), {sign}COUNT(*)
+        FROM additional_fees WHERE student_id = {student} AND paid = 1 GROUP BY m
+        ON CONFLICT (month, school_id, ledger) DO UPDATE SET
+            amount = amount + excluded.amount, entries = entries + excluded.entries;"""
+
+
+def _trigger_statements() -> List[str]:
+    statements = []
+    for ledger, (table, _, _, _, columns) in LEDGERS.items():
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_{ledger}_insert AFTER INSERT ON {table}
+            WHEN {_NOT_PAUSED}
+            BEGIN {_apply_sql(ledger, 'NEW', '')}
+            END""")
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_{ledger}_delete AFTER DELETE ON {table}
+            WHEN {_NOT_PAUSED}
+            BEGIN {_apply_sql(ledger, 'OLD', '-')}
+            END""")
+        statements.append(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_rollup_{ledger}_update AFTER UPDATE OF {', '.join(columns)} ON {table}
+            WHEN {_NOT_PAUSED}
+            BEGIN {_apply_sql(ledger, 'OLD', '-')} {_apply_sql(ledger, 'NEW', '')}
+            END""")
+
+    statements.append(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_students_delete BEFORE DELETE ON students
+        WHEN {_NOT_PAUSED}
+        BEGIN {_student_move_sql('OLD.school_id', '-', 'OLD.id')}
+        END""")
+    statements.append(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_rollup_students_school AFTER UPDATE OF school_id ON students
+        WHEN {_NOT_PAUSED} AND OLD.school_id IS NOT NEW.school_id
+        BEGIN {_student_move_sql('OLD.school_id', '-', 'OLD.id')} {_student_move_sql('NEW.school_id', '', 'NEW.id')}
+        END""")
+    return statements
+
+
+def install_rollups(cursor):
+    """
+    إنشاء جداول التجميع ومحفزاتها (يُستدعى من create_tables)
+
+    عند الإنشاء لأول مرة تُملأ الجداول من البيانات الموجودة
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'financial_rollups'")
+    first_install = cursor.fetchone() is None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS financial_rollups (
+            month TEXT NOT NULL,
+            school_id INTEGER NOT NULL,
+            ledger TEXT NOT NULL,
+            amount REAL NOT NULL DEFAULT 0,
+            entries INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, school_id, ledger)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS financial_rollup_state (
+            key TEXT PRIMARY KEY,
+            value INTEGER
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO financial_rollup_state (key, value) VALUES ('paused', 0)")
+    for statement in _trigger_statements():
+        cursor.execute(statement)
+
+    if first_install:
+        _rebuild(cursor, ["main"])
+        logging.info("تم إنشاء جداول التجميع المالي الشهري")
+
+
+def set_rollups_paused(cursor, paused: bool):
+    """
+    إيقاف المحفزات مؤقتاً ضمن المعاملة الحالية
+
+    يُستخدم عند نقل صفوف لا تمثل حركة مالية (مثل أرشفة عام دراسي)، فتبقى
+    مبالغها في التجميع
+    """
+    cursor.execute("UPDATE financial_rollup_state SET value = ? WHERE key = 'paused'", (1 if paused else 0,))
+
+
+def _rebuild(cursor, schemas: List[str]):
+    cursor.execute("DELETE FROM main.financial_rollups")
+    for ledger, (table, _, amount_column, date_column, _) in LEDGERS.items():
+        if ledger in STUDENT_LEDGERS:
+            parts = []
+            for schema in schemas:
+                date_expr = date_column.format(row="t") if "{row}" in date_column else f"t.{date_column}"
+                paid = " AND t.paid = 1" if ledger == "additional_fees" else ""
+                parts.append(f"""
+                    SELECT {_month_sql(date_expr)} AS month, s.school_id AS school_id,
+                           t.{amount_column} AS amount
+                    FROM {schema}.{table} t JOIN {schema}.students s ON s.id = t.student_id
+                    WHERE 1{paid}""")
+            source = " UNION ALL ".join(parts)
+        else:
+            source = f"""
+                SELECT {_month_sql(date_column)} AS month, COALESCE(school_id, 0) AS school_id,
+                       {amount_column} AS amount
+                FROM main.{table}"""
+        cursor.execute(f"""
+            INSERT INTO main.financial_rollups (month, school_id, ledger, amount, entries)
+            SELECT month, school_id, '{ledger}', COALESCE(SUM(amount), 0), COUNT(*)
+            FROM ({source}) GROUP BY month, school_id
+        """)
+
+
+def rebuild_rollups(db=None, include_archives: bool = True, root=None):
+    """
+    إعادة حساب التجميع بالكامل من الجداول الأصلية (وأرشيف الأعوام السابقة)
+
+    Returns:
+        tuple: (نجح العملية, رسالة النتيجة)
+    """
+    db = _get_db(db)
+    try:
+        schemas = ["main"]
+        if include_archives:
+            from core.database.archive import attached_schemas
+            schemas = attached_schemas(db, root)
+        with db.get_cursor() as cursor:
+            _rebuild(cursor, schemas)
+        return True, "تمت إعادة حساب التجميع المالي"
+    except Exception as e:
+        error_msg = f"خطأ في إعادة حساب التجميع المالي: {e}"
+        logging.error(error_msg)
+        return False, error_msg
+
+
+# ----------------------------------------------------------------------
+# واجهة الاستعلام
+# ----------------------------------------------------------------------
+
+def _query_rollups(db, start_month: str, end_month: str, school_id: Optional[int], by_month: bool):
+    group_by = "month, ledger" if by_month else "ledger"
+    sql = f"""
+        SELECT {group_by}, SUM(amount) AS amount, SUM(entries) AS entries
+        FROM financial_rollups
+        WHERE month BETWEEN ? AND ?
+    """
+    params = [start_month, end_month]
+    if school_id is not None:
+        sql += " AND school_id = ?"
+        params.append(school_id)
+    # صفوف أُفرغت بالحذف تبقى بمبلغ صفر حتى إعادة الحساب
+    sql += f" GROUP BY {group_by} HAVING SUM(entries) != 0"
+    return db.execute_query(sql, tuple(params))
+
+
+def _totals(ledgers: Dict[str, float]) -> Dict[str, float]:
+    income = sum(ledgers.get(name, 0) for name in INCOME_LEDGERS)
+    outflow = sum(ledgers.get(name, 0) for name in OUTFLOW_LEDGERS)
+    return {'income': income, 'outflow': outflow, 'net': income - outflow}
+
+
+def cash_flow(start_month: str, end_month: str, school_id: Optional[int] = None, db=None) -> List[Dict]:
+    """
+    التدفق النقدي الشهري بين شهرين (YYYY-MM، شاملين)
+
+    Returns:
+        list: لكل شهر: المبالغ حسب الدفتر، الوارد، الصادر، الصافي، والرصيد التراكمي
+    """
+    db = _get_db(db)
+    months: Dict[str, Dict[str, float]] = {}
+    for row in _query_rollups(db, start_month, end_month, school_id, by_month=True):
+        months.setdefault(row['month'], {})[row['ledger']] = row['amount'] or 0
+
+    result, balance = [], 0.0
+    for month in sorted(months):
+        totals = _totals(months[month])
+        balance += totals['net']
+        result.append({'month': month, 'ledgers': months[month], **totals, 'balance': balance})
+    return result
+
+
+def profit_and_loss(start_month: str, end_month: str, school_id: Optional[int] = None, db=None) -> Dict:
+    """قائمة الأرباح والخسائر للفترة: بنود الإيرادات والمصروفات والصافي"""
+    db = _get_db(db)
+    ledgers = {name: 0.0 for name in LEDGERS}
+    entries = {name: 0 for name in LEDGERS}
+    for row in _query_rollups(db, start_month, end_month, school_id, by_month=False):
+        ledgers[row['ledger']] = row['amount'] or 0
+        entries[row['ledger']] = row['entries'] or 0
+
+    def lines(names):
+        return [{'ledger': name, 'label': LEDGER_LABELS[name], 'amount': ledgers[name], 'entries': entries[name]}
+                for name in names]
+
+    totals = _totals(ledgers)
+    return {
+        'start_month': start_month,
+        'end_month': end_month,
+        'income_lines': lines(INCOME_LEDGERS),
+        'expense_lines': lines(OUTFLOW_LEDGERS),
+        'total_income': totals['income'],
+        'total_expenses': totals['outflow'],
+        'net_profit': totals['net'],
+    }
+
+
+def year_over_year(years: Optional[List[int]] = None, metric: str = "net",
+                   school_id: Optional[int] = None, db=None) -> Dict:
+    """
+    مقارنة الأعوام شهراً بشهر
+
+    Args:
+        years: الأعوام الميلادية المطلوبة (الافتراضي: العام الحالي والسابق)
+        metric: income | outflow | net أو اسم دفتر محدد
+    """
+    db = _get_db(db)
+    if not years:
+        current = date.today().year
+        years = [current - 1, current]
+    years = sorted(years)
+
+    values = {year: {} for year in years}
+    for flow in cash_flow(f"{years[0]}-01", f"{years[-1]}-12", school_id, db):
+        year, month = int(flow['month'][:4]), int(flow['month'][5:7])
+        if year in values:
+            values[year][month] = flow[metric] if metric in ('income', 'outflow', 'net') \
+                else flow['ledgers'].get(metric, 0)
+
+    rows = []
+    for month in range(1, 13):
+        row = {'month': month, 'values': {year: values[year].get(month, 0.0) for year in years}}
+        previous, latest = row['values'][years[0]], row['values'][years[-1]]
+        row['change'] = ((latest - previous) / abs(previous) * 100) if len(years) > 1 and previous else None
+        rows.append(row)
+    return {
+        'years': years,
+        'metric': metric,
+        'rows': rows,
+        'totals': {year: sum(values[year].values()) for year in years},
+    }
+
+
+def financial_report_data(start_month: str, end_month: str, school_id: Optional[int] = None, db=None) -> Dict:
+    """بيانات قالب التقرير المالي (FINANCIAL_REPORT) مباشرة من التجميع"""
+    pnl = profit_and_loss(start_month, end_month, school_id, db)
+    return {
+        'financial_data': {
+            **pnl,
+            'monthly': cash_flow(start_month, end_month, school_id, db),
+        },
+        'date_range': f"{start_month} - {end_month}",
+    }
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+إحصائيات الرواتب
+جدول salary_staff_stats يحتفظ لكل معلم أو موظف بعدد الرواتب ومجموعها وأعلاها
+وتاريخ آخرها، وجدول salary_monthly_stats بالعدد والمجموع لكل شهر. تحدّثهما
+محفزات مع كل إضافة أو تعديل أو حذف، فتُقرأ إحصائيات الشخص باستعلام واحد على
+المفتاح الأساسي مهما طال سجل رواتبه
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Optional
+
+
+_KEY = "staff_type = {row}.staff_type AND staff_id = {row}.staff_id"
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def _month(row: str) -> str:
+    return f"substr(replace({row}.payment_date, '/', '-'), 1, 7)"
+
+
+def _add_sql(row: str) -> str:
+    amount = f"COALESCE({row}.paid_amount, 0)"
+    return f"""
+        INSERT INTO salary_staff_stats (staff_type, staff_id, payments, total, max_amount, last_payment_date)
+        VALUES ({row}.staff_type, {row}.staff_id, 1, {amount}, {amount}, {row}.payment_date)
+        ON CONFLICT (staff_type, staff_id) DO UPDATE SET
+            payments = payments + 1,
+            total = total + excluded.total,
+            max_amount = MAX(COALESCE(max_amount, excluded.max_amount), excluded.max_amount),
+            last_payment_date = MAX(COALESCE(last_payment_date, excluded.last_payment_date),
+                                    COALESCE(excluded.last_payment_date, last_payment_date));
+        INSERT INTO salary_monthly_stats (staff_type, staff_id, month, payments, total)
+        VALUES ({row}.staff_type, {row}.staff_id, {_month(row)}, 1, {amount})
+        ON CONFLICT (staff_type, staff_id, month) DO UPDATE SET
+            payments = payments + 1, total = total + excluded.total;"""
+
+
+def _remove_sql(row: str) -> str:
+    key = _KEY.format(row=row)
+    person = f"FROM salaries WHERE {key}"
+    return f"""
+        UPDATE salary_staff_stats SET
+            payments = payments - 1,
+            total = total - COALESCE({row}.paid_amount, 0),
+            max_amount = CASE WHEN COALESCE({row}.paid_amount, 0) >= max_amount
+                              THEN (SELECT MAX(paid_amount) {person}) ELSE max_amount END,
+            last_payment_date = CASE WHEN {row}.payment_date >= last_payment_date
+                                     THEN (SELECT MAX(payment_date) {person}) ELSE last_payment_date END
+        WHERE {key};
+        DELETE FROM salary_staff_stats WHERE {key} AND payments <= 0;
+        UPDATE salary_monthly_stats SET
+            payments = payments - 1, total = total - COALESCE({row}.paid_amount, 0)
+        WHERE {key} AND month = {_month(row)};
+        DELETE FROM salary_monthly_stats WHERE {key} AND month = {_month(row)} AND payments <= 0;"""
+
+
+def _trigger_statements():
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_salary_stats_insert AFTER INSERT ON salaries
+            BEGIN {_add_sql('NEW')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_salary_stats_delete AFTER DELETE ON salaries
+            BEGIN {_remove_sql('OLD')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_salary_stats_update
+            AFTER UPDATE OF staff_type, staff_id, paid_amount, payment_date ON salaries
+            BEGIN {_remove_sql('OLD')} {_add_sql('NEW')}
+            END""",
+    ]
+
+
+def _rebuild(cursor):
+    cursor.execute("DELETE FROM salary_staff_stats")
+    cursor.execute("DELETE FROM salary_monthly_stats")
+    cursor.execute("""
+        INSERT INTO salary_staff_stats (staff_type, staff_id, payments, total, max_amount, last_payment_date)
+        SELECT staff_type, staff_id, COUNT(*), COALESCE(SUM(paid_amount), 0), MAX(paid_amount), MAX(payment_date)
+        FROM salaries GROUP BY staff_type, staff_id
+    """)
+    cursor.execute("""
+        INSERT INTO salary_monthly_stats (staff_type, staff_id, month, payments, total)
+        SELECT staff_type, staff_id, substr(replace(payment_date, '/', '-'), 1, 7) AS m,
+               COUNT(*), COALESCE(SUM(paid_amount), 0)
+        FROM salaries GROUP BY staff_type, staff_id, m
+    """)
+
+
+def install_salary_stats(cursor):
+    """
+    إنشاء جداول إحصائيات الرواتب ومحفزاتها (يُستدعى من create_tables)
+
+    عند الإنشاء لأول مرة تُملأ الجداول من الرواتب الموجودة
+    """
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'salary_staff_stats'")
+    first_install = cursor.fetchone() is None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS salary_staff_stats (
+            staff_type TEXT NOT NULL,
+            staff_id INTEGER NOT NULL,
+            payments INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            max_amount REAL,
+            last_payment_date TEXT,
+            PRIMARY KEY (staff_type, staff_id)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS salary_monthly_stats (
+            staff_type TEXT NOT NULL,
+            staff_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            payments INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (staff_type, staff_id, month)
+        ) WITHOUT ROWID
+    """)
+    for statement in _trigger_statements():
+        cursor.execute(statement)
+
+    if first_install:
+        _rebuild(cursor)
+        logging.info("تم إنشاء جداول إحصائيات الرواتب")
+
+
+def rebuild_salary_stats(db=None):
+    """
+    إعادة حساب إحصائيات الرواتب بالكامل من جدول الرواتب
+
+    Returns:
+        tuple: (نجح العملية, رسالة النتيجة)
+    """
+    try:
+        with _get_db(db).get_cursor() as cursor:
+            _rebuild(cursor)
+        return True, "تمت إعادة حساب إحصائيات الرواتب"
+    except Exception as e:
+        error_msg = f"خطأ في إعادة حساب إحصائيات الرواتب: {e}"
+        logging.error(error_msg)
+        return False, error_msg
+
+
+def staff_salary_stats(staff_type: str, staff_id: int, today: Optional[date] = None, db=None) -> Dict:
+    """
+    إحصائيات رواتب شخص واحد باستعلام واحد على جداول الملخص
+
+    Returns:
+        dict: العدد والمجموع والمتوسط والأعلى وآخر تاريخ، ونفس العدد والمجموع
+              للعام والشهر الحاليين
+    """
+    today = today or date.today()
+    year, month = f"{today.year:04d}", f"{today.year:04d}-{today.month:02d}"
+    rows = _get_db(db).execute_query("""
+        SELECT s.payments, s.total, s.max_amount, s.last_payment_date,
+               y.payments AS year_count, y.total AS year_amount,
+               m.payments AS month_count, m.total AS month_amount
+        FROM (SELECT ? AS staff_type, ? AS staff_id) k
+        LEFT JOIN salary_staff_stats s ON s.staff_type = k.staff_type AND s.staff_id = k.staff_id
+        LEFT JOIN (SELECT SUM(payments) AS payments, SUM(total) AS total FROM salary_monthly_stats
+                   WHERE staff_type = ? AND staff_id = ? AND month BETWEEN ? AND ?) y
+        LEFT JOIN salary_monthly_stats m
+               ON m.staff_type = k.staff_type AND m.staff_id = k.staff_id AND m.month = ?
+    """, (staff_type, staff_id, staff_type, staff_id, f"{year}-01", f"{year}-12", month))
+    row = rows[0]
+    count = row['payments'] or 0
+    total = row['total'] or 0.0
+    return {
+        'count': count,
+        'total': total,
+        'average': total / count if count else 0.0,
+        'max': row['max_amount'] or 0.0,
+        'last_date': row['last_payment_date'],
+        'year_count': row['year_count'] or 0,
+        'year_amount': row['year_amount'] or 0.0,
+        'month_count': row['month_count'] or 0,
+        'month_amount': row['month_amount'] or 0.0,
+    }
+
+
+def salary_totals(school_id: Optional[int] = None, staff_type: Optional[str] = None,
+                  staff_id: Optional[int] = None, date_from: Optional[str] = None,
+                  date_to: Optional[str] = None, search: Optional[str] = None, db=None) -> Dict:
+    """
+    مجاميع الرواتب لنفس فلاتر صفحة الرواتب باستعلام تجميعي واحد
+
+    Returns:
+        dict: العدد والمجموع والمتوسط ومجموع المعلمين ومجموع الموظفين
+    """
+    sql = "SELECT s.staff_type, COUNT(*) AS payments, COALESCE(SUM(s.paid_amount), 0) AS total FROM salaries s"
+    conditions, params = [], []
+    if search:
+        sql += """
+            LEFT JOIN teachers t ON s.staff_id = t.id AND s.staff_type = 'teacher'
+            LEFT JOIN employees e ON s.staff_id = e.id AND s.staff_type = 'employee'"""
+        conditions.append("(t.name LIKE ? OR e.name LIKE ?)")
+        params.extend([f"%{search}%", f"%{search}%"])
+    if school_id:
+        conditions.append("s.school_id = ?")
+        params.append(school_id)
+    if staff_type:
+        conditions.append("s.staff_type = ?")
+        params.append(staff_type)
+    if staff_id is not None:
+        conditions.append("s.staff_id = ?")
+        params.append(staff_id)
+    if date_from:
+        conditions.append("s.payment_date >= ?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("s.payment_date <= ?")
+        params.append(date_to)
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " GROUP BY s.staff_type"
+
+    by_type = {row['staff_type']: row for row in _get_db(db).execute_query(sql, tuple(params))}
+    count = sum(row['payments'] for row in by_type.values())
+    total = sum(row['total'] for row in by_type.values())
+    return {
+        'count': count,
+        'total': total,
+        'average': total / count if count else 0.0,
+        'teachers_total': by_type['teacher']['total'] if 'teacher' in by_type else 0.0,
+        'employees_total': by_type['employee']['total'] if 'employee' in by_type else 0.0,
+    }
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+معاينة نقطية سريعة لهوية طالب واحدة
+ترسم البطاقة مباشرة في الذاكرة (QImage) انطلاقاً من لقطة ثابتة للقالب
+وتعيد رسم العناصر التي تغيرت فقط، لتحديث المعاينة أثناء السحب
+"""
+
+import logging
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+
+from PyQt5.QtCore import Qt, QRectF, QPointF
+from PyQt5.QtGui import QImage, QPainter, QColor, QFont, QFontDatabase, QFontMetricsF, QPen
+
+import config
+from templates.id_template import ID_WIDTH, ID_HEIGHT
+from core.pdf.id_template_snapshot import (  # noqa: F401 - واجهة الوحدة
+    LEGACY_PREVIEW_DIR, snapshot_template, cleanup_legacy_previews
+)
+
+
+# عائلات الخطوط المحملة في Qt (تُحمّل مرة واحدة لكل عملية)
+_FONT_FAMILIES: Optional[Dict[str, str]] = None
+
+
+def _load_font_families() -> Dict[str, str]:
+    """تحميل الخطوط العربية في Qt مرة واحدة فقط"""
+    global _FONT_FAMILIES
+    if _FONT_FAMILIES is not None:
+        return _FONT_FAMILIES
+
+    families = {'regular': 'Arial', 'bold': 'Arial'}
+    try:
+        font_dir = Path(config.RESOURCES_DIR) / "fonts"
+        for key, candidates in (('regular', ("Amiri.ttf", "Cairo-Medium.ttf")),
+                                ('bold', ("Amiri-Bold.ttf", "Cairo-Bold.ttf"))):
+            for font_file in candidates:
+                font_path = font_dir / font_file
+                if not font_path.exists():
+                    continue
+                font_id = QFontDatabase.addApplicationFont(str(font_path))
+                loaded = QFontDatabase.applicationFontFamilies(font_id) if font_id != -1 else []
+                if loaded:
+                    families[key] = loaded[0]
+                    break
+    except Exception as e:
+        logging.warning(f"فشل في تحميل الخطوط العربية للمعاينة: {e}")
+
+    _FONT_FAMILIES = families
+    return families
+
+
+def _to_qcolor(value, default=(0, 0, 0)) -> QColor:
+    """تحويل لون القالب (قائمة 0-1 أو 0-255) إلى QColor"""
+    if not isinstance(value, (list, tuple)) or len(value) < 3:
+        value = default
+    r, g, b = [int(c * 255) if c <= 1 else int(c) for c in value[:3]]
+    return QColor(r, g, b)
+
+
+class IDCardPreviewRenderer:
+    """راسم نقطي لهوية واحدة مع ذاكرة طبقات لكل عنصر"""
+
+    def __init__(self, scale: float = 3.0):
+        """
+        Args:
+            scale: عدد البكسلات لكل نقطة PDF
+        """
+        self.scale = scale
+        self.width_px = int(round(ID_WIDTH * scale))
+        self.height_px = int(round(ID_HEIGHT * scale))
+        # اسم العنصر -> (مفتاح الإعدادات والبيانات, الطبقة المرسومة)
+        self._layers: Dict[str, Tuple[tuple, QImage]] = {}
+        self._order: Tuple[str, ...] = ()
+        self._base: Optional[QImage] = None
+        self.last_rendered_count = 0
+
+    def clear(self):
+        """مسح ذاكرة الطبقات"""
+        self._layers.clear()
+        self._order = ()
+        self._base = None
+
+    def render(self, snapshot: MappingProxyType, student_data: Dict,
+               school_name: str = "") -> QImage:
+        """
+        رسم البطاقة كاملة مع إعادة رسم العناصر المتغيرة فقط
+
+        Args:
+            snapshot: لقطة القالب من snapshot_template
+            student_data: بيانات الطالب النموذجية
+            school_name: اسم المدرسة الافتراضي
+
+        Returns:
+            صورة البطاقة
+        """
+        families = _load_font_families()
+        if self._base is None:
+            self._base = self._render_base()
+
+        order = tuple(snapshot.keys())
+        # حذف طبقات العناصر التي لم تعد موجودة
+        for stale in set(self._layers) - set(order):
+            del self._layers[stale]
+
+        rendered = 0
+        for element_name in order:
+            element_config = snapshot[element_name]
+            text = self._element_text(element_name, element_config, student_data, school_name)
+            key = (tuple(element_config.items()), text)
+            cached = self._layers.get(element_name)
+            if cached is not None and cached[0] == key:
+                continue
+            layer = self._new_layer()
+            painter = QPainter(layer)
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setRenderHint(QPainter.TextAntialiasing)
+            try:
+                self._draw_element(painter, element_name, element_config, text, families)
+            except Exception as e:
+                logging.error(f"خطأ في رسم عنصر المعاينة {element_name}: {e}")
+            finally:
+                painter.end()
+            self._layers[element_name] = (key, layer)
+            rendered += 1
+
+        self._order = order
+        self.last_rendered_count = rendered
+
+        # تركيب الطبقات بالترتيب
+        card = QImage(self._base)
+        painter = QPainter(card)
+        for element_name in order:
+            painter.drawImage(0, 0, self._layers[element_name][1])
+        painter.end()
+        return card
+
+    # ------------------------------------------------------------------
+    # الرسم
+    # ------------------------------------------------------------------
+
+    def _new_layer(self) -> QImage:
+        layer = QImage(self.width_px, self.height_px, QImage.Format_ARGB32_Premultiplied)
+        layer.fill(Qt.transparent)
+        return layer
+
+    def _render_base(self) -> QImage:
+        """خلفية البطاقة وحدودها المرجعية"""
+        base = QImage(self.width_px, self.height_px, QImage.Format_ARGB32_Premultiplied)
+        base.fill(Qt.white)
+        painter = QPainter(base)
+        painter.setPen(QPen(QColor(204, 204, 204), 0.5 * self.scale))
+        painter.drawRect(QRectF(0, 0, self.width_px - 1, self.height_px - 1))
+        painter.end()
+        return base
+
+    def _to_px(self, rel_x: float, rel_y: float) -> QPointF:
+        """تحويل الإحداثيات النسبية (أصلها أسفل اليسار) إلى بكسلات Qt"""
+        return QPointF(rel_x * self.width_px, (1.0 - rel_y) * self.height_px)
+
+    def _box_rect(self, element_config) -> QRectF:
+        top_left = self._to_px(element_config.get('x', 0), element_config.get('y', 0) + element_config.get('height', 0))
+        return QRectF(top_left.x(), top_left.y(),
+                      element_config.get('width', 0) * self.width_px,
+                      element_config.get('height', 0) * self.height_px)
+
+    def _element_text(self, element_name: str, element_config, student_data: Dict,
+                      school_name: str) -> str:
+        """تحديد النص المعروض للعنصر بنفس منطق StudentIDGenerator.draw_student_card"""
+        if element_name == "school_name":
+            return student_data.get('school_name', school_name) or ''
+        if element_name == "id_title":
+            return element_config.get('text', 'هوية طالب')
+        if element_name == "student_name":
+            return student_data.get('name', 'اسم الطالب')
+        if element_name == "student_grade":
+            return f"{element_config.get('label', '')}{student_data.get('grade', '')}"
+        if element_name == "academic_year":
+            return element_config.get('text', 'العام الدراسي: 2025 - 2026')
+        if element_name == "birth_date_box":
+            birthdate = student_data.get('birthdate', '')
+            if birthdate:
+                return f"تاريخ الميلاد: {birthdate}"
+            return element_config.get('label', 'تاريخ الميلاد: _______________')
+        if element_name in ("photo_box", "qr_box"):
+            return element_config.get('label', '')
+        if element_name == "id_number":
+            return f"رقم الطالب: {student_data.get('id', 'AUTO')}"
+        if element_name.endswith('_label'):
+            return element_config.get('text', '')
+        return ''
+
+    def _font(self, families: Dict[str, str], font_name: str, font_size: float) -> QFont:
+        bold = 'bold' in (font_name or '').lower()
+        font = QFont(families['bold'] if bold else families['regular'])
+        font.setPixelSize(max(1, int(round(font_size * self.scale))))
+        return font
+
+    def _draw_element(self, painter: QPainter, element_name: str, element_config,
+                      text: str, families: Dict[str, str]):
+        if element_name in ("photo_box", "qr_box", "birth_date_box"):
+            self._draw_box(painter, element_name, element_config, text, families)
+        elif element_name.endswith('_line') or element_config.get('type') == 'line':
+            painter.fillRect(self._box_rect(element_config), _to_qcolor(element_config.get('color')))
+        elif text:
+            self._draw_text(painter, element_config, text, families)
+
+    def _draw_text(self, painter: QPainter, element_config, text: str, families: Dict[str, str]):
+        font = self._font(families, element_config.get('font_name', 'Helvetica'),
+                          element_config.get('font_size', 8))
+        metrics = QFontMetricsF(font)
+        max_width = element_config.get('max_width', 1.0) * self.width_px
+        text = metrics.elidedText(text, Qt.ElideRight, max_width)
+        text_width = metrics.horizontalAdvance(text)
+
+        anchor = self._to_px(element_config.get('x', 0), element_config.get('y', 0))
+        alignment = element_config.get('alignment', 'right')
+        if alignment == 'center':
+            x = anchor.x() - text_width / 2
+        elif alignment == 'left':
+            x = anchor.x()
+        else:
+            x = anchor.x() - text_width
+
+        painter.setFont(font)
+        painter.setPen(_to_qcolor(element_config.get('color')))
+        painter.drawText(QPointF(x, anchor.y()), text)
+
+    def _draw_box(self, painter: QPainter, element_name: str, element_config,
+                  text: str, families: Dict[str, str]):
+        rect = self._box_rect(element_config)
+        painter.setPen(QPen(_to_qcolor(element_config.get('border_color')),
+                            element_config.get('border_width', 1) * self.scale))
+        painter.setBrush(_to_qcolor(element_config.get('fill_color'), (1, 1, 1)))
+        painter.drawRect(rect)
+
+        if not text:
+            return
+        font = self._font(families, 'Helvetica', element_config.get('label_font_size', 6))
+        painter.setFont(font)
+        painter.setPen(_to_qcolor(element_config.get('label_color'), (0.6, 0.6, 0.6)))
+        if element_name == "birth_date_box":
+            anchor = self._to_px(element_config.get('label_x', 0.1), element_config.get('label_y', 0.18))
+            painter.drawText(anchor, text)
+        else:
+            painter.drawText(rect, Qt.AlignCenter, text)
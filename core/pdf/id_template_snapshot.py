@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+لقطات قالب الهوية الثابتة وتنظيف ملفات المعاينة القديمة
+لا تعتمد على Qt، وتستخدمها معاينة الهوية النقطية في id_card_preview
+"""
+
+import logging
+import tempfile
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict
+
+
+# مجلد المعاينات القديمة التي كان يولدها LivePDFGenerator
+LEGACY_PREVIEW_DIR = Path(tempfile.gettempdir()) / "id_preview"
+
+
+def _freeze_value(value):
+    """تحويل قيمة إعداد إلى شكل ثابت قابل للمقارنة والتجزئة"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze_value(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze_value(v) for v in value)
+    if hasattr(value, 'rgb') and hasattr(value, 'red'):
+        # لون ReportLab
+        return (float(value.red), float(value.green), float(value.blue))
+    return value
+
+
+def snapshot_template(elements: Dict[str, Dict]) -> MappingProxyType:
+    """
+    إنشاء لقطة ثابتة (للقراءة فقط) من عناصر القالب
+
+    Args:
+        elements: عناصر القالب كما يعيدها المحرر أو TEMPLATE_ELEMENTS
+
+    Returns:
+        خريطة للقراءة فقط: اسم العنصر -> إعدادات مجمدة
+    """
+    frozen = {}
+    for element_name, element_config in elements.items():
+        frozen[element_name] = MappingProxyType(
+            {key: _freeze_value(value) for key, value in element_config.items()}
+        )
+    return MappingProxyType(frozen)
+
+
+def cleanup_legacy_previews() -> int:
+    """حذف ملفات live_preview_*.pdf المتبقية من المعاينة القديمة"""
+    removed = 0
+    try:
+        if LEGACY_PREVIEW_DIR.exists():
+            for pdf_file in LEGACY_PREVIEW_DIR.glob("live_preview_*.pdf"):
+                try:
+                    pdf_file.unlink()
+                    removed += 1
+                except OSError:
+                    pass
+    except Exception as e:
+        logging.warning(f"تعذر تنظيف ملفات المعاينة المؤقتة: {e}")
+    return removed
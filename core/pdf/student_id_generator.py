@@ -28,6 +28,7 @@ except ImportError:
     logging.warning("مكتبات دعم العربية غير متوفرة. سيتم استخدام النص العادي.")
 
 import config
+from core.utils.telemetry import timed
 from templates.id_template import (
     TEMPLATE_ELEMENTS, ID_WIDTH, ID_HEIGHT, A4_WIDTH, A4_HEIGHT,
     GRID_COLS, GRID_ROWS, PAGE_MARGIN_X, PAGE_MARGIN_Y,
@@ -36,6 +37,9 @@ from templates.id_template import (
     verify_layout_fits, get_optimized_layout
 )
 
+# الخطوط المسجلة مسبقاً (arabic_font, arabic_bold_font) لتجنب إعادة تسجيلها مع كل مولد
+_REGISTERED_FONTS = None
+
 
 class StudentIDGenerator:
     """مولد هويات الطلاب"""
@@ -60,7 +64,12 @@ class StudentIDGenerator:
             return text
     
     def setup_fonts(self):
-        """إعداد الخطوط العربية"""
+        """إعداد الخطوط العربية (تُسجل مرة واحدة لكل عملية)"""
+        global _REGISTERED_FONTS
+        if _REGISTERED_FONTS is not None:
+            self.arabic_font, self.arabic_bold_font = _REGISTERED_FONTS
+            return
+        
         try:
             # محاولة تحميل خط Cairo العربي
             font_dir = Path(config.BASE_DIR) / "app" / "resources" / "fonts"
@@ -123,12 +132,15 @@ class StudentIDGenerator:
             
             if not fonts_loaded:
                 logging.warning("لم يتم العثور على خطوط عربية - سيتم استخدام الخط الافتراضي")
+            
+            _REGISTERED_FONTS = (self.arabic_font, self.arabic_bold_font)
                 
         except Exception as e:
             logging.warning(f"فشل في تحميل الخطوط العربية: {e}")
             self.arabic_font = 'Helvetica'
             self.arabic_bold_font = 'Helvetica-Bold'
     
+    @timed()
     def generate_student_ids(self, students_data: List[Dict], 
                            output_path: str,
                            school_name: str = "",
@@ -17,70 +17,72 @@ from .print_config import (
     PrintMethod,
     TEMPLATE_PRINT_METHODS
 )
-from .template_manager import TemplateManager
-from .print_manager import (
-    PrintManager,
-    print_student_report,
-    print_students_list,
-    print_payment_receipt,
-    print_installment_receipt,
-    print_financial_report
-)
-from .print_utils import (
-    apply_print_styles,
-    PrintHelper,
-    QuickPrintMixin
-)
-from .simple_print_preview import SimplePrintPreviewDialog
+import importlib
+import importlib.util
+
+# الأسماء المصدرة من الوحدات الثقيلة (Jinja2 و QtWebEngine و ReportLab)،
+# تُستورد عند أول وصول إليها وليس عند استيراد الحزمة أثناء بدء التشغيل
+_LAZY_EXPORTS = {
+    'TemplateManager': '.template_manager',
+    'PrintManager': '.print_manager',
+    'print_student_report': '.print_manager',
+    'print_students_list': '.print_manager',
+    'print_payment_receipt': '.print_manager',
+    'print_installment_receipt': '.print_manager',
+    'print_financial_report': '.print_manager',
+    'print_arrears_report': '.print_manager',
+    'print_consolidated_report': '.print_manager',
+    'print_salary_slips': '.print_manager',
+    'apply_print_styles': '.print_utils',
+    'PrintHelper': '.print_utils',
+    'QuickPrintMixin': '.print_utils',
+    'SimplePrintPreviewDialog': '.simple_print_preview',
+    'WebPrintManager': '.web_print_manager',
+    'web_print_payment_receipt': '.web_print_manager',
+    'web_print_students_list': '.web_print_manager',
+    'web_print_student_report': '.web_print_manager',
+    'web_print_financial_report': '.web_print_manager',
+    'ReportLabPrintManager': '.reportlab_print_manager',
+    'QuickPrintInterface': '.quick_print',
+    'quick_print_installment': '.quick_print',
+    'quick_print_student_report': '.quick_print',
+    'load_installment_receipts': '.batch_receipts',
+    'print_installment_receipts_batch': '.batch_receipts',
+}
+
+# توفر المحركات يُحدد بالبحث عن الحزمة دون تحميلها
+_AVAILABILITY_FLAGS = {
+    'WEB_ENGINE_AVAILABLE': 'PyQt5.QtWebEngineWidgets',
+    'REPORTLAB_AVAILABLE': 'reportlab',
+}
+
+
+def _module_available(name: str) -> bool:
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
 
-# محاولة استيراد محرك الويب الحديث
-try:
-    from .web_print_manager import (
-        WebPrintManager,
-        web_print_payment_receipt,
-        web_print_students_list,
-        web_print_student_report,
-        web_print_financial_report
-    )
-    WEB_ENGINE_AVAILABLE = True
-except ImportError:
-    WEB_ENGINE_AVAILABLE = False
 
-# محاولة استيراد محرك ReportLab
-try:
-    from .reportlab_print_manager import ReportLabPrintManager
-    from .quick_print import (
-        QuickPrintInterface,
-        quick_print_installment,
-        quick_print_student_report
-    )
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
+def __getattr__(name):
+    if name in _AVAILABILITY_FLAGS:
+        value = _module_available(_AVAILABILITY_FLAGS[name])
+    elif name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_EXPORTS) | set(_AVAILABILITY_FLAGS))
+
 
 __all__ = [
     'PaperSize', 'PrintOrientation', 'PrintQuality', 'TemplateType',
     'PrintSettings', 'PrintConfig', 'PrintMethod', 'TEMPLATE_PRINT_METHODS',
-    'TemplateManager', 'PrintManager',
-    'print_student_report', 'print_students_list', 'print_payment_receipt',
-    'print_installment_receipt', 'print_financial_report',
-    'apply_print_styles', 'PrintHelper', 'QuickPrintMixin',
-    'SimplePrintPreviewDialog', 'WEB_ENGINE_AVAILABLE', 'REPORTLAB_AVAILABLE'
+    'WEB_ENGINE_AVAILABLE', 'REPORTLAB_AVAILABLE',
+    *_LAZY_EXPORTS,
 ]
-
-if WEB_ENGINE_AVAILABLE:
-    __all__.extend([
-        'WebPrintManager',
-        'web_print_payment_receipt',
-        'web_print_students_list', 
-        'web_print_student_report',
-        'web_print_financial_report'
-    ])
-
-if REPORTLAB_AVAILABLE:
-    __all__.extend([
-        'ReportLabPrintManager',
-        'QuickPrintInterface',
-        'quick_print_installment',
-        'quick_print_student_report'
-    ])
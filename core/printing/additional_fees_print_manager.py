@@ -34,6 +34,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
 import config
+from core.utils.telemetry import timed
 
 
 class AdditionalFeesPrintManager:
@@ -109,6 +110,7 @@ class AdditionalFeesPrintManager:
             logging.error(f"خطأ في إعادة تشكيل النص العربي: {e}")
             return text
     
+    @timed()
     def create_additional_fees_receipt(self, data: Dict[str, Any], output_path: str = None) -> str:
         """إنشاء إيصال الرسوم الإضافية"""
         if not output_path:
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+طباعة إيصالات الأقساط دفعة واحدة
+يجمع إيصالات فترة زمنية أو مدرسة أو قائمة أقساط في ملف PDF واحد
+مع إمكانية إرسال الملف مباشرة إلى الطابعة دون حفظه في مجلد الصادرات
+"""
+
+import logging
+import os
+import platform
+import subprocess
+import tempfile
+from typing import Dict, Any, List, Optional, Sequence
+
+from core.database.connection import db_manager
+
+
+# الحد الأقصى لعدد المعاملات في استعلام IN واحد (حد SQLite الافتراضي 999)
+_IDS_CHUNK_SIZE = 500
+
+_RECEIPTS_QUERY = """
+    SELECT i.id, i.student_id, i.amount, i.payment_date, i.payment_time, i.notes,
+           s.name AS student_name, s.grade, s.section, s.total_fee,
+           sc.name_ar AS school_name, sc.name_en AS school_name_en,
+           sc.address AS school_address, sc.phone AS school_phone,
+           sc.logo_path AS school_logo_path,
+           (SELECT COALESCE(SUM(p.amount), 0) FROM installments p
+            WHERE p.student_id = i.student_id) AS total_paid
+    FROM installments i
+    JOIN students s ON i.student_id = s.id
+    LEFT JOIN schools sc ON s.school_id = sc.id
+    WHERE 1=1
+"""
+
+
+def _row_to_receipt(row) -> Dict[str, Any]:
+    """تحويل صف قاعدة البيانات إلى بيانات إيصال بنفس شكل InstallmentsTableWidget.print_installment"""
+    total_fee = float(row['total_fee'] or 0)
+    total_paid = float(row['total_paid'] or 0)
+    return {
+        'id': row['id'],
+        'installment_id': row['id'],
+        'student_name': str(row['student_name'] or ''),
+        'school_name': str(row['school_name'] or ''),
+        'school_name_en': str(row['school_name_en'] or ''),
+        'school_address': str(row['school_address'] or ''),
+        'school_phone': str(row['school_phone'] or ''),
+        'school_logo_path': str(row['school_logo_path'] or ''),
+        'grade': str(row['grade'] or ''),
+        'section': str(row['section'] or ''),
+        'payment_date': f"{row['payment_date']} {row['payment_time'] or ''}",
+        'payment_method': row['notes'] or '',
+        'description': row['notes'] or '',
+        'amount': float(row['amount'] or 0),
+        'total_paid': total_paid,
+        'total_fee': total_fee,
+        'remaining': total_fee - total_paid
+    }
+
+
+def load_installment_receipts(date_from: Optional[str] = None,
+                              date_to: Optional[str] = None,
+                              school_id: Optional[int] = None,
+                              installment_ids: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+    """
+    جلب بيانات إيصالات الأقساط حسب الفلاتر
+
+    Args:
+        date_from: بداية فترة الدفع (YYYY-MM-DD) شاملة
+        date_to: نهاية فترة الدفع (YYYY-MM-DD) شاملة
+        school_id: معرف المدرسة
+        installment_ids: قائمة معرفات أقساط محددة (None بدون تقييد، والقائمة الفارغة لا تعيد شيئاً)
+
+    Returns:
+        قائمة بيانات الإيصالات مرتبة حسب تاريخ الدفع
+    """
+    if installment_ids is not None and not installment_ids:
+        return []
+
+    filters = []
+    params: List[Any] = []
+    if date_from:
+        filters.append("i.payment_date >= ?")
+        params.append(date_from)
+    if date_to:
+        filters.append("i.payment_date <= ?")
+        params.append(date_to)
+    if school_id:
+        filters.append("s.school_id = ?")
+        params.append(school_id)
+
+    base_query = _RECEIPTS_QUERY + "".join(f" AND {f}" for f in filters)
+    order_by = " ORDER BY i.payment_date, i.payment_time, i.id"
+
+    rows = []
+    if installment_ids is not None:
+        ids = list(installment_ids)
+        for start in range(0, len(ids), _IDS_CHUNK_SIZE):
+            chunk = ids[start:start + _IDS_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            rows.extend(db_manager.execute_query(
+                base_query + f" AND i.id IN ({placeholders})" + order_by,
+                tuple(params) + tuple(chunk)
+            ))
+        if len(ids) > _IDS_CHUNK_SIZE:
+            rows.sort(key=lambda r: (r['payment_date'] or '', r['payment_time'] or '', r['id']))
+    else:
+        rows = db_manager.execute_query(base_query + order_by, tuple(params))
+
+    return [_row_to_receipt(row) for row in rows]
+
+
+def spool_receipts_to_printer(receipts: List[Dict[str, Any]], printer_name: Optional[str] = None) -> bool:
+    """
+    إرسال الإيصالات إلى الطابعة مباشرة دون حفظ ملف في مجلد الصادرات
+
+    على Linux/macOS يُكتب PDF مباشرة في المدخل القياسي لأمر lp.
+    على Windows يُكتب ملف مؤقت ويُطبع بـ ShellExecute (win32api إن توفر،
+    وإلا os.startfile)، مع الفعل printto عند تحديد اسم الطابعة، ثم يُحذف
+    الملف المؤقت بعد تسليمه إلى المُجمّع.
+
+    Returns:
+        True إذا تم إرسال المهمة بنجاح
+    """
+    from .reportlab_print_manager import ReportLabPrintManager
+    manager = ReportLabPrintManager()
+    system = platform.system()
+
+    try:
+        if system != "Windows":
+            command = ["lp"]
+            if printer_name:
+                command += ["-d", printer_name]
+            command += ["-t", "installment_receipts", "-"]
+            process = subprocess.Popen(command, stdin=subprocess.PIPE)
+            manager.create_installment_receipts_batch(receipts, process.stdin)
+            process.stdin.close()
+            return process.wait(timeout=120) == 0
+
+        # على Windows لا تفهم معظم الطابعات PDF كبيانات RAW، لذلك يُكتب ملف مؤقت
+        # ويُطبع عبر البرنامج المسجل لفتح PDF (ShellExecute بالفعل print)
+        fd, temp_path = tempfile.mkstemp(suffix=".pdf", prefix="receipts_")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                manager.create_installment_receipts_batch(receipts, temp_file)
+
+            try:
+                import win32api  # type: ignore
+            except ImportError:
+                win32api = None
+
+            if win32api is not None:
+                if printer_name:
+                    win32api.ShellExecute(0, "printto", temp_path, f'"{printer_name}"', ".", 0)
+                else:
+                    win32api.ShellExecute(0, "print", temp_path, None, ".", 0)
+            else:
+                os.startfile(temp_path, "print")
+            return True
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError as e:
+                logging.warning(f"تعذر حذف ملف الإيصالات المؤقت {temp_path}: {e}")
+
+    except Exception as e:
+        logging.error(f"خطأ في إرسال الإيصالات إلى الطابعة: {e}")
+        return False
+
+
+def print_installment_receipts_batch(date_from: Optional[str] = None,
+                                     date_to: Optional[str] = None,
+                                     school_id: Optional[int] = None,
+                                     installment_ids: Optional[Sequence[int]] = None,
+                                     parent=None,
+                                     direct: bool = False,
+                                     printer_name: Optional[str] = None) -> int:
+    """
+    طباعة إيصالات الأقساط دفعة واحدة مع معاينة واحدة
+
+    Args:
+        direct: إرسال مباشر إلى الطابعة بدلاً من المعاينة
+
+    Returns:
+        عدد الإيصالات التي تمت معالجتها
+    """
+    if installment_ids is not None and not installment_ids:
+        return 0
+
+    receipts = load_installment_receipts(date_from, date_to, school_id, installment_ids)
+    if not receipts:
+        return 0
+
+    if direct:
+        if not spool_receipts_to_printer(receipts, printer_name):
+            raise RuntimeError("فشل في إرسال الإيصالات إلى الطابعة")
+        return len(receipts)
+
+    from .reportlab_print_manager import ReportLabPrintManager
+    pdf_path = ReportLabPrintManager().create_installment_receipts_batch(receipts)
+
+    from ui.widgets.enhanced_pdf_preview_dialog import EnhancedPDFPreviewDialog
+    dialog = EnhancedPDFPreviewDialog(pdf_path, f"معاينة {len(receipts)} إيصال", parent)
+    dialog.exec_()
+    return len(receipts)
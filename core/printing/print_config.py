@@ -52,6 +52,8 @@ class TemplateType(Enum):
     INSTALLMENT_RECEIPT = "installment_receipt"  # إيصال قسط جديد
     TEACHERS_LIST = "teachers_list"  # قائمة المعلمين
     EMPLOYEES_LIST = "employees_list"  # قائمة الموظفين
+    ARREARS_REPORT = "arrears_report"  # تقرير المتأخرات وتوقع التحصيل
+    CONSOLIDATED_REPORT = "consolidated_report"  # التقرير الموحد لكل المدارس
     CUSTOM = "custom"
 
 
@@ -67,6 +69,8 @@ TEMPLATE_PRINT_METHODS = {
     TemplateType.SALARY_SLIP: PrintMethod.HTML_WEB_ENGINE,
     TemplateType.TEACHERS_LIST: PrintMethod.HTML_WEB_ENGINE,
     TemplateType.EMPLOYEES_LIST: PrintMethod.HTML_WEB_ENGINE,
+    TemplateType.ARREARS_REPORT: PrintMethod.HTML_WEB_ENGINE,
+    TemplateType.CONSOLIDATED_REPORT: PrintMethod.HTML_WEB_ENGINE,
     
     # الوصولات والفواتير - ReportLab
     TemplateType.PAYMENT_RECEIPT: PrintMethod.REPORTLAB_CANVAS,
@@ -16,21 +16,29 @@ from .template_manager import TemplateManager
 from .simple_print_preview import SimplePrintPreviewDialog
 from ui.widgets.column_selection_dialog import ColumnSelectionDialog
 
-# محاولة استيراد محرك الويب الحديث
-try:
-    from .web_print_manager import WebPrintManager
-    WEB_ENGINE_AVAILABLE = True
-except ImportError:
-    WEB_ENGINE_AVAILABLE = False
-    logging.warning("محرك الويب الحديث غير متوفر، سيتم استخدام المحرك التقليدي")
-
-# محاولة استيراد مدير ReportLab
-try:
-    from .reportlab_print_manager import ReportLabPrintManager
-    REPORTLAB_AVAILABLE = True
-except ImportError:
-    REPORTLAB_AVAILABLE = False
-    logging.warning("ReportLab غير متوفر، سيتم استخدام مسار HTML فقط")
+# المحركات الثقيلة (QtWebEngine و ReportLab) تُحمّل عند أول طباعة لا عند بدء التشغيل
+_UNSET = object()
+
+
+def load_web_print_manager():
+    """صنف محرك الويب الحديث، أو None إذا لم يكن متوفراً"""
+    try:
+        from .web_print_manager import WebPrintManager
+        return WebPrintManager
+    except ImportError:
+        logging.warning("محرك الويب الحديث غير متوفر، سيتم استخدام المحرك التقليدي")
+        return None
+
+
+def load_reportlab_print_manager():
+    """صنف مدير ReportLab، أو None إذا لم يكن متوفراً"""
+    try:
+        from .reportlab_print_manager import ReportLabPrintManager
+        return ReportLabPrintManager
+    except ImportError:
+        logging.warning("ReportLab غير متوفر، سيتم استخدام مسار HTML فقط")
+        return None
+
 
 class PrintManager:
     """إدارة عمليات الطباعة - يدعم مسارين: HTML و ReportLab"""
@@ -39,21 +47,29 @@ class PrintManager:
         self.parent = parent
         self.template_manager = TemplateManager()
         self.settings = self.template_manager.config.load_settings_from_config()
-        self.use_web_engine = use_web_engine and WEB_ENGINE_AVAILABLE
+        self.use_web_engine = False
+        self._reportlab_manager = _UNSET
         
         # إعداد مدير HTML
+        if use_web_engine:
+            web_print_manager_class = load_web_print_manager()
+            if web_print_manager_class is not None:
+                self.web_print_manager = web_print_manager_class(parent)
+                self.use_web_engine = True
         if self.use_web_engine:
-            self.web_print_manager = WebPrintManager(parent)
             logging.info("تم تفعيل محرك الويب الحديث للطباعة")
         else:
             logging.info("تم تفعيل محرك الطباعة التقليدي")
-        
-        # إعداد مدير ReportLab
-        if REPORTLAB_AVAILABLE:
-            self.reportlab_manager = ReportLabPrintManager()
-            logging.info("تم تفعيل مدير ReportLab للطباعة")
-        else:
-            self.reportlab_manager = None
+    
+    @property
+    def reportlab_manager(self):
+        """مدير ReportLab (يُنشأ عند أول وصل أو فاتورة تحتاجه)"""
+        if self._reportlab_manager is _UNSET:
+            reportlab_class = load_reportlab_print_manager()
+            self._reportlab_manager = reportlab_class() if reportlab_class else None
+            if self._reportlab_manager:
+                logging.info("تم تفعيل مدير ReportLab للطباعة")
+        return self._reportlab_manager
     
     def get_print_method(self, template_type: TemplateType) -> PrintMethod:
         """تحديد طريقة الطباعة المناسبة للقالب"""
@@ -202,10 +218,11 @@ class PrintManager:
     
     def toggle_engine(self):
         """تبديل محرك الطباعة"""
-        if WEB_ENGINE_AVAILABLE:
+        web_print_manager_class = load_web_print_manager()
+        if web_print_manager_class is not None:
             self.use_web_engine = not self.use_web_engine
             if self.use_web_engine and not hasattr(self, 'web_print_manager'):
-                self.web_print_manager = WebPrintManager(self.parent)
+                self.web_print_manager = web_print_manager_class(self.parent)
             
             engine_name = "الحديث" if self.use_web_engine else "التقليدي"
             logging.info(f"تم تغيير محرك الطباعة إلى: {engine_name}")
@@ -289,6 +306,24 @@ def print_financial_report(data, date_range=None, parent=None, use_web_engine=Tr
     pm.preview_document(TemplateType.FINANCIAL_REPORT, payload)
 
 
+def print_arrears_report(data, parent=None, use_web_engine=True):
+    """طباعة تقرير المتأخرات وتوقع التحصيل مع معاينة"""
+    pm = PrintManager(parent, use_web_engine)
+    pm.preview_document(TemplateType.ARREARS_REPORT, data.copy() if isinstance(data, dict) else {})
+
+
+def print_consolidated_report(data, parent=None, use_web_engine=True):
+    """طباعة التقرير الموحد للمدارس (قسم لكل مدرسة ومجموع كلي) مع معاينة"""
+    pm = PrintManager(parent, use_web_engine)
+    pm.preview_document(TemplateType.CONSOLIDATED_REPORT, data.copy() if isinstance(data, dict) else {})
+
+
+def print_salary_slips(slips, parent=None, use_web_engine=True):
+    """طباعة مجموعة قسائم رواتب في مستند واحد (صفحة لكل قسيمة)"""
+    pm = PrintManager(parent, use_web_engine)
+    pm.preview_document(TemplateType.SALARY_SLIP, {'slips': list(slips)})
+
+
 def print_teachers_list(teachers, filter_info=None, parent=None, use_web_engine=True):
     """طباعة قائمة المعلمين مع معاينة"""
     pm = PrintManager(parent, use_web_engine)
@@ -10,7 +10,7 @@ import hashlib_patch
 import logging
 import os
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Union, BinaryIO
 from pathlib import Path
 
 # ReportLab imports
@@ -37,6 +37,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 
 import config
+from core.utils.telemetry import timed
 
 
 class ReportLabPrintManager:
@@ -112,6 +113,7 @@ class ReportLabPrintManager:
             logging.error(f"خطأ في إعادة تشكيل النص العربي: {e}")
             return text
     
+    @timed()
     def create_installment_receipt(self, data: Dict[str, Any], output_path: str = None) -> str:
         """إنشاء إيصال دفع قسط"""
         if not output_path:
@@ -123,7 +125,49 @@ class ReportLabPrintManager:
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
         c = canvas.Canvas(output_path, pagesize=A4)
+        self._draw_receipt_page(c, data)
+        c.save()
+        logging.info(f"تم إنشاء إيصال الدفع: {output_path}")
+        return output_path
+
+    @timed()
+    def create_installment_receipts_batch(self, receipts: List[Dict[str, Any]],
+                                          output: Union[str, BinaryIO, None] = None) -> Union[str, BinaryIO]:
+        """
+        إنشاء ملف PDF واحد متعدد الصفحات لمجموعة إيصالات أقساط
+        
+        جميع الإيصالات تُرسم على canvas واحد، لذلك تُضمَّن الخطوط والشعارات
+        مرة واحدة فقط في الملف بدلاً من ملف مستقل لكل إيصال.
+        
+        Args:
+            receipts: قائمة بيانات الإيصالات (نفس شكل بيانات create_installment_receipt)
+            output: مسار الملف أو كائن ملف ثنائي قابل للكتابة (مثل مدخل مخزن الطباعة)
+            
+        Returns:
+            مسار الملف أو كائن الملف الممرر
+        """
+        if output is None:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            output = os.path.join(
+                config.DATA_DIR, 'exports', 'prints',
+                f'installment_receipts_batch_{timestamp}.pdf'
+            )
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+
+        c = canvas.Canvas(output, pagesize=A4, pageCompression=1)
+        c.setTitle(self.reshape_arabic_text("إيصالات دفع الأقساط"))
+
+        for index, data in enumerate(receipts):
+            if index > 0:
+                c.showPage()
+            self._draw_receipt_page(c, data)
+
+        c.save()
+        logging.info(f"تم إنشاء {len(receipts)} إيصال في ملف واحد: {output if isinstance(output, str) else 'stream'}")
+        return output
 
+    def _draw_receipt_page(self, c, data: Dict[str, Any]):
+        """رسم صفحة إيصال كاملة (نسخة الزبون ونسخة المدرسة)"""
         # Draw the first receipt
         self._draw_receipt(c, data, self.page_height)
 
@@ -132,10 +176,6 @@ class ReportLabPrintManager:
         gap_between = 0 * mm  # 10mm gap between receipts
         second_receipt_y = self.page_height - receipt_height - gap_between
         self._draw_receipt(c, data, second_receipt_y)
-        
-        c.save()
-        logging.info(f"تم إنشاء إيصال الدفع: {output_path}")
-        return output_path
 
     def _draw_receipt(self, c, data, top_y):
         """Helper function to draw a single receipt with a more organized layout."""
@@ -433,6 +473,7 @@ class ReportLabPrintManager:
         )
         return self.create_installment_receipt(data, temp_path)
     
+    @timed()
     def create_student_report(self, data: Dict[str, Any], output_path: str = None) -> str:
         """إنشاء تقرير طالب مفصل PDF"""
         if not output_path:
@@ -18,6 +18,7 @@ except ImportError:
 from datetime import datetime
 
 from .print_config import TemplateType, PrintConfig
+from core.utils.telemetry import timed
 
 
 class TemplateManager:
@@ -100,6 +101,7 @@ class TemplateManager:
             logging.error(f"خطأ في تحميل القالب {template_type.value}: {e}")
             return None
     
+    @timed("TemplateManager.render_template")
     def render_template(self, template_type: TemplateType, data: Dict[str, Any]) -> str:
         """تقديم القالب مع البيانات"""
         try:
@@ -166,7 +168,9 @@ class TemplateManager:
             TemplateType.STAFF_REPORT: self.get_staff_report_template(),
             TemplateType.SCHOOL_REPORT: self.get_school_report_template(),
             TemplateType.TEACHERS_LIST: self.get_teachers_list_template(),
-            TemplateType.EMPLOYEES_LIST: self.get_employees_list_template()
+            TemplateType.EMPLOYEES_LIST: self.get_employees_list_template(),
+            TemplateType.ARREARS_REPORT: self.get_arrears_report_template(),
+            TemplateType.CONSOLIDATED_REPORT: self.get_consolidated_report_template()
         }
         
         for template_type, content in templates.items():
@@ -440,6 +444,22 @@ class TemplateManager:
             border-top: 2px solid #333;
             padding-top: 10px;
         }
+        .ledger-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 20px;
+        }
+        .ledger-table th, .ledger-table td {
+            border: 1px solid #ccc;
+            padding: 6px;
+            text-align: center;
+        }
+        .ledger-table th {
+            background-color: #f0f0f0;
+        }
+        .ledger-table .outflow {
+            color: #a93226;
+        }
         .footer {
             text-align: center;
             margin-top: 50px;
@@ -474,6 +494,35 @@ class TemplateManager:
         </div>
     </div>
     
+    {% if financial_data.income_lines %}
+    <h3>الإيرادات والمصروفات حسب البند</h3>
+    <table class="ledger-table">
+        <tr><th>البند</th><th>عدد الحركات</th><th>المبلغ</th></tr>
+        {% for line in financial_data.income_lines %}
+        <tr><td>{{ line.label }}</td><td>{{ line.entries }}</td><td>{{ line.amount | currency }}</td></tr>
+        {% endfor %}
+        {% for line in financial_data.expense_lines %}
+        <tr class="outflow"><td>{{ line.label }}</td><td>{{ line.entries }}</td><td>{{ line.amount | currency }}</td></tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+    
+    {% if financial_data.monthly %}
+    <h3>التدفق النقدي الشهري</h3>
+    <table class="ledger-table">
+        <tr><th>الشهر</th><th>الوارد</th><th>الصادر</th><th>الصافي</th><th>الرصيد التراكمي</th></tr>
+        {% for row in financial_data.monthly %}
+        <tr>
+            <td>{{ row.month }}</td>
+            <td>{{ row.income | currency }}</td>
+            <td>{{ row.outflow | currency }}</td>
+            <td>{{ row.net | currency }}</td>
+            <td>{{ row.balance | currency }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+    
     <div class="footer">
         <p>{{ company_name }} - {{ system_version }}</p>
     </div>
@@ -614,6 +663,12 @@ class TemplateManager:
             font-weight: bold;
             font-size: 16px;
         }
+        .slip {
+            page-break-after: always;
+        }
+        .slip:last-child {
+            page-break-after: auto;
+        }
         .footer {
             text-align: center;
             margin-top: 30px;
@@ -623,10 +678,15 @@ class TemplateManager:
     </style>
 </head>
 <body>
+    {% for salary in (slips or [salary]) %}
+    <div class="slip">
     <div class="header">
         <h1>{{ company_name }}</h1>
         <h2>قسيمة راتب</h2>
         <p>الشهر: {{ salary.month_year }}</p>
+        {% if salary.period %}
+        <p>الفترة: {{ salary.period }} ({{ salary.days_count }} يوم)</p>
+        {% endif %}
     </div>
     
     <div class="employee-info">
@@ -666,6 +726,8 @@ class TemplateManager:
         <p>تاريخ الطباعة: {{ print_date | date_ar }}</p>
         <p>{{ company_name }}</p>
     </div>
+    </div>
+    {% endfor %}
 </body>
 </html>
         """
@@ -1043,5 +1105,288 @@ class TemplateManager:
         <p>{{ company_name }} - {{ system_version }}</p>
     </div>
 </body>
+</html>
+        """
+    
+    def get_arrears_report_template(self) -> str:
+        """قالب تقرير المتأخرات وتوقع التحصيل"""
+        return """
+<!DOCTYPE html>
+<html dir="rtl">
+<head>
+    <meta charset="UTF-8">
+    <title>تقرير المتأخرات</title>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            margin: 20px;
+            direction: rtl;
+        }
+        .header {
+            text-align: center;
+            border-bottom: 2px solid #333;
+            padding-bottom: 10px;
+            margin-bottom: 20px;
+        }
+        .summary-box {
+            background-color: #fdecea;
+            padding: 15px;
+            border-radius: 5px;
+            margin-bottom: 20px;
+        }
+        .summary-item {
+            display: flex;
+            justify-content: space-between;
+            margin-bottom: 8px;
+            font-size: 16px;
+        }
+        .total {
+            font-weight: bold;
+            font-size: 18px;
+            border-top: 2px solid #333;
+            padding-top: 10px;
+        }
+        .ledger-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 20px;
+        }
+        .ledger-table th, .ledger-table td {
+            border: 1px solid #ccc;
+            padding: 6px;
+            text-align: center;
+        }
+        .ledger-table th {
+            background-color: #f0f0f0;
+        }
+        .ledger-table .outflow {
+            color: #a93226;
+        }
+        .footer {
+            text-align: center;
+            margin-top: 50px;
+            font-size: 12px;
+            color: #666;
+        }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>{{ company_name }}</h1>
+        <h2>تقرير المتأخرات وتوقع التحصيل</h2>
+        <p>تاريخ الطباعة: {{ print_date | date_ar }}</p>
+        {% if academic_year %}
+        <p>العام الدراسي: {{ academic_year }}</p>
+        {% endif %}
+        <p>الأرصدة حتى: {{ as_of | date_ar }}</p>
+    </div>
+    
+    <div class="summary-box">
+        <h3>ملخص التحصيل</h3>
+        <div class="summary-item">
+            <span>عدد الطلاب / المتأخرون:</span>
+            <span>{{ arrears.students }} / {{ arrears.owing_students }}</span>
+        </div>
+        <div class="summary-item">
+            <span>إجمالي المستحق:</span>
+            <span>{{ arrears.billed | currency }}</span>
+        </div>
+        <div class="summary-item">
+            <span>المحصّل ({{ '%.1f' | format(arrears.collection_rate) }}%):</span>
+            <span>{{ arrears.collected | currency }}</span>
+        </div>
+        <div class="summary-item">
+            <span>التحصيل المتوقع حتى {{ arrears.forecast.term_end | date_ar }}:</span>
+            <span>{{ arrears.forecast.projected | currency }}</span>
+        </div>
+        <div class="summary-item total">
+            <span>إجمالي المتأخرات:</span>
+            <span>{{ arrears.outstanding | currency }}</span>
+        </div>
+    </div>
+    
+    <h3>أعمار المتأخرات</h3>
+    <table class="ledger-table">
+        <tr><th>المدة منذ آخر دفعة</th><th>عدد الطلاب</th><th>المبلغ</th><th>النسبة</th></tr>
+        {% for bucket in arrears.aging %}
+        <tr>
+            <td>{{ bucket.label }}</td>
+            <td>{{ bucket.students }}</td>
+            <td>{{ bucket.amount | currency }}</td>
+            <td>{{ '%.1f' | format(bucket.share) }}%</td>
+        </tr>
+        {% endfor %}
+    </table>
+    
+    {% if arrears.groups %}
+    <h3>نسب التحصيل حسب المدرسة والصف والشعبة</h3>
+    <table class="ledger-table">
+        <tr>
+            <th>المدرسة</th><th>الصف</th><th>الشعبة</th><th>الطلاب</th><th>المستحق</th>
+            <th>المحصّل</th><th>نسبة التحصيل</th><th>المتأخرات</th><th>المتوقع</th>
+        </tr>
+        {% for group in arrears.groups %}
+        <tr>
+            <td>{{ group.school_name }}</td>
+            <td>{{ group.grade or '-' }}</td>
+            <td>{{ group.section or '-' }}</td>
+            <td>{{ group.students }}</td>
+            <td>{{ group.billed | currency }}</td>
+            <td>{{ group.collected | currency }}</td>
+            <td>{{ '%.1f' | format(group.collection_rate) }}%</td>
+            <td class="outflow">{{ group.outstanding | currency }}</td>
+            <td>{{ group.projected | currency }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+    
+    {% if arrears.debtors %}
+    <h3>أعلى الأرصدة المتأخرة</h3>
+    <table class="ledger-table">
+        <tr><th>الطالب</th><th>المدرسة</th><th>الصف</th><th>الشعبة</th><th>المتبقي</th><th>آخر دفعة</th><th>الأيام</th></tr>
+        {% for debtor in arrears.debtors %}
+        <tr>
+            <td>{{ debtor.name }}</td>
+            <td>{{ debtor.school_name }}</td>
+            <td>{{ debtor.grade }}</td>
+            <td>{{ debtor.section }}</td>
+            <td class="outflow">{{ debtor.outstanding | currency }}</td>
+            <td>{{ debtor.last_payment | date_ar if debtor.last_payment else 'لا يوجد' }}</td>
+            <td>{{ debtor.age_days }}</td>
+        </tr>
+        {% endfor %}
+    </table>
+    {% endif %}
+    
+    <div class="footer">
+        <p>{{ company_name }} - {{ system_version }}</p>
+    </div>
+</body>
+</html>
+        """
+    
+    def get_consolidated_report_template(self) -> str:
+        """قالب التقرير الموحد (قسم لكل مدرسة ومجموع كلي)"""
+        return """
+<!DOCTYPE html>
+<html dir="rtl">
+<head>
+    <meta charset="UTF-8">
+    <title>التقرير الموحد للمدارس</title>
+    <style>
+        body {
+            font-family: Arial, sans-serif;
+            margin: 20px;
+            direction: rtl;
+        }
+        .header {
+            text-align: center;
+            border-bottom: 2px solid #333;
+            padding-bottom: 10px;
+            margin-bottom: 20px;
+        }
+        .school-section {
+            page-break-after: always;
+        }
+        .school-section h2 {
+            background-color: #f0f0f0;
+            padding: 8px;
+            border-radius: 5px;
+        }
+        .ledger-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-bottom: 20px;
+        }
+        .ledger-table th, .ledger-table td {
+            border: 1px solid #ccc;
+            padding: 6px;
+            text-align: center;
+        }
+        .ledger-table th {
+            background-color: #f0f0f0;
+        }
+        .ledger-table .outflow {
+            color: #a93226;
+        }
+        .total {
+            font-weight: bold;
+        }
+        .footer {
+            text-align: center;
+            margin-top: 50px;
+            font-size: 12px;
+            color: #666;
+        }
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>{{ company_name }}</h1>
+        <h2>التقرير الموحد للمدارس</h2>
+        <p>تاريخ الطباعة: {{ print_date | date_ar }}</p>
+        {% if date_range %}
+        <p>الفترة: {{ date_range }}</p>
+        {% endif %}
+    </div>
+    
+    {% for section in sections %}
+    <div class="school-section">
+        <h2>{{ section.school_name }}</h2>
+        <table class="ledger-table">
+            <tr><th>البند</th><th>القيمة</th></tr>
+            <tr><td>الطلاب النشطون</td><td>{{ section.students }}</td></tr>
+            <tr><td>الأقساط المستحقة</td><td>{{ section.fees_billed | currency }}</td></tr>
+            <tr><td>الأقساط المحصلة</td><td>{{ section.fees_collected | currency }}</td></tr>
+            <tr><td>الأقساط المتبقية</td><td class="outflow">{{ section.fees_outstanding | currency }}</td></tr>
+        </table>
+        <table class="ledger-table">
+            <tr><th>الحركة خلال الفترة</th><th>المبلغ</th></tr>
+            <tr><td>الأقساط</td><td>{{ section.installments | currency }}</td></tr>
+            <tr><td>الرسوم الإضافية المدفوعة</td><td>{{ section.additional_fees_paid | currency }}</td></tr>
+            <tr><td>الإيرادات الخارجية</td><td>{{ section.external_income | currency }}</td></tr>
+            <tr class="total"><td>إجمالي الوارد</td><td>{{ section.income | currency }}</td></tr>
+            <tr><td>المصروفات</td><td class="outflow">{{ section.expenses | currency }}</td></tr>
+            <tr><td>الرواتب</td><td class="outflow">{{ section.salaries | currency }}</td></tr>
+            <tr class="total"><td>إجمالي الصادر</td><td class="outflow">{{ section.outflow | currency }}</td></tr>
+            <tr class="total"><td>الصافي</td><td>{{ section.net | currency }}</td></tr>
+        </table>
+        <p>رسوم إضافية غير مدفوعة: {{ section.additional_fees_unpaid | currency }}</p>
+    </div>
+    {% endfor %}
+    
+    <h2>المجموع الكلي</h2>
+    <table class="ledger-table">
+        <tr>
+            <th>المدرسة</th><th>الطلاب</th><th>المحصل</th><th>المتبقي</th>
+            <th>الوارد</th><th>الصادر</th><th>الصافي</th>
+        </tr>
+        {% for section in sections %}
+        <tr>
+            <td>{{ section.school_name }}</td>
+            <td>{{ section.students }}</td>
+            <td>{{ section.fees_collected | currency }}</td>
+            <td class="outflow">{{ section.fees_outstanding | currency }}</td>
+            <td>{{ section.income | currency }}</td>
+            <td class="outflow">{{ section.outflow | currency }}</td>
+            <td>{{ section.net | currency }}</td>
+        </tr>
+        {% endfor %}
+        <tr class="total">
+            <td>الإجمالي</td>
+            <td>{{ grand_total.students }}</td>
+            <td>{{ grand_total.fees_collected | currency }}</td>
+            <td class="outflow">{{ grand_total.fees_outstanding | currency }}</td>
+            <td>{{ grand_total.income | currency }}</td>
+            <td class="outflow">{{ grand_total.outflow | currency }}</td>
+            <td>{{ grand_total.net | currency }}</td>
+        </tr>
+    </table>
+    
+    <div class="footer">
+        <p>{{ company_name }} - {{ system_version }}</p>
+    </div>
+</body>
 </html>
         """
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+دليل الصفوف والشعب لكل مدرسة
+يُبنى مرة واحدة من أنواع المدارس (school_types) ومن الطلاب الفعليين: الصفوف
+الصالحة لكل مدرسة بترتيبها، والشعب المستخدمة في كل صف، وعدد الطلاب النشطين.
+لا يُعاد بناؤه إلا عند تغير أرقام إصدار جدولي المدارس أو الطلاب (أي عند
+الكتابة فيهما)، فتغيير المدرسة في القوائم لا يعيد تحليل أي نص
+"""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from core.database.table_versions import TableVersionTracker, table_versions
+
+
+# الصفوف لكل مرحلة بترتيبها الدراسي
+STAGE_GRADES = {
+    "ابتدائية": [
+        "الأول الابتدائي", "الثاني الابتدائي", "الثالث الابتدائي",
+        "الرابع الابتدائي", "الخامس الابتدائي", "السادس الابتدائي",
+    ],
+    "متوسطة": ["الأول المتوسط", "الثاني المتوسط", "الثالث المتوسط"],
+    "إعدادية": [
+        "الرابع العلمي", "الرابع الأدبي",
+        "الخامس العلمي", "الخامس الأدبي",
+        "السادس العلمي", "السادس الأدبي",
+    ],
+}
+
+# أنواع مدارس تُعامل كمرحلة أخرى
+STAGE_ALIASES = {"ثانوية": "إعدادية"}
+
+# ترتيب كل صف (1-15)، والصفوف غير المعرفة تأخذ UNKNOWN_GRADE_ORDER
+GRADE_ORDER = {grade: index for index, grade in
+               enumerate((g for grades in STAGE_GRADES.values() for g in grades), start=1)}
+UNKNOWN_GRADE_ORDER = 999
+
+_CATALOG_TABLES = ("schools", "students")
+
+
+def _get_db(db=None):
+    if db is None:
+        from core.database.connection import db_manager
+        db = db_manager
+    return db
+
+
+def grade_ordinal(grade: Optional[str]) -> int:
+    """ترتيب الصف الدراسي (999 للصفوف غير المعرفة)"""
+    return GRADE_ORDER.get(grade, UNKNOWN_GRADE_ORDER) if grade else UNKNOWN_GRADE_ORDER
+
+
+def sort_grades(grades: Iterable[str], known_only: bool = False) -> List[str]:
+    """ترتيب الصفوف حسب المراحل الدراسية (مع حذف غير المعرفة إذا طُلب)"""
+    unique = {grade for grade in grades if grade and (not known_only or grade in GRADE_ORDER)}
+    return sorted(unique, key=lambda grade: (grade_ordinal(grade), grade))
+
+
+def parse_school_types(value) -> List[str]:
+    """تحليل أنواع المدرسة المخزنة كمصفوفة JSON أو نص مفصول بفواصل"""
+    if not value:
+        return []
+    if isinstance(value, (list, tuple)):
+        return [str(item) for item in value]
+    try:
+        parsed = json.loads(value)
+        return [str(item) for item in parsed] if isinstance(parsed, list) else [str(parsed)]
+    except (json.JSONDecodeError, TypeError):
+        return [item.strip() for item in str(value).split(',') if item.strip()]
+
+
+def grades_for_types(school_types: Iterable[str]) -> List[str]:
+    """الصفوف الصالحة لمدرسة بأنواعها المعطاة"""
+    stages = {STAGE_ALIASES.get(school_type, school_type) for school_type in school_types}
+    return [grade for stage, grades in STAGE_GRADES.items() if stage in stages for grade in grades]
+
+
+@dataclass
+class SchoolGrades:
+    """صفوف مدرسة واحدة وشعبها وأعداد طلابها"""
+    school_id: int
+    name: str
+    types: List[str]
+    grades: List[str]
+    sections: Dict[str, List[str]] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+
+    def sections_for(self, grade: Optional[str] = None) -> List[str]:
+        """الشعب المستخدمة في صف (أو في كل الصفوف)"""
+        if grade:
+            return list(self.sections.get(grade, []))
+        return sorted({section for sections in self.sections.values() for section in sections})
+
+
+class GradeCatalog:
+    """دليل الصفوف لكل المدارس، يُعاد بناؤه عند تغير المدارس أو الطلاب فقط"""
+
+    def __init__(self, db=None):
+        self._db = db
+        self._tracker = table_versions if db is None else TableVersionTracker(db)
+        self._lock = threading.Lock()
+        self._versions: Optional[Tuple] = None
+        self._schools: Dict[int, SchoolGrades] = {}
+
+    @property
+    def db(self):
+        return _get_db(self._db)
+
+    def _build(self) -> Dict[int, SchoolGrades]:
+        schools = {}
+        for row in self.db.execute_query("SELECT id, name_ar, school_types FROM schools ORDER BY name_ar"):
+            types = parse_school_types(row['school_types'])
+            schools[row['id']] = SchoolGrades(row['id'], row['name_ar'], types, grades_for_types(types))
+
+        rows = self.db.execute_query("""
+            SELECT school_id, grade, section, SUM(status = 'نشط') AS active
+            FROM students
+            GROUP BY school_id, grade, section
+        """)
+        for row in rows:
+            school = schools.get(row['school_id'])
+            if school is None or not row['grade']:
+                continue
+            grade = row['grade']
+            school.counts[grade] = school.counts.get(grade, 0) + (row['active'] or 0)
+            if row['section']:
+                school.sections.setdefault(grade, []).append(row['section'])
+        for school in schools.values():
+            school.sections = {grade: sorted(set(sections)) for grade, sections in school.sections.items()}
+        return schools
+
+    def _current(self) -> Dict[int, SchoolGrades]:
+        versions = self._tracker.versions(_CATALOG_TABLES)
+        with self._lock:
+            if versions is not None and versions == self._versions:
+                return self._schools
+        schools = self._build()
+        with self._lock:
+            self._versions, self._schools = versions, schools
+        logging.debug(f"تم بناء دليل الصفوف لـ {len(schools)} مدرسة")
+        return schools
+
+    def school(self, school_id) -> Optional[SchoolGrades]:
+        """دليل مدرسة واحدة (None إذا لم تكن موجودة)"""
+        return self._current().get(school_id)
+
+    def grades(self, school_id=None) -> List[str]:
+        """الصفوف الصالحة لمدرسة، أو لكل المدارس مرتبة إذا لم تُحدد"""
+        schools = self._current()
+        if school_id:
+            return list(schools[school_id].grades) if school_id in schools else []
+        return sort_grades(grade for school in schools.values() for grade in school.grades)
+
+    def sections(self, school_id=None, grade: Optional[str] = None) -> List[str]:
+        """الشعب المستخدمة فعلاً (لمدرسة و/أو صف)"""
+        schools = self._current()
+        selected = [schools[school_id]] if school_id in schools else ([] if school_id else schools.values())
+        return sorted({section for school in selected for section in school.sections_for(grade)})
+
+    def invalidate(self):
+        """إجبار إعادة البناء عند الطلب التالي"""
+        with self._lock:
+            self._versions = None
+
+
+# دليل مشترك لقاعدة البيانات الرئيسية
+grade_catalog = GradeCatalog()
@@ -4,69 +4,165 @@
 نظام التسجيل والأخطاء للتطبيق
 """
 
+import atexit
+import json
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 from datetime import datetime
 from pathlib import Path
 
 import config
 
 
+# خيط الكتابة في الخلفية: كل المعالجات الفعلية تعمل فيه بدلاً من خيط الواجهة
+_log_listener = None
+_listener_handlers = []
+
+
+class LoggerNameFilter(logging.Filter):
+    """تمرير سجلات مسجل معين (وفروعه) فقط إلى المعالج"""
+    
+    def __init__(self, *names):
+        super().__init__()
+        self.names = names
+    
+    def filter(self, record):
+        return any(record.name == name or record.name.startswith(name + ".") for name in self.names)
+
+
+class BatchedJsonLinesHandler(logging.Handler):
+    """
+    سجل تدقيق منظم بصيغة JSON lines
+    
+    تُجمع الأحداث في الذاكرة وتُكتب دفعة واحدة عند امتلاء الدفعة أو عند تسجيل
+    خطأ، وإلا يكتبها مؤقت بعد فترة الكتابة من أول حدث في الدفعة حتى لو لم يصل
+    حدث آخر. لا يُقبل إلا السجلات التي تحمل حقل audit
+    """
+    
+    def __init__(self, path, batch_size: int = 50, flush_interval: float = 2.0):
+        super().__init__()
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer = []
+        self._timer = None
+    
+    def emit(self, record):
+        try:
+            event = {
+                "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+                "level": record.levelname,
+                "logger": record.name,
+            }
+            event.update(getattr(record, "audit", {}))
+            self._buffer.append(json.dumps(event, ensure_ascii=False, default=str))
+            if len(self._buffer) >= self.batch_size or record.levelno >= logging.ERROR:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        except Exception:
+            self.handleError(record)
+    
+    def flush(self):
+        self.acquire()
+        try:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._buffer:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(self._buffer) + "\n")
+                self._buffer = []
+        finally:
+            self.release()
+    
+    def close(self):
+        self.flush()
+        super().close()
+
+
+def _rotating_handler(path, max_bytes, backup_count, formatter, level=logging.NOTSET):
+    handler = logging.handlers.RotatingFileHandler(
+        str(path), maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    handler.setFormatter(formatter)
+    handler.setLevel(level)
+    return handler
+
+
 def setup_logging():
-    """إعداد نظام التسجيل"""
+    """
+    إعداد نظام التسجيل
+    
+    المسجلات لا تكتب مباشرة: ترسل السجلات عبر QueueHandler إلى طابور، ويكتبها
+    QueueListener في خيط خلفي إلى ملفات السجلات وسجل التدقيق
+    """
+    global _log_listener, _listener_handlers
     try:
         # التأكد من وجود مجلد السجلات
         config.LOGS_DIR.mkdir(parents=True, exist_ok=True)
+        shutdown_logging()
         
         # إعداد التنسيق العربي
         formatter = logging.Formatter(
             fmt='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
         )
-        
-        # إعداد السجل الرئيسي
-        main_logger = logging.getLogger()
-        main_logger.setLevel(logging.INFO)
-        
-        # إزالة المعالجات الموجودة
-        for handler in main_logger.handlers[:]:
-            main_logger.removeHandler(handler)
+        short_formatter = logging.Formatter(
+            fmt='%(asctime)s - %(levelname)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        level = getattr(logging, str(config.LOG_LEVEL).upper(), logging.INFO)
         
         # معالج ملف السجل العام
-        app_log_path = config.LOGS_DIR / "app.log"
-        app_handler = logging.handlers.RotatingFileHandler(
-            str(app_log_path),
-            maxBytes=10*1024*1024,  # 10 ميجابايت
-            backupCount=5,
-            encoding='utf-8'
-        )
-        app_handler.setFormatter(formatter)
-        app_handler.setLevel(logging.INFO)
-        main_logger.addHandler(app_handler)
+        app_handler = _rotating_handler(config.LOGS_DIR / "app.log", 10*1024*1024, 5, formatter, level)
         
         # معالج ملف الأخطاء
-        error_log_path = config.LOGS_DIR / "error.log"
-        error_handler = logging.handlers.RotatingFileHandler(
-            str(error_log_path),
-            maxBytes=10*1024*1024,  # 10 ميجابايت
-            backupCount=5,
-            encoding='utf-8'
-        )
-        error_handler.setFormatter(formatter)
-        error_handler.setLevel(logging.ERROR)
-        main_logger.addHandler(error_handler)
+        error_handler = _rotating_handler(config.LOGS_DIR / "error.log", 10*1024*1024, 5, formatter, logging.ERROR)
         
         # معالج وحدة التحكم للتطوير
         console_handler = logging.StreamHandler()
         console_handler.setFormatter(formatter)
-        console_handler.setLevel(logging.DEBUG)
-        main_logger.addHandler(console_handler)
+        console_handler.setLevel(level)
+        
+        # سجلات مخصصة لقاعدة البيانات والمصادقة
+        db_handler = _rotating_handler(config.LOGS_DIR / "database.log", 5*1024*1024, 3, short_formatter)
+        db_handler.addFilter(LoggerNameFilter('database'))
+        auth_handler = _rotating_handler(config.LOGS_DIR / "auth.log", 5*1024*1024, 3, short_formatter)
+        auth_handler.addFilter(LoggerNameFilter('auth'))
+        
+        # سجل التدقيق المنظم
+        audit_handler = BatchedJsonLinesHandler(
+            config.AUDIT_LOG_FILE, config.AUDIT_FLUSH_BATCH, config.AUDIT_FLUSH_INTERVAL
+        )
+        audit_handler.addFilter(lambda record: hasattr(record, "audit"))
+        
+        _listener_handlers = [app_handler, error_handler, console_handler,
+                              db_handler, auth_handler, audit_handler]
+        log_queue = queue.SimpleQueue()
+        _log_listener = logging.handlers.QueueListener(
+            log_queue, *_listener_handlers, respect_handler_level=True
+        )
+        
+        # إعداد السجل الرئيسي
+        main_logger = logging.getLogger()
+        main_logger.setLevel(level)
+        
+        # إزالة المعالجات الموجودة
+        for handler in main_logger.handlers[:]:
+            main_logger.removeHandler(handler)
+        main_logger.addHandler(logging.handlers.QueueHandler(log_queue))
         
         # إعداد سجلات مخصصة
         setup_database_logger()
         setup_auth_logger()
         
+        _log_listener.start()
         logging.info("تم إعداد نظام التسجيل بنجاح")
         
     except Exception as e:
@@ -74,51 +170,42 @@ def setup_logging():
         raise
 
 
+def shutdown_logging():
+    """إيقاف خيط الكتابة بعد تفريغ الطابور وكتابة دفعة التدقيق الأخيرة"""
+    global _log_listener, _listener_handlers
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+    for handler in _listener_handlers:
+        try:
+            handler.close()
+        except Exception:
+            pass
+    _listener_handlers = []
+
+
+atexit.register(shutdown_logging)
+
+
 def setup_database_logger():
-    """إعداد سجل قاعدة البيانات"""
+    """إعداد سجل قاعدة البيانات (يُكتب إلى database.log عبر طابور السجلات)"""
     try:
         db_logger = logging.getLogger('database')
         db_logger.setLevel(logging.INFO)
-        
-        db_log_path = config.LOGS_DIR / "database.log"
-        db_handler = logging.handlers.RotatingFileHandler(
-            str(db_log_path),
-            maxBytes=5*1024*1024,  # 5 ميجابايت
-            backupCount=3,
-            encoding='utf-8'
-        )
-        
-        formatter = logging.Formatter(
-            fmt='%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        db_handler.setFormatter(formatter)
-        db_logger.addHandler(db_handler)
+        for handler in db_logger.handlers[:]:
+            db_logger.removeHandler(handler)
         
     except Exception as e:
         logging.error(f"خطأ في إعداد سجل قاعدة البيانات: {e}")
 
 
 def setup_auth_logger():
-    """إعداد سجل المصادقة"""
+    """إعداد سجل المصادقة (يُكتب إلى auth.log عبر طابور السجلات)"""
     try:
         auth_logger = logging.getLogger('auth')
         auth_logger.setLevel(logging.INFO)
-        
-        auth_log_path = config.LOGS_DIR / "auth.log"
-        auth_handler = logging.handlers.RotatingFileHandler(
-            str(auth_log_path),
-            maxBytes=5*1024*1024,  # 5 ميجابايت
-            backupCount=3,
-            encoding='utf-8'
-        )
-        
-        formatter = logging.Formatter(
-            fmt='%(asctime)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        auth_handler.setFormatter(formatter)
-        auth_logger.addHandler(auth_handler)
+        for handler in auth_logger.handlers[:]:
+            auth_logger.removeHandler(handler)
         
     except Exception as e:
         logging.error(f"خطأ في إعداد سجل المصادقة: {e}")
@@ -141,31 +228,40 @@ def log_exception(logger_name: str, exception: Exception, context: str = ""):
         print(f"الاستثناء الأصلي: {exception}")
 
 
+_user_actions_logger = logging.getLogger('user_actions')
+_database_logger = logging.getLogger('database')
+
+
 def log_user_action(action: str, details: str = ""):
-    """تسجيل إجراء المستخدم"""
+    """تسجيل إجراء المستخدم (في السجل العام وسجل التدقيق)"""
     try:
-        logger = logging.getLogger('user_actions')
+        logger = _user_actions_logger
+        if not logger.isEnabledFor(logging.INFO):
+            return
         
         message = f"إجراء المستخدم: {action}"
         if details:
             message += f" - {details}"
             
-        logger.info(message)
+        logger.info(message, extra={"audit": {"type": "user_action", "action": action, "details": details}})
         
     except Exception as e:
         logging.error(f"خطأ في تسجيل إجراء المستخدم: {e}")
 
 
 def log_database_operation(operation: str, table: str, details: str = ""):
-    """تسجيل عملية قاعدة البيانات"""
+    """تسجيل عملية قاعدة البيانات (في سجل قاعدة البيانات وسجل التدقيق)"""
     try:
-        logger = logging.getLogger('database')
+        logger = _database_logger
+        if not logger.isEnabledFor(logging.INFO):
+            return
         
         message = f"عملية قاعدة البيانات: {operation} في الجدول {table}"
         if details:
             message += f" - {details}"
             
-        logger.info(message)
+        logger.info(message, extra={"audit": {"type": "database", "operation": operation,
+                                              "table": table, "details": details}})
         
     except Exception as e:
         logging.error(f"خطأ في تسجيل عملية قاعدة البيانات: {e}")
@@ -195,7 +291,8 @@ class DatabaseLogger:
     
     def log_query(self, query: str, params: tuple = ()):
         """تسجيل استعلام قاعدة البيانات"""
-        self.logger.debug(f"استعلام: {query} | المعاملات: {params}")
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("استعلام: %s | المعاملات: %s", query, params)
     
     def log_insert(self, table: str, record_id: int):
         """تسجيل عملية إدخال"""
@@ -2,59 +2,156 @@
 # -*- coding: utf-8 -*-
 """
 وحدة مساعدة لإدارة إعدادات التطبيق
+المدير المشترك يحمل كل الإعدادات باستعلام واحد ويحتفظ بها في الذاكرة، فتصبح
+القراءة من الذاكرة فقط. عند تعيين إعداد يُبلَّغ المشتركون فوراً بدلاً من أن
+تستعلم الواجهات دورياً، وتُكتشف تعديلات العمليات الأخرى عبر PRAGMA data_version
 """
 
 import logging
-from typing import Optional, Dict, Any
+import threading
+import weakref
+from typing import Optional, Dict, Any, Callable
 from core.database.connection import db_manager
 
 
 class SettingsManager:
     """مدير إعدادات التطبيق"""
     
-    def __init__(self):
+    def __init__(self, db=None):
         """تهيئة مدير الإعدادات"""
+        self.db = db or db_manager
         self._cache = {}
+        self._loaded = False
+        self._version = None
+        self._lock = threading.RLock()
+        self._listeners = []
     
-    def get_setting(self, key: str, default_value: Any = None) -> Any:
-        """الحصول على إعداد من قاعدة البيانات"""
-        try:
-            # البحث في الكاش أولاً
-            if key in self._cache:
-                return self._cache[key]
-            
-            # البحث في قاعدة البيانات
-            query = "SELECT setting_value FROM app_settings WHERE setting_key = ?"
-            result = db_manager.execute_query(query, (key,))
-            
-            if result and len(result) > 0:
-                value = result[0]['setting_value']
-                self._cache[key] = value
-                return value
-            
-            return default_value
+    # ------------------------------------------------------------------
+    # الذاكرة المؤقتة
+    # ------------------------------------------------------------------
+    
+    def _read_version(self, cursor):
+        """رقم تغير القاعدة بالنسبة لهذا الاتصال (يتغير عند كتابة اتصال آخر)"""
+        cursor.execute("PRAGMA data_version")
+        return id(cursor.connection), cursor.fetchone()[0]
+    
+    def reload(self) -> Dict[str, str]:
+        """
+        تحميل كل الإعدادات باستعلام واحد، وإبلاغ المشتركين بما تغير
+        
+        Returns:
+            dict: الإعدادات التي تغيرت قيمها
+        """
+        with self._lock:
+            try:
+                with self.db.get_cursor() as cursor:
+                    cursor.execute("SELECT setting_key, setting_value FROM app_settings")
+                    settings = {row[0]: row[1] for row in cursor.fetchall()}
+                    self._version = self._read_version(cursor)
+            except Exception as e:
+                logging.error(f"خطأ في تحميل الإعدادات: {e}")
+                return {}
             
+            previous, first_load = self._cache, not self._loaded
+            self._cache, self._loaded = settings, True
+        
+        if first_load:
+            return {}
+        changed = {key: value for key, value in settings.items() if previous.get(key) != value}
+        changed.update({key: None for key in previous if key not in settings})
+        for key, value in changed.items():
+            self._notify(key, value)
+        return changed
+    
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.reload()
+    
+    def refresh_if_changed(self) -> bool:
+        """إعادة التحميل فقط إذا عدّلت عملية أخرى القاعدة منذ آخر تحميل"""
+        try:
+            with self.db.get_cursor() as cursor:
+                version = self._read_version(cursor)
         except Exception as e:
-            logging.error(f"خطأ في الحصول على الإعداد {key}: {e}")
-            return default_value
+            logging.error(f"خطأ في فحص تغير الإعدادات: {e}")
+            return False
+        if self._loaded and version == self._version:
+            return False
+        self.reload()
+        return True
+    
+    # ------------------------------------------------------------------
+    # الاشتراك في التغييرات
+    # ------------------------------------------------------------------
+    
+    def subscribe(self, callback: Callable[[str, Any], None], key: Optional[str] = None):
+        """
+        الاشتراك في تغيير إعداد (أو كل الإعدادات إذا لم يحدد المفتاح)
+        
+        الدوال المرتبطة بكائن تُحفظ بمرجع ضعيف، فلا يمنع الاشتراك حذف الويدجت
+        
+        Returns:
+            دالة لإلغاء الاشتراك
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        entry = (ref, key)
+        with self._lock:
+            self._listeners.append(entry)
+        
+        def unsubscribe():
+            with self._lock:
+                if entry in self._listeners:
+                    self._listeners.remove(entry)
+        return unsubscribe
+    
+    def _notify(self, key: str, value: Any):
+        with self._lock:
+            listeners = list(self._listeners)
+        for entry in listeners:
+            ref, wanted_key = entry
+            if wanted_key is not None and wanted_key != key:
+                continue
+            callback = ref()
+            if callback is None:
+                with self._lock:
+                    if entry in self._listeners:
+                        self._listeners.remove(entry)
+                continue
+            try:
+                callback(key, value)
+            except Exception as e:
+                logging.error(f"خطأ في إبلاغ مشترك بتغيير الإعداد {key}: {e}")
+    
+    # ------------------------------------------------------------------
+    # القراءة والكتابة
+    # ------------------------------------------------------------------
+    
+    def get_setting(self, key: str, default_value: Any = None) -> Any:
+        """الحصول على إعداد (من الذاكرة)"""
+        self._ensure_loaded()
+        return self._cache.get(key, default_value)
     
     def set_setting(self, key: str, value: Any) -> bool:
-        """تعيين إعداد في قاعدة البيانات"""
+        """تعيين إعداد في قاعدة البيانات وإبلاغ المشتركين"""
         try:
             query = """
                 INSERT OR REPLACE INTO app_settings (setting_key, setting_value, updated_at)
                 VALUES (?, ?, CURRENT_TIMESTAMP)
             """
             
-            affected_rows = db_manager.execute_update(query, (key, str(value)))
-            
-            if affected_rows >= 0:
-                # تحديث الكاش
+            self._ensure_loaded()
+            value = str(value)
+            with self._lock:
+                affected_rows = self.db.execute_update(query, (key, value))
+                if affected_rows < 0:
+                    return False
+                changed = self._cache.get(key) != value
                 self._cache[key] = value
-                logging.info(f"تم تحديث الإعداد {key}: {value}")
-                return True
             
-            return False
+            logging.info(f"تم تحديث الإعداد {key}: {value}")
+            if changed:
+                self._notify(key, value)
+            return True
             
         except Exception as e:
             logging.error(f"خطأ في تعيين الإعداد {key}: {e}")
@@ -85,38 +182,25 @@ class SettingsManager:
         return self.set_setting('mobile_app_password', password)
     
     def get_all_settings(self) -> Dict[str, Any]:
-        """الحصول على جميع الإعدادات"""
-        try:
-            query = "SELECT setting_key, setting_value FROM app_settings"
-            result = db_manager.execute_query(query)
-            
-            settings = {}
-            for row in result:
-                settings[row['setting_key']] = row['setting_value']
-            
-            # تحديث الكاش
-            self._cache.update(settings)
-            
-            return settings
-            
-        except Exception as e:
-            logging.error(f"خطأ في الحصول على جميع الإعدادات: {e}")
-            return {}
+        """الحصول على جميع الإعدادات (من الذاكرة)"""
+        self._ensure_loaded()
+        return dict(self._cache)
     
     def clear_cache(self):
-        """مسح كاش الإعدادات"""
-        self._cache.clear()
+        """إعادة تحميل الإعدادات من قاعدة البيانات"""
+        self.reload()
     
     def delete_setting(self, key: str) -> bool:
         """حذف إعداد من قاعدة البيانات"""
         try:
             query = "DELETE FROM app_settings WHERE setting_key = ?"
-            affected_rows = db_manager.execute_update(query, (key,))
+            with self._lock:
+                affected_rows = self.db.execute_update(query, (key,))
+                self._cache.pop(key, None)
             
             if affected_rows > 0:
-                # إزالة من الكاش
-                self._cache.pop(key, None)
                 logging.info(f"تم حذف الإعداد {key}")
+                self._notify(key, None)
                 return True
             
             return False
@@ -177,6 +261,11 @@ def set_app_setting(key: str, value: Any) -> bool:
     return settings_manager.set_setting(key, value)
 
 
+def subscribe_setting(callback: Callable[[str, Any], None], key: Optional[str] = None):
+    """دالة مساعدة للاشتراك في تغيير إعداد"""
+    return settings_manager.subscribe(callback, key)
+
+
 def get_mobile_password() -> str:
     """دالة مساعدة للحصول على كلمة مرور التطبيق المحمول"""
     return settings_manager.get_mobile_password()
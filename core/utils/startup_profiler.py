@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس زمن بدء التشغيل
+تحليل مخرجات `python -X importtime` إلى زمن استيراد كل وحدة (ذاتي وتراكمي)،
+ومقارنة زمن ظهور نافذة تسجيل الدخول بالميزانية المحددة في الإعدادات،
+مع التحقق من أن المكتبات الثقيلة (الطباعة و PDF) لم تُحمّل مبكراً
+
+الاستخدام من سطر الأوامر (يعيد رمز خروج 1 عند تجاوز الميزانية):
+    python -m core.utils.startup_profiler
+"""
+
+import logging
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+from core.utils.telemetry import telemetry
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+@dataclass
+class ImportTiming:
+    """زمن استيراد وحدة واحدة"""
+    module: str
+    self_ms: float
+    cumulative_ms: float
+    depth: int
+
+
+def parse_importtime(text: str) -> List[ImportTiming]:
+    """
+    تحليل مخرجات -X importtime، مثل:
+        import time:       412 |       1890 |   core.database.connection
+    """
+    timings = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # سطر العناوين
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        depth = (len(name) - len(stripped)) // 2
+        timings.append(ImportTiming(stripped, self_us / 1000, cumulative_us / 1000, depth))
+    return timings
+
+
+def profile_imports(modules: Iterable[str] = config.STARTUP_MODULES,
+                    python: Optional[str] = None) -> Tuple[List[ImportTiming], List[str]]:
+    """
+    استيراد الوحدات في عملية جديدة (بدء بارد) مع -X importtime
+
+    Returns:
+        tuple: (أزمنة الاستيراد, الوحدات الثقيلة المؤجلة التي حُمّلت)
+    """
+    modules = list(modules)
+    deferred = list(config.STARTUP_DEFERRED_MODULES)
+    script = (
+        "import sys\n"
+        f"for name in {modules!r}:\n"
+        "    __import__(name)\n"
+        f"print(','.join(m for m in {deferred!r} if m in sys.modules))\n"
+    )
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [python or sys.executable, "-X", "importtime", "-c", script],
+        cwd=str(PROJECT_ROOT), env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        last_line = (result.stderr.strip().splitlines() or [""])[-1]
+        raise RuntimeError(f"فشل استيراد وحدات بدء التشغيل: {last_line}")
+    loaded = [name for name in result.stdout.strip().split(",") if name]
+    return parse_importtime(result.stderr), loaded
+
+
+def total_import_ms(timings: List[ImportTiming]) -> float:
+    """الزمن الكلي للاستيراد (مجموع الأزمنة الذاتية)"""
+    return sum(t.self_ms for t in timings)
+
+
+def package_breakdown(timings: List[ImportTiming]) -> List[Dict]:
+    """تجميع الأزمنة الذاتية حسب الحزمة العليا (مثل PyQt5 أو core.printing) مرتبة تنازلياً"""
+    project_packages = {"core", "ui", "app"}
+    totals: Dict[str, List] = {}
+    for timing in timings:
+        parts = timing.module.split(".")
+        key = ".".join(parts[:2]) if parts[0] in project_packages else parts[0]
+        entry = totals.setdefault(key, [0, 0.0])
+        entry[0] += 1
+        entry[1] += timing.self_ms
+    breakdown = [{'package': key, 'modules': count, 'self_ms': ms} for key, (count, ms) in totals.items()]
+    breakdown.sort(key=lambda b: b['self_ms'], reverse=True)
+    return breakdown
+
+
+def format_report(timings: List[ImportTiming], loaded_deferred: List[str] = (),
+                  limit: int = 25) -> str:
+    """تقرير نصي: الحزم الأثقل ثم الوحدات الأبطأ تراكمياً"""
+    total = total_import_ms(timings)
+    budget = config.STARTUP_IMPORT_BUDGET_MS
+    lines = [f"زمن استيراد وحدات بدء التشغيل: {total:.1f} ms (الميزانية {budget} ms)", "", "حسب الحزمة:"]
+    for entry in package_breakdown(timings)[:limit]:
+        lines.append(f"  {entry['self_ms']:9.1f} ms  {entry['modules']:4d} وحدة  {entry['package']}")
+    lines += ["", "أبطأ الوحدات (تراكمي):"]
+    for timing in sorted(timings, key=lambda t: t.cumulative_ms, reverse=True)[:limit]:
+        lines.append(f"  {timing.cumulative_ms:9.1f} ms  {timing.self_ms:8.1f} ms  {timing.module}")
+    if loaded_deferred:
+        lines += ["", f"مكتبات ثقيلة حُمّلت مبكراً: {', '.join(loaded_deferred)}"]
+    return "\n".join(lines)
+
+
+def loaded_deferred_modules() -> List[str]:
+    """المكتبات الثقيلة المحمّلة حالياً في العملية من قائمة المؤجلات"""
+    return [name for name in config.STARTUP_DEFERRED_MODULES if name in sys.modules]
+
+
+def report_startup(started_at: float, stage: str = "login_window") -> float:
+    """
+    تسجيل الزمن من بدء العملية حتى مرحلة معينة ومقارنته بالميزانية
+
+    Args:
+        started_at: قيمة time.perf_counter() في أول سطر من main.py
+    """
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    telemetry.record(f"startup.{stage}", elapsed_ms)
+    if elapsed_ms > config.STARTUP_BUDGET_MS:
+        logging.warning(f"بدء التشغيل حتى {stage} استغرق {elapsed_ms:.0f} ms "
+                        f"(الميزانية {config.STARTUP_BUDGET_MS} ms)")
+    else:
+        logging.info(f"بدء التشغيل حتى {stage}: {elapsed_ms:.0f} ms")
+    loaded = loaded_deferred_modules()
+    if loaded:
+        logging.warning(f"مكتبات ثقيلة حُمّلت قبل {stage}: {', '.join(loaded)}")
+    return elapsed_ms
+
+
+def main() -> int:
+    timings, loaded = profile_imports()
+    print(format_report(timings, loaded))
+    over_budget = total_import_ms(timings) > config.STARTUP_IMPORT_BUDGET_MS
+    return 1 if over_budget or loaded else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
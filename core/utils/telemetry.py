@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+قياس أداء التطبيق أثناء التشغيل
+مقاطع زمنية (spans) عبر مدير سياق أو مزخرف، تُحفظ عيناتها في مخزن دائري
+في الذاكرة مع إحصائيات استعلامات قاعدة البيانات، ويمكن تصديرها إلى ملف
+"""
+
+import functools
+import inspect
+import json
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import config
+
+
+# بادئات دوال الصفحات التي تُقاس تلقائياً
+HOT_METHOD_PREFIXES = ("load_", "fill_", "populate_", "update_stats", "update_summary")
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Telemetry:
+    """مجمع عينات الأداء"""
+
+    def __init__(self, capacity: int = config.TELEMETRY_BUFFER_SIZE,
+                 enabled: bool = config.TELEMETRY_ENABLED):
+        self.enabled = enabled
+        self._samples = deque(maxlen=capacity)
+        self._statements: Dict[str, List[float]] = {}
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # التسجيل
+    # ------------------------------------------------------------------
+
+    def record(self, name: str, duration_ms: float, ok: bool = True):
+        """إضافة عينة زمنية لمقطع"""
+        if not self.enabled:
+            return
+        sample = (name, time.time(), duration_ms, ok, threading.current_thread().name)
+        with self._lock:
+            self._samples.append(sample)
+
+    @contextmanager
+    def span(self, name: str):
+        """قياس زمن كتلة كود: with telemetry.span("students.load"): ..."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        ok = True
+        try:
+            yield
+        except BaseException:
+            ok = False
+            raise
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000, ok)
+
+    def timed(self, name: Optional[str] = None):
+        """مزخرف لقياس زمن دالة (الاسم الافتراضي: Class.method)"""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                ok = True
+                try:
+                    return func(*args, **kwargs)
+                except BaseException:
+                    ok = False
+                    raise
+                finally:
+                    self.record(span_name, (time.perf_counter() - start) * 1000, ok)
+            return wrapper
+        return decorator
+
+    def record_statement(self, sql: str, duration_ms: float):
+        """تجميع زمن استعلام قاعدة بيانات حسب نصه"""
+        if not self.enabled:
+            return
+        key = _WHITESPACE.sub(" ", sql).strip()[:300]
+        with self._lock:
+            entry = self._statements.get(key)
+            if entry is None:
+                self._statements[key] = [1, duration_ms, duration_ms]
+            else:
+                entry[0] += 1
+                entry[1] += duration_ms
+                entry[2] = max(entry[2], duration_ms)
+
+    def count(self, name: str, amount: int = 1):
+        """زيادة عداد باسمه (مثل إصابات الذاكرة المؤقتة)"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._statements.clear()
+            self._counters.clear()
+
+    # ------------------------------------------------------------------
+    # الإحصائيات
+    # ------------------------------------------------------------------
+
+    def span_stats(self) -> List[Dict]:
+        """إحصائيات كل مقطع (العدد، p50، p95، الأقصى، الإجمالي) مرتبة حسب الإجمالي"""
+        with self._lock:
+            samples = list(self._samples)
+        durations: Dict[str, List[float]] = {}
+        errors: Dict[str, int] = {}
+        for name, _, duration_ms, ok, _ in samples:
+            durations.setdefault(name, []).append(duration_ms)
+            if not ok:
+                errors[name] = errors.get(name, 0) + 1
+
+        stats = []
+        for name, values in durations.items():
+            values.sort()
+            stats.append({
+                'name': name,
+                'count': len(values),
+                'p50': _percentile(values, 0.50),
+                'p95': _percentile(values, 0.95),
+                'max': values[-1],
+                'total': sum(values),
+                'errors': errors.get(name, 0),
+            })
+        stats.sort(key=lambda s: s['total'], reverse=True)
+        return stats
+
+    def statement_stats(self, limit: int = 50) -> List[Dict]:
+        """أكثر استعلامات قاعدة البيانات استهلاكاً للوقت"""
+        with self._lock:
+            items = [(sql, list(entry)) for sql, entry in self._statements.items()]
+        stats = [{'sql': sql, 'count': int(count), 'total': total, 'average': total / count, 'max': maximum}
+                 for sql, (count, total, maximum) in items]
+        stats.sort(key=lambda s: s['total'], reverse=True)
+        return stats[:limit]
+
+    def counter_stats(self) -> Dict[str, int]:
+        """قيم العدادات الحالية"""
+        with self._lock:
+            return dict(self._counters)
+
+    def export(self, path=None) -> Path:
+        """تصدير العينات والإحصائيات إلى ملف JSON lines"""
+        path = Path(path or config.LOGS_DIR / f"telemetry_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl")
+        with self._lock:
+            samples = list(self._samples)
+        with open(path, "w", encoding="utf-8") as f:
+            for name, started, duration_ms, ok, thread in samples:
+                f.write(json.dumps({
+                    "type": "sample", "name": name,
+                    "ts": datetime.fromtimestamp(started).isoformat(timespec="milliseconds"),
+                    "ms": round(duration_ms, 3), "ok": ok, "thread": thread
+                }, ensure_ascii=False) + "\n")
+            for stat in self.span_stats():
+                f.write(json.dumps({"type": "span", **stat}, ensure_ascii=False) + "\n")
+            for stat in self.statement_stats(limit=1000):
+                f.write(json.dumps({"type": "statement", **stat}, ensure_ascii=False) + "\n")
+            for name, value in sorted(self.counter_stats().items()):
+                f.write(json.dumps({"type": "counter", "name": name, "value": value}, ensure_ascii=False) + "\n")
+        return path
+
+
+# مثيل مشترك
+telemetry = Telemetry()
+
+
+def span(name: str):
+    """قياس زمن كتلة كود عبر المجمع المشترك"""
+    return telemetry.span(name)
+
+
+def timed(name: Optional[str] = None):
+    """مزخرف لقياس زمن دالة عبر المجمع المشترك"""
+    return telemetry.timed(name)
+
+
+def _positional_limit(func) -> Optional[int]:
+    """عدد المعاملات الموضعية التي تقبلها الدالة (None إذا كانت تقبل *args)"""
+    try:
+        parameters = inspect.signature(func).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        return None
+    return sum(1 for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+
+
+def instrument_methods(*prefixes: str):
+    """
+    مزخرف صنف يقيس كل دوال الصنف التي تبدأ بإحدى البادئات
+
+    الدالة المغلفة تحتفظ بعدد معاملاتها الأصلي، فتُسقط المعاملات الزائدة كما
+    يفعل PyQt عند ربط إشارة مثل clicked(bool) بدالة بلا معاملات
+    """
+    prefixes = prefixes or HOT_METHOD_PREFIXES
+
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if not inspect.isfunction(value) or not attr.startswith(prefixes):
+                continue
+            limit = _positional_limit(value)
+            timed_func = telemetry.timed(f"{cls.__name__}.{attr}")(value)
+
+            @functools.wraps(value)
+            def wrapper(*args, _func=timed_func, _limit=limit, **kwargs):
+                if _limit is not None:
+                    args = args[:_limit]
+                return _func(*args, **kwargs)
+
+            setattr(cls, attr, wrapper)
+        return cls
+    return decorator
@@ -4,6 +4,10 @@
 نقطة البداية الرئيسية لتطبيق حسابات المدارس الأهلية
 """
 
+# بداية قياس زمن بدء التشغيل (انظر core/utils/startup_profiler.py)
+import time
+_STARTUP_STARTED_AT = time.perf_counter()
+
 # CRITICAL: Apply hashlib patch FIRST before any other imports
 import hashlib_patch
 
@@ -50,6 +54,7 @@ import config
 from core.utils.logger import setup_logging
 from core.database.connection import DatabaseManager
 from core.auth.login_manager import AuthManager
+from core.utils.startup_profiler import report_startup
 from ui.auth.login_window import LoginWindow
 from app.main_window import MainWindow
 
@@ -278,6 +283,7 @@ class SchoolAccountingApp:
             
             # عرض نافذة تسجيل الدخول
             self.login_window = LoginWindow()
+            report_startup(_STARTUP_STARTED_AT, "login_window")
             
             if self.login_window.exec_() == self.login_window.Accepted:
                 logging.info("تم تسجيل الدخول بنجاح")
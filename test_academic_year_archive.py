@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار أرشفة الأعوام الدراسية في ملفات مستقلة وإرفاقها للتقارير
+"""
+
+import sys
+import sqlite3
+import stat
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.database.archive import (
+    archive_academic_year, archivable_years, attach_archives, attached_archives,
+    detach_archives, list_archives, student_history, yearly_summary
+)
+
+
+CURRENT_YEAR = "2025 - 2026"
+
+
+def _seed():
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO schools (name_ar, school_types) VALUES (?, ?)", ("مدرسة النور", "ابتدائية"))
+        school_id = cursor.lastrowid
+        for name, national_id, year, fee, paid in [
+            ("علي", "111", "2023 - 2024", 1000, 600),
+            ("علي", "111", "2024 - 2025", 1200, 1200),
+            ("علي", "111", CURRENT_YEAR, 1500, 500),
+            ("سارة", "222", "2024 - 2025", 1100, 0),
+        ]:
+            cursor.execute("""
+                INSERT INTO students (name, national_id_number, school_id, grade, section, academic_year,
+                                      gender, total_fee, start_date)
+                VALUES (?, ?, ?, 'الأول', 'أ', ?, 'ذكر', ?, '2024-09-01')
+            """, (name, national_id, school_id, year, fee))
+            if paid:
+                cursor.execute("""
+                    INSERT INTO installments (student_id, amount, payment_date, payment_time)
+                    VALUES (?, ?, '2024-10-01', '10:00')
+                """, (cursor.lastrowid, paid))
+            cursor.execute("INSERT INTO additional_fees (student_id, fee_type, amount) VALUES "
+                           "((SELECT MAX(id) FROM students), 'كتب', 50)")
+            cursor.execute("""
+                INSERT INTO installment_plans (student_id, sequence, due_date, amount, cumulative_amount)
+                VALUES ((SELECT MAX(id) FROM students), 1, '2024-10-15', ?, ?)
+            """, (fee, fee))
+
+
+def _count(table):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM main.{table}")
+        return cursor.fetchone()[0]
+
+
+def test_archive_moves_closed_year_out_of_live_database():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "live.db"
+        db_manager.create_tables()
+        _seed()
+        root = Path(temp_dir) / "archives"
+
+        assert archivable_years(current_year=CURRENT_YEAR) == ["2023 - 2024", "2024 - 2025"]
+        assert not archive_academic_year(CURRENT_YEAR, root=root, current_year=CURRENT_YEAR)[0]
+
+        success, message = archive_academic_year("2024 - 2025", root=root, current_year=CURRENT_YEAR)
+        print(f"✅ {message}")
+        assert success
+        assert _count("students") == 2 and _count("installments") == 2 and _count("additional_fees") == 2
+        # جداول الاستحقاق تُنقل للأرشيف ولا تُحذف بالحذف المتتالي، ولا تبقى مجاميع دفعات يتيمة
+        assert _count("installment_plans") == 2
+        with db_manager.get_cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM main.student_payment_totals "
+                           "WHERE student_id NOT IN (SELECT id FROM main.students)")
+            assert cursor.fetchone()[0] == 0
+        archived = sqlite3.connect(str(Path(root) / "year_2024_2025.db"))
+        try:
+            assert archived.execute("SELECT COUNT(*) FROM installment_plans").fetchone()[0] == 2
+            assert dict(archived.execute("SELECT key, value FROM archive_info").fetchall())[
+                "installment_plans_count"] == "2"
+        finally:
+            archived.close()
+        assert not archive_academic_year("2024 - 2025", root=root, current_year=CURRENT_YEAR)[0]
+        assert archive_academic_year("2023 - 2024", root=root, current_year=CURRENT_YEAR)[0]
+        assert _count("students") == 1
+        assert _count("installment_plans") == 1 and _count("student_payment_totals") == 1
+
+        archives = list_archives(root)
+        assert [a['academic_year'] for a in archives] == ["2024 - 2025", "2023 - 2024"]
+        assert not archives[0]['path'].stat().st_mode & stat.S_IWUSR
+
+        # الأرشيف للقراءة فقط بعد إرفاقه
+        attach_archives(root=root)
+        assert sorted(attached_archives()) == ["archive_2023_2024", "archive_2024_2025"]
+        try:
+            with db_manager.get_cursor() as cursor:
+                cursor.execute("DELETE FROM archive_2024_2025.students")
+            raise AssertionError("الأرشيف يجب أن يكون للقراءة فقط")
+        except sqlite3.OperationalError:
+            pass
+
+        summary = {row['academic_year']: row for row in yearly_summary(root=root)}
+        print(f"✅ ملخص الأعوام: {sorted(summary)}")
+        assert summary["2024 - 2025"]['students'] == 2
+        assert summary["2024 - 2025"]['total_paid'] == 1200
+        assert summary[CURRENT_YEAR]['source'] == "main"
+
+        history = student_history(national_id_number="111", root=root)
+        print(f"✅ سجل الطالب: {[(h['academic_year'], h['paid']) for h in history]}")
+        assert [h['academic_year'] for h in history] == [CURRENT_YEAR, "2024 - 2025", "2023 - 2024"]
+        assert [h['paid'] for h in history] == [500, 1200, 600]
+        assert history[-1]['school_name'] == "مدرسة النور"
+
+        detach_archives()
+        assert attached_archives() == []
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_archive_moves_closed_year_out_of_live_database()
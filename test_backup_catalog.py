@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار فهرس النسخ الاحتياطية المحلي: المطابقة مع المخزن والعرض على صفحات
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.backup.storage import LocalStorage
+from core.backup.catalog import BackupCatalog
+from core.backup.incremental import IncrementalBackup, LocalChunkStore
+from core.backup.backup_manager import BackupManager
+
+
+def _write_backups(storage, count):
+    start = datetime(2026, 1, 1, 8, 0, 0)
+    for i in range(count):
+        name = f"backup_{(start + timedelta(hours=i)).strftime('%Y%m%d_%H%M%S')}.zip"
+        with open(storage.object_path("manual", name), "wb") as f:
+            f.write(b"x" * (i + 1))
+
+
+def test_catalog_reconcile_and_paging():
+    """المطابقة تملأ الفهرس، والعرض يتم على صفحات من الأحدث إلى الأقدم"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage = LocalStorage(temp_dir)
+        _write_backups(storage, 120)
+        catalog = BackupCatalog(os.path.join(temp_dir, "catalog.db"))
+        manager = BackupManager(storage, IncrementalBackup(LocalChunkStore(temp_dir)), catalog=catalog)
+
+        assert manager.list_cached_backups() == []
+        changed, message = manager.reconcile_catalog()
+        print(f"✅ {message}")
+        assert changed and manager.count_cached_backups() == 120
+
+        first = manager.list_cached_backups(0, 50)
+        second = manager.list_cached_backups(50, 50)
+        assert len(first) == len(second) == 50
+        assert first[0]['created_at'] > first[-1]['created_at'] > second[0]['created_at']
+
+        # الحذف يحدث الفهرس مباشرة، والمطابقة التالية لا تجد فرقاً
+        assert manager.delete_backup(first[0]['path'])[0]
+        assert manager.count_cached_backups() == 119
+        changed, _ = manager.reconcile_catalog()
+        assert not changed
+
+        # ملف حذف من خارج التطبيق يزال من الفهرس عند المطابقة
+        os.unlink(second[0]['path'])
+        changed, message = manager.reconcile_catalog()
+        print(f"✅ {message}")
+        assert changed and manager.count_cached_backups() == 118
+        catalog.close()
+
+
+if __name__ == "__main__":
+    test_catalog_reconcile_and_paging()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار خط النسخ الاحتياطي المتدفق مع خادم تخزين محلي بديل (بروتوكول TUS)
+"""
+
+import sys
+import os
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.backup.pipeline import (
+    FileSink, TusUploadSink, available_codecs, backup_extension,
+    decompress_backup, run_pipeline
+)
+
+
+class _TusHandler(BaseHTTPRequestHandler):
+    """خادم TUS مصغر يحفظ الرفع في الذاكرة ويسجل أحجام الدفعات"""
+
+    uploads = {}
+    patch_sizes = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        upload_id = str(len(self.uploads) + 1)
+        self.uploads[upload_id] = bytearray()
+        self.send_response(201)
+        self.send_header("Location", f"/upload/{upload_id}")
+        self.send_header("Tus-Resumable", "1.0.0")
+        self.end_headers()
+
+    def do_PATCH(self):
+        upload = self.uploads[self.path.rsplit("/", 1)[-1]]
+        assert int(self.headers["Upload-Offset"]) == len(upload)
+        data = self.rfile.read(int(self.headers["Content-Length"]))
+        upload.extend(data)
+        self.patch_sizes.append(len(data))
+        if "Upload-Length" in self.headers:
+            assert int(self.headers["Upload-Length"]) == len(upload)
+        self.send_response(204)
+        self.send_header("Upload-Offset", str(len(upload)))
+        self.end_headers()
+
+
+def _create_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload BLOB)")
+    conn.executemany("INSERT INTO items (payload) VALUES (?)",
+                     [(os.urandom(64) + b"a" * 400,) for _ in range(6000)])
+    conn.commit()
+    conn.close()
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_pipeline_to_local_files():
+    """كل طرق الضغط المتاحة تعيد اللقطة نفسها بعد فك الضغط"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "snapshot.db")
+        _create_database(db_path)
+        for codec in available_codecs():
+            target = os.path.join(temp_dir, f"backup_test{backup_extension(codec)}")
+            stats = run_pipeline(db_path, FileSink(target), codec=codec, level=3,
+                                 info_text="test", read_size=64 * 1024, queue_depth=2)
+            restored = os.path.join(temp_dir, f"restored_{codec}.db")
+            decompress_backup(target, restored)
+            print(f"✅ {stats.summary()}")
+            assert _file_hash(restored) == _file_hash(db_path)
+            assert stats.output_bytes == os.path.getsize(target)
+
+
+def test_pipeline_chunked_upload():
+    """الرفع يتم على دفعات بالحجم المحدد إلى خادم TUS محلي"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _TusHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_path = os.path.join(temp_dir, "snapshot.db")
+            _create_database(db_path)
+            endpoint = f"http://127.0.0.1:{server.server_address[1]}/files"
+            sink = TusUploadSink(endpoint, "bucket", "backups/org/backup_test.db.gz",
+                                 chunk_size=256 * 1024)
+            stats = run_pipeline(db_path, sink, codec="gzip", level=1, read_size=128 * 1024)
+
+            uploaded = os.path.join(temp_dir, "uploaded.db.gz")
+            with open(uploaded, "wb") as f:
+                f.write(bytes(_TusHandler.uploads["1"]))
+            restored = os.path.join(temp_dir, "restored.db")
+            decompress_backup(uploaded, restored)
+            print(f"✅ رفع مجزأ: {len(_TusHandler.patch_sizes)} دفعة - {stats.summary()}")
+            assert _file_hash(restored) == _file_hash(db_path)
+            assert len(_TusHandler.patch_sizes) > 1
+            assert max(_TusHandler.patch_sizes) <= 256 * 1024
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_pipeline_to_local_files()
+    test_pipeline_chunked_upload()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار الاستعادة داخل التطبيق: الفحص المسبق والاستبدال المرحلي والمعاينة الجانبية
+"""
+
+import sys
+import os
+import sqlite3
+import stat
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import config
+from core.database.connection import db_manager, SCHEMA_VERSION
+from core.backup.pipeline import FileSink, backup_extension, run_pipeline
+from core.backup.restore import check_database_file, restore_from_file
+from core.backup.storage import LocalStorage
+from core.backup.catalog import BackupCatalog
+from core.backup.incremental import IncrementalBackup, LocalChunkStore
+from core.backup.backup_manager import BackupManager
+from core.database.archive import archive_academic_year, list_archives
+
+
+def _use_database(path):
+    db_manager.close_connection()
+    db_manager.db_path = Path(path)
+    db_manager.create_tables()
+
+
+def _school_names():
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("SELECT name_ar FROM schools ORDER BY id")
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _add_school(name):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO schools (name_ar, school_types) VALUES (?, ?)", (name, "ابتدائية"))
+
+
+def test_restore_archive_replaces_live_database():
+    """استعادة أرشيف مضغوط تعيد البيانات كما كانت وقت النسخ"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _use_database(os.path.join(temp_dir, "live.db"))
+        _add_school("مدرسة أ")
+        db_manager.close_connection()
+
+        archive = os.path.join(temp_dir, "backup_20260101_080000.zip")
+        run_pipeline(str(db_manager.db_path), FileSink(archive), codec="zip")
+
+        _add_school("مدرسة ب")
+        assert _school_names() == ["مدرسة أ", "مدرسة ب"]
+
+        assert db_manager.restore_database(archive)
+        print(f"✅ المدارس بعد الاستعادة: {_school_names()}")
+        assert _school_names() == ["مدرسة أ"]
+        assert os.path.exists(f"{db_manager.db_path}.before_restore")
+        db_manager.close_connection()
+
+
+def test_preflight_rejects_bad_backups():
+    """رفض نسخة من إصدار مخطط أحدث ونسخة بلا جداول أساسية"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        newer = os.path.join(temp_dir, "newer.db")
+        conn = sqlite3.connect(newer)
+        for table in ("schools", "students", "installments"):
+            conn.execute(f"CREATE TABLE {table} (id INTEGER PRIMARY KEY)")
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION + 1}")
+        conn.commit()
+        conn.close()
+        success, message = check_database_file(newer)
+        print(f"✅ {message}")
+        assert not success
+
+        empty = os.path.join(temp_dir, "empty.db")
+        sqlite3.connect(empty).execute("CREATE TABLE other (id INTEGER)").connection.close()
+        assert not check_database_file(empty)[0]
+
+        _use_database(os.path.join(temp_dir, "live.db"))
+        _add_school("مدرسة أ")
+        assert not restore_from_file(empty)[0]
+        assert _school_names() == ["مدرسة أ"]
+        db_manager.close_connection()
+
+
+def test_inspect_backup_as_side_database():
+    """المعاينة ترفق النسخة كقاعدة جانبية دون تعديل البيانات الحية"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        _use_database(os.path.join(temp_dir, "live.db"))
+        _add_school("مدرسة قديمة")
+        db_manager.close_connection()
+
+        storage = LocalStorage(os.path.join(temp_dir, "backups"))
+        sink = storage.open_writer("manual", "backup_20260101_080000.db.gz")
+        run_pipeline(str(db_manager.db_path), sink, codec="gzip")
+        backup_path = storage.object_path("manual", "backup_20260101_080000.db.gz")
+
+        _add_school("مدرسة جديدة")
+        catalog = BackupCatalog(os.path.join(temp_dir, "catalog.db"))
+        manager = BackupManager(storage, IncrementalBackup(LocalChunkStore(os.path.join(temp_dir, "backups"))),
+                                catalog=catalog)
+        success, message = manager.open_backup_for_inspection(backup_path)
+        print(f"✅ {message}")
+        assert success
+
+        with db_manager.get_cursor() as cursor:
+            cursor.execute("SELECT name_ar FROM restored.schools")
+            assert [row[0] for row in cursor.fetchall()] == ["مدرسة قديمة"]
+        assert _school_names() == ["مدرسة قديمة", "مدرسة جديدة"]
+        db_manager.close_connection()
+        catalog.close()
+
+
+def test_year_archives_are_backed_up_and_restored():
+    """ملف أرشيف العام يُرفع مرة واحدة مع النسخة ويُستعاد معها عند فقدانه"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        live_path = Path(temp_dir) / "live.db"
+        archive_dir = Path(temp_dir) / "archives"
+        _use_database(live_path)
+        with db_manager.get_cursor() as cursor:
+            cursor.execute("INSERT INTO schools (name_ar, school_types) VALUES ('مدرسة النور', 'ابتدائية')")
+            cursor.execute("""
+                INSERT INTO students (name, school_id, grade, section, academic_year, gender, total_fee, start_date)
+                VALUES ('علي', last_insert_rowid(), 'الأول', 'أ', '2023 - 2024', 'ذكر', 1000, '2023-09-01')
+            """)
+        original = (config.DATABASE_PATH, config.ARCHIVE_DIR)
+        config.DATABASE_PATH, config.ARCHIVE_DIR = live_path, archive_dir
+        storage = LocalStorage(os.path.join(temp_dir, "remote"))
+        catalog = BackupCatalog(os.path.join(temp_dir, "catalog.db"))
+        manager = BackupManager(storage, IncrementalBackup(LocalChunkStore(os.path.join(temp_dir, "backups")),
+                                                           live_path), catalog=catalog)
+        try:
+            assert archive_academic_year("2023 - 2024", current_year="2025 - 2026", vacuum=False)[0]
+            assert manager.create_backup("بعد الأرشفة")[0]
+            uploaded = storage.list_files("archives")
+            assert [item['name'] for item in uploaded] == ["year_2023_2024.db" + backup_extension(config.BACKUP_CODEC)]
+            modified = os.path.getmtime(uploaded[0]['path'])
+
+            _add_school("مدرسة ب")
+            assert manager.create_backup("ثانية")[0]
+            assert len(storage.list_files("archives")) == 1
+            assert os.path.getmtime(uploaded[0]['path']) == modified
+            print("✅ رفع أرشيف العام مرة واحدة")
+
+            backup_path = manager.list_backups()[-1]['path']
+            archive_file = archive_dir / "year_2023_2024.db"
+            os.chmod(archive_file, stat.S_IWUSR | stat.S_IRUSR)
+            archive_file.unlink()
+            success, message = manager.restore_backup(backup_path)
+            print(f"✅ {message}")
+            assert success and archive_file.exists()
+            assert not archive_file.stat().st_mode & stat.S_IWUSR
+            assert [a['academic_year'] for a in list_archives()] == ["2023 - 2024"]
+            assert list_archives()[0]['students'] == 1
+        finally:
+            config.DATABASE_PATH, config.ARCHIVE_DIR = original
+            db_manager.close_connection()
+            catalog.close()
+
+
+if __name__ == "__main__":
+    test_restore_archive_replaces_live_database()
+    test_preflight_rejects_bad_backups()
+    test_inspect_backup_as_side_database()
+    test_year_archives_are_backed_up_and_restored()
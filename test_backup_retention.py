@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار سياسة الاحتفاظ بالنسخ (الجد - الأب - الابن) مع المخزن المحلي
+"""
+
+import sys
+import os
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.backup.retention import RetentionPolicy, plan_retention
+from core.backup.storage import LocalStorage
+from core.backup.incremental import IncrementalBackup, LocalChunkStore
+from core.backup.catalog import BackupCatalog
+from core.backup.backup_manager import BackupManager
+
+
+NOW = datetime(2026, 10, 19, 12, 0, 0)  # يوم اثنين
+
+
+def _daily_history(days):
+    """نسختان يومياً لعدد من الأيام السابقة"""
+    backups = []
+    for day in range(days):
+        for hour in (9, 18):
+            moment = (NOW - timedelta(days=day)).replace(hour=hour)
+            if moment <= NOW:
+                backups.append({'created_at': moment, 'category': 'daily'})
+    return backups
+
+
+def test_plan_keeps_one_per_day_week_and_month():
+    """نسخة لكل يوم حديث، وترقية نسخة لكل أسبوع منتهٍ، وحذف الباقي"""
+    backups = _daily_history(120)
+    policy = RetentionPolicy(daily=7, weekly=4, monthly=3, manual=2)
+    promote, delete = plan_retention(backups, policy, NOW)
+
+    kept = [b for b in backups if all(b is not d for d in delete)]
+    promoted_weeks = {b['created_at'].isocalendar()[:2] for b in promote}
+    print(f"✅ ترقية {len(promote)} وحذف {len(delete)} من {len(backups)}")
+    assert len(promoted_weeks) == len(promote) == 4 + 3
+    assert len(kept) - len(promote) <= 7
+    # أحدث نسخة لا تحذف أبداً
+    assert all(d['created_at'] != NOW.replace(hour=9) for d in delete)
+
+
+def test_manual_backups_are_capped():
+    manual = [{'created_at': NOW - timedelta(hours=h), 'category': 'manual'} for h in range(5)]
+    _, delete = plan_retention(manual, RetentionPolicy(manual=3), NOW)
+    print(f"✅ حذف {len(delete)} نسخة يدوية زائدة")
+    assert [d['created_at'] for d in delete] == [NOW - timedelta(hours=3), NOW - timedelta(hours=4)]
+
+
+def test_apply_retention_on_local_storage():
+    """التطبيق على مجلدات النسخ المحلية: ترقية إلى weekly وحذف الزائد"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        storage = LocalStorage(temp_dir)
+        for backup in _daily_history(21):
+            name = f"backup_{backup['created_at'].strftime('%Y%m%d_%H%M%S')}.zip"
+            with open(storage.object_path("daily", name), "wb") as f:
+                f.write(b"x")
+
+        incremental = IncrementalBackup(LocalChunkStore(temp_dir), os.path.join(temp_dir, "db.sqlite"))
+        catalog = BackupCatalog(os.path.join(temp_dir, "catalog.db"))
+        manager = BackupManager(storage, incremental, RetentionPolicy(daily=3, weekly=2, monthly=0), catalog)
+        success, message = manager.apply_retention(now=NOW)
+        print(f"✅ {message}")
+        assert success
+
+        daily = manager.list_backups("daily")
+        weekly = manager.list_backups("weekly")
+        assert len({b['created_at'].date() for b in daily}) == len(daily) == 3
+        assert len(weekly) == 2
+        assert all(b['created_at'].isocalendar()[:2] != NOW.isocalendar()[:2] for b in weekly)
+        catalog.close()
+
+
+if __name__ == "__main__":
+    test_plan_keeps_one_per_day_week_and_month()
+    test_manual_backups_are_capped()
+    test_apply_retention_on_local_storage()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار خدمة النسخ الاحتياطي في الخلفية: الطابور وحفظ الحالة والاستئناف
+"""
+
+import sys
+import os
+import json
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.backup.backup_service import BackupService, JOB_DONE, JOB_RUNNING
+
+
+def test_exit_job_runs_after_shutdown():
+    """مهمة الخروج تكتمل في الخلفية بعد طلب الإيقاف"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        release = threading.Event()
+        ran = []
+
+        def runner(job):
+            release.wait(5)
+            ran.append(job.kind)
+            return True, "ok"
+
+        service = BackupService(runner, os.path.join(temp_dir, "jobs.json"),
+                                periodic_interval=0, idle_seconds=0)
+        service.start()
+        service.submit("exit")
+        service.shutdown(wait=False)
+        assert service.is_running()
+
+        release.set()
+        service.shutdown(wait=True, timeout=5)
+        print(f"✅ المهام المنفذة: {ran}")
+        assert ran == ["exit"]
+
+
+def test_interrupted_job_resumes_on_next_start():
+    """مهمة انقطعت أثناء التنفيذ تُستأنف عند التشغيل التالي"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        state_path = os.path.join(temp_dir, "jobs.json")
+        with open(state_path, "w", encoding="utf-8") as f:
+            json.dump({"jobs": [{"kind": "exit", "id": "abc", "status": JOB_RUNNING, "attempts": 1}]}, f)
+
+        ran = []
+        service = BackupService(lambda job: (ran.append(job.id) or True, "ok"), state_path,
+                                periodic_interval=0, idle_seconds=0)
+        service.start()
+        service.shutdown(wait=True, timeout=5)
+
+        with open(state_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        print(f"✅ تم استئناف: {ran}")
+        assert ran == ["abc"]
+        assert saved["jobs"][0]["status"] == JOB_DONE
+
+
+def test_idle_snapshot_is_scheduled():
+    """أخذ نسخة عند الخمول مرة واحدة حتى يعود النشاط"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        done = threading.Event()
+        kinds = []
+
+        def runner(job):
+            kinds.append(job.kind)
+            done.set()
+            return True, "ok"
+
+        service = BackupService(runner, os.path.join(temp_dir, "jobs.json"),
+                                periodic_interval=0, idle_seconds=1)
+        service.start()
+        assert done.wait(10)
+        service.shutdown(wait=True, timeout=5)
+        print(f"✅ نسخ الخمول: {kinds}")
+        assert kinds == ["idle"]
+
+
+if __name__ == "__main__":
+    test_exit_job_runs_after_shutdown()
+    test_interrupted_job_resumes_on_next_start()
+    test_idle_snapshot_is_scheduled()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار اللقطة المتسقة لقاعدة البيانات عبر واجهة النسخ الاحتياطي في SQLite
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.backup.snapshot import create_snapshot, verify_snapshot, create_verified_snapshot
+
+
+def _create_source(db_path, rows_count):
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload TEXT)")
+    conn.executemany("INSERT INTO items (payload) VALUES (?)",
+                     [("x" * 200,) for _ in range(rows_count)])
+    conn.commit()
+    return conn
+
+
+def test_snapshot_with_open_transaction():
+    """اللقطة لا تتضمن معاملة غير مكتملة على الاتصال الرئيسي"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source.db")
+        snapshot_path = os.path.join(temp_dir, "snapshot.db")
+        conn = _create_source(source_path, 2000)
+        conn.execute("INSERT INTO items (payload) VALUES ('uncommitted')")
+
+        progress = []
+        success, message = create_verified_snapshot(
+            snapshot_path, source_path, pages_per_step=16, step_pause=0,
+            progress_callback=lambda done, total: progress.append((done, total))
+        )
+        conn.rollback()
+        conn.close()
+        print(f"✅ {message} - عدد الخطوات: {len(progress)}")
+        assert success
+        assert len(progress) > 1
+        assert progress[-1][0] == progress[-1][1]
+
+        snapshot = sqlite3.connect(snapshot_path)
+        count = snapshot.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        snapshot.close()
+        assert count == 2000
+
+
+def test_verify_detects_corruption():
+    """فحص السلامة يرفض ملفاً تالفاً"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source_path = os.path.join(temp_dir, "source.db")
+        snapshot_path = os.path.join(temp_dir, "snapshot.db")
+        _create_source(source_path, 500).close()
+        assert create_snapshot(snapshot_path, source_path, step_pause=0)[0]
+
+        with open(snapshot_path, "r+b") as f:
+            f.seek(4096 * 2)
+            f.write(b"\xff" * 4096)
+
+        success, message = verify_snapshot(snapshot_path)
+        print(f"✅ {message}")
+        assert not success
+
+
+if __name__ == "__main__":
+    test_snapshot_with_open_transaction()
+    test_verify_detects_corruption()
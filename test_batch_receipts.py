@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار طباعة إيصالات الأقساط دفعة واحدة: جلب الإيصالات بالفلاتر وعلى دفعات من المعرفات،
+وإرسال الملف إلى الطابعة (lp على Linux وملف مؤقت مع ShellExecute على Windows)
+"""
+
+import sys
+import types
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+import core.printing.batch_receipts as batch_receipts
+from core.printing.batch_receipts import load_installment_receipts, spool_receipts_to_printer
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def test_load_receipts_filters_and_chunks():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "receipts.db"
+        db_manager.create_tables()
+        school = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('النور', 'ابتدائية')")
+        other = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('الأمل', 'ابتدائية')")
+        student = _execute("""
+            INSERT INTO students (name, school_id, grade, section, gender, total_fee, start_date, status)
+            VALUES ('علي', ?, 'الأول الابتدائي', 'أ', 'ذكر', 1000000, '2025-09-01', 'نشط')
+        """, (school,))
+        other_student = _execute("""
+            INSERT INTO students (name, school_id, grade, section, gender, total_fee, start_date, status)
+            VALUES ('زيد', ?, 'الأول الابتدائي', 'أ', 'ذكر', 500000, '2025-09-01', 'نشط')
+        """, (other,))
+        with db_manager.get_cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO installments (student_id, amount, payment_date, payment_time) VALUES (?, ?, ?, ?)",
+                [(student if i % 2 else other_student, 1000, f"2025-10-{(i % 28) + 1:02d}", "10:00")
+                 for i in range(1200)]
+            )
+
+        receipts = load_installment_receipts(date_from="2025-10-05", date_to="2025-10-06", school_id=school)
+        assert receipts and all(r['school_name'] == "النور" for r in receipts)
+        assert all(r['payment_date'][:10] in ("2025-10-05", "2025-10-06") for r in receipts)
+        assert receipts[0]['total_paid'] == 600000 and receipts[0]['remaining'] == 400000
+
+        # أكثر من حد الدفعة الواحدة (_IDS_CHUNK_SIZE) مع ترتيب موحد عبر الدفعات
+        ids = list(range(1200, 0, -1))
+        receipts = load_installment_receipts(installment_ids=ids)
+        assert len(receipts) == 1200 and len(ids) > batch_receipts._IDS_CHUNK_SIZE
+        keys = [(r['payment_date'], r['id']) for r in receipts]
+        assert keys == sorted(keys)
+        assert len(load_installment_receipts(installment_ids=ids, school_id=other)) == 600
+
+        # القائمة الفارغة تعني "لا أقساط" وليس "بدون تقييد"
+        assert load_installment_receipts(installment_ids=[]) == []
+        assert batch_receipts.print_installment_receipts_batch(installment_ids=[], direct=True) == 0
+        print("✅ جلب الإيصالات بالفلاتر وعلى دفعات من المعرفات")
+        db_manager.close_connection()
+
+
+class _FakeManager:
+    """بديل ReportLabPrintManager يكتب PDF صغيراً في الهدف الممرر"""
+
+    def create_installment_receipts_batch(self, receipts, output):
+        output.write(b"%PDF-1.4 " + str(len(receipts)).encode())
+        return output
+
+
+class _FakeStdin:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+
+    def close(self):
+        pass
+
+
+class _FakeProcess:
+    """بديل عملية lp يحتفظ بالأمر وبما كُتب في مدخله القياسي"""
+    last = None
+
+    def __init__(self, command, stdin=None):
+        self.command = command
+        self.stdin = _FakeStdin()
+        _FakeProcess.last = self
+
+    def wait(self, timeout=None):
+        return 0
+
+
+def _patch(name, value, saved, target):
+    saved.append((target, name, getattr(target, name)))
+    setattr(target, name, value)
+
+
+def test_spool_receipts():
+    saved = []
+    fake_manager_module = types.ModuleType("core.printing.reportlab_print_manager")
+    fake_manager_module.ReportLabPrintManager = _FakeManager
+    previous_module = sys.modules.get("core.printing.reportlab_print_manager")
+    previous_win32api = sys.modules.get("win32api")
+    sys.modules["core.printing.reportlab_print_manager"] = fake_manager_module
+    receipts = [{'id': 1}, {'id': 2}]
+    try:
+        # Linux: المدخل القياسي لأمر lp
+        _patch("system", lambda: "Linux", saved, batch_receipts.platform)
+        _patch("Popen", _FakeProcess, saved, batch_receipts.subprocess)
+        assert spool_receipts_to_printer(receipts, "HP")
+        assert _FakeProcess.last.command == ["lp", "-d", "HP", "-t", "installment_receipts", "-"]
+        assert b"".join(_FakeProcess.last.stdin.chunks) == b"%PDF-1.4 2"
+
+        # Windows: ملف مؤقت يُطبع بـ ShellExecute
+        _patch("system", lambda: "Windows", saved, batch_receipts.platform)
+        calls = []
+        fake_win32api = types.ModuleType("win32api")
+        fake_win32api.ShellExecute = lambda *args: calls.append(args + (Path(args[2]).read_bytes(),))
+        sys.modules["win32api"] = fake_win32api
+
+        assert spool_receipts_to_printer(receipts)
+        assert spool_receipts_to_printer(receipts, "HP LaserJet")
+        (_, verb, path, params, _, _, content), (_, named_verb, named_path, named_params, _, _, named_content) = calls
+        assert verb == "print" and params is None
+        assert named_verb == "printto" and named_params == '"HP LaserJet"'
+        assert content == named_content == b"%PDF-1.4 2"
+        # الملف المؤقت يُحذف بعد تسليمه إلى المُجمّع
+        for pdf_path in (path, named_path):
+            assert pdf_path.endswith(".pdf") and not Path(pdf_path).exists()
+
+        # فشل الطباعة يعيد False بدلاً من رفع استثناء، ويُحذف الملف المؤقت أيضاً
+        failed = []
+
+        def _no_printer(*args):
+            failed.append(args[2])
+            raise OSError("no printer")
+
+        fake_win32api.ShellExecute = _no_printer
+        assert not spool_receipts_to_printer(receipts)
+        assert failed and not Path(failed[0]).exists()
+        print("✅ إرسال الإيصالات إلى الطابعة (lp و ShellExecute)")
+    finally:
+        for target, name, value in reversed(saved):
+            setattr(target, name, value)
+        for module_name, module in (("core.printing.reportlab_print_manager", previous_module),
+                                    ("win32api", previous_win32api)):
+            if module is None:
+                sys.modules.pop(module_name, None)
+            else:
+                sys.modules[module_name] = module
+
+
+if __name__ == "__main__":
+    test_load_receipts_filters_and_chunks()
+    test_spool_receipts()
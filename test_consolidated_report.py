@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار التقرير الموحد: أقسام المدارس من مجموعة الخيوط تطابق الحساب المباشر،
+المجموع الكلي، تدفق الأقسام أثناء البناء، والإلغاء
+"""
+
+import sys
+import random
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.finance.consolidated import build_consolidated_report
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _seed(rng, schools=6):
+    for index in range(schools):
+        school = _execute("INSERT INTO schools (name_ar, school_types) VALUES (?, 'ابتدائية')", (f"مدرسة {index:02d}",))
+        for _ in range(rng.randint(5, 15)):
+            student = _execute("""
+                INSERT INTO students (name, school_id, grade, section, gender, total_fee, start_date, status)
+                VALUES ('طالب', ?, 'الأول الابتدائي', 'أ', 'ذكر', 1000000, '2025-09-01', ?)
+            """, (school, rng.choice(["نشط", "نشط", "منقطع"])))
+            for _ in range(rng.randint(0, 3)):
+                _execute("INSERT INTO installments (student_id, amount, payment_date, payment_time) "
+                         "VALUES (?, ?, ?, '10:00')", (student, 250000, f"2025-{rng.randint(1, 12):02d}-10"))
+            _execute("INSERT INTO additional_fees (student_id, fee_type, amount, paid, payment_date) "
+                     "VALUES (?, 'زي', 50000, ?, '2025-10-01')", (student, rng.random() < 0.5))
+        for _ in range(4):
+            _execute("INSERT INTO expenses (school_id, expense_type, amount, expense_date) VALUES (?, 'قرطاسية', ?, ?)",
+                     (school, rng.choice([10000, 20000]), f"2025-{rng.randint(1, 12):02d}-05"))
+            _execute("""
+                INSERT INTO external_income (school_id, amount, category, income_type, income_date)
+                VALUES (?, ?, 'أخرى', 'تبرع', ?)
+            """, (school, 30000, f"2024-{rng.randint(1, 12):02d}-05"))
+        _execute("""
+            INSERT INTO salaries (staff_type, staff_id, base_salary, paid_amount, from_date, to_date,
+                                  days_count, payment_date, payment_time, school_id)
+            VALUES ('teacher', 1, 500000, 500000, '2025-11-01', '2025-11-30', 30, '2025-11-30', '10:00', ?)
+        """, (school,))
+
+
+def _expected(school_id):
+    students = db_manager.execute_query(
+        "SELECT id, total_fee FROM students WHERE school_id = ? AND status = 'نشط'", (school_id,))
+    paid = {row['id']: db_manager.execute_query(
+        "SELECT COALESCE(SUM(amount), 0) AS p FROM installments WHERE student_id = ?", (row['id'],))[0]['p']
+        for row in students}
+    installments = db_manager.execute_query("""
+        SELECT COALESCE(SUM(i.amount), 0) AS t FROM installments i JOIN students s ON s.id = i.student_id
+        WHERE s.school_id = ? AND i.payment_date LIKE '2025-%'
+    """, (school_id,))[0]['t']
+    return {
+        'students': len(students),
+        'fees_outstanding': sum(max(row['total_fee'] - paid[row['id']], 0) for row in students),
+        'installments': installments,
+        'external_income': 0,
+        'salaries': 500000,
+    }
+
+
+def test_parallel_sections_match_direct_queries():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "consolidated.db"
+        db_manager.create_tables()
+        _seed(random.Random(11))
+
+        streamed = []
+        report = build_consolidated_report("2025-01-01", "2025-12-31", workers=3, db_path=db_manager.db_path,
+                                           on_section=lambda section, done, total: streamed.append((done, total)))
+        sections = report['sections']
+        assert [s['school_name'] for s in sections] == [f"مدرسة {i:02d}" for i in range(6)]
+        assert streamed == [(done, 6) for done in range(1, 7)]
+
+        for section in sections:
+            expected = _expected(section['school_id'])
+            assert {key: section[key] for key in expected} == expected
+            assert section['net'] == section['income'] - section['outflow']
+        assert report['grand_total']['students'] == sum(s['students'] for s in sections)
+        assert report['grand_total']['net'] == sum(s['net'] for s in sections)
+        print(f"✅ {len(sections)} أقسام بالتوازي، الصافي الكلي {report['grand_total']['net']:,.0f}")
+
+        single = build_consolidated_report("2025-01-01", "2025-12-31", workers=1, db_path=db_manager.db_path)
+        assert single['sections'] == sections
+
+        subset = build_consolidated_report(school_ids=[sections[0]['school_id']], db_path=db_manager.db_path)
+        assert len(subset['sections']) == 1 and subset['sections'][0]['external_income'] == 120000
+
+        try:
+            build_consolidated_report(db_path=db_manager.db_path, cancel_check=lambda: True)
+            assert False, "كان يجب إلغاء البناء"
+        except InterruptedError:
+            pass
+        print("✅ نفس النتيجة بخيط واحد، وفلتر المدارس والإلغاء يعملان")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_parallel_sections_match_direct_queries()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار تحليلات المتأخرات: الأرصدة المتبقية، أعمار الديون، نسب التحصيل والتوقع
+"""
+
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.finance.arrears import (
+    aging_buckets, arrears_report_data, collection_rates, load_ledger, top_debtors
+)
+
+
+YEAR = "2025 - 2026"
+AS_OF = date(2026, 3, 1)
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _add_student(name, school_id, grade, section, fee, start="2025-09-01", year=YEAR):
+    return _execute("""
+        INSERT INTO students (name, school_id, grade, section, academic_year, gender, total_fee, start_date)
+        VALUES (?, ?, ?, ?, ?, 'ذكر', ?, ?)
+    """, (name, school_id, grade, section, year, fee, start))
+
+
+def _pay(student_id, amount, day):
+    _execute("INSERT INTO installments (student_id, amount, payment_date, payment_time) VALUES (?, ?, ?, '09:00')",
+             (student_id, amount, day))
+
+
+def _seed():
+    school_a = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('النور', 'ابتدائية')")
+    school_b = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('الأمل', 'ابتدائية')")
+    ali = _add_student("علي", school_a, "الأول", "أ", 1000)
+    sara = _add_student("سارة", school_a, "الأول", "أ", 1000)
+    omar = _add_student("عمر", school_a, "الثاني", "ب", 800)
+    huda = _add_student("هدى", school_b, "الأول", "أ", 1200)
+    _add_student("قديم", school_b, "الأول", "أ", 900, year="2024 - 2025")
+
+    _pay(ali, 400, "2026-02-15")      # متبقي 600، آخر دفعة قبل 14 يوماً
+    _pay(sara, 1000, "2025-10-01")    # مسدد بالكامل
+    _pay(omar, 300, "2025-12-01")     # متبقي 500، قبل 90 يوماً
+    # هدى لم تدفع: العمر من تاريخ المباشرة
+    _execute("INSERT INTO additional_fees (student_id, fee_type, amount, paid) VALUES (?, 'كتب', 50, 0)", (huda,))
+    _execute("INSERT INTO additional_fees (student_id, fee_type, amount, paid) VALUES (?, 'زي', 70, 1)", (sara,))
+    return ali, sara, omar, huda
+
+
+def test_vectorized_arrears_match_per_student_balances():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "arrears.db"
+        db_manager.create_tables()
+        ali, sara, omar, huda = _seed()
+
+        ledger = load_ledger(YEAR, as_of=AS_OF)
+        outstanding = dict(zip(ledger.ids.tolist(), ledger.outstanding.tolist()))
+        print(f"✅ الأرصدة المتبقية: {outstanding}")
+        assert outstanding == {ali: 600, sara: 0, omar: 500, huda: 1250}
+
+        buckets = aging_buckets(ledger)
+        assert [b['students'] for b in buckets] == [1, 0, 1, 1]
+        assert [b['amount'] for b in buckets] == [600, 0, 500, 1250]
+
+        by_school = {row['school_name']: row for row in collection_rates(ledger, "school")}
+        assert by_school["النور"]['billed'] == 2870 and by_school["النور"]['collected'] == 1770
+        assert round(by_school["النور"]['collection_rate'], 2) == 61.67
+        sections = collection_rates(ledger, "section")
+        assert [(r['school_name'], r['grade'], r['section']) for r in sections] == [
+            ("الأمل", "الأول", "أ"), ("النور", "الأول", "أ"), ("النور", "الثاني", "ب")]
+
+        debtors = top_debtors(ledger, limit=2)
+        assert [d['name'] for d in debtors] == ["هدى", "علي"]
+        assert debtors[0]['last_payment'] is None and debtors[0]['age_days'] == 181
+
+        report = arrears_report_data(YEAR, as_of=AS_OF)['arrears']
+        forecast = report['forecast']
+        print(f"✅ التحصيل المتوقع حتى {forecast['term_end']}: {forecast['projected']:.0f}")
+        assert report['owing_students'] == 3 and report['outstanding'] == 2350
+        # علي وعمر دفعا ضمن آخر 90 يوماً؛ التوقع لا يتجاوز المتبقي
+        assert forecast['term_end'] == "2026-06-30"
+        assert 0 < forecast['projected'] <= 1100
+        assert round(forecast['projected'] + forecast['shortfall'], 2) == 2350
+        db_manager.close_connection()
+
+
+def test_large_roster_is_grouped_in_one_pass():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "arrears_bulk.db"
+        db_manager.create_tables()
+        school = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('الكبرى', 'ابتدائية')")
+        with db_manager.get_cursor() as cursor:
+            cursor.executemany("""
+                INSERT INTO students (name, school_id, grade, section, academic_year, gender, total_fee, start_date)
+                VALUES (?, ?, ?, ?, ?, 'ذكر', 1000, '2025-09-01')
+            """, [(f"طالب {i}", school, f"الصف {i % 6}", "أب"[(i // 6) % 2], YEAR) for i in range(5000)])
+            cursor.execute("""
+                INSERT INTO installments (student_id, amount, payment_date, payment_time)
+                SELECT id, (id % 5) * 200, '2026-01-10', '09:00' FROM students
+            """)
+
+        ledger = load_ledger(YEAR, as_of=AS_OF)
+        groups = collection_rates(ledger, "section")
+        print(f"✅ {len(ledger)} طالب في {len(groups)} مجموعة")
+        assert len(ledger) == 5000 and len(groups) == 12
+        assert sum(g['students'] for g in groups) == 5000
+        assert ledger.outstanding.sum() == 5000 * 1000 - ledger.paid.sum()
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_vectorized_arrears_match_per_student_balances()
+    test_large_roster_is_grouped_in_one_pass()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار تعيين الرسوم الجماعي: المعاينة تطابق التنفيذ، منع التكرار في نفس الفصل،
+والتراجع عن الدفعة كاملة
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.finance.fee_assignment import (
+    FeeTarget, assign_fee, preview_fee_assignment, recent_batches, undo_fee_batch
+)
+
+
+TERM = "2025 - 2026"
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _add_student(school_id, grade, section="أ", gender="ذكر", status="نشط"):
+    return _execute("""
+        INSERT INTO students (name, school_id, grade, section, gender, total_fee, start_date, status)
+        VALUES ('طالب', ?, ?, ?, ?, 1000000, '2025-09-01', ?)
+    """, (school_id, grade, section, gender, status))
+
+
+def _fees(fee_type="الزي المدرسي"):
+    return db_manager.execute_query(
+        "SELECT student_id, amount, term, batch_id, paid FROM additional_fees WHERE fee_type = ? ORDER BY student_id",
+        (fee_type,))
+
+
+def test_bulk_assignment_preview_duplicates_and_undo():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "fees.db"
+        db_manager.create_tables()
+        db_manager.create_tables()  # إعادة التثبيت لا تضيف الأعمدة مرتين
+        school = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('النور', 'ابتدائية')")
+        other = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('الأمل', 'ابتدائية')")
+        boys = [_add_student(school, "الأول الابتدائي") for _ in range(3)]
+        girls = [_add_student(school, "الأول الابتدائي", section="ب", gender="أنثى") for _ in range(2)]
+        _add_student(school, "الأول الابتدائي", status="منقطع")
+        _add_student(school, "الثاني الابتدائي")
+        _add_student(other, "الأول الابتدائي")
+
+        grade = FeeTarget(school_id=school, grade="الأول الابتدائي")
+        preview = preview_fee_assignment(grade, "الزي المدرسي", 50000, TERM)
+        assert preview == {'matched': 5, 'duplicates': 0, 'new': 5, 'total': 250000.0, 'term': TERM}
+
+        ok, message, girls_batch = assign_fee(FeeTarget(school_id=school, gender="أنثى"), "الزي المدرسي", 50000, TERM)
+        assert ok and [row['student_id'] for row in _fees()] == girls
+        preview = preview_fee_assignment(grade, "الزي المدرسي", 50000, TERM)
+        assert preview['duplicates'] == 2 and preview['new'] == 3
+
+        ok, message, batch_id = assign_fee(grade, "الزي المدرسي", 50000, TERM, notes="دفعة أيلول")
+        assert ok, message
+        fees = _fees()
+        assert [row['student_id'] for row in fees] == sorted(boys + girls)
+        assert {row['batch_id'] for row in fees if row['student_id'] in boys} == {batch_id}
+        assert all(row['term'] == TERM and not row['paid'] for row in fees)
+        print(f"✅ {message}")
+
+        ok, message, _ = assign_fee(grade, "الزي المدرسي", 50000, TERM)
+        assert not ok and len(_fees()) == 5
+        ok, _, next_term = assign_fee(FeeTarget(section="أ", grade="الأول الابتدائي"),
+                                      "الزي المدرسي", 50000, "2026 - 2027")
+        assert ok and len(_fees()) == 9
+        try:
+            _execute("INSERT INTO additional_fees (student_id, fee_type, amount, term) VALUES (?, 'الزي المدرسي', 1, ?)",
+                     (boys[0], TERM))
+            assert False, "كان يجب رفض التكرار"
+        except Exception:
+            pass
+        print("✅ منع تكرار الرسم لنفس الطالب في نفس الفصل")
+
+        _execute("UPDATE additional_fees SET paid = 1 WHERE batch_id = ? AND student_id = ?", (girls_batch, girls[0]))
+        ok, message = undo_fee_batch(girls_batch)
+        assert not ok and "دفع" in message
+
+        ok, message = undo_fee_batch(batch_id)
+        assert ok and [row['student_id'] for row in _fees() if row['term'] == TERM] == girls
+        assert not undo_fee_batch(batch_id)[0]
+        batches = {batch['id']: batch for batch in recent_batches()}
+        assert batches[batch_id]['undone_at'] and batches[batch_id]['students_count'] == 3
+        assert batches[girls_batch]['paid_count'] == 1 and batches[next_term]['total_amount'] == 200000
+
+        ok, _, _ = assign_fee(grade, "الزي المدرسي", 50000, TERM)
+        assert ok and len(_fees()) == 9
+        print("✅ التراجع عن الدفعة كاملة وإعادة التعيين")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_bulk_assignment_preview_duplicates_and_undo()
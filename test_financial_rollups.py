@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار التجميع المالي الشهري: تحديث المحفزات وتقارير التدفق النقدي والأرباح ومقارنة الأعوام
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.database.archive import archive_academic_year
+from core.finance.rollups import (
+    cash_flow, financial_report_data, profit_and_loss, rebuild_rollups, year_over_year
+)
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _add_student(school_id, year="2025 - 2026"):
+    return _execute("""
+        INSERT INTO students (name, school_id, grade, section, academic_year, gender, total_fee, start_date)
+        VALUES ('طالب', ?, 'الأول', 'أ', ?, 'ذكر', 1000, '2024-09-01')
+    """, (school_id, year))
+
+
+def _seed():
+    school_a = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('أ', 'ابتدائية')")
+    school_b = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('ب', 'ابتدائية')")
+    students = [_add_student(school_a, "2024 - 2025"), _add_student(school_a), _add_student(school_b)]
+    for student, amount, day in [(students[0], 300, "2024-10-05"), (students[0], 200, "2025-10-07"),
+                                 (students[1], 400, "2025-10-09"), (students[2], 250, "2025-11-01")]:
+        _execute("INSERT INTO installments (student_id, amount, payment_date, payment_time) VALUES (?, ?, ?, '09:00')",
+                 (student, amount, day))
+    _execute("INSERT INTO additional_fees (student_id, fee_type, amount, paid, payment_date) "
+             "VALUES (?, 'كتب', 50, 1, '2025-10-10')", (students[1],))
+    unpaid_fee = _execute("INSERT INTO additional_fees (student_id, fee_type, amount, paid) VALUES (?, 'زي', 80, 0)",
+                          (students[2],))
+    _execute("INSERT INTO external_income (school_id, amount, category, income_type, income_date) "
+             "VALUES (?, 120, 'الحانوت', 'نقدي', '2025-10-15')", (school_a,))
+    expense = _execute("INSERT INTO expenses (school_id, expense_type, amount, expense_date) "
+                       "VALUES (?, 'صيانة', 90, '2025-10-20')", (school_b,))
+    _execute("INSERT INTO salaries (staff_type, staff_id, base_salary, paid_amount, from_date, to_date, "
+             "days_count, payment_date, payment_time) "
+             "VALUES ('teacher', 1, 500, 500, '2025-10-01', '2025-10-30', 30, '2025-10-30', '10:00')")
+    return school_a, school_b, students, unpaid_fee, expense
+
+
+def _rollup_rows():
+    rows = db_manager.execute_query(
+        "SELECT month, school_id, ledger, ROUND(amount, 2), entries FROM financial_rollups "
+        "WHERE entries != 0 ORDER BY month, school_id, ledger")
+    return [tuple(row) for row in rows]
+
+
+def test_triggers_match_full_rebuild():
+    """بعد سلسلة تعديلات يطابق التجميع التزايدي إعادة الحساب الكاملة"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "finance.db"
+        db_manager.create_tables()
+        school_a, school_b, students, unpaid_fee, expense = _seed()
+
+        _execute("UPDATE installments SET amount = 450 WHERE student_id = ?", (students[1],))
+        _execute("UPDATE additional_fees SET paid = 1, payment_date = '2025-11-03' WHERE id = ?", (unpaid_fee,))
+        _execute("UPDATE students SET school_id = ? WHERE id = ?", (school_b, students[1]))
+        _execute("DELETE FROM expenses WHERE id = ?", (expense,))
+        _execute("DELETE FROM students WHERE id = ?", (students[2],))
+
+        incremental = _rollup_rows()
+        assert rebuild_rollups(include_archives=False)[0]
+        print(f"✅ {len(incremental)} صف تجميع مطابق لإعادة الحساب")
+        assert incremental == _rollup_rows()
+
+        pnl = profit_and_loss("2025-10", "2025-10")
+        # أقساط 200 + 450، رسوم 50، إيراد خارجي 120؛ رواتب 500
+        assert pnl['total_income'] == 820 and pnl['total_expenses'] == 500
+        assert pnl['net_profit'] == 320
+        print(f"✅ صافي أكتوبر: {pnl['net_profit']}")
+
+        flow = cash_flow("2024-01", "2025-12")
+        assert [f['month'] for f in flow] == ["2024-10", "2025-10"]
+        assert flow[-1]['balance'] == 300 + 320
+
+        yoy = year_over_year([2024, 2025], metric="installments")
+        october = yoy['rows'][9]
+        assert october['values'] == {2024: 300, 2025: 650}
+        assert round(october['change'], 1) == 116.7
+        assert financial_report_data("2025-10", "2025-10", school_id=school_a)['financial_data']['total_income'] == 320
+
+        # الأرشفة لا تُنقص التجميع
+        before = _rollup_rows()
+        archives = Path(temp_dir) / "archives"
+        assert archive_academic_year("2024 - 2025", root=archives, current_year="2025 - 2026", vacuum=False)[0]
+        assert _rollup_rows() == before
+        assert rebuild_rollups(root=archives)[0]
+        assert _rollup_rows() == before
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_triggers_match_full_rebuild()
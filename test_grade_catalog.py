@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار دليل الصفوف: الصفوف حسب نوع المدرسة، الشعب المستخدمة والأعداد،
+الترتيب، وإعادة البناء عند الكتابة فقط
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.utils.grade_catalog import (
+    grade_catalog, grade_ordinal, grades_for_types, parse_school_types, sort_grades
+)
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _add_student(school_id, grade, section, status="نشط"):
+    return _execute("""
+        INSERT INTO students (name, school_id, grade, section, gender, phone, total_fee, start_date, status)
+        VALUES ('طالب', ?, ?, ?, 'ذكر', '07700000000', 1000000, '2025-09-01', ?)
+    """, (school_id, grade, section, status))
+
+
+def test_grade_helpers():
+    assert parse_school_types('["ابتدائية", "متوسطة"]') == ["ابتدائية", "متوسطة"]
+    assert parse_school_types("ابتدائية, ثانوية") == ["ابتدائية", "ثانوية"]
+    assert parse_school_types(None) == []
+    assert grades_for_types(["ثانوية"])[0] == "الرابع العلمي"
+    assert len(grades_for_types(["ابتدائية", "متوسطة", "إعدادية"])) == 15
+    assert grade_ordinal("الأول المتوسط") == 7 and grade_ordinal("Grade 1") == 999
+    assert sort_grades(["السادس الأدبي", "Grade 1", "الثاني الابتدائي"], known_only=True) == [
+        "الثاني الابتدائي", "السادس الأدبي"]
+    print("✅ تحليل أنواع المدارس وترتيب الصفوف")
+
+
+def test_catalog_rebuilds_only_after_writes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "catalog.db"
+        db_manager.create_tables()
+        primary = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('النور', '[\"ابتدائية\"]')")
+        secondary = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('الأمل', 'متوسطة,ثانوية')")
+        for section in ("ب", "أ", "أ"):
+            _add_student(primary, "الأول الابتدائي", section)
+        _add_student(primary, "الأول الابتدائي", "ج", status="منقطع")
+        _add_student(secondary, "الأول المتوسط", "أ")
+
+        school = grade_catalog.school(primary)
+        assert school.grades == grades_for_types(["ابتدائية"])
+        assert school.sections == {"الأول الابتدائي": ["أ", "ب", "ج"]}
+        assert school.counts == {"الأول الابتدائي": 3}
+        assert grade_catalog.grades(secondary)[:3] == ["الأول المتوسط", "الثاني المتوسط", "الثالث المتوسط"]
+        assert len(grade_catalog.grades()) == 15
+        assert grade_catalog.sections(secondary) == ["أ"]
+        print(f"✅ دليل مدرسة {school.name}: {school.counts} والشعب {school.sections_for()}")
+
+        queries = []
+        original = db_manager.execute_query
+        db_manager.execute_query = lambda sql, params=(): queries.append(sql) or original(sql, params)
+        try:
+            for _ in range(5):
+                grade_catalog.grades(primary)
+                grade_catalog.sections(secondary, "الأول المتوسط")
+            assert queries == []
+
+            _add_student(secondary, "الثاني المتوسط", "د")
+            assert grade_catalog.sections(secondary) == ["أ", "د"]
+            assert len(queries) == 2
+        finally:
+            db_manager.execute_query = original
+        print("✅ الدليل يُبنى مرة ويُعاد بناؤه بعد إضافة طالب فقط")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_grade_helpers()
+    test_catalog_rebuilds_only_after_writes()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار لقطات قالب الهوية الثابتة وتنظيف ملفات المعاينة القديمة (بدون Qt)
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import core.pdf.id_template_snapshot as id_snapshot
+from core.pdf.id_template_snapshot import snapshot_template, cleanup_legacy_previews
+
+
+class _ReportLabColor:
+    """بديل بسيط للون ReportLab (red/green/blue بين 0 و 1)"""
+
+    def __init__(self, red, green, blue):
+        self.red, self.green, self.blue = red, green, blue
+
+    def rgb(self):
+        return (self.red, self.green, self.blue)
+
+
+def test_snapshot_is_frozen_and_comparable():
+    elements = {
+        "student_name": {"x": 0.4, "y": 0.6, "font_size": 11, "color": [0, 0, 0.5],
+                         "label": {"text": "الاسم", "visible": True}},
+        "photo": {"x": 0.05, "y": 0.2, "border_color": _ReportLabColor(1, 0, 0)},
+    }
+    snapshot = snapshot_template(elements)
+
+    assert snapshot["student_name"]["color"] == (0, 0, 0.5)
+    assert snapshot["student_name"]["label"] == (("text", "الاسم"), ("visible", True))
+    assert snapshot["photo"]["border_color"] == (1.0, 0.0, 0.0)
+    hash(tuple(snapshot["student_name"].items()))
+    for target in (snapshot, snapshot["photo"]):
+        try:
+            target["x"] = 1
+            assert False, "كان يجب رفض التعديل على اللقطة"
+        except TypeError:
+            pass
+
+    # تعديل القالب الأصلي لا يغير اللقطة، ولقطة جديدة تلتقط التغيير فقط
+    elements["student_name"]["color"].append(1)
+    elements["photo"]["x"] = 0.1
+    assert snapshot["student_name"]["color"] == (0, 0, 0.5)
+    updated = snapshot_template(elements)
+    assert updated["photo"] != snapshot["photo"]
+    assert updated["student_name"]["label"] == snapshot["student_name"]["label"]
+    print("✅ لقطة القالب للقراءة فقط ومستقلة عن القالب الأصلي")
+
+
+def test_cleanup_legacy_previews():
+    original_dir = id_snapshot.LEGACY_PREVIEW_DIR
+    with tempfile.TemporaryDirectory() as temp_dir:
+        try:
+            id_snapshot.LEGACY_PREVIEW_DIR = Path(temp_dir) / "missing"
+            assert cleanup_legacy_previews() == 0
+
+            preview_dir = Path(temp_dir) / "id_preview"
+            preview_dir.mkdir()
+            for index in range(3):
+                (preview_dir / f"live_preview_{index}.pdf").write_bytes(b"%PDF")
+            (preview_dir / "other.pdf").write_bytes(b"%PDF")
+            id_snapshot.LEGACY_PREVIEW_DIR = preview_dir
+
+            assert cleanup_legacy_previews() == 3
+            assert [path.name for path in preview_dir.iterdir()] == ["other.pdf"]
+            assert cleanup_legacy_previews() == 0
+        finally:
+            id_snapshot.LEGACY_PREVIEW_DIR = original_dir
+    print("✅ حذف ملفات live_preview_*.pdf القديمة فقط")
+
+
+if __name__ == "__main__":
+    test_snapshot_is_frozen_and_comparable()
+    test_cleanup_legacy_previews()
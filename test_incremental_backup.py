@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار النسخ الاحتياطي التزايدي على مخزن محلي مؤقت
+"""
+
+import sys
+import os
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import config
+from core.backup.incremental import IncrementalBackup, LocalChunkStore
+from core.backup.storage import LocalStorage
+from core.backup.catalog import BackupCatalog
+from core.backup.backup_manager import BackupManager
+
+
+def _file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def test_incremental_backup_cycle():
+    """نسخة أولى كاملة، ثم تخطي عند عدم التغيير، ثم أجزاء قليلة بعد تعديل صغير"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "schools.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload TEXT)")
+        conn.executemany("INSERT INTO items (payload) VALUES (?)",
+                         [(f"{i:06d}" * 40,) for i in range(5000)])
+        conn.commit()
+
+        backup = IncrementalBackup(LocalChunkStore(os.path.join(temp_dir, "backups")), db_path)
+
+        success, message = backup.create_backup("أولى")
+        first = backup.store.latest_manifest()
+        print(f"✅ {message}")
+        assert success and first["new_chunks"] == len(set(first["chunks"]))
+
+        success, message = backup.create_backup("بلا تغيير")
+        print(f"✅ {message}")
+        assert success and backup.is_unchanged()
+        assert len(backup.store.list_manifests()) == 1
+
+        conn.execute("UPDATE items SET payload = 'changed' WHERE id = 2500")
+        conn.commit()
+        assert not backup.is_unchanged()
+
+        success, message = backup.create_backup("بعد التعديل")
+        print(f"✅ {message}")
+        manifests = backup.store.list_manifests()
+        assert success and len(manifests) == 2
+        assert manifests[0]["new_chunks"] < len(manifests[0]["chunks"]) // 2
+
+        restored = os.path.join(temp_dir, "restored.db")
+        assert backup.restore_to(manifests[0]["name"], restored)[0]
+        conn.close()
+        assert _file_hash(restored) == manifests[0]["sha256"]
+        check = sqlite3.connect(restored)
+        assert check.execute("SELECT payload FROM items WHERE id = 2500").fetchone()[0] == "changed"
+        check.close()
+
+
+def test_daily_backup_keeps_its_category():
+    """نسخة يومية تُحفظ في daily فقط، والنسخة الثانية بلا تغيير تُتخطى"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = Path(temp_dir) / "schools.db"
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload TEXT)")
+        conn.executemany("INSERT INTO items (payload) VALUES (?)", [(f"{i:06d}",) for i in range(500)])
+        conn.commit()
+        conn.close()
+
+        storage = LocalStorage(os.path.join(temp_dir, "remote"))
+        store = LocalChunkStore(os.path.join(temp_dir, "backups"))
+        catalog = BackupCatalog(os.path.join(temp_dir, "catalog.db"))
+        manager = BackupManager(storage, IncrementalBackup(store, db_path), catalog=catalog)
+        original_path = config.DATABASE_PATH
+        config.DATABASE_PATH = db_path
+        try:
+            assert manager.create_backup("يومية", category="daily")[0]
+            success, message = manager.create_backup("يومية", category="daily")
+        finally:
+            config.DATABASE_PATH = original_path
+            catalog.close()
+
+        print(f"✅ {message}")
+        assert success and "لا توجد تغييرات" in message
+        assert len(store.list_manifests("daily")) == 1
+        assert store.list_manifests("manual") == []
+        assert store.list_manifests("daily")[0].get("remote_path")
+        assert len(list(Path(storage.object_path("daily", "x")).parent.glob("backup_*"))) == 1
+
+
+def test_garbage_collection_waits_for_backup_in_progress():
+    """جمع الأجزاء أثناء كتابة نسخة لا يحذف أجزاءها قبل حفظ ملف وصفها"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "schools.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, payload TEXT)")
+        conn.executemany("INSERT INTO items (payload) VALUES (?)", [(f"{i:06d}" * 40,) for i in range(2000)])
+        conn.commit()
+        conn.close()
+
+        store = LocalChunkStore(os.path.join(temp_dir, "backups"))
+        backup = IncrementalBackup(store, db_path)
+        first_chunk_written = threading.Event()
+        put_chunk = store.put_chunk
+
+        def slow_put_chunk(digest, data):
+            written = put_chunk(digest, data)
+            first_chunk_written.set()
+            threading.Event().wait(0.01)
+            return written
+
+        store.put_chunk = slow_put_chunk
+        writer = threading.Thread(target=backup.create_backup, args=("أثناء الجمع",))
+        writer.start()
+        assert first_chunk_written.wait(10)
+        store.collect_garbage()
+        writer.join()
+
+        manifest = store.latest_manifest()
+        assert manifest and all(store.has_chunk(digest) for digest in manifest["chunks"])
+        assert backup.restore_to(manifest["name"], os.path.join(temp_dir, "restored.db"))[0]
+        print("✅ جمع الأجزاء ينتظر النسخة قيد الكتابة")
+
+
+if __name__ == "__main__":
+    test_incremental_backup_cycle()
+    test_daily_backup_keeps_its_category()
+    test_garbage_collection_waits_for_backup_in_progress()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار جداول استحقاق الأقساط: إنشاء جداول صف كامل، توزيع الدفعات على المواعيد،
+ومطابقة "المستحق هذا الأسبوع" و"المتأخر" للحساب المباشر بعد إضافة وتعديل وحذف الدفعات
+"""
+
+import sys
+import random
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.finance.installment_plans import (
+    STATUS_DUE, STATUS_OVERDUE, STATUS_PAID, STATUS_PARTIAL, build_schedule, create_student_plan,
+    due_summary, due_this_week, generate_grade_plans, overdue, rebuild_payment_totals, student_plan
+)
+
+
+TODAY = date(2025, 11, 20)
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _add_student(school_id, grade, section="أ", total_fee=1000000, status="نشط"):
+    return _execute("""
+        INSERT INTO students (name, school_id, grade, section, gender, total_fee, start_date, status)
+        VALUES ('طالب', ?, ?, ?, 'ذكر', ?, '2025-09-01', ?)
+    """, (school_id, grade, section, total_fee, status))
+
+
+def _pay(student_id, amount):
+    return _execute("INSERT INTO installments (student_id, amount, payment_date, payment_time) "
+                    "VALUES (?, ?, '2025-10-01', '10:00')", (student_id, amount))
+
+
+def _expected_outstanding(start, end):
+    """المواعيد غير المسددة في [start, end) بتوزيع الدفعات على المواعيد في Python"""
+    result = {}
+    for plan in db_manager.execute_query("SELECT DISTINCT student_id FROM installment_plans"):
+        student_id = plan['student_id']
+        paid = db_manager.execute_query(
+            "SELECT COALESCE(SUM(amount), 0) AS p FROM installments WHERE student_id = ?", (student_id,))[0]['p']
+        rows = db_manager.execute_query(
+            "SELECT id, due_date, amount FROM installment_plans WHERE student_id = ? ORDER BY sequence",
+            (student_id,))
+        for row in rows:
+            covered = min(paid, row['amount'])
+            paid -= covered
+            if row['amount'] - covered > 0 and start <= row['due_date'] < end:
+                result[row['id']] = row['amount'] - covered
+    return result
+
+
+def test_schedule_split():
+    schedule = build_schedule(1000000, 3, "2025-09-15", interval_days=30)
+    assert [item['amount'] for item in schedule] == [333333, 333333, 333334]
+    assert [item['due_date'] for item in schedule] == ["2025-09-15", "2025-10-15", "2025-11-14"]
+    assert schedule[-1]['cumulative_amount'] == 1000000
+    print("✅ تقسيم المبلغ ومواعيد الاستحقاق")
+
+
+def test_grade_plans_and_due_queries():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "plans.db"
+        db_manager.create_tables()
+        school = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('النور', 'ابتدائية')")
+        other = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('الأمل', 'ابتدائية')")
+        students = [_add_student(school, "الأول الابتدائي", section) for section in ("أ", "أ", "ب", "ب")]
+        _add_student(school, "الأول الابتدائي", status="منقطع")
+        _add_student(school, "الثاني الابتدائي")
+        _add_student(other, "الأول الابتدائي")
+
+        first_due = TODAY - timedelta(days=60)
+        ok, message, planned = generate_grade_plans(school, "الأول الابتدائي", 4, first_due, interval_days=30)
+        assert ok and planned == 4, message
+        count = db_manager.execute_query("SELECT COUNT(*) AS c FROM installment_plans")[0]['c']
+        assert count == 16
+        ok, message, planned = generate_grade_plans(school, "الأول الابتدائي", 4, first_due, section="أ")
+        assert not ok and planned == 0
+        ok, message, planned = generate_grade_plans(school, "الأول الابتدائي", 2, TODAY, section="ب", replace=True)
+        assert ok and planned == 2
+        print(f"✅ {message}")
+
+        _pay(students[0], 250000)
+        _pay(students[1], 600000)
+        _pay(students[2], 100000)
+        plan = student_plan(students[1], today=TODAY)
+        assert [item['status'] for item in plan] == [STATUS_PAID, STATUS_PAID, STATUS_PARTIAL, STATUS_DUE]
+        assert plan[2]['remaining'] == 150000
+        assert [item['status'] for item in student_plan(students[3], today=TODAY)] == [STATUS_DUE, STATUS_DUE]
+        assert student_plan(students[0], today=TODAY)[1]['status'] == STATUS_OVERDUE
+
+        rng = random.Random(5)
+        payments = [_pay(rng.choice(students), rng.choice([50000, 125000, 250000])) for _ in range(10)]
+        _execute("UPDATE installments SET amount = amount * 2 WHERE id = ?", (payments[0],))
+        _execute("UPDATE installments SET student_id = ? WHERE id = ?", (students[3], payments[1]))
+        _execute("DELETE FROM installments WHERE id = ?", (payments[2],))
+
+        week_end = (TODAY + timedelta(days=7)).isoformat()
+        week = {row['id']: row['remaining'] for row in due_this_week(today=TODAY)}
+        late = {row['id']: row['remaining'] for row in overdue(today=TODAY)}
+        assert week == _expected_outstanding(TODAY.isoformat(), week_end)
+        assert late == _expected_outstanding("0000-01-01", TODAY.isoformat())
+        assert all(row['school_name'] == "النور" for row in overdue(today=TODAY, school_id=school))
+        assert overdue(today=TODAY, school_id=other) == []
+
+        summary = due_summary(today=TODAY)
+        assert summary['week_count'] == len(week) and summary['week_amount'] == sum(week.values())
+        assert summary['overdue_count'] == len(late) and summary['overdue_amount'] == sum(late.values())
+        print(f"✅ المستحق هذا الأسبوع {len(week)} والمتأخر {len(late)} يطابقان الحساب المباشر")
+
+        before = {row['id']: row['remaining'] for row in overdue(today=TODAY)}
+        assert rebuild_payment_totals()[0]
+        assert {row['id']: row['remaining'] for row in overdue(today=TODAY)} == before
+
+        ok, message = create_student_plan(students[0], 1, TODAY, total_amount=500000)
+        assert ok and [item['remaining'] for item in student_plan(students[0], today=TODAY)] == [0.0]
+        _execute("DELETE FROM students WHERE id = ?", (students[0],))
+        assert db_manager.execute_query(
+            "SELECT COUNT(*) AS c FROM installment_plans WHERE student_id = ?", (students[0],))[0]['c'] == 0
+        print("✅ إعادة بناء المجاميع وجدول طالب واحد والحذف المتتالي")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_schedule_split()
+    test_grade_plans_and_due_queries()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار التسجيل عبر الطابور وسجل التدقيق المنظم (JSON lines)
+"""
+
+import sys
+import json
+import logging
+import logging.handlers
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import config
+from core.utils import logger as app_logger
+
+
+def test_queue_logging_and_audit_trail():
+    """المسجلات تكتب إلى الطابور فقط، والكاتب الخلفي ينتج السجلات وسجل التدقيق"""
+    original = (config.LOGS_DIR, config.AUDIT_LOG_FILE, config.AUDIT_FLUSH_BATCH)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config.LOGS_DIR = Path(temp_dir)
+        config.AUDIT_LOG_FILE = Path(temp_dir) / "audit.jsonl"
+        config.AUDIT_FLUSH_BATCH = 10
+        try:
+            app_logger.setup_logging()
+            root_handlers = logging.getLogger().handlers
+            assert len(root_handlers) == 1
+            assert isinstance(root_handlers[0], logging.handlers.QueueHandler)
+
+            for i in range(25):
+                app_logger.log_user_action("students - filter", f"طلب {i}")
+            app_logger.log_database_operation("INSERT", "students", "معرف 7")
+            logging.getLogger("auth").info("تسجيل دخول")
+            app_logger.shutdown_logging()
+
+            with open(config.AUDIT_LOG_FILE, encoding="utf-8") as f:
+                events = [json.loads(line) for line in f]
+            print(f"✅ أحداث التدقيق: {len(events)}")
+            assert len(events) == 26
+            assert events[0]["type"] == "user_action" and events[0]["details"] == "طلب 0"
+            assert events[-1] == {**events[-1], "type": "database", "operation": "INSERT", "table": "students"}
+
+            database_log = (Path(temp_dir) / "database.log").read_text(encoding="utf-8")
+            auth_log = (Path(temp_dir) / "auth.log").read_text(encoding="utf-8")
+            assert "INSERT" in database_log and "تسجيل دخول" not in database_log
+            assert "تسجيل دخول" in auth_log
+            assert "students - filter" in (Path(temp_dir) / "app.log").read_text(encoding="utf-8")
+        finally:
+            app_logger.shutdown_logging()
+            logging.getLogger().handlers.clear()
+            config.LOGS_DIR, config.AUDIT_LOG_FILE, config.AUDIT_FLUSH_BATCH = original
+
+
+def test_audit_batch_flushes_on_interval():
+    """حدث تدقيق منفرد يُكتب بعد فترة الكتابة دون انتظار امتلاء الدفعة أو حدث آخر"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "audit.jsonl"
+        handler = app_logger.BatchedJsonLinesHandler(path, batch_size=50, flush_interval=0.2)
+        audit_logger = logging.getLogger("test_audit_interval")
+        audit_logger.propagate = False
+        audit_logger.addHandler(handler)
+        try:
+            audit_logger.warning("حدث", extra={"audit": {"type": "user_action", "action": "login"}})
+            assert not path.exists()
+
+            deadline = time.monotonic() + 5
+            while not path.exists() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            events = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+            assert [event["action"] for event in events] == ["login"]
+
+            # الدفعة التالية تبدأ مؤقتاً جديداً
+            audit_logger.warning("حدث", extra={"audit": {"type": "user_action", "action": "logout"}})
+            time.sleep(0.6)
+            assert len(path.read_text(encoding="utf-8").splitlines()) == 2
+            print("✅ كتابة دفعة التدقيق بعد فترة الكتابة")
+        finally:
+            audit_logger.removeHandler(handler)
+            handler.close()
+
+
+if __name__ == "__main__":
+    test_queue_logging_and_audit_trail()
+    test_audit_batch_flushes_on_interval()
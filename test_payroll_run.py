@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار مسير الرواتب الشهري: التعبئة من الراتب الشهري، الاحتساب النسبي،
+كشف تداخل الفترات، والإدراج في معاملة واحدة
+"""
+
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.finance.payroll import (
+    IntervalIndex, commit_payroll_run, find_overlapping_salaries, overlap_warning, prepare_payroll_run, salary_slips
+)
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _pay(staff_type, staff_id, school_id, from_date, to_date, amount):
+    return _execute("""
+        INSERT INTO salaries (staff_type, staff_id, base_salary, paid_amount, from_date, to_date,
+                              days_count, payment_date, payment_time, school_id)
+        VALUES (?, ?, ?, ?, ?, ?, 1, ?, '10:00', ?)
+    """, (staff_type, staff_id, amount, amount, from_date, to_date, to_date, school_id))
+
+
+def test_interval_index_finds_every_overlap():
+    d = date.fromisoformat
+    index = IntervalIndex([
+        ("a", d("2025-01-01"), d("2025-03-31"), "long"),
+        ("a", d("2025-02-01"), d("2025-02-10"), "short"),
+        ("a", d("2025-05-01"), d("2025-05-31"), "may"),
+        ("b", d("2025-02-05"), d("2025-02-06"), "other"),
+    ])
+    assert index.overlapping("a", d("2025-02-15"), d("2025-02-20")) == ["long"]
+    assert index.overlapping("a", d("2025-02-10"), d("2025-05-01")) == ["long", "short", "may"]
+    assert index.overlapping("a", d("2025-04-01"), d("2025-04-30")) == []
+    assert index.overlapping("c", d("2025-01-01"), d("2025-12-31")) == []
+    print("✅ فهرس الفترات يطابق الفحص الكامل")
+
+
+def test_payroll_run_prorates_and_skips_overlaps():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "payroll.db"
+        db_manager.create_tables()
+        school = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('النور', 'ابتدائية')")
+        other_school = _execute("INSERT INTO schools (name_ar, school_types) VALUES ('الأمل', 'ابتدائية')")
+        full = _execute("INSERT INTO teachers (name, school_id, monthly_salary) VALUES ('أحمد', ?, 900000)", (school,))
+        half = _execute("INSERT INTO teachers (name, school_id, monthly_salary) VALUES ('زينب', ?, 600000)", (school,))
+        paid = _execute("INSERT INTO employees (name, school_id, job_type, monthly_salary) "
+                        "VALUES ('كريم', ?, 'محاسب', 500000)", (school,))
+        _execute("INSERT INTO teachers (name, school_id, monthly_salary) VALUES ('خارج', ?, 700000)", (other_school,))
+
+        _pay("teacher", half, school, "2025-11-01", "2025-11-10", 200000)    # الأيام الأولى مدفوعة
+        _pay("employee", paid, school, "2025-11-15", "2025-12-14", 500000)   # يغطي منتصف الشهر
+
+        lines = {line.name: line for line in prepare_payroll_run(school, 2025, 11)}
+        assert sorted(lines) == ["أحمد", "زينب", "كريم"]
+        assert lines["أحمد"].include and lines["أحمد"].amount == 900000 and lines["أحمد"].days_count == 30
+        assert lines["زينب"].include and lines["زينب"].from_date == date(2025, 11, 11)
+        assert lines["زينب"].amount == 400000
+        assert not lines["كريم"].include and len(lines["كريم"].overlaps) == 1
+        warning = overlap_warning("employee", paid, "2025-12-01", "2025-12-31")
+        assert "2025-11-15 إلى 2025-12-14" in warning and "500,000" in warning
+        assert overlap_warning("employee", paid, "2025-12-15", "2025-12-31") is None
+        print(f"✅ المسير: {[(n, l.amount, l.include) for n, l in lines.items()]}")
+
+        # محاولة فرض سطر متداخل تلغي المسير كاملاً
+        lines["كريم"].include = True
+        success, message, ids = commit_payroll_run(list(lines.values()), payment_date="2025-11-30")
+        assert not success and ids == []
+        assert db_manager.execute_query("SELECT COUNT(*) AS c FROM salaries")[0]['c'] == 2
+        print(f"✅ رفض المسير المتداخل: {message}")
+
+        lines["كريم"].include = False
+        success, message, ids = commit_payroll_run(list(lines.values()), payment_date="2025-11-30")
+        assert success and len(ids) == 2
+        assert find_overlapping_salaries("teacher", full, "2025-11-20", "2025-11-20")[0]['id'] in ids
+        assert not prepare_payroll_run(school, 2025, 11)[0].include
+
+        slips = salary_slips(ids)
+        assert [s['employee_name'] for s in slips] == ["أحمد", "زينب"]
+        assert slips[1]['days_count'] == 20 and slips[1]['net_salary'] == 400000
+        print(f"✅ {len(slips)} قسيمة راتب جاهزة للطباعة")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_interval_index_finds_every_overlap()
+    test_payroll_run_prorates_and_skips_overlaps()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار مجاميع الفترات: حدود المدى، مطابقة الحساب المباشر، استخدام الفهرس،
+وإبطال الذاكرة المؤقتة عند الكتابة من نفس الاتصال أو من اتصال آخر
+"""
+
+import sys
+import random
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.finance.periods import current_period_totals, period_bounds, period_total
+
+
+TODAY = date(2025, 12, 15)
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _add_expense(school_id, day, amount):
+    return _execute("INSERT INTO expenses (school_id, expense_type, amount, expense_date) VALUES (?, 'قرطاسية', ?, ?)",
+                    (school_id, amount, day))
+
+
+def _expected(school_id, prefix):
+    rows = db_manager.execute_query("SELECT school_id, amount, expense_date FROM expenses")
+    return sum(row['amount'] for row in rows
+               if row['expense_date'].startswith(prefix) and school_id in (None, row['school_id']))
+
+
+def test_period_bounds():
+    assert period_bounds(2025, 2) == ("2025-02-01", "2025-03-01")
+    assert period_bounds(2025, 12) == ("2025-12-01", "2026-01-01")
+    assert period_bounds(2025) == ("2025-01-01", "2026-01-01")
+    print("✅ حدود الفترات نصف مفتوحة بما فيها شهر كانون الأول")
+
+
+def test_totals_are_cached_until_written():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "periods.db"
+        db_manager.create_tables()
+        schools = [_execute("INSERT INTO schools (name_ar, school_types) VALUES (?, 'ابتدائية')", (name,))
+                   for name in ("النور", "الأمل")]
+
+        rng = random.Random(3)
+        for _ in range(300):
+            day = TODAY - timedelta(days=rng.randint(0, 400))
+            _add_expense(rng.choice(schools), day.isoformat(), rng.choice([5000, 12500, 40000]))
+
+        for school_id in (None, *schools):
+            totals = current_period_totals("expenses", school_id=school_id, today=TODAY)
+            assert totals == {'month': _expected(school_id, "2025-12"), 'year': _expected(school_id, "2025")}
+        assert current_period_totals("expenses", school_id="general", today=TODAY) == {'month': 0, 'year': 0}
+        print(f"✅ مجاميع الشهر والسنة مطابقة: {current_period_totals('expenses', today=TODAY)}")
+
+        plan = db_manager.execute_query("""
+            EXPLAIN QUERY PLAN SELECT SUM(amount) FROM expenses
+            WHERE expense_date >= ? AND expense_date < ? AND school_id = ?
+        """, (*period_bounds(2025, 12), schools[0]))
+        assert any("idx_expenses_school_date" in row['detail'] for row in plan)
+
+        queries = []
+        original = db_manager.execute_query
+        db_manager.execute_query = lambda sql, params=(): queries.append(sql) or original(sql, params)
+        try:
+            period_total("expenses", 2025, 12, schools[0])
+            assert queries == []
+            print("✅ إعادة الطلب دون كتابة تُخدم من الذاكرة المؤقتة")
+
+            before = period_total("expenses", 2025, 12, schools[0])
+            _add_expense(schools[0], "2025-12-01", 1000)
+            assert period_total("expenses", 2025, 12, schools[0]) == before + 1000
+
+            # كتابة من عملية أخرى تُكتشف عبر PRAGMA data_version
+            other = sqlite3.connect(db_manager.db_path)
+            other.execute("DELETE FROM expenses WHERE amount = 1000")
+            other.commit()
+            other.close()
+            assert period_total("expenses", 2025, 12, schools[0]) == before
+            assert len(queries) == 2
+        finally:
+            db_manager.execute_query = original
+        print("✅ الكتابة من نفس الاتصال أو من اتصال آخر تُبطل المجموع المحفوظ")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_period_bounds()
+    test_totals_are_cached_until_written()
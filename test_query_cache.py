@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار ذاكرة الاستعلامات: توحيد المفتاح، الإبطال عند الكتابة في الجدول المقروء
+فقط، تجاوز الجداول غير المتتبعة، وعدادات الإصابة والإخفاق
+"""
+
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.database.query_cache import query_cache, referenced_tables
+from core.utils.telemetry import telemetry
+
+
+SCHOOLS_QUERY = "SELECT id, name_ar FROM schools ORDER BY name_ar"
+
+
+def test_referenced_tables():
+    assert referenced_tables(SCHOOLS_QUERY) == ("schools",)
+    assert referenced_tables("""
+        SELECT t.id, s.name_ar FROM teachers t LEFT JOIN schools s ON t.school_id = s.id
+    """) == ("schools", "teachers")
+    print("✅ استخراج الجداول المقروءة من نص الاستعلام")
+
+
+def test_cache_hits_until_table_changes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "cache.db"
+        db_manager.create_tables()
+        query_cache.clear()
+        telemetry.reset()
+        school = db_manager.execute_insert(
+            "INSERT INTO schools (name_ar, school_types) VALUES ('النور', 'ابتدائية')")
+
+        first = db_manager.execute_cached_query(SCHOOLS_QUERY)
+        # نفس الاستعلام بمسافات مختلفة يصيب نفس المدخل
+        again = db_manager.execute_cached_query("SELECT id, name_ar\n    FROM schools   ORDER BY name_ar")
+        assert [tuple(r) for r in again] == [tuple(r) for r in first] == [(school, "النور")]
+        assert query_cache.stats()['hits'] == 1
+
+        # الكتابة في جدول آخر لا تبطل قائمة المدارس
+        db_manager.execute_insert(
+            "INSERT INTO teachers (name, school_id, monthly_salary) VALUES ('أحمد', ?, 500000)", (school,))
+        db_manager.execute_cached_query(SCHOOLS_QUERY)
+        assert query_cache.stats()['hits'] == 2
+
+        db_manager.execute_update("UPDATE schools SET name_ar = 'الأمل' WHERE id = ?", (school,))
+        assert db_manager.execute_cached_query(SCHOOLS_QUERY)[0]['name_ar'] == "الأمل"
+
+        # المعاملات جزء من المفتاح
+        query = "SELECT id, name FROM teachers WHERE school_id = ?"
+        assert len(db_manager.execute_cached_query(query, (school,))) == 1
+        assert len(db_manager.execute_cached_query(query, (school + 1,))) == 0
+
+        # الجداول غير المتتبعة لا تُحفظ
+        before = query_cache.stats()['entries']
+        db_manager.execute_cached_query("SELECT setting_key FROM app_settings")
+        assert query_cache.stats()['entries'] == before
+
+        stats = query_cache.stats()
+        counters = telemetry.counter_stats()
+        assert (stats['hits'], stats['misses']) == (2, 5)
+        assert counters == {'query_cache.hit': 2, 'query_cache.miss': 5}
+        print(f"✅ ذاكرة الاستعلامات: {stats}")
+
+        # إعادة فتح القاعدة تبطل كل المدخلات
+        db_manager.close_connection()
+        db_manager.execute_cached_query(SCHOOLS_QUERY)
+        assert query_cache.stats()['misses'] == 6
+        print("✅ إعادة الاتصال تبطل النتائج المحفوظة")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_referenced_tables()
+    test_cache_hits_until_table_changes()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار إحصائيات الرواتب: ملخصات المحفزات تطابق الحساب المباشر بعد الإضافة والتعديل والحذف
+"""
+
+import sys
+import random
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.finance.salary_stats import rebuild_salary_stats, salary_totals, staff_salary_stats
+
+
+TODAY = date(2025, 11, 20)
+STAFF = [("teacher", 1), ("teacher", 2), ("employee", 1)]
+
+
+def _execute(sql, params=()):
+    with db_manager.get_cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+
+def _insert(rng):
+    staff_type, staff_id = rng.choice(STAFF)
+    paid = rng.choice([250000, 400000, 500000, 750000])
+    day = (TODAY - timedelta(days=rng.randint(0, 500))).isoformat()
+    return _execute("""
+        INSERT INTO salaries (staff_type, staff_id, base_salary, paid_amount, from_date, to_date,
+                              days_count, payment_date, payment_time, school_id)
+        VALUES (?, ?, ?, ?, ?, ?, 30, ?, '10:00', 1)
+    """, (staff_type, staff_id, paid, paid, day, day, day))
+
+
+def _expected(staff_type, staff_id):
+    rows = db_manager.execute_query(
+        "SELECT paid_amount, payment_date FROM salaries WHERE staff_type = ? AND staff_id = ?",
+        (staff_type, staff_id))
+    amounts = [row['paid_amount'] for row in rows]
+    this_year = [row['paid_amount'] for row in rows if row['payment_date'][:4] == "2025"]
+    this_month = [row['paid_amount'] for row in rows if row['payment_date'][:7] == "2025-11"]
+    return {
+        'count': len(rows),
+        'total': sum(amounts),
+        'average': sum(amounts) / len(rows) if rows else 0.0,
+        'max': max(amounts, default=0.0),
+        'last_date': max((row['payment_date'] for row in rows), default=None),
+        'year_count': len(this_year),
+        'year_amount': sum(this_year),
+        'month_count': len(this_month),
+        'month_amount': sum(this_month),
+    }
+
+
+def test_summaries_follow_inserts_updates_and_deletes():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "salaries.db"
+        db_manager.create_tables()
+        _execute("INSERT INTO schools (name_ar, school_types) VALUES ('النور', 'ابتدائية')")
+
+        rng = random.Random(7)
+        ids = [_insert(rng) for _ in range(60)]
+        for _ in range(40):
+            action = rng.random()
+            if action < 0.4:
+                salary_id = ids.pop(rng.randrange(len(ids)))
+                _execute("DELETE FROM salaries WHERE id = ?", (salary_id,))
+            elif action < 0.7:
+                _execute("UPDATE salaries SET paid_amount = ? WHERE id = ?",
+                         (rng.choice([100000, 900000]), rng.choice(ids)))
+            elif action < 0.85:
+                staff_type, staff_id = rng.choice(STAFF)
+                _execute("UPDATE salaries SET staff_type = ?, staff_id = ? WHERE id = ?",
+                         (staff_type, staff_id, rng.choice(ids)))
+            else:
+                _execute("UPDATE salaries SET payment_date = ? WHERE id = ?",
+                         (TODAY.isoformat(), rng.choice(ids)))
+
+        for staff_type, staff_id in STAFF:
+            assert staff_salary_stats(staff_type, staff_id, TODAY) == _expected(staff_type, staff_id)
+        print(f"✅ ملخصات {len(STAFF)} أشخاص مطابقة بعد 40 تعديلاً")
+
+        summary = db_manager.execute_query("SELECT * FROM salary_monthly_stats ORDER BY 1, 2, 3")
+        assert rebuild_salary_stats()[0]
+        assert [tuple(r) for r in summary] == [
+            tuple(r) for r in db_manager.execute_query("SELECT * FROM salary_monthly_stats ORDER BY 1, 2, 3")]
+
+        empty = staff_salary_stats("teacher", 99, TODAY)
+        assert empty['count'] == 0 and empty['last_date'] is None
+
+        totals = salary_totals(date_from="2025-01-01", date_to="2025-12-31")
+        year = [_expected(*staff)['year_amount'] for staff in STAFF]
+        assert totals['total'] == sum(year)
+        assert totals['teachers_total'] == year[0] + year[1] and totals['employees_total'] == year[2]
+        print(f"✅ مجاميع صفحة الرواتب: {totals['count']} راتب بمجموع {totals['total']:,.0f}")
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_summaries_follow_inserts_updates_and_deletes()
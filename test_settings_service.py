@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار خدمة الإعدادات: ذاكرة مؤقتة موحدة، إشعارات عند التغيير، واكتشاف تعديلات العمليات الأخرى
+"""
+
+import sys
+import gc
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import DatabaseManager
+from core.utils.settings_manager import SettingsManager
+
+
+def _database(path):
+    db = DatabaseManager()
+    db.db_path = Path(path)
+    return db
+
+
+def _count_cursors(db):
+    """عداد لمرات فتح cursor على القاعدة"""
+    calls = []
+    original = db.get_cursor
+
+    @contextmanager
+    def counting_cursor():
+        calls.append(1)
+        with original() as cursor:
+            yield cursor
+
+    db.get_cursor = counting_cursor
+    return calls
+
+
+class Listener:
+    def __init__(self):
+        self.events = []
+
+    def on_change(self, key, value):
+        self.events.append((key, value))
+
+
+def test_reads_come_from_memory_after_single_load():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = _database(Path(temp_dir) / "settings.db")
+        db.create_tables()
+        db.execute_update("INSERT INTO app_settings (setting_key, setting_value) VALUES ('academic_year', '2025 - 2026')")
+        calls = _count_cursors(db)
+
+        manager = SettingsManager(db)
+        for _ in range(100):
+            assert manager.get_academic_year() == "2025 - 2026"
+            manager.get_all_settings()
+        print(f"✅ 200 قراءة باستعلام واحد ({len(calls)})")
+        assert len(calls) == 1
+        db.close_connection()
+
+
+def test_set_setting_notifies_subscribers():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = _database(Path(temp_dir) / "settings.db")
+        db.create_tables()
+        manager = SettingsManager(db)
+
+        year_listener, all_listener = Listener(), Listener()
+        manager.subscribe(year_listener.on_change, "academic_year")
+        unsubscribe = manager.subscribe(all_listener.on_change)
+
+        manager.set_academic_year("2026 - 2027")
+        manager.set_academic_year("2026 - 2027")  # بلا تغيير: لا إشعار
+        manager.set_setting("currency_symbol", "د.ع")
+        print(f"✅ إشعارات العام الدراسي: {year_listener.events}")
+        assert year_listener.events == [("academic_year", "2026 - 2027")]
+        assert len(all_listener.events) == 2
+
+        unsubscribe()
+        del year_listener
+        gc.collect()
+        manager.set_academic_year("2027 - 2028")
+        assert len(all_listener.events) == 2
+        assert manager._listeners == []
+        db.close_connection()
+
+
+def test_changes_from_another_process_are_detected():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = Path(temp_dir) / "settings.db"
+        db = _database(path)
+        db.create_tables()
+        manager = SettingsManager(db)
+        manager.set_academic_year("2025 - 2026")
+        listener = Listener()
+        manager.subscribe(listener.on_change, "academic_year")
+
+        assert not manager.refresh_if_changed()
+
+        # اتصال مستقل يمثل نسخة أخرى من التطبيق
+        other = SettingsManager(_database(path))
+        other.set_academic_year("2030 - 2031")
+
+        assert manager.refresh_if_changed()
+        print(f"✅ تغيير من عملية أخرى: {listener.events}")
+        assert manager.get_academic_year() == "2030 - 2031"
+        assert listener.events == [("academic_year", "2030 - 2031")]
+        other.db.close_connection()
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    test_reads_come_from_memory_after_single_load()
+    test_set_setting_notifies_subscribers()
+    test_changes_from_another_process_are_detected()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار ميزانية بدء التشغيل: المكتبات الثقيلة للطباعة و PDF لا تُحمّل عند الاستيراد
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+import config
+from core.utils.startup_profiler import (
+    parse_importtime, package_breakdown, profile_imports, total_import_ms
+)
+
+
+# وحدات بدء التشغيل التي لا تحتاج PyQt5
+STARTUP_CORE_MODULES = (
+    "core.database.connection",
+    "core.auth.login_manager",
+    "core.backup.backup_manager",
+    "core.printing",
+    "core.printing.print_config",
+)
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _io
+import time:       300 |        420 |   core.utils.telemetry
+import time:      1500 |       1920 | core.printing
+"""
+
+
+def test_parse_importtime():
+    timings = parse_importtime(SAMPLE)
+    print(f"✅ تم تحليل {len(timings)} سطر")
+    assert [t.module for t in timings] == ["_io", "core.utils.telemetry", "core.printing"]
+    assert [t.depth for t in timings] == [2, 1, 0]
+    assert timings[-1].cumulative_ms == 1.92
+    assert abs(total_import_ms(timings) - 1.92) < 1e-9
+    assert package_breakdown(timings)[0]['package'] == "core.printing"
+
+
+def test_heavy_modules_stay_deferred():
+    """استيراد وحدات بدء التشغيل في عملية باردة دون تحميل ReportLab أو Jinja2 أو QtWebEngine"""
+    timings, loaded = profile_imports(STARTUP_CORE_MODULES)
+    total = total_import_ms(timings)
+    print(f"✅ زمن الاستيراد البارد: {total:.1f} ms، مكتبات ثقيلة محمّلة: {loaded or 'لا شيء'}")
+    assert loaded == []
+    assert total < config.STARTUP_IMPORT_BUDGET_MS
+    imported = {t.module for t in timings}
+    assert "core.printing.print_manager" not in imported
+    assert "core.printing.reportlab_print_manager" not in imported
+
+
+if __name__ == "__main__":
+    test_parse_importtime()
+    test_heavy_modules_stay_deferred()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار محرك التصدير المتدفق على قاعدة بيانات مؤقتة
+"""
+
+import sys
+import os
+import csv
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.database.connection import db_manager
+from core.export import (
+    EXPENSES_EXPORT, open_readonly_connection, export_to_file
+)
+
+
+def _prepare_database(db_path, rows_count):
+    db_manager.db_path = Path(db_path)
+    db_manager.connection = None
+    db_manager.create_tables()
+    with db_manager.get_cursor() as cursor:
+        cursor.execute("INSERT INTO schools (name_ar, school_types) VALUES (?, ?)", ("مدرسة الاختبار", "ابتدائية"))
+        school_id = cursor.lastrowid
+        cursor.executemany(
+            "INSERT INTO expenses (school_id, expense_type, amount, expense_date, description) VALUES (?, ?, ?, ?, ?)",
+            [(school_id, "رواتب" if i % 2 else "صيانة", 1000 + i, f"2025-01-{(i % 28) + 1:02d}", f"مصروف {i}")
+             for i in range(rows_count)]
+        )
+
+
+def test_streaming_csv_export():
+    """تصدير CSV على دفعات صغيرة مع فلتر الصفحة"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "test.db")
+        _prepare_database(db_path, 250)
+
+        output_path = os.path.join(temp_dir, "expenses.csv")
+        progress = []
+        conn = open_readonly_connection(db_path)
+        try:
+            written, summary = export_to_file(
+                conn, EXPENSES_EXPORT, output_path,
+                where_clause=" AND e.expense_type = ?",
+                params=("صيانة",),
+                selected_keys=["id", "amount"],
+                batch_size=40,
+                progress_callback=lambda done, total: progress.append((done, total))
+            )
+        finally:
+            conn.close()
+        db_manager.close_connection()
+
+        print(f"✅ تم تصدير {written} سجل، الإجمالي {summary.total:,.2f}")
+        assert written == 125
+        assert summary.count == 125
+        assert progress[-1] == (125, 125)
+
+        with open(output_path, encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+        assert rows[4] == ["المعرف", "المبلغ (د.ع)"]
+        assert len(rows[5:5 + written]) == 125
+
+
+def test_streaming_export_cancel():
+    """إلغاء التصدير يوقف الكتابة"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "test.db")
+        _prepare_database(db_path, 100)
+
+        conn = open_readonly_connection(db_path)
+        try:
+            export_to_file(conn, EXPENSES_EXPORT, os.path.join(temp_dir, "out.csv"),
+                           batch_size=10, cancel_check=lambda: True)
+        except InterruptedError:
+            print("✅ تم إيقاف التصدير عند الإلغاء")
+        else:
+            raise AssertionError("كان يجب إيقاف التصدير")
+        finally:
+            conn.close()
+            db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_streaming_csv_export()
+    test_streaming_export_cancel()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+اختبار قياس الأداء: المقاطع الزمنية والمزخرفات وإحصائيات الاستعلامات
+"""
+
+import sys
+import json
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from core.utils.telemetry import Telemetry, telemetry, instrument_methods
+from core.database.connection import db_manager
+
+
+def test_span_stats_and_export():
+    """حساب p50/p95 من المخزن الدائري وتصدير العينات"""
+    collector = Telemetry(capacity=100, enabled=True)
+    for value in range(1, 201):
+        collector.record("page.load", float(value))
+    with collector.span("block"):
+        pass
+
+    stats = {s['name']: s for s in collector.span_stats()}
+    print(f"✅ p50={stats['page.load']['p50']} p95={stats['page.load']['p95']}")
+    # المخزن يحتفظ بآخر 100 عينة فقط
+    assert stats['page.load']['count'] == 99
+    assert stats['page.load']['p50'] == 151.0
+    assert stats['page.load']['p95'] == 195.0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = collector.export(Path(temp_dir) / "telemetry.jsonl")
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line) for line in f]
+        assert sum(1 for line in lines if line["type"] == "sample") == 100
+
+
+def test_instrument_methods_drops_extra_signal_args():
+    """الدوال المقاسة تقبل المعاملات الزائدة كما يمررها PyQt (مثل clicked(bool))"""
+    @instrument_methods()
+    class Page:
+        def load_data(self):
+            return "loaded"
+
+        def helper(self):
+            return "not timed"
+
+    telemetry.reset()
+    page = Page()
+    assert page.load_data(False) == "loaded"
+    assert page.helper() == "not timed"
+    names = [s['name'] for s in telemetry.span_stats()]
+    print(f"✅ المقاطع: {names}")
+    assert names == ["Page.load_data"]
+
+
+def test_statement_stats():
+    """تجميع أزمنة الاستعلامات حسب نصها"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_manager.close_connection()
+        db_manager.db_path = Path(temp_dir) / "telemetry.db"
+        db_manager.create_tables()
+        telemetry.reset()
+        for _ in range(3):
+            db_manager.execute_query("SELECT   COUNT(*)\n FROM schools")
+        stats = telemetry.statement_stats()
+        print(f"✅ {stats[0]['sql']} × {stats[0]['count']}")
+        assert stats[0]['sql'] == "SELECT COUNT(*) FROM schools"
+        assert stats[0]['count'] == 3
+        db_manager.close_connection()
+
+
+if __name__ == "__main__":
+    test_span_stats_and_export()
+    test_instrument_methods_drops_extra_signal_args()
+    test_statement_stats()
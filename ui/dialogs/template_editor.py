@@ -7,21 +7,18 @@
 import sys
 import json
 import logging
-import tempfile
-import threading
+import time
 import os
-from datetime import datetime
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QTabWidget,
     QWidget, QPushButton, QLabel, QSpinBox, QDoubleSpinBox,
     QLineEdit, QColorDialog, QComboBox, QCheckBox, QGroupBox,
     QScrollArea, QTextEdit, QFileDialog, QMessageBox, QSplitter,
-    QFrame, QProgressBar
+    QFrame
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QThread, QUrl
-from PyQt5.QtGui import QColor, QFont
-from PyQt5.QtWebEngineWidgets import QWebEngineView
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
+from PyQt5.QtGui import QColor, QFont, QPixmap
 
 # إضافة مسار المشروع
 project_root = Path(__file__).parent.parent
@@ -31,83 +28,19 @@ from templates.id_template import (
     TEMPLATE_ELEMENTS, save_template_as_json, load_template_from_json,
     ID_WIDTH, ID_HEIGHT, GRID_COLS, GRID_ROWS
 )
+from core.pdf.id_card_preview import (
+    IDCardPreviewRenderer, snapshot_template, cleanup_legacy_previews
+)
 
 
-class LivePDFGenerator(QThread):
-    """مولد PDF لحظي في خيط منفصل"""
-    pdf_generated = pyqtSignal(str)  # إشارة عند اكتمال توليد PDF
-    error_occurred = pyqtSignal(str)  # إشارة عند حدوث خطأ
-    
-    def __init__(self):
-        super().__init__()
-        self.template_data = None
-        self.should_generate = False
-        self.temp_dir = Path(tempfile.gettempdir()) / "id_preview"
-        self.temp_dir.mkdir(exist_ok=True)
-        
-    def set_template_data(self, template_data):
-        """تحديث بيانات القالب"""
-        self.template_data = template_data.copy()
-        self.should_generate = True
-        
-    def run(self):
-        """تشغيل مولد PDF"""
-        if not self.template_data or not self.should_generate:
-            return
-            
-        try:
-            self.should_generate = False
-            
-            # بيانات تجريبية للمعاينة
-            sample_data = {
-                'student_name': 'أحمد محمد علي',
-                'class_name': 'الصف السادس أ',
-                'student_id': '123456',
-                'school_name': 'مدرسة الأمل الابتدائية',
-                'school_address': 'شارع الملك فهد، الرياض',
-                'phone': '011-4567890',
-                'email': 'info@amal-school.edu.sa',
-                'academic_year': '2024-2025'
-            }
-            
-            # إنشاء PDF للمعاينة (نستخدم القالب الافتراضي مؤقتاً)
-            from core.pdf.student_id_generator import StudentIDGenerator
-            
-            pdf_path = self.temp_dir / f"live_preview_{datetime.now().strftime('%H%M%S')}.pdf"
-            
-            # تطبيق تغييرات القالب مؤقتاً
-            self.apply_template_temporarily()
-            
-            # توليد PDF 
-            generator = StudentIDGenerator()
-            success = generator.generate_student_ids(
-                students_data=[sample_data],
-                output_path=str(pdf_path),
-                school_name=sample_data.get('school_name', ''),
-                custom_title="هوية طالب - معاينة"
-            )
-            
-            if success and pdf_path.exists():
-                self.pdf_generated.emit(str(pdf_path))
-            else:
-                self.error_occurred.emit("فشل في توليد PDF")
-                
-        except Exception as e:
-            logging.error(f"خطأ في توليد PDF لحظي: {e}")
-            self.error_occurred.emit(f"خطأ: {str(e)}")
-    
-    def apply_template_temporarily(self):
-        """تطبيق تغييرات القالب مؤقتاً على TEMPLATE_ELEMENTS"""
-        try:
-            from templates.id_template import TEMPLATE_ELEMENTS
-            
-            # نطبق التغييرات مؤقتاً فقط
-            for element_name, element_data in self.template_data.items():
-                if element_name in TEMPLATE_ELEMENTS:
-                    TEMPLATE_ELEMENTS[element_name].update(element_data)
-                    
-        except Exception as e:
-            logging.error(f"خطأ في تطبيق القالب مؤقتاً: {e}")
+# بيانات نموذجية للمعاينة اللحظية
+PREVIEW_SAMPLE_DATA = {
+    'name': 'أحمد محمد علي',
+    'grade': 'الصف السادس أ',
+    'id': '123456',
+    'school_name': 'مدرسة الأمل الابتدائية',
+    'birthdate': ''
+}
 
 
 class ColorButton(QPushButton):
@@ -418,7 +351,7 @@ class TemplateEditor(QDialog):
         preview_layout = QVBoxLayout(preview_frame)
         
         # عنوان المعاينة
-        preview_title = QLabel("📄 معاينة PDF لحظية")
+        preview_title = QLabel("📄 معاينة لحظية للهوية")
         preview_title.setObjectName("panelTitle")
         preview_layout.addWidget(preview_title)
         
@@ -445,63 +378,50 @@ class TemplateEditor(QDialog):
         
         preview_layout.addLayout(controls_layout)
         
-        # شريط التقدم
-        self.pdf_progress = QProgressBar()
-        self.pdf_progress.setObjectName("pdfProgress")
-        self.pdf_progress.setVisible(False)
-        self.pdf_progress.setRange(0, 0)  # للدوران اللانهائي
-        preview_layout.addWidget(self.pdf_progress)
-        
-        # عارض PDF الحقيقي
-        self.pdf_preview_widget = QWebEngineView()
+        # عارض المعاينة النقطية (يُرسم في الذاكرة دون ملفات مؤقتة)
+        self.pdf_preview_widget = QLabel()
         self.pdf_preview_widget.setObjectName("pdfPreviewWidget")
-        preview_layout.addWidget(self.pdf_preview_widget)
+        self.pdf_preview_widget.setAlignment(Qt.AlignCenter)
+        preview_scroll = QScrollArea()
+        preview_scroll.setWidgetResizable(True)
+        preview_scroll.setWidget(self.pdf_preview_widget)
+        preview_layout.addWidget(preview_scroll)
         
         parent.addWidget(preview_frame)
         
-        # إعداد مولد PDF اللحظي
-        self.setup_live_pdf_generator()
+        # إعداد الراسم اللحظي
+        self.setup_live_preview_renderer()
     
-    def setup_live_pdf_generator(self):
-        """إعداد مولد PDF اللحظي"""
-        self.pdf_generator = LivePDFGenerator()
-        self.pdf_generator.pdf_generated.connect(self.on_pdf_ready)
-        self.pdf_generator.error_occurred.connect(self.on_pdf_error)
+    def setup_live_preview_renderer(self):
+        """إعداد راسم المعاينة اللحظية"""
+        self.preview_renderer = IDCardPreviewRenderer()
         
-        # تايمر للتحديث المؤجل
+        # تايمر قصير لدمج التغييرات المتتالية أثناء السحب
         self.update_timer = QTimer()
         self.update_timer.setSingleShot(True)
         self.update_timer.timeout.connect(self.trigger_pdf_generation)
         
         # متغيرات التحكم
         self.auto_update_enabled = True
-        self.current_pdf_path = None
         
-    def on_pdf_ready(self, pdf_path):
-        """عند اكتمال توليد PDF"""
+        # حذف ملفات المعاينة القديمة المتبقية من الإصدارات السابقة
+        cleanup_legacy_previews()
+        
+    def on_preview_ready(self, image, elapsed_ms):
+        """عند اكتمال رسم المعاينة"""
         try:
-            self.current_pdf_path = pdf_path
-            self.pdf_progress.setVisible(False)
-            self.preview_status.setText("✅ PDF جاهز")
-            
-            # تحميل PDF في العارض
-            import urllib.parse
-            file_path = pdf_path.replace("\\", "/")
-            if not file_path.startswith("/"):
-                file_path = "/" + file_path
-            file_url = f"file://{file_path}"
-            
-            self.pdf_preview_widget.load(QUrl(file_url))
-            
+            self.pdf_preview_widget.setPixmap(QPixmap.fromImage(image))
+            self.preview_status.setText(
+                f"✅ جاهز ({elapsed_ms:.0f} ms، {self.preview_renderer.last_rendered_count} عنصر)"
+            )
         except Exception as e:
-            logging.error(f"خطأ في عرض PDF: {e}")
+            logging.error(f"خطأ في عرض المعاينة: {e}")
             self.preview_status.setText(f"❌ خطأ في العرض: {str(e)[:30]}...")
     
     def on_pdf_error(self, error_msg):
-        """عند حدوث خطأ في توليد PDF"""
-        self.pdf_progress.setVisible(False)
+        """عند حدوث خطأ في رسم المعاينة"""
         self.preview_status.setText(f"❌ {error_msg}")
-        logging.error(f"خطأ في توليد PDF: {error_msg}")
+        logging.error(f"خطأ في رسم المعاينة: {error_msg}")
     
     def toggle_auto_update(self, state):
         """تبديل التحديث التلقائي"""
@@ -510,36 +430,31 @@ class TemplateEditor(QDialog):
             self.schedule_pdf_update()
     
     def force_pdf_update(self):
-        """فرض تحديث PDF يدوياً"""
-        self.schedule_pdf_update()
+        """فرض تحديث المعاينة يدوياً"""
+        self.preview_renderer.clear()
+        self.trigger_pdf_generation()
     
     def schedule_pdf_update(self):
-        """جدولة تحديث PDF مع تأخير"""
+        """جدولة تحديث المعاينة مع تأخير قصير"""
         if not self.auto_update_enabled:
             return
             
         self.update_timer.stop()
-        self.update_timer.start(1000)  # تأخير ثانية واحدة
-        
-        self.pdf_progress.setVisible(True)
-        self.preview_status.setText("⏳ جاري التحديث...")
+        self.update_timer.start(15)
     
     def trigger_pdf_generation(self):
-        """تشغيل توليد PDF"""
+        """رسم المعاينة من لقطة ثابتة للقالب الحالي"""
         try:
-            template_data = self.get_current_template_data()
-            
-            if not self.pdf_generator.isRunning():
-                self.pdf_generator.set_template_data(template_data)
-                if not self.pdf_generator.isRunning():
-                    self.pdf_generator.start()
-            else:
-                # إذا كان يعمل، قم بتحديث البيانات فقط
-                self.pdf_generator.set_template_data(template_data)
+            started = time.perf_counter()
+            snapshot = snapshot_template(self.get_current_template_data())
+            image = self.preview_renderer.render(
+                snapshot, PREVIEW_SAMPLE_DATA, PREVIEW_SAMPLE_DATA['school_name']
+            )
+            self.on_preview_ready(image, (time.perf_counter() - started) * 1000)
                 
         except Exception as e:
-            logging.error(f"خطأ في تشغيل توليد PDF: {e}")
-            self.on_pdf_error(f"خطأ في التشغيل: {str(e)}")
+            logging.error(f"خطأ في رسم المعاينة: {e}")
+            self.on_pdf_error(f"خطأ في الرسم: {str(e)}")
     
     def get_current_template_data(self):
         """الحصول على بيانات القالب الحالية"""
@@ -1,28 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة تعيين رسم إضافي لمجموعة طلاب
+تحدد الطلاب بفلتر، وتعرض عددهم والمجموع قبل التنفيذ، ثم تعين الرسم للجميع
+دفعة واحدة مع إمكانية التراجع عن آخر الدفعات
+"""
+
 import sys
-import os
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, 
-                            QLabel, QLineEdit, QComboBox, QDateEdit, QDoubleSpinBox,
-                            QPushButton, QFrame, QMessageBox, QGroupBox, QTextEdit,
-                            QCheckBox, QListWidget, QListWidgetItem)
-from PyQt5.QtCore import Qt, QDate, pyqtSignal
-from PyQt5.QtGui import QFont, QIcon
-import sqlite3
-from datetime import datetime
 import logging
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
+                            QLabel, QLineEdit, QComboBox, QDoubleSpinBox,
+                            QPushButton, QMessageBox, QGroupBox, QTextEdit,
+                            QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QFont, QIcon
+
+from core.database.connection import db_manager
+from core.finance.fee_assignment import (
+    FeeTarget, assign_fee, current_term, preview_fee_assignment, recent_batches, undo_fee_batch
+)
+from core.utils.grade_catalog import grade_catalog
+from core.utils.logger import log_user_action
+
 
 class AddAdditionalFeeDialog(QDialog):
+    """نافذة تعيين رسم إضافي لمجموعة طلاب دفعة واحدة"""
+
     fee_added = pyqtSignal()
-    
-    def __init__(self, parent=None):
+
+    # أنواع الرسوم المعتمدة في فلتر صفحة الرسوم الإضافية
+    FEE_TYPES = ["رسوم التسجيل", "الزي المدرسي", "الكتب", "القرطاسية"]
+
+    def __init__(self, parent=None, school_id=None):
         super().__init__(parent)
-        self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'database', 'private_schools.db')
-        self.selected_students = []
+        self.initial_school_id = school_id
         self.setup_ui()
         self.load_data()
         self.setup_connections()
         
     def setup_ui(self):
-        self.setWindowTitle("إضافة رسم إضافي")
+        self.setWindowTitle("تعيين رسم إضافي")
         self.setModal(True)
         self.resize(700, 750)
         
@@ -177,7 +194,7 @@ class AddAdditionalFeeDialog(QDialog):
         main_layout.setContentsMargins(20, 20, 20, 20)
         
         # عنوان النافذة
-        title_label = QLabel("إضافة رسم إضافي")
+        title_label = QLabel("تعيين رسم إضافي")
         title_label.setAlignment(Qt.AlignCenter)
         title_label.setStyleSheet("""
             QLabel {
@@ -197,89 +214,61 @@ class AddAdditionalFeeDialog(QDialog):
         fee_layout = QFormLayout(fee_details_group)
         fee_layout.setSpacing(12)
         
-        # نوع الرسم
+        # نوع الرسم (قابل للتعديل لإدخال رسم مخصص)
         self.fee_type_combo = QComboBox()
-        self.fee_type_combo.addItems([
-            "كتب ومواد دراسية", "نشاطات ورحلات", "نقل وباصات",
-            "امتحانات وشهادات", "رسوم إدارية", "خدمات إضافية", "أخرى"
-        ])
+        self.fee_type_combo.setEditable(True)
+        self.fee_type_combo.addItems(self.FEE_TYPES)
         fee_layout.addRow("نوع الرسم:", self.fee_type_combo)
         
-        # اسم الرسم
-        self.fee_name_edit = QLineEdit()
-        self.fee_name_edit.setPlaceholderText("مثال: كتب الفصل الأول")
-        fee_layout.addRow("اسم الرسم:", self.fee_name_edit)
-        
-        # الوصف
-        self.description_edit = QTextEdit()
-        self.description_edit.setPlaceholderText("وصف تفصيلي للرسم (اختياري)")
-        self.description_edit.setMaximumHeight(80)
-        fee_layout.addRow("الوصف:", self.description_edit)
-        
         # المبلغ
         self.amount_spin = QDoubleSpinBox()
-        self.amount_spin.setRange(0, 999999)
-        self.amount_spin.setDecimals(2)
-        self.amount_spin.setSuffix(" ر.س")
-        self.amount_spin.setValue(100.00)
+        self.amount_spin.setRange(0, 999999999)
+        self.amount_spin.setDecimals(0)
+        self.amount_spin.setSuffix(" د.ع")
+        self.amount_spin.setValue(50000)
         fee_layout.addRow("المبلغ:", self.amount_spin)
         
-        # تاريخ الاستحقاق
-        self.due_date_edit = QDateEdit()
-        self.due_date_edit.setDate(QDate.currentDate().addDays(30))
-        self.due_date_edit.setCalendarPopup(True)
-        self.due_date_edit.setDisplayFormat("yyyy-MM-dd")
-        fee_layout.addRow("تاريخ الاستحقاق:", self.due_date_edit)
+        # الفصل (يمنع تكرار نفس الرسم لنفس الطالب في نفس الفصل)
+        self.term_edit = QLineEdit()
+        self.term_edit.setText(current_term())
+        fee_layout.addRow("الفصل:", self.term_edit)
         
-        main_layout.addWidget(fee_details_group)
+        # الملاحظات
+        self.description_edit = QTextEdit()
+        self.description_edit.setPlaceholderText("ملاحظات تُحفظ مع كل رسم (اختياري)")
+        self.description_edit.setMaximumHeight(80)
+        fee_layout.addRow("الملاحظات:", self.description_edit)
         
-        # مجموعة اختيار الطلاب
-        students_group = QGroupBox("اختيار الطلاب")
-        students_layout = QVBoxLayout(students_group)
+        main_layout.addWidget(fee_details_group)
         
-        # شريط الفلترة
-        filter_layout = QHBoxLayout()
+        # مجموعة فلتر الطلاب
+        students_group = QGroupBox("الطلاب المستهدفون")
+        students_layout = QFormLayout(students_group)
+        students_layout.setSpacing(12)
         
-        # اختيار المدرسة
         self.school_combo = QComboBox()
-        self.school_combo.setPlaceholderText("اختر المدرسة")
-        filter_layout.addWidget(QLabel("المدرسة:"))
-        filter_layout.addWidget(self.school_combo)
+        students_layout.addRow("المدرسة:", self.school_combo)
         
-        # اختيار الصف
         self.grade_combo = QComboBox()
-        self.grade_combo.addItems([
-            "الكل", "KG1", "KG2", "الأول الابتدائي", "الثاني الابتدائي", 
-            "الثالث الابتدائي", "الرابع الابتدائي", "الخامس الابتدائي", 
-            "السادس الابتدائي", "الأول المتوسط", "الثاني المتوسط", 
-            "الثالث المتوسط", "الأول الثانوي", "الثاني الثانوي", "الثالث الثانوي"
-        ])
-        filter_layout.addWidget(QLabel("الصف:"))
-        filter_layout.addWidget(self.grade_combo)
-        
-        students_layout.addLayout(filter_layout)
+        students_layout.addRow("الصف:", self.grade_combo)
         
-        # أزرار التحديد
-        selection_layout = QHBoxLayout()
+        self.section_combo = QComboBox()
+        students_layout.addRow("الشعبة:", self.section_combo)
         
-        self.select_all_checkbox = QCheckBox("تحديد الكل")
-        selection_layout.addWidget(self.select_all_checkbox)
+        self.status_combo = QComboBox()
+        for status in ("نشط", "منقطع", "متخرج", "منتقل"):
+            self.status_combo.addItem(status, status)
+        self.status_combo.addItem("جميع الحالات", None)
+        students_layout.addRow("الحالة:", self.status_combo)
         
-        selection_layout.addStretch()
+        self.gender_combo = QComboBox()
+        self.gender_combo.addItem("الكل", None)
+        self.gender_combo.addItem("ذكر", "ذكر")
+        self.gender_combo.addItem("أنثى", "أنثى")
+        students_layout.addRow("الجنس:", self.gender_combo)
         
-        self.filter_btn = QPushButton("تطبيق الفلتر")
-        self.filter_btn.setObjectName("select_btn")
-        selection_layout.addWidget(self.filter_btn)
-        
-        students_layout.addLayout(selection_layout)
-        
-        # قائمة الطلاب
-        self.students_list = QListWidget()
-        self.students_list.setMaximumHeight(200)
-        students_layout.addWidget(self.students_list)
-        
-        # معلومات الطلاب المحددين
-        self.selected_info_label = QLabel("لم يتم تحديد أي طلاب")
+        # نتيجة المعاينة
+        self.selected_info_label = QLabel("")
         self.selected_info_label.setStyleSheet("""
             QLabel {
                 background-color: #f8f9fa;
@@ -290,19 +279,39 @@ class AddAdditionalFeeDialog(QDialog):
                 font-size: 24px;
             }
         """)
-        students_layout.addWidget(self.selected_info_label)
+        students_layout.addRow(self.selected_info_label)
         
         main_layout.addWidget(students_group)
         
+        # آخر الدفعات مع إمكانية التراجع
+        batches_group = QGroupBox("آخر عمليات التعيين")
+        batches_layout = QVBoxLayout(batches_group)
+        
+        self.batches_table = QTableWidget(0, 5)
+        self.batches_table.setHorizontalHeaderLabels(["نوع الرسم", "الفصل", "الطلاب", "المجموع", "الحالة"])
+        self.batches_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.batches_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.batches_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.batches_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.batches_table.setMaximumHeight(150)
+        batches_layout.addWidget(self.batches_table)
+        
+        self.undo_btn = QPushButton("تراجع عن الدفعة المحددة")
+        self.undo_btn.setObjectName("select_btn")
+        self.undo_btn.setEnabled(False)
+        batches_layout.addWidget(self.undo_btn)
+        
+        main_layout.addWidget(batches_group)
+        
         # أزرار العمل
         buttons_layout = QHBoxLayout()
         buttons_layout.addStretch()
         
-        self.save_btn = QPushButton("حفظ الرسوم")
+        self.save_btn = QPushButton("تعيين الرسم")
         self.save_btn.setIcon(QIcon("💾"))
         buttons_layout.addWidget(self.save_btn)
         
-        self.cancel_btn = QPushButton("إلغاء")
+        self.cancel_btn = QPushButton("إغلاق")
         self.cancel_btn.setObjectName("cancel_btn")
         self.cancel_btn.setIcon(QIcon("❌"))
         buttons_layout.addWidget(self.cancel_btn)
@@ -313,154 +322,174 @@ class AddAdditionalFeeDialog(QDialog):
         """ربط الإشارات"""
         self.save_btn.clicked.connect(self.save_fees)
         self.cancel_btn.clicked.connect(self.reject)
-        self.filter_btn.clicked.connect(self.load_students)
+        self.undo_btn.clicked.connect(self.undo_selected_batch)
+        self.batches_table.itemSelectionChanged.connect(self.update_undo_button)
         
-        # ربط التحديد
-        self.select_all_checkbox.toggled.connect(self.toggle_select_all)
-        self.students_list.itemChanged.connect(self.update_selected_count)
+        # إعادة تحميل الصفوف والشعب عند تغيير المدرسة أو الصف
+        self.school_combo.currentIndexChanged.connect(self.load_grades)
+        self.grade_combo.currentIndexChanged.connect(self.load_sections)
+        
+        # تحديث المعاينة مع أي تغيير في الرسم أو الفلتر
+        for signal in (self.school_combo.currentIndexChanged, self.grade_combo.currentIndexChanged,
+                       self.section_combo.currentIndexChanged, self.status_combo.currentIndexChanged,
+                       self.gender_combo.currentIndexChanged, self.fee_type_combo.currentTextChanged,
+                       self.amount_spin.valueChanged, self.term_edit.textChanged):
+            signal.connect(self.update_preview)
         
     def load_data(self):
         """تحميل البيانات الأساسية"""
         self.load_schools()
+        if self.initial_school_id:
+            index = self.school_combo.findData(self.initial_school_id)
+            if index >= 0:
+                self.school_combo.setCurrentIndex(index)
+        self.load_grades()
+        self.load_batches()
         
     def load_schools(self):
         """تحميل قائمة المدارس"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT id, arabic_name FROM schools ORDER BY arabic_name")
-            schools = cursor.fetchall()
+            schools = db_manager.execute_cached_query("SELECT id, name_ar FROM schools ORDER BY name_ar")
             
+            self.school_combo.blockSignals(True)
             self.school_combo.clear()
-            self.school_combo.addItem("الكل", None)
-            for school_id, school_name in schools:
-                self.school_combo.addItem(school_name, school_id)
-                
-            conn.close()
+            self.school_combo.addItem("جميع المدارس", None)
+            for school in schools:
+                self.school_combo.addItem(school['name_ar'], school['id'])
+            self.school_combo.blockSignals(False)
             
         except Exception as e:
             logging.error(f"خطأ في تحميل المدارس: {e}")
             QMessageBox.warning(self, "خطأ", f"حدث خطأ في تحميل المدارس:\n{str(e)}")
     
-    def load_students(self):
-        """تحميل قائمة الطلاب حسب الفلتر"""
-        school_id = self.school_combo.currentData()
-        grade = self.grade_combo.currentText()
-        
+    def load_grades(self):
+        """تحميل صفوف المدرسة المختارة من دليل الصفوف"""
+        self.grade_combo.blockSignals(True)
+        self.grade_combo.clear()
+        self.grade_combo.addItem("جميع الصفوف", None)
+        for grade in grade_catalog.grades(self.school_combo.currentData()):
+            self.grade_combo.addItem(grade, grade)
+        self.grade_combo.blockSignals(False)
+        self.load_sections()
+    
+    def load_sections(self):
+        """تحميل الشعب المستخدمة في الصف المختار"""
+        self.section_combo.blockSignals(True)
+        self.section_combo.clear()
+        self.section_combo.addItem("جميع الشعب", None)
+        grade = self.grade_combo.currentData()
+        if grade:
+            for section in grade_catalog.sections(self.school_combo.currentData(), grade):
+                self.section_combo.addItem(section, section)
+        self.section_combo.setEnabled(bool(grade))
+        self.section_combo.blockSignals(False)
+        self.update_preview()
+    
+    def current_target(self):
+        """فلتر الطلاب الحالي"""
+        return FeeTarget(
+            school_id=self.school_combo.currentData(),
+            grade=self.grade_combo.currentData(),
+            section=self.section_combo.currentData(),
+            status=self.status_combo.currentData(),
+            gender=self.gender_combo.currentData(),
+        )
+    
+    def update_preview(self, *args):
+        """معاينة عدد الطلاب والمجموع دون كتابة"""
+        fee_type = self.fee_type_combo.currentText().strip()
+        if not fee_type or self.amount_spin.value() <= 0:
+            self.selected_info_label.setText("أدخل نوع الرسم ومبلغاً أكبر من صفر")
+            self.save_btn.setEnabled(False)
+            return
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # بناء الاستعلام
-            query = """
-                SELECT s.id, s.first_name, s.last_name, s.grade, s.section, sc.arabic_name
-                FROM students s
-                LEFT JOIN schools sc ON s.school_id = sc.id
-                WHERE s.status = 'نشط'
-            """
-            params = []
-            
-            if school_id:
-                query += " AND s.school_id = ?"
-                params.append(school_id)
-            
-            if grade != "الكل":
-                query += " AND s.grade = ?"
-                params.append(grade)
-            
-            query += " ORDER BY sc.arabic_name, s.grade, s.section, s.first_name"
-            
-            cursor.execute(query, params)
-            students = cursor.fetchall()
-            conn.close()
-            
-            # تحديث قائمة الطلاب
-            self.students_list.clear()
-            for student_id, first_name, last_name, grade, section, school_name in students:
-                display_text = f"{first_name} {last_name} - {grade}"
-                if section:
-                    display_text += f" ({section})"
-                display_text += f" - {school_name}"
-                
-                item = QListWidgetItem(display_text)
-                item.setData(Qt.UserRole, student_id)
-                item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
-                item.setCheckState(Qt.Unchecked)
-                self.students_list.addItem(item)
-            
-            self.update_selected_count()
-            
+            preview = preview_fee_assignment(self.current_target(), fee_type, self.amount_spin.value(),
+                                             self.term_edit.text().strip() or None)
+            info_text = f"الطلاب المطابقون: {preview['matched']}\n"
+            info_text += f"سيُضاف الرسم لـ {preview['new']} طالب بمجموع {preview['total']:,.0f} د.ع"
+            if preview['duplicates']:
+                info_text += f"\nمعين مسبقاً في نفس الفصل (سيُتخطى): {preview['duplicates']}"
+            self.selected_info_label.setText(info_text)
+            self.save_btn.setEnabled(preview['new'] > 0)
         except Exception as e:
-            logging.error(f"خطأ في تحميل الطلاب: {e}")
-            QMessageBox.warning(self, "خطأ", f"حدث خطأ في تحميل الطلاب:\n{str(e)}")
+            logging.error(f"خطأ في معاينة تعيين الرسوم: {e}")
+            self.selected_info_label.setText("تعذرت المعاينة")
+            self.save_btn.setEnabled(False)
     
-    def toggle_select_all(self, checked):
-        """تحديد/إلغاء تحديد جميع الطلاب"""
-        for i in range(self.students_list.count()):
-            item = self.students_list.item(i)
-            item.setCheckState(Qt.Checked if checked else Qt.Unchecked)
+    def load_batches(self):
+        """تحميل آخر دفعات التعيين"""
+        try:
+            self.batches = recent_batches()
+            self.batches_table.setRowCount(len(self.batches))
+            for row, batch in enumerate(self.batches):
+                if batch['undone_at']:
+                    status = "تم التراجع"
+                elif batch['paid_count']:
+                    status = f"مدفوع {batch['paid_count']}"
+                else:
+                    status = "قابل للتراجع"
+                values = [batch['fee_type'], batch['term'], str(batch['students_count']),
+                          f"{batch['total_amount']:,.0f}", status]
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(value)
+                    item.setToolTip(batch['target'] or "")
+                    self.batches_table.setItem(row, column, item)
+            self.update_undo_button()
+        except Exception as e:
+            logging.error(f"خطأ في تحميل دفعات الرسوم: {e}")
     
-    def update_selected_count(self):
-        """تحديث عدد الطلاب المحددين"""
-        selected_count = 0
-        total_amount = 0
-        
-        for i in range(self.students_list.count()):
-            item = self.students_list.item(i)
-            if item.checkState() == Qt.Checked:
-                selected_count += 1
-                total_amount += self.amount_spin.value()
-        
-        if selected_count == 0:
-            self.selected_info_label.setText("لم يتم تحديد أي طلاب")
-        else:
-            info_text = f"الطلاب المحددون: {selected_count}\n"
-            info_text += f"إجمالي المبلغ: {total_amount:.2f} ر.س"
-            self.selected_info_label.setText(info_text)
+    def selected_batch(self):
+        row = self.batches_table.currentRow()
+        return self.batches[row] if 0 <= row < len(self.batches) else None
     
-    def get_selected_students(self):
-        """الحصول على قائمة الطلاب المحددين"""
-        selected_students = []
-        for i in range(self.students_list.count()):
-            item = self.students_list.item(i)
-            if item.checkState() == Qt.Checked:
-                student_id = item.data(Qt.UserRole)
-                selected_students.append(student_id)
-        return selected_students
+    def update_undo_button(self):
+        batch = self.selected_batch()
+        self.undo_btn.setEnabled(bool(batch) and not batch['undone_at'] and not batch['paid_count'])
     
-    def validate_inputs(self):
-        """التحقق من صحة البيانات"""
-        errors = []
-        
-        if not self.fee_name_edit.text().strip():
-            errors.append("يجب إدخال اسم الرسم")
-        
-        if self.amount_spin.value() <= 0:
-            errors.append("يجب إدخال مبلغ أكبر من صفر")
-        
-        selected_students = self.get_selected_students()
-        if not selected_students:
-            errors.append("يجب تحديد طالب واحد على الأقل")
+    def undo_selected_batch(self):
+        """التراجع عن الدفعة المحددة كاملة"""
+        batch = self.selected_batch()
+        if not batch:
+            return
+        reply = QMessageBox.question(
+            self,
+            "تأكيد التراجع",
+            f"هل أنت متأكد من حذف رسم {batch['fee_type']} من {batch['students_count']} طالب؟",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply != QMessageBox.Yes:
+            return
         
-        return errors
+        success, message = undo_fee_batch(batch['id'])
+        if not success:
+            QMessageBox.warning(self, "خطأ", message)
+            return
+        log_user_action("التراجع عن تعيين رسوم", f"{batch['fee_type']}: {message}")
+        QMessageBox.information(self, "نجح", message)
+        self.load_batches()
+        self.update_preview()
+        self.fee_added.emit()
     
     def save_fees(self):
-        """حفظ الرسوم الإضافية"""
-        # التحقق من صحة البيانات
-        errors = self.validate_inputs()
-        if errors:
-            QMessageBox.warning(self, "خطأ في البيانات", "\n".join(errors))
+        """تعيين الرسم لكل الطلاب المطابقين دفعة واحدة"""
+        fee_type = self.fee_type_combo.currentText().strip()
+        amount = self.amount_spin.value()
+        term = self.term_edit.text().strip() or None
+        target = self.current_target()
+        
+        preview = preview_fee_assignment(target, fee_type, amount, term)
+        if preview['new'] == 0:
+            QMessageBox.warning(self, "تحذير", "لا يوجد طلاب جدد لتعيين الرسم لهم")
             return
         
-        selected_students = self.get_selected_students()
-        
         # تأكيد الحفظ
         reply = QMessageBox.question(
             self, 
-            "تأكيد الحفظ",
-            f"هل أنت متأكد من إضافة الرسم لـ {len(selected_students)} طالب؟\n"
-            f"إجمالي المبلغ: {len(selected_students) * self.amount_spin.value():.2f} ر.س",
+            "تأكيد التعيين",
+            f"هل أنت متأكد من إضافة رسم {fee_type} لـ {preview['new']} طالب؟\n"
+            f"إجمالي المبلغ: {preview['total']:,.0f} د.ع\n"
+            f"({target.describe()})",
             QMessageBox.Yes | QMessageBox.No,
             QMessageBox.No
         )
@@ -468,55 +497,17 @@ class AddAdditionalFeeDialog(QDialog):
         if reply != QMessageBox.Yes:
             return
         
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            fee_type = self.fee_type_combo.currentText()
-            fee_name = self.fee_name_edit.text().strip()
-            description = self.description_edit.toPlainText().strip()
-            amount = self.amount_spin.value()
-            due_date = self.due_date_edit.date().toString("yyyy-MM-dd")
-            
-            # إنشاء الوصف الكامل
-            full_description = f"{fee_type} - {fee_name}"
-            if description:
-                full_description += f"\n{description}"
-            
-            # إدراج الرسوم لكل طالب محدد
-            insert_query = """
-                INSERT INTO additional_fees (
-                    student_id, type, description, amount, due_date, status, created_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            for student_id in selected_students:
-                cursor.execute(insert_query, (
-                    student_id,
-                    fee_type,
-                    full_description,
-                    amount,
-                    due_date,
-                    "مستحق",
-                    datetime.now().isoformat()
-                ))
-            
-            conn.commit()
-            conn.close()
-            
-            QMessageBox.information(
-                self, 
-                "نجح", 
-                f"تم إضافة الرسم بنجاح لـ {len(selected_students)} طالب!\n"
-                f"إجمالي المبلغ: {len(selected_students) * amount:.2f} ر.س"
-            )
-            
-            self.fee_added.emit()
-            self.accept()
-            
-        except Exception as e:
-            logging.error(f"خطأ في حفظ الرسوم: {e}")
-            QMessageBox.critical(self, "خطأ", f"حدث خطأ في حفظ الرسوم:\n{str(e)}")
+        notes = self.description_edit.toPlainText().strip() or None
+        success, message, batch_id = assign_fee(target, fee_type, amount, term, notes)
+        if not success:
+            QMessageBox.warning(self, "خطأ", message)
+            return
+        
+        log_user_action("تعيين رسوم لمجموعة طلاب", f"{message} ({target.describe()})")
+        QMessageBox.information(self, "نجح", message)
+        self.load_batches()
+        self.update_preview()
+        self.fee_added.emit()
 
 if __name__ == "__main__":
     from PyQt5.QtWidgets import QApplication
@@ -6,7 +6,6 @@
 
 import logging
 import json
-import os
 import sqlite3
 from datetime import datetime, date
 from pathlib import Path
@@ -15,7 +14,7 @@ from PyQt5.QtWidgets import (
     QTableWidgetItem, QPushButton, QLabel, QLineEdit,
     QFrame, QMessageBox, QHeaderView, QAbstractItemView,
     QMenu, QComboBox, QDateEdit, QSpinBox, QDoubleSpinBox,
-    QCheckBox, QTextEdit, QAction, QDialog, QFileDialog
+    QCheckBox, QTextEdit, QAction, QDialog
 )
 from PyQt5.QtCore import Qt, pyqtSignal, QDate
 from PyQt5.QtGui import QFont, QPixmap, QIcon, QFontDatabase
@@ -23,6 +22,9 @@ from PyQt5.QtGui import QFont, QPixmap, QIcon, QFontDatabase
 import config
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action, log_database_operation
+from core.export import ADDITIONAL_FEES_EXPORT
+from core.utils.telemetry import instrument_methods
+from ui.widgets.export_dialog import run_streaming_export
 from .add_additional_fee_dialog import AddAdditionalFeeDialog
 
 # استخدام مسار قاعدة البيانات من الإعدادات
@@ -31,6 +33,7 @@ db_path = str(config.DATABASE_PATH)
 
 
 
+@instrument_methods()
 class AdditionalFeesPage(QWidget):
     """صفحة إدارة الرسوم الإضافية"""
     
@@ -223,6 +226,10 @@ class AdditionalFeesPage(QWidget):
             actions_layout.addStretch()
             
             # أزرار العمليات
+            self.assign_fees_button = QPushButton("تعيين رسم جماعي")
+            self.assign_fees_button.setObjectName("secondaryButton")
+            actions_layout.addWidget(self.assign_fees_button)
+            
             self.export_fees_button = QPushButton("تصدير التقرير")
             self.export_fees_button.setObjectName("secondaryButton")
             actions_layout.addWidget(self.export_fees_button)
@@ -412,6 +419,7 @@ class AdditionalFeesPage(QWidget):
         """ربط الإشارات والأحداث"""
         try:
             # ربط أزرار العمليات
+            self.assign_fees_button.clicked.connect(self.assign_fees_to_students)
             self.export_fees_button.clicked.connect(self.export_fees)
             self.refresh_button.clicked.connect(self.refresh)
             self.clear_filters_button.clicked.connect(self.clear_filters)
@@ -442,7 +450,7 @@ class AdditionalFeesPage(QWidget):
             
             # جلب المدارس من قاعدة البيانات
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
@@ -481,7 +489,7 @@ class AdditionalFeesPage(QWidget):
                 """
                 params = []
             
-            students = db_manager.execute_query(query, params)
+            students = db_manager.execute_cached_query(query, params)
             
             if students:
                 for student in students:
@@ -499,6 +507,54 @@ class AdditionalFeesPage(QWidget):
         except Exception as e:
             logging.error(f"خطأ في معالج تغيير المدرسة: {e}")
     
+    def build_filter_clause(self):
+        """بناء شرط الفلترة الحالي بصيغة (" AND ...", params) لاستخدامه في العرض والتصدير"""
+        clause = ""
+        params = []
+        
+        # فلتر المدرسة
+        selected_school_id = self.school_combo.currentData()
+        if selected_school_id:
+            clause += " AND s.school_id = ?"
+            params.append(selected_school_id)
+        
+        # فلتر الطالب
+        selected_student_id = self.student_combo.currentData()
+        if selected_student_id:
+            clause += " AND af.student_id = ?"
+            params.append(selected_student_id)
+        
+        # فلتر نوع الرسم (مع دعم الرسوم المخصصة)
+        selected_fee_type = self.fee_type_combo.currentText()
+        if selected_fee_type and selected_fee_type != "جميع الأنواع":
+            # عند اختيار الرسوم المخصصة، عرض أي نوع رسم غير الأنواع الافتراضية
+            if selected_fee_type == "رسم مخصص":
+                # استبعاد الأنواع الافتراضية
+                default_types = ['رسوم التسجيل', 'الزي المدرسي', 'الكتب', 'القرطاسية']
+                placeholders = ','.join('?' for _ in default_types)
+                clause += f" AND af.fee_type NOT IN ({placeholders})"
+                params.extend(default_types)
+            else:
+                # أنواع الرسم المحددة
+                clause += " AND af.fee_type = ?"
+                params.append(selected_fee_type)
+        
+        # فلتر الحالة
+        selected_status = self.status_combo.currentText()
+        if selected_status and selected_status != "الكل":
+            paid_status = 1 if selected_status == "مدفوع" else 0
+            clause += " AND af.paid = ?"
+            params.append(paid_status)
+        
+        # فلتر البحث
+        search_text = self.search_input.text().strip()
+        if search_text:
+            clause += " AND (af.notes LIKE ? OR s.name LIKE ?)"
+            search_param = f"%{search_text}%"
+            params.extend([search_param, search_param])
+        
+        return clause, params
+    
     def load_fees(self):
         """تحميل قائمة الرسوم الإضافية"""
         try:
@@ -519,48 +575,8 @@ class AdditionalFeesPage(QWidget):
                 JOIN schools sc ON s.school_id = sc.id
                 WHERE 1=1
             """
-            params = []
-            
-            # فلتر المدرسة
-            selected_school_id = self.school_combo.currentData()
-            if selected_school_id:
-                query += " AND s.school_id = ?"
-                params.append(selected_school_id)
-            
-            # فلتر الطالب
-            selected_student_id = self.student_combo.currentData()
-            if selected_student_id:
-                query += " AND af.student_id = ?"
-                params.append(selected_student_id)
-            
-            # فلتر نوع الرسم (مع دعم الرسوم المخصصة)
-            selected_fee_type = self.fee_type_combo.currentText()
-            if selected_fee_type and selected_fee_type != "جميع الأنواع":
-                # عند اختيار الرسوم المخصصة، عرض أي نوع رسم غير الأنواع الافتراضية
-                if selected_fee_type == "رسم مخصص":
-                    # استبعاد الأنواع الافتراضية
-                    default_types = ['رسوم التسجيل', 'الزي المدرسي', 'الكتب', 'القرطاسية']
-                    placeholders = ','.join('?' for _ in default_types)
-                    query += f" AND af.fee_type NOT IN ({placeholders})"
-                    params.extend(default_types)
-                else:
-                    # أنواع الرسم المحددة
-                    query += " AND af.fee_type = ?"
-                    params.append(selected_fee_type)
-            
-            # فلتر الحالة
-            selected_status = self.status_combo.currentText()
-            if selected_status and selected_status != "الكل":
-                paid_status = 1 if selected_status == "مدفوع" else 0
-                query += " AND af.paid = ?"
-                params.append(paid_status)
-            
-            # فلتر البحث
-            search_text = self.search_input.text().strip()
-            if search_text:
-                query += " AND (af.notes LIKE ? OR s.name LIKE ?)"
-                search_param = f"%{search_text}%"
-                params.extend([search_param, search_param])
+            filter_clause, params = self.build_filter_clause()
+            query += filter_clause
             
             query += " ORDER BY af.created_at DESC"
             
@@ -779,105 +795,14 @@ class AdditionalFeesPage(QWidget):
             conn.close()
     
     def export_fees(self):
-        """تصدير تقرير الرسوم"""
+        """تصدير تقرير الرسوم (CSV أو Excel) مباشرة من قاعدة البيانات"""
         try:
-            from datetime import datetime
-            import csv
-            import os
-            
             if not self.current_fees:
                 QMessageBox.warning(self, "تحذير", "لا توجد بيانات للتصدير")
                 return
             
-            # تحديد اسم الملف الافتراضي
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            default_filename = f"Additional_Fees_Report_{timestamp}.csv"
-            
-            # فتح نافذة حفظ الملف
-            filename, _ = QFileDialog.getSaveFileName(
-                self,
-                "حفظ تقرير الرسوم الإضافية",
-                default_filename,
-                "CSV Files (*.csv);;All Files (*)"
-            )
-            
-            if not filename:
-                return  # المستخدم ألغى العملية
-            
-            # التأكد من امتداد الملف
-            if not filename.lower().endswith('.csv'):
-                filename += '.csv'
-            
-            # حساب الإحصائيات
-            total_amount = sum(fee[4] or 0 for fee in self.current_fees)
-            paid_fees = [fee for fee in self.current_fees if fee[5]]  # الرسوم المدفوعة
-            unpaid_fees = [fee for fee in self.current_fees if not fee[5]]  # الرسوم غير المدفوعة
-            total_paid = sum(fee[4] or 0 for fee in paid_fees)
-            total_unpaid = sum(fee[4] or 0 for fee in unpaid_fees)
-            
-            # إنشاء التقرير بتنسيق محسن للـ Excel
-            with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
-                writer = csv.writer(f, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-                
-                # كتابة معلومات التقرير
-                writer.writerow([f"تقرير الرسوم الإضافية - {datetime.now().strftime('%Y-%m-%d %H:%M')}"])
-                writer.writerow([f"إجمالي عدد الرسوم: {len(self.current_fees)}"])
-                writer.writerow([f"إجمالي المبلغ: {total_amount:,.2f} د.ع"])
-                writer.writerow([f"المبلغ المدفوع: {total_paid:,.2f} د.ع"])
-                writer.writerow([f"المبلغ المتبقي: {total_unpaid:,.2f} د.ع"])
-                writer.writerow([])  # سطر فارغ
-                
-                # كتابة رأس الجدول
-                headers = ["ID", "Student Name", "School", "Fee Type", "Amount (IQD)", "Status", "Payment Date", "Notes", "Created Date"]
-                writer.writerow(headers)
-                
-                # كتابة البيانات
-                for fee in self.current_fees:
-                    # (id, student_name, school_name, fee_type, amount, paid, payment_date, notes, created_at)
-                    row = [
-                        fee[0] or '',  # ID
-                        fee[1] or '',  # Student Name
-                        fee[2] or 'General',  # School
-                        fee[3] or '',  # Fee Type
-                        f"{fee[4] or 0:,.2f}",  # Amount
-                        "Paid" if fee[5] else "Unpaid",  # Status
-                        fee[6] or '',  # Payment Date
-                        fee[7] or '',  # Notes
-                        fee[8] or ''   # Created Date
-                    ]
-                    writer.writerow(row)
-                
-                # إضافة إحصائيات في النهاية
-                writer.writerow([])  # سطر فارغ
-                writer.writerow(['Statistics:'])
-                writer.writerow(['Total Records:', len(self.current_fees)])
-                writer.writerow(['Total Amount:', f"{total_amount:,.2f} IQD"])
-                writer.writerow(['Paid Amount:', f"{total_paid:,.2f} IQD"])
-                writer.writerow(['Unpaid Amount:', f"{total_unpaid:,.2f} IQD"])
-                writer.writerow(['Paid Fees Count:', len(paid_fees)])
-                writer.writerow(['Unpaid Fees Count:', len(unpaid_fees)])
-                if self.current_fees:
-                    avg_amount = total_amount / len(self.current_fees)
-                    writer.writerow(['Average Amount:', f"{avg_amount:,.2f} IQD"])
-                    amounts = [fee[4] or 0 for fee in self.current_fees]
-                    writer.writerow(['Max Amount:', f"{max(amounts):,.2f} IQD"])
-                    writer.writerow(['Min Amount:', f"{min(amounts):,.2f} IQD"])
-            
-            # إظهار رسالة نجح مع خيار فتح الملف
-            reply = QMessageBox.question(
-                self, "تم بنجاح", 
-                f"تم تصدير التقرير بنجاح إلى:\n{filename}\n\nهل تريد فتح الملف الآن؟",
-                QMessageBox.Yes | QMessageBox.No,
-                QMessageBox.Yes
-            )
-            
-            if reply == QMessageBox.Yes:
-                try:
-                    os.startfile(filename)  # فتح الملف بالبرنامج الافتراضي (Excel)
-                except:
-                    QMessageBox.information(self, "معلومات", f"تم حفظ الملف في:\n{filename}")
-            
-            log_user_action("تصدير تقرير الرسوم الإضافية", "نجح")
+            filter_clause, params = self.build_filter_clause()
+            run_streaming_export(self, ADDITIONAL_FEES_EXPORT, filter_clause, params)
             
         except Exception as e:
             logging.error(f"خطأ في تصدير التقرير: {e}")
@@ -1032,40 +957,8 @@ class AdditionalFeesPage(QWidget):
             logging.error(f"خطأ في إعداد الستايل: {e}")
     
     def add_fee(self):
-        """إضافة رسم إضافي جديد"""
-        try:
-            log_user_action("إضافة رسم إضافي جديد")
-            dialog = AddAdditionalFeeDialog(self)
-            if dialog.exec_() == QDialog.Accepted:
-                fee_type = dialog.fee_name_edit.text().strip()
-                default_amount = dialog.amount_spin.value()
-                description = dialog.description_edit.toPlainText().strip()
-                
-                if not fee_type:
-                    QMessageBox.warning(self, "تحذير", "يرجى إدخال نوع الرسم")
-                    return
-                
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                
-                try:
-                    cursor.execute("""
-                        INSERT INTO additional_fees (fee_type, default_amount, description)
-                        VALUES (?, ?, ?)
-                    """, (fee_type, default_amount, description))
-                    
-                    conn.commit()
-                    QMessageBox.information(self, "نجح", "تم إضافة الرسم بنجاح")
-                    self.load_fees()
-                    
-                except sqlite3.Error as e:
-                    QMessageBox.critical(self, "خطأ", f"فشل في إضافة الرسم: {e}")
-                finally:
-                    conn.close()
-                    
-        except Exception as e:
-            logging.error(f"خطأ في إضافة رسم إضافي: {e}")
-            QMessageBox.critical(self, "خطأ", f"حدث خطأ: {e}")
+        """إضافة رسم إضافي جديد (لطالب أو مجموعة طلاب)"""
+        self.assign_fees_to_students()
 
     def edit_fee(self):
         """تعديل رسم إضافي"""
@@ -1165,9 +1058,9 @@ class AdditionalFeesPage(QWidget):
         """تعيين رسوم للطلاب"""
         try:
             log_user_action("تعيين رسوم للطلاب")
-            # dialog = AssignFeesDialog(self)  # هذا سيتم إضافته لاحقاً
-            # dialog.exec_()
-            QMessageBox.information(self, "معلومات", "ميزة تعيين الرسوم للطلاب ستكون متاحة قريباً")
+            dialog = AddAdditionalFeeDialog(self, school_id=self.school_combo.currentData())
+            dialog.fee_added.connect(self.load_fees)
+            dialog.exec_()
             
         except Exception as e:
             logging.error(f"خطأ في تعيين رسوم للطلاب: {e}")
@@ -18,7 +18,9 @@ from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont, QIcon, QPixmap
 
 from core.backup.backup_manager import backup_manager
+from core.backup.backup_service import JOB_DONE, get_backup_service
 from core.utils.logger import log_user_action
+from core.utils.telemetry import instrument_methods
 
 
 class BackupWorker(QThread):
@@ -26,21 +28,66 @@ class BackupWorker(QThread):
     
     finished = pyqtSignal(bool, str)  # نجح العملية، رسالة
     progress = pyqtSignal(str)  # رسالة التقدم
+    step_progress = pyqtSignal(int, int)  # المنجز، الإجمالي (0 عند عدم التحديد)
     
     def __init__(self, description=""):
         super().__init__()
         self.description = description
     
+    def report_progress(self, message, done, total):
+        """تمرير تقدم مراحل النسخ الاحتياطي إلى الواجهة"""
+        self.progress.emit(message)
+        self.step_progress.emit(done, total)
+    
     def run(self):
         """تنفيذ عملية النسخ الاحتياطي"""
         try:
             self.progress.emit("جاري إنشاء النسخة الاحتياطية...")
-            success, message = backup_manager.create_backup(self.description)
+            success, message = backup_manager.create_backup(
+                self.description, progress_callback=self.report_progress
+            )
             self.finished.emit(success, message)
         except Exception as e:
             self.finished.emit(False, f"خطأ في إنشاء النسخة الاحتياطية: {e}")
 
 
+class CatalogSyncWorker(QThread):
+    """عامل مطابقة فهرس النسخ المحلي مع المخزن في الخلفية"""
+    
+    finished = pyqtSignal(bool, str)  # هل تغير الفهرس، رسالة
+    
+    def run(self):
+        try:
+            changed, message = backup_manager.reconcile_catalog()
+            self.finished.emit(changed, message)
+        except Exception as e:
+            self.finished.emit(False, f"خطأ في مطابقة فهرس النسخ الاحتياطية: {e}")
+
+
+class RestoreWorker(QThread):
+    """عامل استعادة نسخة احتياطية (أو فتحها للمعاينة) في خيط منفصل"""
+    
+    finished = pyqtSignal(bool, str)  # نجح العملية، رسالة
+    progress = pyqtSignal(str)  # رسالة المرحلة
+    
+    def __init__(self, backup_path, inspect_only=False):
+        super().__init__()
+        self.backup_path = backup_path
+        self.inspect_only = inspect_only
+    
+    def run(self):
+        try:
+            if self.inspect_only:
+                success, message = backup_manager.open_backup_for_inspection(
+                    self.backup_path, progress_callback=self.progress.emit)
+            else:
+                success, message = backup_manager.restore_backup(
+                    self.backup_path, progress_callback=self.progress.emit)
+            self.finished.emit(success, message)
+        except Exception as e:
+            self.finished.emit(False, f"خطأ في استعادة النسخة الاحتياطية: {e}")
+
+
 class CreateBackupDialog(QDialog):
     """حوار إنشاء نسخة احتياطية جديدة"""
     
@@ -91,13 +138,31 @@ class CreateBackupDialog(QDialog):
         return self.description_edit.text().strip()
 
 
+@instrument_methods()
 class BackupPage(QWidget):
     """صفحة إدارة النسخ الاحتياطيات"""
     
+    # عدد النسخ المعروضة في كل صفحة من الفهرس
+    PAGE_SIZE = 50
+    
+    CATEGORY_LABELS = {
+        "daily": "نسخة يومية تلقائية",
+        "weekly": "نسخة أسبوعية",
+        "manual": "نسخة يدوية",
+    }
+    
+    # انتهاء مهمة سياسة الاحتفاظ (يُرسل من خيط خدمة النسخ الاحتياطي)
+    retention_finished = pyqtSignal(bool, str)
+    
     def __init__(self):
         super().__init__()
         self.backup_worker = None
+        self.sync_worker = None
+        self.restore_worker = None
         self.progress_dialog = None
+        self.retention_pending = False
+        self.retention_listener_added = False
+        self.loaded_count = 0
         self.setup_ui()
         self.setup_styles()
         self.setup_connections()
@@ -169,6 +234,12 @@ class BackupPage(QWidget):
         header.setSectionResizeMode(4, QHeaderView.ResizeToContents)  # العمليات
         
         layout.addWidget(self.backups_table)
+        
+        # تحميل الصفحة التالية من الفهرس عند الطلب
+        self.load_more_btn = QPushButton("تحميل المزيد")
+        self.load_more_btn.setObjectName("secondaryButton")
+        self.load_more_btn.setVisible(False)
+        layout.addWidget(self.load_more_btn)
     
     def setup_info_panel(self, layout):
         """إعداد لوحة المعلومات"""
@@ -177,7 +248,8 @@ class BackupPage(QWidget):
         info_layout = QHBoxLayout(info_frame)
         
         # معلومات التخزين
-        storage_info = QLabel("التخزين: Supabase Storage")
+        storage_name = "Supabase Storage" if backup_manager.storage.is_remote else "التخزين المحلي"
+        storage_info = QLabel(f"التخزين: {storage_name}")
         storage_info.setStyleSheet("color: #666; font-size: 12px;")
         info_layout.addWidget(storage_info)
         
@@ -322,7 +394,9 @@ class BackupPage(QWidget):
         """إعداد الروابط والأحداث"""
         self.create_backup_btn.clicked.connect(self.create_new_backup)
         self.refresh_btn.clicked.connect(self.refresh_backups)
+        self.load_more_btn.clicked.connect(self.load_more_backups)
         self.cleanup_btn.clicked.connect(self.cleanup_old_backups)
+        self.retention_finished.connect(self.cleanup_finished)
     
     def create_new_backup(self):
         """إنشاء نسخة احتياطية جديدة"""
@@ -344,6 +418,7 @@ class BackupPage(QWidget):
                 # بدء عملية النسخ الاحتياطي
                 self.backup_worker = BackupWorker(description)
                 self.backup_worker.progress.connect(self.update_progress)
+                self.backup_worker.step_progress.connect(self.update_step_progress)
                 self.backup_worker.finished.connect(self.backup_finished)
                 self.backup_worker.start()
                 
@@ -359,6 +434,13 @@ class BackupPage(QWidget):
         if self.progress_dialog:
             self.progress_dialog.setLabelText(message)
     
+    def update_step_progress(self, done, total):
+        """تحديث شريط التقدم بعدد الصفحات المنسوخة"""
+        if self.progress_dialog:
+            # الإجمالي 0 يعني مرحلة غير محددة الطول
+            self.progress_dialog.setMaximum(max(total, 0))
+            self.progress_dialog.setValue(min(done, total) if total else 0)
+    
     def backup_finished(self, success, message):
         """معالجة انتهاء عملية النسخ الاحتياطي"""
         if self.progress_dialog:
@@ -374,15 +456,31 @@ class BackupPage(QWidget):
         self.backup_worker = None
     
     def refresh_backups(self):
-        """تحديث قائمة النسخ الاحتياطية"""
+        """تحديث قائمة النسخ الاحتياطية من الفهرس المحلي ثم مطابقته في الخلفية"""
+        self.show_backups_page(reset=True)
+        self.start_catalog_sync()
+    
+    def load_more_backups(self):
+        """عرض الصفحة التالية من الفهرس"""
+        self.show_backups_page(reset=False)
+    
+    def show_backups_page(self, reset=True):
+        """عرض النسخ من الفهرس المحلي (دون انتظار المخزن)"""
         try:
-            # جلب النسخ الاحتياطية
-            backups = backup_manager.list_backups()
+            if reset:
+                self.loaded_count = 0
+                self.backups_table.setRowCount(0)
+            
+            # جلب الصفحة التالية من النسخ الاحتياطية
+            backups = backup_manager.list_cached_backups(self.loaded_count, self.PAGE_SIZE)
+            total = backup_manager.count_cached_backups()
             
             # تحديث الجدول
-            self.backups_table.setRowCount(len(backups))
+            self.backups_table.setSortingEnabled(False)
+            first_row = self.loaded_count
+            self.backups_table.setRowCount(first_row + len(backups))
             
-            for row, backup in enumerate(backups):
+            for row, backup in enumerate(backups, start=first_row):
                 # تحديد ارتفاع الصف ليتناسب مع الأزرار الصغيرة
                 self.backups_table.setRowHeight(row, 30)
                 
@@ -401,8 +499,9 @@ class BackupPage(QWidget):
                 size_item.setFlags(size_item.flags() & ~Qt.ItemIsEditable)
                 self.backups_table.setItem(row, 2, size_item)
                 
-                # الوصف (يمكن استخراجه من معلومات النسخة)
-                description_item = QTableWidgetItem("--")
+                # الوصف المسجل في الفهرس أو نوع النسخة
+                description = backup.get('description') or self.CATEGORY_LABELS.get(backup.get('category'), "--")
+                description_item = QTableWidgetItem(description)
                 description_item.setFlags(description_item.flags() & ~Qt.ItemIsEditable)
                 self.backups_table.setItem(row, 3, description_item)
                 
@@ -410,16 +509,34 @@ class BackupPage(QWidget):
                 operations_widget = self.create_operations_widget(backup)
                 self.backups_table.setCellWidget(row, 4, operations_widget)
             
-            # تحديث وقت آخر تحديث
-            current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.last_update_label.setText(f"آخر تحديث: {current_time}")
+            self.backups_table.setSortingEnabled(True)
+            self.loaded_count = first_row + len(backups)
+            self.load_more_btn.setVisible(self.loaded_count < total)
+            self.load_more_btn.setText(f"تحميل المزيد ({self.loaded_count} من {total})")
             
-            logging.info(f"تم تحديث قائمة النسخ الاحتياطية: {len(backups)} نسخة")
+            logging.info(f"تم عرض {self.loaded_count} من {total} نسخة احتياطية")
             
         except Exception as e:
             logging.error(f"خطأ في تحديث قائمة النسخ الاحتياطية: {e}")
             QMessageBox.critical(self, "خطأ", f"خطأ في تحديث القائمة:\n{e}")
     
+    def start_catalog_sync(self):
+        """مطابقة الفهرس مع المخزن في خيط منفصل"""
+        if self.sync_worker is not None and self.sync_worker.isRunning():
+            return
+        self.last_update_label.setText("جاري مزامنة قائمة النسخ...")
+        self.sync_worker = CatalogSyncWorker()
+        self.sync_worker.finished.connect(self.catalog_sync_finished)
+        self.sync_worker.start()
+    
+    def catalog_sync_finished(self, changed, message):
+        """إعادة عرض القائمة إذا تغير الفهرس بعد المطابقة"""
+        if changed:
+            self.show_backups_page(reset=True)
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.last_update_label.setText(f"آخر تحديث: {current_time}")
+        logging.info(message)
+    
     def create_operations_widget(self, backup):
         """إنشاء ويجيت العمليات لكل نسخة احتياطية"""
         widget = QWidget()
@@ -433,6 +550,12 @@ class BackupPage(QWidget):
         download_btn.clicked.connect(lambda: self.download_backup(backup))
         layout.addWidget(download_btn)
         
+        # زر الاستعادة
+        restore_btn = QPushButton("استعادة")
+        restore_btn.setObjectName("smallButton")
+        restore_btn.clicked.connect(lambda: self.restore_backup(backup))
+        layout.addWidget(restore_btn)
+        
         # زر الحذف
         delete_btn = QPushButton("حذف")
         delete_btn.setObjectName("smallDangerButton")
@@ -462,6 +585,62 @@ class BackupPage(QWidget):
             logging.error(f"خطأ في تحميل النسخة الاحتياطية: {e}")
             QMessageBox.critical(self, "خطأ", f"خطأ في التحميل:\n{e}")
     
+    def restore_backup(self, backup):
+        """استعادة نسخة احتياطية أو فتحها كقاعدة جانبية للمعاينة"""
+        try:
+            if self.restore_worker is not None and self.restore_worker.isRunning():
+                return
+            
+            box = QMessageBox(self)
+            box.setWindowTitle("استعادة نسخة احتياطية")
+            box.setIcon(QMessageBox.Question)
+            box.setText(
+                f"الملف: {backup['filename']}\n"
+                f"التاريخ: {backup['formatted_date']}\n\n"
+                "الاستعادة تستبدل جميع البيانات الحالية بمحتوى النسخة بعد فحصها، "
+                "مع حفظ نسخة من القاعدة الحالية للتراجع.\n"
+                "المعاينة تفتح النسخة كقاعدة جانبية دون المساس بالبيانات الحالية."
+            )
+            restore_btn = box.addButton("استعادة", QMessageBox.DestructiveRole)
+            inspect_btn = box.addButton("معاينة فقط", QMessageBox.AcceptRole)
+            box.addButton("إلغاء", QMessageBox.RejectRole)
+            box.exec_()
+            
+            clicked = box.clickedButton()
+            if clicked not in (restore_btn, inspect_btn):
+                return
+            inspect_only = clicked is inspect_btn
+            
+            self.progress_dialog = QProgressDialog("جاري تحضير النسخة الاحتياطية...", None, 0, 0, self)
+            self.progress_dialog.setWindowTitle("معاينة نسخة احتياطية" if inspect_only else "استعادة نسخة احتياطية")
+            self.progress_dialog.setModal(True)
+            self.progress_dialog.show()
+            
+            self.restore_worker = RestoreWorker(backup['path'], inspect_only)
+            self.restore_worker.progress.connect(self.update_progress)
+            self.restore_worker.finished.connect(self.restore_finished)
+            self.restore_worker.start()
+            
+            action = "inspect_backup" if inspect_only else "restore_backup"
+            log_user_action(f"backup - {action}: {backup['filename']}")
+            
+        except Exception as e:
+            logging.error(f"خطأ في استعادة النسخة الاحتياطية: {e}")
+            QMessageBox.critical(self, "خطأ", f"خطأ في الاستعادة:\n{e}")
+    
+    def restore_finished(self, success, message):
+        """انتهاء عملية الاستعادة"""
+        if self.progress_dialog:
+            self.progress_dialog.close()
+            self.progress_dialog = None
+        
+        if success:
+            QMessageBox.information(self, "نجح", message)
+        else:
+            QMessageBox.critical(self, "خطأ", message)
+        
+        self.restore_worker = None
+    
     def delete_backup(self, backup):
         """حذف نسخة احتياطية"""
         try:
@@ -497,22 +676,45 @@ class BackupPage(QWidget):
             # تأكيد العملية
             reply = QMessageBox.question(
                 self, "تأكيد التنظيف",
-                "هل تريد حذف جميع النسخ الاحتياطية الأقدم من 30 يوماً؟\n\n"
+                "هل تريد تطبيق سياسة الاحتفاظ بالنسخ الاحتياطية؟\n"
+                "سيتم الإبقاء على نسخة لكل يوم من الأيام الأخيرة ونسخة لكل أسبوع ولكل شهر، "
+                "وحذف ما عدا ذلك.\n\n"
                 "هذه العملية لا يمكن التراجع عنها!",
                 QMessageBox.Yes | QMessageBox.No,
                 QMessageBox.No
             )
             
             if reply == QMessageBox.Yes:
-                success, message = backup_manager.cleanup_old_backups(30)
-                
-                if success:
-                    QMessageBox.information(self, "نجح", message)
-                    self.refresh_backups()  # تحديث القائمة
-                    log_user_action("backup - cleanup_old_backups: keep_days=30")
-                else:
-                    QMessageBox.critical(self, "خطأ", message)
+                # التنفيذ في خيط خدمة النسخ الاحتياطي، متسلسلاً مع مهام النسخ الأخرى
+                service = get_backup_service()
+                if not self.retention_listener_added:
+                    service.add_listener(self.on_service_job_finished)
+                    self.retention_listener_added = True
+                if not service.is_running():
+                    service.start()
+                # يُضبط قبل الإرسال لأن المهمة قد تنتهي قبل عودة submit
+                self.retention_pending = True
+                service.submit("prune")
+                self.cleanup_btn.setEnabled(False)
+                self.cleanup_btn.setText("جاري حذف النسخ القديمة...")
+                log_user_action("backup - cleanup_old_backups: retention policy")
                     
         except Exception as e:
             logging.error(f"خطأ في تنظيف النسخ الاحتياطية: {e}")
             QMessageBox.critical(self, "خطأ", f"خطأ في التنظيف:\n{e}")
+    
+    def on_service_job_finished(self, job):
+        """مستمع خدمة النسخ الاحتياطي (يُستدعى من خيطها، فيُمرر إلى الواجهة بإشارة)"""
+        if job.kind == "prune" and self.retention_pending:
+            self.retention_finished.emit(job.status == JOB_DONE, job.message)
+    
+    def cleanup_finished(self, success, message):
+        """معالجة انتهاء تطبيق سياسة الاحتفاظ"""
+        self.retention_pending = False
+        self.cleanup_btn.setEnabled(True)
+        self.cleanup_btn.setText("حذف النسخ القديمة")
+        if success:
+            QMessageBox.information(self, "نجح", message)
+            self.refresh_backups()  # تحديث القائمة
+        else:
+            QMessageBox.critical(self, "خطأ", message)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة التقرير الموحد للمدارس
+تُبنى أقسام المدارس في خيط خلفي وتظهر في الجدول فور اكتمال كل منها،
+ثم يُعرض التقرير كاملاً عبر قالب الطباعة (مع الحفظ كـ PDF)
+"""
+
+import logging
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, QPushButton,
+    QDateEdit, QTableWidget, QTableWidgetItem, QHeaderView, QProgressBar, QMessageBox
+)
+from PyQt5.QtCore import Qt, QDate, QThread, pyqtSignal
+
+from core.finance.consolidated import build_consolidated_report
+from core.utils.logger import log_user_action
+
+
+class ConsolidatedReportWorker(QThread):
+    """خيط بناء التقرير الموحد (يوزع المدارس بدوره على مجموعة خيوط)"""
+
+    section_ready = pyqtSignal(dict, int, int)  # (القسم، المكتمل، الإجمالي)
+    report_ready = pyqtSignal(dict)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, date_from: str, date_to: str):
+        super().__init__()
+        self.date_from = date_from
+        self.date_to = date_to
+        self._cancelled = False
+
+    def cancel(self):
+        """طلب إيقاف البناء"""
+        self._cancelled = True
+
+    def run(self):
+        try:
+            report = build_consolidated_report(
+                self.date_from, self.date_to,
+                on_section=self.section_ready.emit,
+                cancel_check=lambda: self._cancelled
+            )
+            self.report_ready.emit(report)
+        except InterruptedError:
+            self.error_occurred.emit("تم إلغاء بناء التقرير")
+        except Exception as e:
+            logging.error(f"خطأ في بناء التقرير الموحد: {e}")
+            self.error_occurred.emit(str(e))
+
+
+class ConsolidatedReportDialog(QDialog):
+    """نافذة بناء ومعاينة التقرير الموحد"""
+
+    COLUMNS = ["المدرسة", "الطلاب", "المحصل", "المتبقي", "الوارد", "الصادر", "الصافي"]
+    KEYS = ["school_name", "students", "fees_collected", "fees_outstanding", "income", "outflow", "net"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker = None
+        self.report = None
+        self.setup_ui()
+
+    def setup_ui(self):
+        """إعداد واجهة المستخدم"""
+        self.setWindowTitle("التقرير الموحد للمدارس")
+        self.setModal(True)
+        self.resize(900, 600)
+        self.setLayoutDirection(Qt.RightToLeft)
+
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        today = QDate.currentDate()
+        self.date_from_edit = QDateEdit(QDate(today.year(), 1, 1))
+        self.date_from_edit.setDisplayFormat("yyyy-MM-dd")
+        self.date_from_edit.setCalendarPopup(True)
+        form.addRow("من تاريخ:", self.date_from_edit)
+        self.date_to_edit = QDateEdit(today)
+        self.date_to_edit.setDisplayFormat("yyyy-MM-dd")
+        self.date_to_edit.setCalendarPopup(True)
+        form.addRow("إلى تاريخ:", self.date_to_edit)
+        layout.addLayout(form)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setValue(0)
+        layout.addWidget(self.progress_bar)
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        self.build_button = QPushButton("إنشاء التقرير")
+        self.build_button.clicked.connect(self.build_report)
+        self.print_button = QPushButton("معاينة وطباعة")
+        self.print_button.setEnabled(False)
+        self.print_button.clicked.connect(self.print_report)
+        close_button = QPushButton("إغلاق")
+        close_button.clicked.connect(self.reject)
+        buttons.addWidget(self.build_button)
+        buttons.addWidget(self.print_button)
+        buttons.addStretch()
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+    def build_report(self):
+        """بدء بناء التقرير في الخلفية"""
+        self.report = None
+        self.table.setRowCount(0)
+        self.progress_bar.setValue(0)
+        self.build_button.setEnabled(False)
+        self.print_button.setEnabled(False)
+        self.status_label.setText("جاري تجميع بيانات المدارس...")
+
+        self.worker = ConsolidatedReportWorker(
+            self.date_from_edit.date().toString("yyyy-MM-dd"),
+            self.date_to_edit.date().toString("yyyy-MM-dd")
+        )
+        self.worker.section_ready.connect(self.add_section)
+        self.worker.report_ready.connect(self.on_report_ready)
+        self.worker.error_occurred.connect(self.on_error)
+        self.worker.start()
+
+    def add_row(self, values, bold=False):
+        row = self.table.rowCount()
+        self.table.insertRow(row)
+        for column, key in enumerate(self.KEYS):
+            value = values.get(key, "")
+            text = f"{value:,.0f}" if isinstance(value, float) else str(value)
+            item = QTableWidgetItem(text)
+            if bold:
+                font = item.font()
+                font.setBold(True)
+                item.setFont(font)
+            self.table.setItem(row, column, item)
+
+    def add_section(self, section, done, total):
+        """إضافة قسم مدرسة فور اكتماله"""
+        self.add_row(section)
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"اكتملت {done} من {total} مدرسة")
+
+    def on_report_ready(self, report):
+        """عرض التقرير النهائي بترتيب المدارس مع المجموع الكلي"""
+        self.report = report
+        self.table.setRowCount(0)
+        for section in report['sections']:
+            self.add_row(section)
+        self.add_row({**report['grand_total'], 'school_name': "الإجمالي"}, bold=True)
+        self.progress_bar.setMaximum(max(len(report['sections']), 1))
+        self.progress_bar.setValue(self.progress_bar.maximum())
+        self.status_label.setText(f"اكتمل التقرير لـ {len(report['sections'])} مدرسة")
+        self.build_button.setEnabled(True)
+        self.print_button.setEnabled(bool(report['sections']))
+        log_user_action("إنشاء التقرير الموحد للمدارس", report['date_range'])
+
+    def on_error(self, message):
+        self.build_button.setEnabled(True)
+        self.status_label.setText(message)
+        QMessageBox.warning(self, "خطأ", f"تعذر إنشاء التقرير الموحد:\n{message}")
+
+    def print_report(self):
+        """معاينة التقرير عبر قالب الطباعة (يمكن حفظه كـ PDF من المعاينة)"""
+        try:
+            from core.printing.print_manager import print_consolidated_report
+            print_consolidated_report(self.report, parent=self)
+        except Exception as e:
+            logging.error(f"خطأ في طباعة التقرير الموحد: {e}")
+            QMessageBox.critical(self, "خطأ", f"فشل في طباعة التقرير:\n{e}")
+
+    def reject(self):
+        if self.worker is not None and self.worker.isRunning():
+            self.worker.cancel()
+            self.worker.wait()
+        super().reject()
@@ -7,15 +7,17 @@
 import logging
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-    QFrame, QLabel, QPushButton, QScrollArea
+    QFrame, QLabel, QPushButton, QScrollArea, QMessageBox
 )
 from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont, QPixmap
 
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action
+from core.utils.telemetry import instrument_methods
 
 
+@instrument_methods()
 class DashboardPage(QWidget):
     """صفحة لوحة التحكم"""
     
@@ -197,6 +199,33 @@ class DashboardPage(QWidget):
             add_payment_btn.clicked.connect(self.add_payment_action)
             buttons_layout.addWidget(add_payment_btn)
             
+            # زر التقرير المالي
+            report_btn = QPushButton("التقرير المالي")
+            report_btn.setObjectName("actionButton")
+            report_btn.setToolTip("التدفق النقدي والأرباح والخسائر للعام الحالي")
+            report_btn.clicked.connect(self.view_reports_action)
+            buttons_layout.addWidget(report_btn)
+            
+            # زر تقرير المتأخرات
+            arrears_btn = QPushButton("تقرير المتأخرات")
+            arrears_btn.setObjectName("actionButton")
+            arrears_btn.setToolTip("أعمار المتأخرات ونسب التحصيل والتحصيل المتوقع للعام الدراسي الحالي")
+            arrears_btn.clicked.connect(self.view_arrears_action)
+            buttons_layout.addWidget(arrears_btn)
+            
+            # زر التقرير الموحد
+            consolidated_btn = QPushButton("التقرير الموحد")
+            consolidated_btn.setObjectName("actionButton")
+            consolidated_btn.setToolTip("قسم لكل مدرسة بمجاميعها مع المجموع الكلي لكل المدارس")
+            consolidated_btn.clicked.connect(self.view_consolidated_action)
+            buttons_layout.addWidget(consolidated_btn)
+            
+            # زر ملخص الأعوام الدراسية (يشمل الأعوام المؤرشفة)
+            yearly_btn = QPushButton("ملخص الأعوام")
+            yearly_btn.setObjectName("actionButton")
+            yearly_btn.setToolTip("الطلاب والرسوم والمدفوع لكل عام دراسي، بما فيها الأعوام المؤرشفة")
+            yearly_btn.clicked.connect(self.view_yearly_summary_action)
+            buttons_layout.addWidget(yearly_btn)
             
             # زر تحديث البيانات
             refresh_btn = QPushButton("تحديث البيانات")
@@ -461,15 +490,58 @@ class DashboardPage(QWidget):
     def view_reports_action(self):
         """إجراء عرض التقارير"""
         try:
-            from PyQt5.QtWidgets import QApplication, QMessageBox
-            main_window = QApplication.activeWindow()
-            # Inform user that reports feature is coming soon
-            QMessageBox.information(main_window, "عرض التقارير", "سيتم اضافة الميزة قريبا")
-            log_user_action("طلب عرض التقارير من لوحة التحكم")
+            from datetime import date
+            from core.finance.rollups import financial_report_data
+            from core.printing.print_manager import print_financial_report
+            
+            # التقرير من التجميع الشهري للعام الميلادي الحالي
+            year = date.today().year
+            data = financial_report_data(f"{year}-01", f"{year}-12")
+            print_financial_report(data, date_range=data['date_range'], parent=self)
+            log_user_action("طلب عرض التقرير المالي من لوحة التحكم")
             
         except Exception as e:
             logging.error(f"خطأ في إجراء عرض التقارير: {e}")
     
+    def view_arrears_action(self):
+        """إجراء عرض تقرير المتأخرات"""
+        try:
+            from core.finance.arrears import arrears_report_data
+            from core.printing.print_manager import print_arrears_report
+            from core.utils.settings_manager import settings_manager
+            
+            data = arrears_report_data(academic_year=settings_manager.get_academic_year())
+            print_arrears_report(data, parent=self)
+            log_user_action("طلب عرض تقرير المتأخرات من لوحة التحكم")
+            
+        except Exception as e:
+            logging.error(f"خطأ في إجراء عرض تقرير المتأخرات: {e}")
+            QMessageBox.warning(self, "خطأ", f"تعذر إنشاء تقرير المتأخرات:\n{e}")
+    
+    def view_consolidated_action(self):
+        """إجراء عرض التقرير الموحد للمدارس"""
+        try:
+            from .consolidated_report_dialog import ConsolidatedReportDialog
+            
+            dialog = ConsolidatedReportDialog(self)
+            dialog.exec_()
+            
+        except Exception as e:
+            logging.error(f"خطأ في إجراء عرض التقرير الموحد: {e}")
+            QMessageBox.warning(self, "خطأ", f"تعذر فتح التقرير الموحد:\n{e}")
+    
+    def view_yearly_summary_action(self):
+        """إجراء عرض ملخص الأعوام الدراسية الحالية والمؤرشفة"""
+        try:
+            from .yearly_summary_dialog import YearlySummaryDialog
+            
+            dialog = YearlySummaryDialog(self)
+            dialog.exec_()
+            
+        except Exception as e:
+            logging.error(f"خطأ في إجراء عرض ملخص الأعوام الدراسية: {e}")
+            QMessageBox.warning(self, "خطأ", f"تعذر فتح ملخص الأعوام الدراسية:\n{e}")
+    
     def refresh(self):
         """تحديث الصفحة"""
         try:
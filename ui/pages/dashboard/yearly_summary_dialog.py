@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة ملخص الأعوام الدراسية
+تجمع عدد الطلاب والرسوم والمدفوع لكل عام من القاعدة الحية ومن أرشيفات
+الأعوام المنتهية (المرفقة عند الحاجة) في خيط خلفي
+"""
+
+import logging
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+from core.database.archive import yearly_summary
+from core.utils.logger import log_user_action
+
+
+class YearlySummaryWorker(QThread):
+    """خيط تجميع ملخص الأعوام عبر القاعدة الحية والأرشيفات"""
+
+    summary_ready = pyqtSignal(list)
+    error_occurred = pyqtSignal(str)
+
+    def run(self):
+        try:
+            self.summary_ready.emit(yearly_summary())
+        except Exception as e:
+            logging.error(f"خطأ في تجميع ملخص الأعوام الدراسية: {e}")
+            self.error_occurred.emit(str(e))
+
+
+class YearlySummaryDialog(QDialog):
+    """نافذة ملخص الأعوام الدراسية الحالية والمؤرشفة"""
+
+    COLUMNS = ["العام الدراسي", "الطلاب", "إجمالي الرسوم", "المدفوع", "المتبقي", "المصدر"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.worker = None
+        self.setup_ui()
+        self.load_summary()
+
+    def setup_ui(self):
+        """إعداد واجهة المستخدم"""
+        self.setWindowTitle("ملخص الأعوام الدراسية")
+        self.setModal(True)
+        self.resize(800, 450)
+        self.setLayoutDirection(Qt.RightToLeft)
+
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        close_button = QPushButton("إغلاق")
+        close_button.clicked.connect(self.reject)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+    def load_summary(self):
+        """بدء تجميع الملخص في الخلفية"""
+        self.status_label.setText("جاري تجميع بيانات الأعوام الدراسية...")
+        self.worker = YearlySummaryWorker()
+        self.worker.summary_ready.connect(self.on_summary_ready)
+        self.worker.error_occurred.connect(self.on_error)
+        self.worker.start()
+        log_user_action("عرض ملخص الأعوام الدراسية")
+
+    def on_summary_ready(self, rows):
+        self.table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            total_fees = float(row['total_fees'] or 0)
+            total_paid = float(row['total_paid'] or 0)
+            values = [
+                row['academic_year'] or "",
+                f"{row['students']:,}",
+                f"{total_fees:,.0f} د.ع",
+                f"{total_paid:,.0f} د.ع",
+                f"{total_fees - total_paid:,.0f} د.ع",
+                "الحالي" if row['source'] == "main" else "مؤرشف",
+            ]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(str(value))
+                item.setTextAlignment(Qt.AlignCenter)
+                self.table.setItem(row_index, column, item)
+        archived = sum(1 for row in rows if row['source'] != "main")
+        self.status_label.setText(f"{len(rows)} عام دراسي، منها {archived} من الأرشيف")
+        self.worker = None
+
+    def on_error(self, message):
+        self.status_label.setText(f"تعذر تجميع الملخص: {message}")
+        self.worker = None
+
+    def reject(self):
+        if self.worker is not None:
+            self.worker.wait()
+        super().reject()
@@ -17,6 +17,7 @@ from PyQt5.QtGui import QFont, QFontDatabase
 import config
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action, log_database_operation
+from core.utils.telemetry import instrument_methods
 
 # استيراد نوافذ إدارة الموظفين
 from .add_employee_dialog import AddEmployeeDialog
@@ -24,6 +25,7 @@ from .edit_employee_dialog import EditEmployeeDialog
 from ..shared.salary_details_dialog import SalaryDetailsDialog
 
 
+@instrument_methods()
 class EmployeesPage(QWidget):
     """صفحة إدارة الموظفين"""
     
@@ -359,7 +361,7 @@ class EmployeesPage(QWidget):
             self.school_combo.addItem("جميع المدارس", None)
             
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
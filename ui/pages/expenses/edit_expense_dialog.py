@@ -205,7 +205,7 @@ class EditExpenseDialog(QDialog):
             
             # جلب المدارس من قاعدة البيانات
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
@@ -13,7 +13,7 @@ from PyQt5.QtWidgets import (
     QTableWidgetItem, QPushButton, QLabel, QLineEdit,
     QFrame, QMessageBox, QHeaderView, QAbstractItemView,
     QMenu, QComboBox, QDateEdit, QAction, QDialog,
-    QSpinBox, QTextEdit, QFormLayout, QGroupBox, QFileDialog
+    QSpinBox, QTextEdit, QFormLayout, QGroupBox
 )
 from PyQt5.QtCore import Qt, pyqtSignal, QDate
 from PyQt5.QtGui import QFont, QPixmap, QIcon, QFontDatabase
@@ -21,11 +21,16 @@ from PyQt5.QtGui import QFont, QPixmap, QIcon, QFontDatabase
 import config
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action, log_database_operation
+from core.export import EXTERNAL_INCOME_EXPORT
+from core.finance.periods import current_period_totals
+from core.utils.telemetry import instrument_methods
+from ui.widgets.export_dialog import run_streaming_export
 
 from .add_income_dialog import AddIncomeDialog
 from .edit_income_dialog import EditIncomeDialog
 
 
+@instrument_methods()
 class ExternalIncomePage(QWidget):
     """صفحة إدارة الواردات الخارجية"""
 
@@ -391,7 +396,7 @@ class ExternalIncomePage(QWidget):
             
             # جلب المدارس من قاعدة البيانات
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
@@ -403,6 +408,44 @@ class ExternalIncomePage(QWidget):
         except Exception as e:
             logging.error(f"خطأ في تحميل المدارس: {e}")
     
+    def build_filter_clause(self):
+        """بناء شرط الفلترة الحالي بصيغة (" AND ...", params) لاستخدامه في العرض والتصدير"""
+        clause = ""
+        params = []
+        
+        # فلتر المدرسة
+        selected_school_id = self.school_combo.currentData()
+        if selected_school_id == "general":
+            # إظهار الواردات العامة فقط (school_id IS NULL)
+            clause += " AND ei.school_id IS NULL"
+        elif selected_school_id:
+            # إظهار واردات مدرسة محددة
+            clause += " AND ei.school_id = ?"
+            params.append(selected_school_id)
+        
+        # فلتر الفئة
+        selected_category = self.category_combo.currentText()
+        if selected_category and selected_category != "جميع الفئات":
+            clause += " AND ei.category = ?"
+            params.append(selected_category)
+        
+        # فلتر التاريخ (يُطبق فقط إذا تم تغيير النطاق عن القيمة الافتراضية)
+        start_date = self.start_date.date().toPyDate()
+        end_date = self.end_date.date().toPyDate()
+        min_date = self.start_date.minimumDate().toPyDate()
+        max_date = self.end_date.maximumDate().toPyDate()
+        if not (start_date == min_date and end_date == max_date):
+            clause += " AND ei.income_date BETWEEN ? AND ?"
+            params.extend([start_date.isoformat(), end_date.isoformat()])
+        
+        # فلتر البحث
+        search_text = self.search_input.text().strip()
+        if search_text:
+            clause += " AND (ei.income_type LIKE ? OR ei.description LIKE ? OR ei.notes LIKE ?)"
+            params.extend([f"%{search_text}%", f"%{search_text}%", f"%{search_text}%"])
+        
+        return clause, params
+    
     def load_incomes(self):
         """تحميل قائمة الواردات"""
         try:
@@ -415,38 +458,8 @@ class ExternalIncomePage(QWidget):
                 LEFT JOIN schools s ON ei.school_id = s.id
                 WHERE 1=1
             """
-            params = []
-            
-            # فلتر المدرسة
-            selected_school_id = self.school_combo.currentData()
-            if selected_school_id == "general":
-                # إظهار الواردات العامة فقط (school_id IS NULL)
-                query += " AND ei.school_id IS NULL"
-            elif selected_school_id:
-                # إظهار واردات مدرسة محددة
-                query += " AND ei.school_id = ?"
-                params.append(selected_school_id)
-            
-            # فلتر الفئة
-            selected_category = self.category_combo.currentText()
-            if selected_category and selected_category != "جميع الفئات":
-                query += " AND ei.category = ?"
-                params.append(selected_category)
-            
-            # فلتر التاريخ (يُطبق فقط إذا تم تغيير النطاق عن القيمة الافتراضية)
-            start_date = self.start_date.date().toPyDate()
-            end_date = self.end_date.date().toPyDate()
-            min_date = self.start_date.minimumDate().toPyDate()
-            max_date = self.end_date.maximumDate().toPyDate()
-            if not (start_date == min_date and end_date == max_date):
-                query += " AND e.income_date BETWEEN ? AND ?"
-                params.extend([start_date, end_date])
-            
-            # فلتر البحث
-            search_text = self.search_input.text().strip()
-            if search_text:
-                query += " AND (ei.income_type LIKE ? OR ei.description LIKE ? OR ei.notes LIKE ?)"
-                params.extend([f"%{search_text}%", f"%{search_text}%", f"%{search_text}%"])
+            filter_clause, params = self.build_filter_clause()
+            query += filter_clause
             
             # Default sort by newest entries first based on id
             query += " ORDER BY ei.id DESC"
@@ -517,23 +530,10 @@ class ExternalIncomePage(QWidget):
             avg_displayed = total_displayed / count_displayed if count_displayed > 0 else 0
             max_displayed = max([income['amount'] for income in self.current_incomes], default=0)
             
-            # إحصائيات الشهر الحالي
-            current_month = datetime.now().month
-            current_year = datetime.now().year
-            monthly_query = """
-                SELECT COALESCE(SUM(amount), 0) FROM external_income 
-                WHERE strftime('%Y', income_date) = ? AND strftime('%m', income_date) = ?
-            """
-            monthly_result = db_manager.execute_query(monthly_query, (str(current_year), f"{current_month:02d}"))
-            monthly_total = monthly_result[0][0] if monthly_result else 0
-            
-            # إحصائيات السنة الحالية
-            yearly_query = """
-                SELECT COALESCE(SUM(amount), 0) FROM external_income 
-                WHERE strftime('%Y', income_date) = ?
-            """
-            yearly_result = db_manager.execute_query(yearly_query, (str(current_year),))
-            yearly_total = yearly_result[0][0] if yearly_result else 0
+            # إجماليات الشهر والسنة الحالية لنفس المدرسة المختارة
+            totals = current_period_totals("external_income", school_id=self.school_combo.currentData())
+            monthly_total = totals['month']
+            yearly_total = totals['year']
             
             # تحديث التسميات
             self.monthly_total_label.setText(f"إجمالي هذا الشهر: {monthly_total:,.2f} د.ع")
@@ -649,88 +649,14 @@ class ExternalIncomePage(QWidget):
             QMessageBox.critical(self, "خطأ", f"حدث خطأ في حذف الوارد:\n{str(e)}")
     
     def export_report(self):
-        """تصدير تقرير الواردات"""
+        """تصدير تقرير الواردات (CSV أو Excel) مباشرة من قاعدة البيانات"""
         try:
-            from datetime import datetime
-            from PyQt5.QtWidgets import QFileDialog
-            import csv
-            import os
-            
             if not self.current_incomes:
                 QMessageBox.warning(self, "تحذير", "لا توجد بيانات للتصدير")
                 return
             
-            # تحديد اسم الملف الافتراضي
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            default_filename = f"External_Income_Report_{timestamp}.csv"
-            
-            # فتح نافذة حفظ الملف
-            filename, _ = QFileDialog.getSaveFileName(
-                self,
-                "حفظ تقرير الواردات الخارجية",
-                default_filename,
-                "CSV Files (*.csv);;All Files (*)"
-            )
-            
-            if not filename:
-                return  # المستخدم ألغى العملية
-            
-            # التأكد من امتداد الملف
-            if not filename.lower().endswith('.csv'):
-                filename += '.csv'
-            
-            # إنشاء التقرير بتنسيق محسن للـ Excel
-            with open(filename, 'w', encoding='utf-8-sig', newline='') as f:
-                writer = csv.writer(f, delimiter=',', quotechar='"', quoting=csv.QUOTE_MINIMAL)
-                
-                # كتابة معلومات التقرير
-                writer.writerow([f"تقرير الواردات الخارجية - {datetime.now().strftime('%Y-%m-%d %H:%M')}"])
-                writer.writerow([f"إجمالي عدد الواردات: {len(self.current_incomes)}"])
-                writer.writerow([f"إجمالي المبلغ: {sum(income['amount'] for income in self.current_incomes):,.2f} د.ع"])
-                writer.writerow([])  # سطر فارغ
-                
-                # كتابة رأس الجدول
-                headers = ["ID", "Income Type", "Description", "Amount (IQD)", "Category", "Date", "School", "Notes"]
-                writer.writerow(headers)
-                
-                # كتابة البيانات
-                for income in self.current_incomes:
-                    row = [
-                        income['id'],
-                        income['income_type'] or '',
-                        income['description'] or '',
-                        f"{income['amount']:,.2f}",
-                        income['category'] or '',
-                        income['income_date'] or '',
-                        income['school_name'] or 'General',
-                        income['notes'] or ''
-                    ]
-                    writer.writerow(row)
-                
-                # إضافة إحصائيات في النهاية
-                writer.writerow([])  # سطر فارغ
-                writer.writerow(['Statistics:'])
-                writer.writerow(['Total Records:', len(self.current_incomes)])
-                writer.writerow(['Total Amount:', f"{sum(income['amount'] for income in self.current_incomes):,.2f} IQD"])
-                writer.writerow(['Average Amount:', f"{sum(income['amount'] for income in self.current_incomes) / len(self.current_incomes):,.2f} IQD"])
-                writer.writerow(['Max Amount:', f"{max(income['amount'] for income in self.current_incomes):,.2f} IQD"])
-                writer.writerow(['Min Amount:', f"{min(income['amount'] for income in self.current_incomes):,.2f} IQD"])
-            
-            # إظهار رسالة نجح مع خيار فتح الملف
-            reply = QMessageBox.question(
-                self, "تم بنجاح", 
-                f"تم تصدير التقرير بنجاح إلى:\n{filename}\n\nهل تريد فتح الملف الآن؟",
-                QMessageBox.Yes | QMessageBox.No,
-                QMessageBox.Yes
-            )
-            
-            if reply == QMessageBox.Yes:
-                try:
-                    os.startfile(filename)  # فتح الملف بالبرنامج الافتراضي (Excel)
-                except:
-                    QMessageBox.information(self, "معلومات", f"تم حفظ الملف في:\n{filename}")
-            
-            log_user_action("تصدير تقرير الواردات الخارجية", "نجح")
+            filter_clause, params = self.build_filter_clause()
+            run_streaming_export(self, EXTERNAL_INCOME_EXPORT, filter_clause, params)
             
         except Exception as e:
             logging.error(f"خطأ في تصدير التقرير: {e}")
@@ -1,31 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة جدولة الأقساط
+تنشئ جدول استحقاق لطالب واحد أو لكل طلاب صف (أو شعبة) دفعة واحدة
+"""
+
 import sys
-import os
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, 
+import logging
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
                             QLabel, QLineEdit, QComboBox, QDateEdit, QDoubleSpinBox,
                             QPushButton, QFrame, QMessageBox, QGroupBox, QSpinBox,
-                            QTextEdit)
+                            QTextEdit, QCheckBox)
 from PyQt5.QtCore import Qt, QDate, pyqtSignal
 from PyQt5.QtGui import QFont, QIcon
-import sqlite3
-from datetime import datetime, timedelta
-import logging
 
-class AddInstallmentDialog(QDialog):
-    installment_added = pyqtSignal()
-    installment_saved = pyqtSignal(int) # New signal to emit installment_id
-    
-    def __init__(self, parent=None):
+from core.database.connection import db_manager
+from core.finance.installment_plans import build_schedule, create_student_plan, generate_grade_plans
+from core.utils.grade_catalog import grade_catalog
+from core.utils.logger import log_user_action
+
+
+class InstallmentPlanDialog(QDialog):
+    """نافذة إنشاء جداول استحقاق الأقساط"""
+
+    plans_saved = pyqtSignal(int)  # عدد الطلاب الذين أُنشئت جداولهم
+
+    def __init__(self, parent=None, school_id=None):
         super().__init__(parent)
-        self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))), 'database', 'private_schools.db')
+        self.initial_school_id = school_id
         self.setup_ui()
         self.load_data()
         self.setup_connections()
         
     def setup_ui(self):
-        self.setWindowTitle("إضافة قسط جديد")
+        self.setWindowTitle("جدولة الأقساط")
         self.setModal(True)
         self.resize(600, 700)
         
+        
         # تطبيق الستايل
         self.setStyleSheet("""
             QDialog {
@@ -137,7 +149,7 @@ class AddInstallmentDialog(QDialog):
         main_layout.setContentsMargins(20, 20, 20, 20)
         
         # عنوان النافذة
-        title_label = QLabel("إضافة قسط جديد")
+        title_label = QLabel("جدولة الأقساط")
         title_label.setAlignment(Qt.AlignCenter)
         title_label.setStyleSheet("""
             QLabel {
@@ -152,24 +164,31 @@ class AddInstallmentDialog(QDialog):
         """)
         main_layout.addWidget(title_label)
         
-        # مجموعة معلومات الطالب
-        student_info_group = QGroupBox("معلومات الطالب")
+        # مجموعة الطلاب المشمولين
+        student_info_group = QGroupBox("الطلاب")
         student_layout = QFormLayout(student_info_group)
         student_layout.setSpacing(12)
         
         # اختيار المدرسة
         self.school_combo = QComboBox()
-        self.school_combo.setPlaceholderText("اختر المدرسة أولاً")
         student_layout.addRow("المدرسة:", self.school_combo)
         
-        # اختيار الطالب
+        # اختيار الصف والشعبة
+        self.grade_combo = QComboBox()
+        self.grade_combo.setEnabled(False)
+        student_layout.addRow("الصف:", self.grade_combo)
+        
+        self.section_combo = QComboBox()
+        self.section_combo.setEnabled(False)
+        student_layout.addRow("الشعبة:", self.section_combo)
+        
+        # اختيار الطالب (أو كل طلاب الصف)
         self.student_combo = QComboBox()
-        self.student_combo.setPlaceholderText("اختر الطالب")
         self.student_combo.setEnabled(False)
         student_layout.addRow("الطالب:", self.student_combo)
         
         # معلومات الطالب المحددة
-        self.student_info_label = QLabel("لم يتم اختيار طالب")
+        self.student_info_label = QLabel("سيتم إنشاء الجداول لكل الطلاب النشطين في الصف")
         self.student_info_label.setStyleSheet("""
             QLabel {
                 background-color: #f8f9fa;
@@ -182,50 +201,41 @@ class AddInstallmentDialog(QDialog):
         """)
         student_layout.addRow("معلومات:", self.student_info_label)
         
+        self.replace_check = QCheckBox("استبدال جداول الاستحقاق الموجودة")
+        student_layout.addRow("", self.replace_check)
+        
         main_layout.addWidget(student_info_group)
         
-        # مجموعة تفاصيل القسط
-        installment_group = QGroupBox("تفاصيل القسط")
+        # مجموعة تفاصيل الأقساط
+        installment_group = QGroupBox("تفاصيل الأقساط")
         installment_layout = QFormLayout(installment_group)
         installment_layout.setSpacing(12)
         
-        # نوع القسط
-        self.installment_type_combo = QComboBox()
-        self.installment_type_combo.addItems([
-            "رسوم دراسية", "رسوم تسجيل", "رسوم كتب", 
-            "رسوم نشاطات", "رسوم نقل", "أخرى"
-        ])
-        installment_layout.addRow("نوع القسط:", self.installment_type_combo)
-        
         # الوصف
         self.description_edit = QLineEdit()
-        self.description_edit.setPlaceholderText("وصف القسط (اختياري)")
+        self.description_edit.setPlaceholderText("ملاحظات الجدول (اختياري)")
         installment_layout.addRow("الوصف:", self.description_edit)
         
-        # المبلغ الإجمالي
+        # المبلغ المقسط (القسط الكلي للطالب افتراضياً)
+        self.use_total_fee_check = QCheckBox("تقسيط القسط الكلي لكل طالب")
+        self.use_total_fee_check.setChecked(True)
+        installment_layout.addRow("", self.use_total_fee_check)
+        
         self.total_amount_spin = QDoubleSpinBox()
-        self.total_amount_spin.setRange(0, 999999)
-        self.total_amount_spin.setDecimals(2)
-        self.total_amount_spin.setSuffix(" ر.س")
-        self.total_amount_spin.setValue(1000.00)
+        self.total_amount_spin.setRange(0, 999999999)
+        self.total_amount_spin.setDecimals(0)
+        self.total_amount_spin.setSuffix(" د.ع")
+        self.total_amount_spin.setEnabled(False)
         installment_layout.addRow("المبلغ الإجمالي:", self.total_amount_spin)
         
         # عدد الأقساط
         self.installments_count_spin = QSpinBox()
         self.installments_count_spin.setRange(1, 12)
-        self.installments_count_spin.setValue(1)
+        self.installments_count_spin.setValue(4)
         installment_layout.addRow("عدد الأقساط:", self.installments_count_spin)
         
-        # مبلغ القسط الواحد
-        self.installment_amount_spin = QDoubleSpinBox()
-        self.installment_amount_spin.setRange(0, 999999)
-        self.installment_amount_spin.setDecimals(2)
-        self.installment_amount_spin.setSuffix(" ر.س")
-        self.installment_amount_spin.setReadOnly(True)
-        installment_layout.addRow("مبلغ القسط الواحد:", self.installment_amount_spin)
-        
         # زر حساب الأقساط
-        self.calculate_btn = QPushButton("حساب الأقساط")
+        self.calculate_btn = QPushButton("معاينة الجدول")
         self.calculate_btn.setObjectName("calculate_btn")
         installment_layout.addRow("", self.calculate_btn)
         
@@ -259,7 +269,7 @@ class AddInstallmentDialog(QDialog):
         self.preview_text = QTextEdit()
         self.preview_text.setReadOnly(True)
         self.preview_text.setMaximumHeight(150)
-        self.preview_text.setPlaceholderText("سيتم عرض تفاصيل الأقساط هنا")
+        self.preview_text.setPlaceholderText("سيتم عرض مواعيد الاستحقاق هنا")
         preview_layout.addWidget(self.preview_text)
         
         main_layout.addWidget(preview_group)
@@ -268,7 +278,7 @@ class AddInstallmentDialog(QDialog):
         buttons_layout = QHBoxLayout()
         buttons_layout.addStretch()
         
-        self.save_btn = QPushButton("حفظ الأقساط")
+        self.save_btn = QPushButton("حفظ الجدول")
         self.save_btn.setIcon(QIcon("💾"))
         self.save_btn.setEnabled(False)
         buttons_layout.addWidget(self.save_btn)
@@ -287,65 +297,98 @@ class AddInstallmentDialog(QDialog):
         self.calculate_btn.clicked.connect(self.calculate_installments)
         
         # ربط تغييرات الحقول
-        self.school_combo.currentIndexChanged.connect(self.load_students)
+        self.school_combo.currentIndexChanged.connect(self.load_grades)
+        self.grade_combo.currentIndexChanged.connect(self.load_sections)
+        self.section_combo.currentIndexChanged.connect(self.load_students)
         self.student_combo.currentIndexChanged.connect(self.update_student_info)
-        self.total_amount_spin.valueChanged.connect(self.update_installment_amount)
-        self.installments_count_spin.valueChanged.connect(self.update_installment_amount)
+        self.use_total_fee_check.toggled.connect(self.total_amount_spin.setDisabled)
+        
+        # أي تغيير بعد المعاينة يتطلب معاينة جديدة قبل الحفظ
+        for signal in (self.school_combo.currentIndexChanged, self.grade_combo.currentIndexChanged,
+                       self.section_combo.currentIndexChanged, self.student_combo.currentIndexChanged,
+                       self.installments_count_spin.valueChanged, self.interval_days_spin.valueChanged,
+                       self.total_amount_spin.valueChanged, self.first_due_date_edit.dateChanged,
+                       self.use_total_fee_check.toggled):
+            signal.connect(self.invalidate_preview)
         
     def load_data(self):
         """تحميل البيانات الأساسية"""
         self.load_schools()
+        if self.initial_school_id:
+            index = self.school_combo.findData(self.initial_school_id)
+            if index >= 0:
+                self.school_combo.setCurrentIndex(index)
         
     def load_schools(self):
         """تحميل قائمة المدارس"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT id, arabic_name FROM schools ORDER BY arabic_name")
-            schools = cursor.fetchall()
+            schools = db_manager.execute_cached_query("SELECT id, name_ar FROM schools ORDER BY name_ar")
             
             self.school_combo.clear()
             self.school_combo.addItem("اختر المدرسة", None)
-            for school_id, school_name in schools:
-                self.school_combo.addItem(school_name, school_id)
-                
-            conn.close()
+            for school in schools:
+                self.school_combo.addItem(school['name_ar'], school['id'])
             
         except Exception as e:
             logging.error(f"خطأ في تحميل المدارس: {e}")
             QMessageBox.warning(self, "خطأ", f"حدث خطأ في تحميل المدارس:\n{str(e)}")
     
+    def load_grades(self):
+        """تحميل صفوف المدرسة المختارة من دليل الصفوف"""
+        school_id = self.school_combo.currentData()
+        self.grade_combo.clear()
+        self.grade_combo.setEnabled(bool(school_id))
+        if not school_id:
+            self.load_sections()
+            return
+        self.grade_combo.addItem("اختر الصف", None)
+        for grade in grade_catalog.grades(school_id):
+            self.grade_combo.addItem(grade, grade)
+    
+    def load_sections(self):
+        """تحميل الشعب المستخدمة في الصف المختار"""
+        school_id = self.school_combo.currentData()
+        grade = self.grade_combo.currentData()
+        self.section_combo.blockSignals(True)
+        self.section_combo.clear()
+        self.section_combo.addItem("جميع الشعب", None)
+        if school_id and grade:
+            for section in grade_catalog.sections(school_id, grade):
+                self.section_combo.addItem(section, section)
+        self.section_combo.setEnabled(bool(grade))
+        self.section_combo.blockSignals(False)
+        self.load_students()
+    
     def load_students(self):
-        """تحميل قائمة الطلاب حسب المدرسة المختارة"""
+        """تحميل الطلاب النشطين في الصف (والشعبة) المختارة"""
         school_id = self.school_combo.currentData()
+        grade = self.grade_combo.currentData()
         
         self.student_combo.clear()
         self.student_combo.setEnabled(False)
         
-        if not school_id:
+        if not school_id or not grade:
             return
             
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, first_name, last_name, grade, section, status
-                FROM students 
-                WHERE school_id = ? AND status = 'نشط'
-                ORDER BY grade, section, first_name
-            """, (school_id,))
-            
-            students = cursor.fetchall()
-            conn.close()
-            
-            self.student_combo.addItem("اختر الطالب", None)
-            for student_id, first_name, last_name, grade, section, status in students:
-                display_text = f"{first_name} {last_name} - {grade}"
-                if section:
-                    display_text += f" ({section})"
-                self.student_combo.addItem(display_text, student_id)
+            query = """
+                SELECT id, name, section, total_fee
+                FROM students
+                WHERE school_id = ? AND grade = ? AND status = 'نشط'
+            """
+            params = [school_id, grade]
+            section = self.section_combo.currentData()
+            if section:
+                query += " AND section = ?"
+                params.append(section)
+            students = db_manager.execute_query(query + " ORDER BY section, name", tuple(params))
+            
+            self.student_combo.addItem(f"جميع طلاب الصف ({len(students)})", None)
+            for student in students:
+                display_text = student['name']
+                if student['section']:
+                    display_text += f" ({student['section']})"
+                self.student_combo.addItem(display_text, (student['id'], student['total_fee'] or 0))
             
             self.student_combo.setEnabled(True)
             
@@ -355,75 +398,60 @@ class AddInstallmentDialog(QDialog):
     
     def update_student_info(self):
         """تحديث معلومات الطالب المحدد"""
-        student_id = self.student_combo.currentData()
+        student = self.student_combo.currentData()
+        self.replace_check.setEnabled(student is None)
         
-        if not student_id:
-            self.student_info_label.setText("لم يتم اختيار طالب")
+        if student is None:
+            self.student_info_label.setText("سيتم إنشاء الجداول لكل الطلاب النشطين في الصف")
             return
-            
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT s.first_name, s.last_name, s.grade, s.section, 
-                       s.student_number, sc.arabic_name
-                FROM students s
-                LEFT JOIN schools sc ON s.school_id = sc.id
-                WHERE s.id = ?
-            """, (student_id,))
-            
-            student = cursor.fetchone()
-            conn.close()
-            
-            if student:
-                info_text = f"""الطالب: {student[0]} {student[1]}
-الصف: {student[2]} ({student[3] or 'غير محدد'})
-رقم الطالب: {student[4] or 'غير محدد'}
-المدرسة: {student[5]}"""
-                
-                self.student_info_label.setText(info_text)
-            
-        except Exception as e:
-            logging.error(f"خطأ في تحديث معلومات الطالب: {e}")
-    
-    def update_installment_amount(self):
-        """تحديث مبلغ القسط الواحد"""
-        total_amount = self.total_amount_spin.value()
-        installments_count = self.installments_count_spin.value()
         
-        if installments_count > 0:
-            installment_amount = total_amount / installments_count
-            self.installment_amount_spin.setValue(installment_amount)
+        student_id, total_fee = student
+        self.total_amount_spin.setValue(total_fee)
+        self.student_info_label.setText(f"القسط الكلي: {total_fee:,.0f} د.ع\n"
+                                        "سيُستبدل جدول الاستحقاق الحالي للطالب إن وجد")
+    
+    def invalidate_preview(self, *args):
+        """إلغاء المعاينة السابقة بعد تغيير أي حقل"""
+        self.preview_text.clear()
+        self.save_btn.setEnabled(False)
+    
+    def plan_amount(self):
+        """المبلغ المقسط المحدد (None يعني القسط الكلي لكل طالب)"""
+        return None if self.use_total_fee_check.isChecked() else self.total_amount_spin.value()
     
     def calculate_installments(self):
-        """حساب ومعاينة الأقساط"""
-        if not self.student_combo.currentData():
-            QMessageBox.warning(self, "تحذير", "يجب اختيار الطالب أولاً")
+        """حساب ومعاينة مواعيد الاستحقاق"""
+        errors = self.validate_inputs()
+        if errors:
+            QMessageBox.warning(self, "تحذير", "\n".join(errors))
             return
         
-        total_amount = self.total_amount_spin.value()
+        student = self.student_combo.currentData()
+        total_amount = self.plan_amount()
+        if total_amount is None:
+            total_amount = student[1] if student else None
         installments_count = self.installments_count_spin.value()
         first_due_date = self.first_due_date_edit.date().toPyDate()
         interval_days = self.interval_days_spin.value()
         
-        if total_amount <= 0:
-            QMessageBox.warning(self, "تحذير", "يجب إدخال مبلغ أكبر من صفر")
-            return
+        if total_amount is None:
+            # معاينة المواعيد بنسب القسط الكلي لأن المبلغ يختلف من طالب لآخر
+            schedule = build_schedule(100, installments_count, first_due_date, interval_days)
+            preview_text = f"الطلاب المشمولون: {self.student_combo.count() - 1}\n"
+            preview_text += "المبلغ: القسط الكلي لكل طالب مقسماً بالتساوي\n\n"
+        else:
+            if total_amount <= 0:
+                QMessageBox.warning(self, "تحذير", "يجب إدخال مبلغ أكبر من صفر")
+                return
+            schedule = build_schedule(total_amount, installments_count, first_due_date, interval_days)
+            preview_text = f"إجمالي المبلغ: {total_amount:,.0f} د.ع\n"
+            preview_text += f"عدد الأقساط: {installments_count}\n\n"
         
-        installment_amount = total_amount / installments_count
-        
-        # إنشاء معاينة الأقساط
-        preview_text = f"إجمالي المبلغ: {total_amount:.2f} ر.س\n"
-        preview_text += f"عدد الأقساط: {installments_count}\n"
-        preview_text += f"مبلغ القسط الواحد: {installment_amount:.2f} ر.س\n\n"
         preview_text += "تواريخ الاستحقاق:\n"
         preview_text += "-" * 30 + "\n"
-        
-        current_date = first_due_date
-        for i in range(installments_count):
-            preview_text += f"القسط {i+1}: {current_date.strftime('%Y-%m-%d')} - {installment_amount:.2f} ر.س\n"
-            current_date += timedelta(days=interval_days)
+        for item in schedule:
+            amount = f"{item['amount']:.0f}%" if total_amount is None else f"{item['amount']:,.0f} د.ع"
+            preview_text += f"القسط {item['sequence']}: {item['due_date']} - {amount}\n"
         
         self.preview_text.setPlainText(preview_text)
         self.save_btn.setEnabled(True)
@@ -432,78 +460,55 @@ class AddInstallmentDialog(QDialog):
         """التحقق من صحة البيانات"""
         errors = []
         
-        if not self.student_combo.currentData():
-            errors.append("يجب اختيار الطالب")
+        if not self.school_combo.currentData():
+            errors.append("يجب اختيار المدرسة")
         
-        if self.total_amount_spin.value() <= 0:
-            errors.append("يجب إدخال مبلغ أكبر من صفر")
+        if not self.grade_combo.currentData():
+            errors.append("يجب اختيار الصف")
+        elif self.student_combo.count() <= 1:
+            errors.append("لا يوجد طلاب نشطون في الصف المختار")
         
-        if self.installments_count_spin.value() <= 0:
-            errors.append("يجب أن يكون عدد الأقساط أكبر من صفر")
+        if self.plan_amount() is not None and self.total_amount_spin.value() <= 0:
+            errors.append("يجب إدخال مبلغ أكبر من صفر")
         
         return errors
     
     def save_installments(self):
-        """حفظ الأقساط"""
+        """حفظ جدول الاستحقاق لطالب واحد أو لكل طلاب الصف في معاملة واحدة"""
         # التحقق من صحة البيانات
         errors = self.validate_inputs()
         if errors:
             QMessageBox.warning(self, "خطأ في البيانات", "\n".join(errors))
             return
         
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            student_id = self.student_combo.currentData()
-            installment_type = self.installment_type_combo.currentText()
-            description = self.description_edit.text().strip()
-            total_amount = self.total_amount_spin.value()
-            installments_count = self.installments_count_spin.value()
-            installment_amount = total_amount / installments_count
-            first_due_date = self.first_due_date_edit.date().toPyDate()
-            interval_days = self.interval_days_spin.value()
-            
-            # إدراج الأقساط
-            current_date = first_due_date
-            for i in range(installments_count):
-                installment_description = f"{installment_type}"
-                if description:
-                    installment_description += f" - {description}"
-                installment_description += f" (القسط {i+1} من {installments_count})"
-                
-                insert_query = """
-                    INSERT INTO installments (
-                        student_id, amount, payment_date, payment_time, notes
-                    ) VALUES (?, ?, ?, ?, ?)
-                """
-                # Use current date/time for each installment
-                from datetime import datetime
-                payment_date = datetime.now().strftime("%Y-%m-%d")
-                payment_time = datetime.now().strftime("%H:%M:%S")
-                cursor.execute(insert_query, (
-                    student_id,
-                    installment_amount,
-                    payment_date,
-                    payment_time,
-                    installment_description
-                ))
-                last_installment_id = cursor.lastrowid # Get the ID of the last inserted installment
-                
-                current_date += timedelta(days=interval_days)
-            
-            conn.commit()
-            conn.close()
-            
-            QMessageBox.information(self, "نجح", f"تم إضافة {installments_count} قسط بنجاح!")
-            self.installment_added.emit()
-            if installments_count == 1: # Only emit if a single installment was added
-                self.installment_saved.emit(last_installment_id)
-            self.accept()
-            
-        except Exception as e:
-            logging.error(f"خطأ في حفظ الأقساط: {e}")
-            QMessageBox.critical(self, "خطأ", f"حدث خطأ في حفظ الأقساط:\n{str(e)}")
+        student = self.student_combo.currentData()
+        notes = self.description_edit.text().strip() or None
+        arguments = dict(
+            count=self.installments_count_spin.value(),
+            first_due=self.first_due_date_edit.date().toPyDate(),
+            interval_days=self.interval_days_spin.value(),
+            total_amount=self.plan_amount(),
+            notes=notes,
+        )
+        
+        if student is None:
+            success, message, planned = generate_grade_plans(
+                self.school_combo.currentData(), self.grade_combo.currentData(),
+                section=self.section_combo.currentData(), replace=self.replace_check.isChecked(),
+                **arguments
+            )
+        else:
+            success, message = create_student_plan(student[0], **arguments)
+            planned = 1 if success else 0
+        
+        if not success:
+            QMessageBox.warning(self, "خطأ", message)
+            return
+        
+        log_user_action("جدولة الأقساط", f"{self.grade_combo.currentText()}: {message}")
+        QMessageBox.information(self, "نجح", message)
+        self.plans_saved.emit(planned)
+        self.accept()
 
 if __name__ == "__main__":
     from PyQt5.QtWidgets import QApplication
@@ -513,7 +518,7 @@ if __name__ == "__main__":
     font = QFont("Arial", 10)
     app.setFont(font)
     
-    dialog = AddInstallmentDialog()
+    dialog = InstallmentPlanDialog()
     dialog.show()
     
     sys.exit(app.exec_())
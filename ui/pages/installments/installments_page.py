@@ -21,10 +21,15 @@ from PyQt5.QtGui import QFont, QPixmap, QIcon, QFontDatabase
 import config
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action, log_database_operation
+from core.export import INSTALLMENTS_EXPORT
+from core.finance.installment_plans import due_summary
+from core.utils.telemetry import instrument_methods
+from ui.widgets.export_dialog import run_streaming_export
 
 
 
 
+@instrument_methods()
 class InstallmentsPage(QWidget):
     """صفحة إدارة الأقساط"""
     
@@ -199,6 +204,18 @@ class InstallmentsPage(QWidget):
             actions_layout.addStretch()
             
             # أزرار العمليات
+            self.plan_installments_button = QPushButton("جدولة الأقساط")
+            self.plan_installments_button.setObjectName("secondaryButton")
+            actions_layout.addWidget(self.plan_installments_button)
+            
+            self.print_receipts_button = QPushButton("طباعة الوصولات")
+            self.print_receipts_button.setObjectName("secondaryButton")
+            actions_layout.addWidget(self.print_receipts_button)
+            
+            self.export_button = QPushButton("تصدير")
+            self.export_button.setObjectName("secondaryButton")
+            actions_layout.addWidget(self.export_button)
+            
             self.generate_report_button = QPushButton("تقرير مالي")
             self.generate_report_button.setObjectName("secondaryButton")
             actions_layout.addWidget(self.generate_report_button)
@@ -311,6 +328,14 @@ class InstallmentsPage(QWidget):
             self.displayed_count_label.setObjectName("statLabel")
             summary_layout.addWidget(self.displayed_count_label)
             
+            # مواعيد الاستحقاق غير المسددة من جداول الأقساط
+            self.due_week_label = QLabel("مستحق هذا الأسبوع: 0")
+            self.due_week_label.setObjectName("statLabel")
+            summary_layout.addWidget(self.due_week_label)
+            self.overdue_label = QLabel("متأخر: 0")
+            self.overdue_label.setObjectName("statLabel")
+            summary_layout.addWidget(self.overdue_label)
+            
             # ... تمت إزالة شريط التقدم والإحصائيات المتفرعة
             
             # ... تمت إزالة إحصائيات الحالة بسبب حذف الأعمدة
@@ -325,6 +350,9 @@ class InstallmentsPage(QWidget):
         try:
             # ربط أزرار العمليات
             self.generate_report_button.clicked.connect(self.generate_report)
+            self.plan_installments_button.clicked.connect(self.add_installment)
+            self.print_receipts_button.clicked.connect(self.print_receipts_batch)
+            self.export_button.clicked.connect(self.export_installments)
             self.refresh_button.clicked.connect(self.refresh)
             self.clear_filters_button.clicked.connect(self.clear_filters)
             
@@ -354,7 +382,7 @@ class InstallmentsPage(QWidget):
             
             # جلب المدارس من قاعدة البيانات
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
@@ -393,7 +421,7 @@ class InstallmentsPage(QWidget):
                 """
                 params = []
             
-            students = db_manager.execute_query(query, params)
+            students = db_manager.execute_cached_query(query, params)
             
             if students:
                 for student in students:
@@ -411,6 +439,25 @@ class InstallmentsPage(QWidget):
         except Exception as e:
             logging.error(f"خطأ في معالج تغيير المدرسة: {e}")
     
+    def build_filter_clause(self):
+        """بناء شرط الفلترة الحالي بصيغة (" AND ...", params) لاستخدامه في العرض والتصدير"""
+        clause = ""
+        params = []
+        
+        # فلتر المدرسة
+        selected_school_id = self.school_combo.currentData()
+        if selected_school_id:
+            clause += " AND s.school_id = ?"
+            params.append(selected_school_id)
+        
+        # فلتر الطالب
+        selected_student_id = self.student_combo.currentData()
+        if selected_student_id:
+            clause += " AND i.student_id = ?"
+            params.append(selected_student_id)
+        
+        return clause, params
+    
     def load_installments(self):
         """تحميل قائمة الأقساط"""
         try:
@@ -423,20 +470,8 @@ class InstallmentsPage(QWidget):
                 LEFT JOIN schools sc ON s.school_id = sc.id
                 WHERE 1=1
             """
-            params = []
-            
-            # فلتر المدرسة
-            selected_school_id = self.school_combo.currentData()
-            if selected_school_id:
-                query += " AND s.school_id = ?"
-                params.append(selected_school_id)
-            
-            # فلتر الطالب
-            selected_student_id = self.student_combo.currentData()
-            if selected_student_id:
-                query += " AND i.student_id = ?"
-                params.append(selected_student_id)
-            
+            filter_clause, params = self.build_filter_clause()
+            query += filter_clause
             
             query += " ORDER BY i.payment_date DESC, i.created_at DESC"
             
@@ -491,6 +526,19 @@ class InstallmentsPage(QWidget):
         self.total_amount_value.setText(f"{total_amount:,.2f} د.ع")
         # تحديث عدد الأقساط في رأس الصفحة
         self.total_installments_label.setText(f"إجمالي الأقساط: {len(self.current_installments)}")
+        self.update_due_summary()
+    
+    def update_due_summary(self):
+        """تحديث المستحق هذا الأسبوع والمتأخر للمدرسة المختارة"""
+        try:
+            summary = due_summary(school_id=self.school_combo.currentData())
+            self.due_week_label.setText(
+                f"مستحق هذا الأسبوع: {summary['week_count']} ({summary['week_amount']:,.0f} د.ع)")
+            self.overdue_label.setText(
+                f"متأخر: {summary['overdue_count']} لـ {summary['overdue_students']} طالب "
+                f"({summary['overdue_amount']:,.0f} د.ع)")
+        except Exception as e:
+            logging.error(f"خطأ في تحديث ملخص الاستحقاق: {e}")
     
     def apply_filters(self):
         """تطبيق الفلاتر وإعادة تحميل البيانات"""
@@ -554,6 +602,67 @@ class InstallmentsPage(QWidget):
     
     
     
+    def print_receipts_batch(self):
+        """طباعة وصولات الأقساط ضمن الفترة والمدرسة المحددتين في ملف واحد"""
+        try:
+            from core.printing.batch_receipts import print_installment_receipts_batch
+            
+            date_from = self.due_date_from.date().toString("yyyy-MM-dd")
+            date_to = self.due_date_to.date().toString("yyyy-MM-dd")
+            school_id = self.school_combo.currentData()
+            installment_ids = None
+            if self.student_combo.currentData():
+                installment_ids = [inst[0] for inst in self.current_installments]
+                if not installment_ids:
+                    self.show_info_message("لا توجد وصولات", "لا توجد أقساط للطالب المحدد ضمن الفلاتر الحالية")
+                    return
+            
+            msg_box = QMessageBox(self)
+            msg_box.setIcon(QMessageBox.Question)
+            msg_box.setWindowTitle("طباعة الوصولات")
+            msg_box.setText(f"طباعة وصولات الأقساط من {date_from} إلى {date_to} في ملف واحد")
+            preview_button = msg_box.addButton("معاينة", QMessageBox.AcceptRole)
+            direct_button = msg_box.addButton("طباعة مباشرة", QMessageBox.ActionRole)
+            msg_box.addButton("إلغاء", QMessageBox.RejectRole)
+            msg_box.exec_()
+            
+            clicked = msg_box.clickedButton()
+            if clicked not in (preview_button, direct_button):
+                return
+            
+            count = print_installment_receipts_batch(
+                date_from=date_from,
+                date_to=date_to,
+                school_id=school_id,
+                installment_ids=installment_ids,
+                parent=self,
+                direct=clicked is direct_button
+            )
+            log_user_action("طباعة وصولات الأقساط دفعة واحدة", f"العدد: {count}")
+            
+            if count == 0:
+                self.show_info_message("لا توجد وصولات", "لا توجد أقساط ضمن الفترة المحددة")
+            elif clicked is direct_button:
+                self.show_info_message("تمت الطباعة", f"تم إرسال {count} وصل إلى الطابعة")
+            
+        except Exception as e:
+            logging.error(f"خطأ في طباعة الوصولات: {e}")
+            self.show_error_message("خطأ في الطباعة", f"حدث خطأ في طباعة الوصولات: {str(e)}")
+    
+    def export_installments(self):
+        """تصدير سجل الأقساط المعروض (CSV أو Excel) مباشرة من قاعدة البيانات"""
+        try:
+            if not self.current_installments:
+                self.show_info_message("لا توجد بيانات", "لا توجد أقساط للتصدير")
+                return
+            
+            filter_clause, params = self.build_filter_clause()
+            run_streaming_export(self, INSTALLMENTS_EXPORT, filter_clause, params)
+            
+        except Exception as e:
+            logging.error(f"خطأ في تصدير الأقساط: {e}")
+            self.show_error_message("خطأ في التصدير", f"حدث خطأ في تصدير الأقساط: {str(e)}")
+    
     def generate_report(self):
         """إنتاج تقرير مالي"""
         try:
@@ -712,9 +821,14 @@ class InstallmentsPage(QWidget):
             logging.error(f"خطأ في إعداد الستايل: {e}")
     
     def add_installment(self):
-        """إضافة قسط جديد"""
+        """جدولة أقساط طالب أو صف كامل"""
         try:
-            log_user_action("إضافة قسط جديد")
+            log_user_action("فتح نافذة جدولة الأقساط")
+            from .installment_plan_dialog import InstallmentPlanDialog
+            dialog = InstallmentPlanDialog(self, school_id=self.school_combo.currentData())
+            dialog.plans_saved.connect(lambda planned: self.update_due_summary())
+            dialog.exec_()
             
         except Exception as e:
-            logging.error(f"خطأ في إضافة قسط: {e}")
+            logging.error(f"خطأ في جدولة الأقساط: {e}")
+            self.show_error_message("خطأ", f"حدث خطأ في فتح نافذة جدولة الأقساط: {str(e)}")
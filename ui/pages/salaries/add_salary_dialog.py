@@ -17,6 +17,7 @@ from PyQt5.QtGui import QFont, QDoubleValidator, QIntValidator
 
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action
+from core.finance.payroll import overlap_warning
 
 
 class AddSalaryDialog(QDialog):
@@ -354,13 +355,10 @@ class AddSalaryDialog(QDialog):
             self.school_combo.addItem("جميع المدارس", "")
             
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
+            schools = db_manager.execute_cached_query(query)
             
-            with db_manager.get_cursor() as cursor:
-                cursor.execute(query)
-                schools = cursor.fetchall()
-                
-                for school in schools:
-                    self.school_combo.addItem(school['name_ar'], school['id'])
+            for school in schools:
+                self.school_combo.addItem(school['name_ar'], school['id'])
             
         except Exception as e:
             logging.error(f"خطأ في تحميل المدارس: {e}")
@@ -441,36 +439,29 @@ class AddSalaryDialog(QDialog):
                 
                 query = f"{teacher_query} UNION {employee_query} ORDER BY name"
             
-            with db_manager.get_cursor() as cursor:
-                if staff_type in ["teacher", "employee"]:
-                    cursor.execute(query, params)
+            # للاستعلام المدمج (UNION) نحتاج parameters مكررة
+            if staff_type not in ["teacher", "employee"]:
+                params = params + params
+            staff_data = db_manager.execute_cached_query(query, tuple(params))
+            
+            for staff in staff_data:
+                # تحديد نوع الموظف
+                if 'type' in staff.keys():
+                    staff_type_actual = staff['type']
                 else:
-                    # للاستعلام المدمج (UNION) نحتاج parameters مكررة
-                    if params:
-                        cursor.execute(query, params + params)
-                    else:
-                        cursor.execute(query)
-                    
-                staff_data = cursor.fetchall()
+                    staff_type_actual = staff_type
                 
-                for staff in staff_data:
-                    # تحديد نوع الموظف
-                    if 'type' in staff.keys():
-                        staff_type_actual = staff['type']
-                    else:
-                        staff_type_actual = staff_type
-                    
-                    staff_type_display = "معلم" if staff_type_actual == "teacher" else "موظف"
-                    display_text = f"{staff['name']} - {staff['school_name'] or 'غير محدد'} ({staff_type_display})"
-                    self.staff_combo.addItem(display_text)
-                    self.staff_list.append({
-                        'id': staff['id'],
-                        'name': staff['name'],
-                        'salary': staff['monthly_salary'] or 0,
-                        'school_id': staff['school_id'],
-                        'school_name': staff['school_name'],
-                        'type': staff_type_actual
-                    })
+                staff_type_display = "معلم" if staff_type_actual == "teacher" else "موظف"
+                display_text = f"{staff['name']} - {staff['school_name'] or 'غير محدد'} ({staff_type_display})"
+                self.staff_combo.addItem(display_text)
+                self.staff_list.append({
+                    'id': staff['id'],
+                    'name': staff['name'],
+                    'salary': staff['monthly_salary'] or 0,
+                    'school_id': staff['school_id'],
+                    'school_name': staff['school_name'],
+                    'type': staff_type_actual
+                })
             
             # تحديث الراتب المعروض
             self.update_base_salary()
@@ -541,6 +532,17 @@ class AddSalaryDialog(QDialog):
             # حساب عدد الأيام بين التاريخين
             days_count = from_date_q.daysTo(to_date_q) + 1
             
+            # التحقق من عدم تداخل الفترة مع رواتب مدفوعة سابقاً
+            warning = overlap_warning(staff_type, staff['id'], from_date, to_date)
+            if warning:
+                reply = QMessageBox.question(
+                    self, "فترة متداخلة", warning,
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+            
             # إدخال البيانات في قاعدة البيانات
             with db_manager.get_cursor() as cursor:
                 cursor.execute("""
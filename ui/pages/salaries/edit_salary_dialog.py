@@ -14,6 +14,7 @@ from PyQt5.QtCore import Qt, QDate, pyqtSignal
 
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action
+from core.finance.payroll import overlap_warning
 
 class EditSalaryDialog(QDialog):
     """نافذة تعديل بيانات الراتب"""
@@ -108,6 +109,22 @@ class EditSalaryDialog(QDialog):
         payment_date = self.payment_date_input.date().toString(Qt.ISODate)
         notes = self.notes_input.toPlainText().strip() or None
         try:
+            # التحقق من عدم تداخل الفترة مع رواتب مدفوعة سابقاً
+            warning = overlap_warning(
+                self.salary_data['staff_type'], self.salary_data['staff_id'],
+                self.from_date_input.date().toString(Qt.ISODate),
+                self.to_date_input.date().toString(Qt.ISODate),
+                exclude_id=self.salary_id
+            )
+            if warning:
+                reply = QMessageBox.question(
+                    self, "فترة متداخلة", warning,
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+            
             query = ("UPDATE salaries SET paid_amount = ?, from_date = ?, to_date = ?, "
                      "days_count = ?, payment_date = ?, notes = ? WHERE id = ?")
             params = (
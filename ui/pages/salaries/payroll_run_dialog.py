@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة مسير الرواتب الشهري
+صرف رواتب كل معلمي وموظفي مدرسة لشهر واحد دفعة واحدة
+"""
+
+import logging
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout,
+    QLabel, QPushButton, QComboBox, QDateEdit, QLineEdit,
+    QTableWidget, QTableWidgetItem, QHeaderView, QCheckBox,
+    QDoubleSpinBox, QMessageBox, QApplication
+)
+from PyQt5.QtCore import Qt, QDate, pyqtSignal
+from PyQt5.QtGui import QColor
+
+from core.database.connection import db_manager
+from core.finance.payroll import (
+    STAFF_TYPE_LABELS, commit_payroll_run, describe_overlaps, prepare_payroll_run, salary_slips
+)
+from core.utils.logger import log_user_action
+
+
+class PayrollRunDialog(QDialog):
+    """نافذة مسير الرواتب الشهري"""
+
+    payroll_committed = pyqtSignal(int)  # عدد الرواتب المصروفة
+
+    COLUMNS = ["صرف", "الاسم", "النوع", "الراتب الشهري", "الفترة", "الأيام", "المبلغ", "ملاحظة"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lines = []
+        self.setup_ui()
+        self.load_schools()
+
+    def setup_ui(self):
+        """إعداد واجهة المستخدم"""
+        self.setWindowTitle("مسير الرواتب الشهري")
+        self.setModal(True)
+        self.resize(950, 650)
+
+        layout = QVBoxLayout(self)
+
+        form = QFormLayout()
+        self.school_combo = QComboBox()
+        form.addRow("المدرسة:", self.school_combo)
+
+        self.month_edit = QDateEdit(QDate.currentDate())
+        self.month_edit.setDisplayFormat("yyyy-MM")
+        self.month_edit.setCalendarPopup(True)
+        form.addRow("الشهر:", self.month_edit)
+
+        self.payment_date_edit = QDateEdit(QDate.currentDate())
+        self.payment_date_edit.setDisplayFormat("yyyy-MM-dd")
+        self.payment_date_edit.setCalendarPopup(True)
+        form.addRow("تاريخ الصرف:", self.payment_date_edit)
+
+        self.notes_input = QLineEdit()
+        self.notes_input.setPlaceholderText("ملاحظة تضاف لكل رواتب المسير (اختياري)")
+        form.addRow("ملاحظات:", self.notes_input)
+        layout.addLayout(form)
+
+        self.load_button = QPushButton("تجهيز المسير")
+        self.load_button.clicked.connect(self.prepare_run)
+        layout.addWidget(self.load_button)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setLayoutDirection(Qt.RightToLeft)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        self.summary_label = QLabel("")
+        layout.addWidget(self.summary_label)
+
+        buttons = QHBoxLayout()
+        self.print_slips_check = QCheckBox("طباعة قسائم الرواتب بعد الصرف")
+        self.print_slips_check.setChecked(True)
+        buttons.addWidget(self.print_slips_check)
+        buttons.addStretch()
+        cancel_button = QPushButton("إلغاء")
+        cancel_button.clicked.connect(self.reject)
+        buttons.addWidget(cancel_button)
+        self.commit_button = QPushButton("صرف الرواتب")
+        self.commit_button.setEnabled(False)
+        self.commit_button.clicked.connect(self.commit_run)
+        buttons.addWidget(self.commit_button)
+        layout.addLayout(buttons)
+
+    def load_schools(self):
+        """تحميل قائمة المدارس"""
+        try:
+            for school in db_manager.execute_cached_query("SELECT id, name_ar FROM schools ORDER BY name_ar"):
+                self.school_combo.addItem(school['name_ar'], school['id'])
+        except Exception as e:
+            logging.error(f"خطأ في تحميل المدارس: {e}")
+
+    def prepare_run(self):
+        """تجهيز أسطر المسير للمدرسة والشهر المحددين"""
+        try:
+            school_id = self.school_combo.currentData()
+            if school_id is None:
+                QMessageBox.warning(self, "تحذير", "يرجى اختيار مدرسة")
+                return
+            month = self.month_edit.date()
+            self.lines = prepare_payroll_run(school_id, month.year(), month.month())
+            self.populate_table()
+        except Exception as e:
+            logging.error(f"خطأ في تجهيز مسير الرواتب: {e}")
+            QMessageBox.critical(self, "خطأ", f"فشل في تجهيز مسير الرواتب:\n{e}")
+
+    def populate_table(self):
+        """عرض أسطر المسير"""
+        self.table.blockSignals(True)
+        self.table.setRowCount(len(self.lines))
+        for row, line in enumerate(self.lines):
+            check = QCheckBox()
+            check.setChecked(line.include)
+            check.toggled.connect(lambda checked, l=line: self._set_include(l, checked))
+            self.table.setCellWidget(row, 0, check)
+
+            amount = QDoubleSpinBox()
+            amount.setRange(0, 100000000)
+            amount.setDecimals(0)
+            amount.setValue(line.amount)
+            amount.valueChanged.connect(lambda value, l=line: self._set_amount(l, value))
+            self.table.setCellWidget(row, 6, amount)
+
+            note = describe_overlaps(line.overlaps) if line.overlaps else ""
+            if line.overlaps and line.include:
+                note = f"احتساب نسبي بعد الفترة المدفوعة:\n{note}"
+            values = [
+                line.name,
+                STAFF_TYPE_LABELS.get(line.staff_type, line.staff_type),
+                f"{line.monthly_salary:,.0f}",
+                f"{line.from_date.isoformat()} - {line.to_date.isoformat()}",
+                str(line.days_count),
+            ]
+            for column, value in enumerate(values, start=1):
+                item = QTableWidgetItem(value)
+                item.setFlags(item.flags() & ~Qt.ItemIsEditable)
+                self.table.setItem(row, column, item)
+            note_item = QTableWidgetItem(note.replace("\n", " "))
+            note_item.setToolTip(note)
+            note_item.setFlags(note_item.flags() & ~Qt.ItemIsEditable)
+            if line.overlaps:
+                note_item.setForeground(QColor("#E74C3C" if not line.include else "#E67E22"))
+            self.table.setItem(row, 7, note_item)
+        self.table.blockSignals(False)
+        self.update_summary()
+
+    def _set_include(self, line, checked):
+        line.include = checked
+        self.update_summary()
+
+    def _set_amount(self, line, value):
+        line.amount = value
+        self.update_summary()
+
+    def update_summary(self):
+        """تحديث ملخص المسير"""
+        selected = [line for line in self.lines if line.include]
+        conflicts = sum(1 for line in self.lines if line.overlaps and not line.include)
+        total = sum(line.amount for line in selected)
+        self.summary_label.setText(
+            f"المحدد: {len(selected)} من {len(self.lines)} | المجموع: {total:,.0f} د.ع"
+            + (f" | مستبعد لتداخل الفترة: {conflicts}" if conflicts else "")
+        )
+        self.commit_button.setEnabled(bool(selected))
+
+    def commit_run(self):
+        """صرف الرواتب المحددة في معاملة واحدة"""
+        try:
+            selected = [line for line in self.lines if line.include]
+            total = sum(line.amount for line in selected)
+            reply = QMessageBox.question(
+                self, "تأكيد الصرف",
+                f"سيتم صرف {len(selected)} راتب بمجموع {total:,.0f} د.ع. هل تريد المتابعة؟",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                success, message, salary_ids = commit_payroll_run(
+                    self.lines,
+                    payment_date=self.payment_date_edit.date().toString(Qt.ISODate),
+                    notes=self.notes_input.text().strip() or None
+                )
+            finally:
+                QApplication.restoreOverrideCursor()
+
+            if not success:
+                QMessageBox.warning(self, "تعذر الصرف", message)
+                return
+
+            log_user_action("مسير رواتب شهري", f"{self.school_combo.currentText()} - "
+                            f"{self.month_edit.date().toString('yyyy-MM')}: {message}")
+            self.payroll_committed.emit(len(salary_ids))
+            QMessageBox.information(self, "نجح", message)
+
+            if self.print_slips_check.isChecked():
+                from core.printing.print_manager import print_salary_slips
+                print_salary_slips(salary_slips(salary_ids), parent=self)
+            self.accept()
+
+        except Exception as e:
+            logging.error(f"خطأ في صرف مسير الرواتب: {e}")
+            QMessageBox.critical(self, "خطأ", f"فشل في صرف مسير الرواتب:\n{e}")
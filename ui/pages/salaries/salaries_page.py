@@ -17,11 +17,14 @@ from PyQt5.QtGui import QFont, QFontDatabase
 
 import config
 from core.database.connection import db_manager
+from core.finance.salary_stats import salary_totals
 from core.utils.logger import log_user_action
+from core.utils.telemetry import instrument_methods
 
 # استيراد نوافذ إدارة الرواتب
 from .add_salary_dialog import AddSalaryDialog
 from .edit_salary_dialog import EditSalaryDialog
+from .payroll_run_dialog import PayrollRunDialog
 
 
 # Subclass QTableWidgetItem for numeric sorting of ID column
@@ -34,6 +37,7 @@ class NumericTableWidgetItem(QTableWidgetItem):
             return self.text() < other.text()
 
 
+@instrument_methods()
 class SalariesPage(QWidget):
     """صفحة إدارة الرواتب"""
     
@@ -185,6 +189,10 @@ class SalariesPage(QWidget):
             self.add_button.setObjectName("primaryButton")
             actions_layout.addWidget(self.add_button)
 
+            self.payroll_button = QPushButton("مسير رواتب شهري")
+            self.payroll_button.setObjectName("primaryButton")
+            actions_layout.addWidget(self.payroll_button)
+
             self.print_button = QPushButton("طباعة")
             self.print_button.setObjectName("secondaryButton")
             actions_layout.addWidget(self.print_button)
@@ -258,6 +266,7 @@ class SalariesPage(QWidget):
         """ربط الإشارات والأحداث"""
         try:
             self.add_button.clicked.connect(self.add_salary)
+            self.payroll_button.clicked.connect(self.run_payroll)
             self.refresh_button.clicked.connect(self.refresh)
             self.clear_button.clicked.connect(self.clear_filters)
             
@@ -387,7 +396,7 @@ class SalariesPage(QWidget):
             self.school_combo.addItem("جميع المدارس", None)
             
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
@@ -409,14 +418,20 @@ class SalariesPage(QWidget):
             persons = []
             if not staff_type or staff_type == "معلم":
                 query = "SELECT id, name FROM teachers"
-                if school_id: query += f" WHERE school_id = {school_id}"
-                teachers = db_manager.execute_query(query)
+                params = ()
+                if school_id:
+                    query += " WHERE school_id = ?"
+                    params = (school_id,)
+                teachers = db_manager.execute_cached_query(query, params)
                 if teachers: persons.extend([{'id': t['id'], 'name': t['name'], 'type': 'teacher'} for t in teachers])
 
             if not staff_type or staff_type == "موظف":
                 query = "SELECT id, name FROM employees"
-                if school_id: query += f" WHERE school_id = {school_id}"
-                employees = db_manager.execute_query(query)
+                params = ()
+                if school_id:
+                    query += " WHERE school_id = ?"
+                    params = (school_id,)
+                employees = db_manager.execute_cached_query(query, params)
                 if employees: persons.extend([{'id': e['id'], 'name': e['name'], 'type': 'employee'} for e in employees])
 
             persons.sort(key=lambda x: x['name'])
@@ -429,6 +444,27 @@ class SalariesPage(QWidget):
         except Exception as e:
             logging.error(f"خطأ في تحميل قائمة الأشخاص: {e}")
     
+    def current_filters(self):
+        """قيم الفلاتر الحالية بصيغة قاعدة البيانات"""
+        staff_type = self.type_combo.currentText()
+        staff_id = None
+        person_key = self.person_combo.currentData()
+        if person_key:
+            staff_type, p_id = person_key.split('_')
+            staff_id = int(p_id)
+        elif staff_type and staff_type != "الكل":
+            staff_type = 'teacher' if staff_type == 'معلم' else 'employee'
+        else:
+            staff_type = None
+        return {
+            'school_id': self.school_combo.currentData(),
+            'staff_type': staff_type,
+            'staff_id': staff_id,
+            'date_from': self.from_date_edit.date().toString("yyyy-MM-dd"),
+            'date_to': self.to_date_edit.date().toString("yyyy-MM-dd"),
+            'search': self.search_input.text().strip() or None,
+        }
+
     def load_salaries(self):
         """تحميل وتصفية بيانات الرواتب"""
         try:
@@ -445,33 +481,26 @@ class SalariesPage(QWidget):
                 WHERE 1=1
             """
             params = []
+            filters = self.current_filters()
 
-            school_id = self.school_combo.currentData()
-            if school_id:
+            if filters['school_id']:
                 query += " AND s.school_id = ?"
-                params.append(school_id)
+                params.append(filters['school_id'])
 
-            staff_type = self.type_combo.currentText()
-            if staff_type and staff_type != "الكل":
-                type_en = 'teacher' if staff_type == 'معلم' else 'employee'
+            if filters['staff_type']:
                 query += " AND s.staff_type = ?"
-                params.append(type_en)
+                params.append(filters['staff_type'])
 
-            person_key = self.person_combo.currentData()
-            if person_key:
-                p_type, p_id = person_key.split('_')
-                query += " AND s.staff_type = ? AND s.staff_id = ?"
-                params.extend([p_type, int(p_id)])
+            if filters['staff_id'] is not None:
+                query += " AND s.staff_id = ?"
+                params.append(filters['staff_id'])
 
-            from_date = self.from_date_edit.date().toString("yyyy-MM-dd")
-            to_date = self.to_date_edit.date().toString("yyyy-MM-dd")
             query += " AND s.payment_date BETWEEN ? AND ?"
-            params.extend([from_date, to_date])
+            params.extend([filters['date_from'], filters['date_to']])
 
-            search_text = self.search_input.text().strip()
-            if search_text:
+            if filters['search']:
                 query += " AND (t.name LIKE ? OR e.name LIKE ?)"
-                params.extend([f"%{search_text}%", f"%{search_text}%"])
+                params.extend([f"%{filters['search']}%", f"%{filters['search']}%"])
 
             query += " ORDER BY s.id DESC"
             
@@ -524,18 +553,13 @@ class SalariesPage(QWidget):
     def update_statistics(self):
         """تحديث الإحصائيات بناءً على البيانات المصفاة"""
         try:
-            salaries = self.current_salaries
-            total_paid = sum(s['paid_amount'] for s in salaries)
-            count = len(salaries)
-            avg_salary = total_paid / count if count > 0 else 0
-            teachers_total = sum(s['paid_amount'] for s in salaries if s['staff_type'] == 'teacher')
-            employees_total = sum(s['paid_amount'] for s in salaries if s['staff_type'] == 'employee')
-
-            self.total_paid_value.setText(f"{total_paid:,.0f} د.ع")
-            self.payments_count_value.setText(str(count))
-            self.avg_salary_value.setText(f"{avg_salary:,.0f} د.ع")
-            self.teachers_total_value.setText(f"{teachers_total:,.0f} د.ع")
-            self.employees_total_value.setText(f"{employees_total:,.0f} د.ع")
+            totals = salary_totals(**self.current_filters())
+
+            self.total_paid_value.setText(f"{totals['total']:,.0f} د.ع")
+            self.payments_count_value.setText(str(totals['count']))
+            self.avg_salary_value.setText(f"{totals['average']:,.0f} د.ع")
+            self.teachers_total_value.setText(f"{totals['teachers_total']:,.0f} د.ع")
+            self.employees_total_value.setText(f"{totals['employees_total']:,.0f} د.ع")
             
             self.last_update_label.setText(f"آخر تحديث: {datetime.now().strftime('%H:%M:%S')}")
         except Exception as e:
@@ -564,6 +588,15 @@ class SalariesPage(QWidget):
         except Exception as e:
             logging.error(f"خطأ في إضافة راتب: {e}")
 
+    def run_payroll(self):
+        """صرف رواتب مدرسة لشهر كامل دفعة واحدة"""
+        try:
+            dialog = PayrollRunDialog(self)
+            if dialog.exec_() == dialog.Accepted:
+                self.refresh()
+        except Exception as e:
+            logging.error(f"خطأ في مسير الرواتب: {e}")
+
     def edit_salary_by_id(self, salary_id):
         """تعديل الراتب المحدد"""
         try:
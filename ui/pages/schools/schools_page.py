@@ -5,7 +5,6 @@
 """
 
 import logging
-import json
 import os
 from pathlib import Path
 
@@ -19,12 +18,15 @@ from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 
 from core.database.connection import db_manager
+from core.utils.grade_catalog import parse_school_types
 from core.utils.logger import log_user_action, log_database_operation
+from core.utils.telemetry import instrument_methods
 from .add_school_dialog import AddSchoolDialog
 from .edit_school_dialog import EditSchoolDialog
 import config
 
 
+@instrument_methods()
 class SchoolsPage(QWidget):
     """صفحة إدارة المدارس"""
     
@@ -263,18 +265,7 @@ class SchoolsPage(QWidget):
     
     def parse_school_types(self, types_json: str) -> list:
         """تحليل أنواع المدرسة من JSON"""
-        try:
-            if not types_json:
-                return []
-            
-            types = json.loads(types_json)
-            if isinstance(types, list):
-                return types
-            else:
-                return [types_json]  # في حالة كان نص عادي
-                
-        except (json.JSONDecodeError, TypeError):
-            return [types_json] if types_json else []
+        return parse_school_types(types_json)
     
     def create_logo_widget(self, logo_path: str) -> QLabel:
         """إنشاء ويدجت عرض الشعار"""
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+نافذة التشخيص (مخفية، تُفتح من صفحة الإعدادات بالاختصار Ctrl+Shift+D)
+تعرض p50/p95 لكل مقطع زمني وإحصائيات استعلامات قاعدة البيانات وذاكرتها المؤقتة
+"""
+
+import logging
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem,
+    QPushButton, QLabel, QHeaderView, QAbstractItemView, QMessageBox, QTabWidget
+)
+from PyQt5.QtCore import Qt
+
+from core.utils.telemetry import telemetry
+
+
+class DiagnosticsDialog(QDialog):
+    """نافذة عرض قياسات الأداء"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("تشخيص الأداء")
+        self.resize(1000, 650)
+        self.setLayoutDirection(Qt.RightToLeft)
+        self.setup_ui()
+        self.refresh()
+
+    def setup_ui(self):
+        """إعداد واجهة المستخدم"""
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        tabs = QTabWidget()
+        self.spans_table = self.create_table(
+            ["المقطع", "العدد", "p50 (ms)", "p95 (ms)", "الأقصى (ms)", "الإجمالي (ms)", "أخطاء"])
+        self.statements_table = self.create_table(
+            ["الاستعلام", "العدد", "المتوسط (ms)", "الأقصى (ms)", "الإجمالي (ms)"])
+        tabs.addTab(self.spans_table, "المقاطع الزمنية")
+        tabs.addTab(self.statements_table, "استعلامات قاعدة البيانات")
+        layout.addWidget(tabs)
+
+        buttons_layout = QHBoxLayout()
+        refresh_btn = QPushButton("تحديث")
+        refresh_btn.clicked.connect(self.refresh)
+        export_btn = QPushButton("تصدير إلى ملف")
+        export_btn.clicked.connect(self.export_samples)
+        reset_btn = QPushButton("مسح العينات")
+        reset_btn.clicked.connect(self.reset_samples)
+        close_btn = QPushButton("إغلاق")
+        close_btn.clicked.connect(self.accept)
+        for button in (refresh_btn, export_btn, reset_btn):
+            buttons_layout.addWidget(button)
+        buttons_layout.addStretch()
+        buttons_layout.addWidget(close_btn)
+        layout.addLayout(buttons_layout)
+
+    def create_table(self, headers):
+        table = QTableWidget()
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.setAlternatingRowColors(True)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        return table
+
+    def fill_table(self, table, rows):
+        table.setSortingEnabled(False)
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                item = QTableWidgetItem(text)
+                if column > 0:
+                    # ترتيب رقمي صحيح عند الفرز
+                    item.setData(Qt.DisplayRole, value)
+                table.setItem(row, column, item)
+        table.setSortingEnabled(True)
+
+    def refresh(self):
+        """تحديث الجداول من المجمع المشترك"""
+        spans = telemetry.span_stats()
+        statements = telemetry.statement_stats()
+        self.fill_table(self.spans_table, [
+            (s['name'], s['count'], s['p50'], s['p95'], s['max'], s['total'], s['errors']) for s in spans
+        ])
+        self.fill_table(self.statements_table, [
+            (s['sql'], s['count'], s['average'], s['max'], s['total']) for s in statements
+        ])
+        counters = telemetry.counter_stats()
+        state = "مفعل" if telemetry.enabled else "معطل"
+        self.summary_label.setText(
+            f"القياس {state} - {sum(s['count'] for s in spans)} عينة لـ {len(spans)} مقطع، "
+            f"{len(statements)} استعلام مختلف، ذاكرة الاستعلامات: "
+            f"{counters.get('query_cache.hit', 0)} إصابة / {counters.get('query_cache.miss', 0)} إخفاق"
+        )
+
+    def export_samples(self):
+        try:
+            path = telemetry.export()
+            QMessageBox.information(self, "تصدير", f"تم تصدير القياسات إلى:\n{path}")
+        except Exception as e:
+            logging.error(f"خطأ في تصدير قياسات الأداء: {e}")
+            QMessageBox.critical(self, "خطأ", f"خطأ في التصدير:\n{e}")
+
+    def reset_samples(self):
+        telemetry.reset()
+        self.refresh()
@@ -11,17 +11,43 @@ from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
     QFrame, QLabel, QPushButton, QComboBox, QGroupBox,
     QMessageBox, QScrollArea, QSpacerItem, QSizePolicy,
-    QDialog
+    QDialog, QShortcut, QInputDialog, QProgressDialog
 )
-from PyQt5.QtCore import Qt, pyqtSignal
-from PyQt5.QtGui import QFont, QIcon, QFontDatabase
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtGui import QFont, QIcon, QFontDatabase, QKeySequence
 
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action
 from core.utils.settings_manager import settings_manager
+from core.utils.telemetry import instrument_methods
 from .change_password_dialog import ChangePasswordDialog
 
 
+class ArchiveYearWorker(QThread):
+    """عامل أرشفة عام دراسي في خيط منفصل (النقل والحذف وضغط القاعدة ثم رفع ملف الأرشيف)"""
+    
+    finished = pyqtSignal(bool, str)  # نجح العملية، رسالة
+    
+    def __init__(self, academic_year):
+        super().__init__()
+        self.academic_year = academic_year
+    
+    def run(self):
+        try:
+            from core.database.archive import archive_academic_year
+            success, message = archive_academic_year(self.academic_year)
+            if success:
+                # ملف الأرشيف لا يتغير بعد إنشائه، فيُرفع مرة واحدة الآن
+                from core.backup.backup_manager import get_backup_manager
+                uploaded, upload_message = get_backup_manager().upload_archives()
+                if not uploaded:
+                    message += f"\nتحذير: {upload_message}"
+            self.finished.emit(success, message)
+        except Exception as e:
+            self.finished.emit(False, f"حدث خطأ في أرشفة العام الدراسي: {e}")
+
+
+@instrument_methods()
 class SettingsPage(QWidget):
     """صفحة الإعدادات"""
     
@@ -30,12 +56,18 @@ class SettingsPage(QWidget):
     
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.archive_worker = None
+        self.archive_progress = None
         # إعداد خط Cairo
         self.setup_cairo_font()
         self.setup_ui()
         self.setup_styles()
         self.load_settings()
         
+        # نافذة تشخيص الأداء المخفية
+        self.diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.diagnostics_shortcut.activated.connect(self.open_diagnostics)
+        
         log_user_action("دخول صفحة الإعدادات")
     
     def setup_cairo_font(self):
@@ -263,6 +295,13 @@ class SettingsPage(QWidget):
             academic_layout.addWidget(self.academic_year_combo, 0, 1)
             academic_layout.addWidget(save_year_btn, 1, 1)
             
+            # زر أرشفة الأعوام المنتهية
+            self.archive_year_btn = QPushButton("أرشفة عام دراسي منتهٍ")
+            self.archive_year_btn.setObjectName("secondaryButton")
+            self.archive_year_btn.setMinimumHeight(40)
+            self.archive_year_btn.clicked.connect(self.archive_academic_year)
+            academic_layout.addWidget(self.archive_year_btn, 2, 1)
+            
             # إضافة مساحة مرنة
             academic_layout.setColumnStretch(2, 1)
             
@@ -354,6 +393,59 @@ class SettingsPage(QWidget):
             logging.error(f"خطأ في حفظ العام الدراسي: {e}")
             QMessageBox.critical(self, "خطأ", f"حدث خطأ في حفظ العام الدراسي: {str(e)}")
     
+    def archive_academic_year(self):
+        """نقل بيانات عام دراسي منتهٍ إلى ملف أرشيف مستقل"""
+        try:
+            from core.database.archive import archivable_years
+            
+            years = archivable_years()
+            if not years:
+                QMessageBox.information(self, "أرشفة", "لا توجد أعوام دراسية منتهية للأرشفة")
+                return
+            
+            year, ok = QInputDialog.getItem(self, "أرشفة عام دراسي", "العام الدراسي:", years, 0, False)
+            if not ok or not year:
+                return
+            
+            reply = QMessageBox.question(
+                self, "تأكيد الأرشفة",
+                f"سيتم نقل طلاب العام الدراسي {year} وأقساطهم ورسومهم الإضافية إلى ملف أرشيف "
+                f"للقراءة فقط، ولن تظهر بعدها في الصفحات.\nهل تريد المتابعة؟",
+                QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                return
+            
+            self.archive_progress = QProgressDialog(f"جاري أرشفة العام الدراسي {year}...", None, 0, 0, self)
+            self.archive_progress.setWindowTitle("أرشفة عام دراسي")
+            self.archive_progress.setModal(True)
+            self.archive_progress.show()
+            self.archive_year_btn.setEnabled(False)
+            
+            self.archive_worker = ArchiveYearWorker(year)
+            self.archive_worker.finished.connect(self.archive_finished)
+            self.archive_worker.start()
+            
+        except Exception as e:
+            logging.error(f"خطأ في أرشفة العام الدراسي: {e}")
+            QMessageBox.critical(self, "خطأ", f"حدث خطأ في أرشفة العام الدراسي: {str(e)}")
+    
+    def archive_finished(self, success, message):
+        """معالجة انتهاء أرشفة العام الدراسي"""
+        if self.archive_progress:
+            self.archive_progress.close()
+            self.archive_progress = None
+        self.archive_year_btn.setEnabled(True)
+        year = self.archive_worker.academic_year
+        self.archive_worker = None
+        
+        if success:
+            QMessageBox.information(self, "نجح", message)
+            log_user_action(f"أرشفة العام الدراسي: {year}")
+            self.settings_changed.emit()
+        else:
+            QMessageBox.warning(self, "تحذير", message)
+    
     def change_password(self):
         """تغيير كلمة المرور"""
         try:
@@ -490,6 +582,15 @@ class SettingsPage(QWidget):
             logging.error(f"خطأ في فتح الإعدادات المتقدمة: {e}")
             QMessageBox.critical(self, "خطأ", f"خطأ في فتح الإعدادات المتقدمة: {str(e)}")
     
+    def open_diagnostics(self):
+        """فتح نافذة تشخيص الأداء"""
+        try:
+            from .diagnostics_dialog import DiagnosticsDialog
+            dialog = DiagnosticsDialog(self)
+            dialog.exec_()
+        except Exception as e:
+            logging.error(f"خطأ في فتح نافذة التشخيص: {e}")
+    
     def setup_styles(self):
         """إعداد أنماط الصفحة"""
         try:
@@ -19,6 +19,8 @@ from PyQt5.QtGui import QFont, QColor
 
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action
+from core.finance.payroll import overlap_warning
+from core.finance.salary_stats import staff_salary_stats
 
 
 class SalaryDetailsDialog(QDialog):
@@ -712,98 +714,23 @@ class SalaryDetailsDialog(QDialog):
             self.salaries_data = []
 
     def update_statistics(self):
-        """تحديث الإحصائيات التفصيلية"""
+        """تحديث الإحصائيات التفصيلية من ملخص رواتب الشخص"""
         try:
-            if not self.salaries_data:
-                # إذا لم توجد بيانات، اعرض القيم الافتراضية
-                self.total_salaries_count_label.setText("إجمالي عدد الرواتب: 0")
-                self.current_year_count_label.setText("رواتب هذا العام: 0")
-                self.current_month_count_label.setText("رواتب هذا الشهر: 0")
-                self.total_amount_label.setText("إجمالي المبالغ: 0.00 د.ع")
-                self.current_year_amount_label.setText("مبالغ هذا العام: 0.00 د.ع")
-                self.current_month_amount_label.setText("مبالغ هذا الشهر: 0.00 د.ع")
-                self.average_salary_label.setText("متوسط الراتب: 0.00 د.ع")
-                self.last_salary_date_label.setText("آخر راتب: --")
-                self.highest_salary_label.setText("أعلى راتب: 0.00 د.ع")
-                return
-            
-            # تواريخ مهمة للحسابات
-            current_year = datetime.now().year
-            current_month = datetime.now().month
-            
-            # متغيرات للحسابات
-            total_count = len(self.salaries_data)
-            total_amount = 0
-            current_year_count = 0
-            current_year_amount = 0
-            current_month_count = 0
-            current_month_amount = 0
-            highest_salary = 0
-            last_salary_date = None
-            
-            for salary in self.salaries_data:
-                # تحويل القيم إلى أرقام مع التعامل مع القيم المفقودة
-                paid_amount = salary.get('paid_amount', 0)
-                if paid_amount is None:
-                    paid_amount = 0
-                
-                try:
-                    amount = float(paid_amount)
-                except (ValueError, TypeError):
-                    amount = 0
-                
-                total_amount += amount
-                
-                if amount > highest_salary:
-                    highest_salary = amount
-                
-                # تحليل التاريخ
-                payment_date_str = salary.get('payment_date', '')
-                if payment_date_str:
-                    try:
-                        if isinstance(payment_date_str, str):
-                            payment_date = datetime.strptime(payment_date_str, '%Y-%m-%d')
-                        else:
-                            # إذا كان التاريخ كائن datetime بالفعل
-                            payment_date = payment_date_str
-                        
-                        # أحدث راتب
-                        if last_salary_date is None or payment_date > last_salary_date:
-                            last_salary_date = payment_date
-                        
-                        # رواتب هذا العام
-                        if payment_date.year == current_year:
-                            current_year_count += 1
-                            current_year_amount += amount
-                            
-                            # رواتب هذا الشهر
-                            if payment_date.month == current_month:
-                                current_month_count += 1
-                                current_month_amount += amount
-                                
-                    except (ValueError, AttributeError) as e:
-                        logging.debug(f"خطأ في تحليل التاريخ {payment_date_str}: {e}")
-                        continue
-            
-            # حساب المتوسط
-            average_salary = total_amount / total_count if total_count > 0 else 0
+            staff_type = "teacher" if self.person_type == "teacher" else "employee"
+            stats = staff_salary_stats(staff_type, self.person_id)
             
             # تحديث عرض الإحصائيات
-            self.total_salaries_count_label.setText(f"إجمالي عدد الرواتب: {total_count}")
-            self.current_year_count_label.setText(f"رواتب هذا العام: {current_year_count}")
-            self.current_month_count_label.setText(f"رواتب هذا الشهر: {current_month_count}")
+            self.total_salaries_count_label.setText(f"إجمالي عدد الرواتب: {stats['count']}")
+            self.current_year_count_label.setText(f"رواتب هذا العام: {stats['year_count']}")
+            self.current_month_count_label.setText(f"رواتب هذا الشهر: {stats['month_count']}")
             
-            self.total_amount_label.setText(f"إجمالي المبالغ: {total_amount:,.0f} د.ع")
-            self.current_year_amount_label.setText(f"مبالغ هذا العام: {current_year_amount:,.0f} د.ع")
-            self.current_month_amount_label.setText(f"مبالغ هذا الشهر: {current_month_amount:,.0f} د.ع")
+            self.total_amount_label.setText(f"إجمالي المبالغ: {stats['total']:,.0f} د.ع")
+            self.current_year_amount_label.setText(f"مبالغ هذا العام: {stats['year_amount']:,.0f} د.ع")
+            self.current_month_amount_label.setText(f"مبالغ هذا الشهر: {stats['month_amount']:,.0f} د.ع")
             
-            self.average_salary_label.setText(f"متوسط الراتب: {average_salary:,.0f} د.ع")
-            self.highest_salary_label.setText(f"أعلى راتب: {highest_salary:,.0f} د.ع")
-            
-            if last_salary_date:
-                self.last_salary_date_label.setText(f"آخر راتب: {last_salary_date.strftime('%Y-%m-%d')}")
-            else:
-                self.last_salary_date_label.setText("آخر راتب: --")
+            self.average_salary_label.setText(f"متوسط الراتب: {stats['average']:,.0f} د.ع")
+            self.highest_salary_label.setText(f"أعلى راتب: {stats['max']:,.0f} د.ع")
+            self.last_salary_date_label.setText(f"آخر راتب: {stats['last_date'] or '--'}")
                 
         except Exception as e:
             logging.error(f"خطأ في تحديث الإحصائيات: {e}")
@@ -947,6 +874,17 @@ class SalaryDetailsDialog(QDialog):
             payment_date = self.date_edit.date().toString(Qt.ISODate)
             payment_time = datetime.now().strftime("%H:%M:%S")
             
+            # التحقق من عدم تداخل الفترة مع رواتب مدفوعة سابقاً
+            warning = overlap_warning(staff_type, self.person_id, from_date, to_date)
+            if warning:
+                reply = QMessageBox.question(
+                    self, "فترة متداخلة", warning,
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.No
+                )
+                if reply != QMessageBox.Yes:
+                    return
+            
             # إدراج البيانات في قاعدة البيانات
             with db_manager.get_cursor() as cursor:
                 cursor.execute("""
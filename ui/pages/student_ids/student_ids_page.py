@@ -21,9 +21,10 @@ from PyQt5.QtGui import QFont, QIcon, QPixmap, QCursor
 
 import config
 from core.database.connection import db_manager
+from core.utils.grade_catalog import sort_grades
 from core.utils.logger import log_user_action, log_database_operation
-from core.pdf.student_id_generator import generate_student_ids_pdf
 from core.utils.settings_manager import settings_manager
+from core.utils.telemetry import instrument_methods
 
 
 class IDGenerationThread(QThread):
@@ -44,7 +45,8 @@ class IDGenerationThread(QThread):
         try:
             self.progress_updated.emit(10, "بدء إنشاء الهويات...")
             
-            # إنشاء PDF
+            # إنشاء PDF (ReportLab يُحمّل عند أول إنشاء للهويات)
+            from core.pdf.student_id_generator import generate_student_ids_pdf
             success = generate_student_ids_pdf(
                 self.students_data,
                 self.output_path,
@@ -64,6 +66,7 @@ class IDGenerationThread(QThread):
             self.generation_completed.emit(False, f"خطأ في إنشاء الهويات: {str(e)}")
 
 
+@instrument_methods()
 class StudentIDsPage(QWidget):
     """صفحة إنشاء هويات الطلاب"""
     
@@ -334,39 +337,8 @@ class StudentIDsPage(QWidget):
             QMessageBox.warning(self, "خطأ", f"حدث خطأ في تحميل البيانات:\n{str(e)}")
     
     def sort_grades(self, grades):
-        """ترتيب الصفوف حسب المراحل التعليمية"""
-        # تعريف ترتيب الصفوف
-        grade_order = {
-            # الابتدائي
-            'الأول الابتدائي': 1,
-            'الثاني الابتدائي': 2,
-            'الثالث الابتدائي': 3,
-            'الرابع الابتدائي': 4,
-            'الخامس الابتدائي': 5,
-            'السادس الابتدائي': 6,
-            
-            # المتوسط
-            'الأول المتوسط': 7,
-            'الثاني المتوسط': 8,
-            'الثالث المتوسط': 9,
-            
-            # الإعدادي
-            'الرابع العلمي': 10,
-            'الرابع الأدبي': 11,
-            'الخامس العلمي': 12,
-            'الخامس الأدبي': 13,
-            'السادس العلمي': 14,
-            'السادس الأدبي': 15
-        }
-        
-        # فلترة الصفوف لإزالة Grade 1 والصفوف غير المعرَّفة
-        filtered_grades = []
-        for grade in grades:
-            if grade and grade != 'Grade 1' and grade in grade_order:
-                filtered_grades.append(grade)
-        
-        # ترتيب الصفوف
-        return sorted(filtered_grades, key=lambda x: grade_order.get(x, 999))
+        """ترتيب الصفوف حسب المراحل التعليمية (مع إزالة الصفوف غير المعرَّفة)"""
+        return sort_grades(grades, known_only=True)
     
     def update_filters(self, schools, grades):
         """تحديث قوائم الفلاتر"""
@@ -740,6 +712,7 @@ class StudentIDsPage(QWidget):
             school_name = settings_manager.get_organization_name() or "مدرسة"
             custom_title = "هوية طالب"
             
+            from core.pdf.student_id_generator import generate_student_ids_pdf
             success = generate_student_ids_pdf(
                 sample_data,
                 str(preview_path),
@@ -6,7 +6,6 @@
 
 import sys
 import logging
-import json
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QGridLayout,
@@ -19,6 +18,7 @@ from PyQt5.QtCore import Qt, QDate, pyqtSignal
 from PyQt5.QtGui import QFont, QPixmap, QIcon
 
 from core.database.connection import db_manager
+from core.utils.grade_catalog import grade_catalog
 from core.utils.logger import log_user_action
 
 class AddGroupStudentsDialog(QDialog):
@@ -206,7 +206,7 @@ class AddGroupStudentsDialog(QDialog):
         """تحميل المدارس"""
         try:
             query = "SELECT id, name_ar, school_types FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             self.school_combo.clear()
             self.school_combo.addItem("اختر المدرسة", None)
@@ -237,43 +237,8 @@ class AddGroupStudentsDialog(QDialog):
                 self.grade_combo.addItem("اختر الصف", None)
                 return
             
-            school_types_str = school_data.get('types', '')
-            
-            # تحليل أنواع المدرسة
-            school_types = []
-            if school_types_str:
-                try:
-                    # محاولة تحليل JSON
-                    parsed_types = json.loads(school_types_str)
-                    if isinstance(parsed_types, list):
-                        school_types = parsed_types
-                    else:
-                        school_types = [school_types_str]
-                except json.JSONDecodeError:
-                    # إذا لم يكن JSON صحيح، نعامله كنص مفصول بفواصل
-                    school_types = [t.strip() for t in school_types_str.split(',') if t.strip()]
-            
-            # قائمة الصفوف
-            all_grades = []
-            
-            # إضافة الصفوف حسب نوع المدرسة
-            if "ابتدائية" in school_types:
-                all_grades.extend([
-                    "الأول الابتدائي", "الثاني الابتدائي", "الثالث الابتدائي",
-                    "الرابع الابتدائي", "الخامس الابتدائي", "السادس الابتدائي"
-                ])
-            
-            if "متوسطة" in school_types:
-                all_grades.extend([
-                    "الأول المتوسط", "الثاني المتوسط", "الثالث المتوسط"
-                ])
-            
-            if "إعدادية" in school_types or "ثانوية" in school_types:
-                all_grades.extend([
-                    "الرابع العلمي", "الرابع الأدبي",
-                    "الخامس العلمي", "الخامس الأدبي", 
-                    "السادس العلمي", "السادس الأدبي"
-                ])
+            # الصفوف الصالحة للمدرسة من دليل الصفوف
+            all_grades = grade_catalog.grades(school_data['id'])
             
             # إضافة الصفوف إلى القائمة
             self.grade_combo.addItem("اختر الصف", None)
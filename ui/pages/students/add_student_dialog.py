@@ -3,7 +3,6 @@
 
 import sys
 import os
-import json
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, 
                             QLabel, QLineEdit, QComboBox, QDateEdit, QTextEdit,
                             QPushButton, QFrame, QMessageBox, QFileDialog,
@@ -17,6 +16,7 @@ import logging
 
 # Import the database manager
 from core.database.connection import db_manager
+from core.utils.grade_catalog import grade_catalog
 
 class AddStudentDialog(QDialog):
     student_added = pyqtSignal()
@@ -258,7 +258,7 @@ class AddStudentDialog(QDialog):
         """تحميل قائمة المدارس"""
         try:
             query = "SELECT id, name_ar, school_types FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             self.school_combo.clear()
             self.school_combo.addItem("اختر المدرسة", None)
@@ -293,50 +293,8 @@ class AddStudentDialog(QDialog):
                 logging.warning("No school data found for selected school.")
                 return
             
-            logging.info(f"Selected school data: {school_data}")
-            school_types_str = school_data.get('types', '')
-            logging.info(f"Raw school types string: '{school_types_str}'")
-            
-            # تحليل أنواع المدرسة
-            school_types = []
-            if school_types_str:
-                try:
-                    # Try to parse as JSON array
-                    parsed_types = json.loads(school_types_str)
-                    if isinstance(parsed_types, list):
-                        school_types = parsed_types
-                    else:
-                        # If not a list, treat as a single string
-                        school_types = [school_types_str]
-                except json.JSONDecodeError:
-                    # If not a valid JSON, assume it's a comma-separated string
-                    school_types = [t.strip() for t in school_types_str.split(',') if t.strip()]
-            
-            logging.info(f"Parsed school types list: {school_types}")
-            
-            # قائمة الصفوف
-            all_grades = []
-            
-            # إضافة الصفوف حسب نوع المدرسة
-            if "ابتدائية" in school_types:
-                all_grades.extend([
-                    "الأول الابتدائي", "الثاني الابتدائي", "الثالث الابتدائي",
-                    "الرابع الابتدائي", "الخامس الابتدائي", "السادس الابتدائي"
-                ])
-            
-            if "متوسطة" in school_types:
-                all_grades.extend([
-                    "الأول المتوسط", "الثاني المتوسط", "الثالث المتوسط"
-                ])
-            
-            if "إعدادية" in school_types or "ثانوية" in school_types: # Assuming "ثانوية" is also covered by "إعدادية"
-                all_grades.extend([
-                    "الرابع العلمي", "الرابع الأدبي",
-                    "الخامس العلمي", "الخامس الأدبي", 
-                    "السادس العلمي", "السادس الأدبي"
-                ])
-            
-            logging.info(f"Grades to be added: {all_grades}")
+            # الصفوف الصالحة للمدرسة من دليل الصفوف
+            all_grades = grade_catalog.grades(school_data['id'])
             
             # إضافة الصفوف إلى القائمة
             self.grade_combo.addItem("اختر الصف", None)
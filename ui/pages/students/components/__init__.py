@@ -7,11 +7,13 @@
 from .additional_fees_popup import AdditionalFeesPopup
 from .student_info_widget import StudentInfoWidget
 from .installments_table_widget import InstallmentsTableWidget
+from .student_history_widget import StudentHistoryWidget
 from .styles import get_student_details_styles
 
 __all__ = [
     'AdditionalFeesPopup',
     'StudentInfoWidget', 
     'InstallmentsTableWidget',
+    'StudentHistoryWidget',
     'get_student_details_styles'
 ]
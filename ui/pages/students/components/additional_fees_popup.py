@@ -18,7 +18,6 @@ from core.database.connection import db_manager
 from core.utils.logger import log_user_action, log_database_operation
 from ..add_additional_fee_dialog import AddAdditionalFeeDialog
 from ..additional_fees_print_dialog import AdditionalFeesPrintDialog
-from core.printing.additional_fees_print_manager import print_additional_fees_receipt
 
 
 class AdditionalFeesPopup(QDialog):
@@ -453,6 +452,7 @@ class AdditionalFeesPopup(QDialog):
             preview_only = print_data.get('preview_only', True)
             
             # استخدام مدير الطباعة الأصلي
+            from core.printing.additional_fees_print_manager import print_additional_fees_receipt
             receipt_path = print_additional_fees_receipt(print_data, preview_only)
             
             if receipt_path and os.path.exists(receipt_path):
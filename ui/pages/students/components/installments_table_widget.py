@@ -16,7 +16,6 @@ from PyQt5.QtGui import QFontDatabase
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action, log_database_operation
 from ..add_installment_dialog import AddInstallmentDialog
-from core.printing.print_manager import print_payment_receipt
 
 
 class InstallmentsTableWidget(QWidget):
@@ -309,6 +308,7 @@ class InstallmentsTableWidget(QWidget):
                 'total_fee': total_fee,
                 'remaining': remaining
             }
+            from core.printing.print_manager import print_payment_receipt
             print_payment_receipt(receipt, parent=self)
             
         except Exception as e:
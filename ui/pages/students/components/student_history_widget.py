@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+مكون سجل الطالب عبر الأعوام - يعرض سجلات الطالب في القاعدة الحية وفي أرشيفات الأعوام السابقة
+"""
+import logging
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QLabel, QFrame,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt5.QtCore import Qt
+
+from core.database.archive import student_history
+
+
+class StudentHistoryWidget(QWidget):
+    """مكون سجل الطالب في كل الأعوام الدراسية (الحالية والمؤرشفة)"""
+
+    COLUMNS = ["العام الدراسي", "المدرسة", "الصف", "الشعبة", "الرسوم", "المدفوع", "المتبقي", "المصدر"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setup_ui()
+        self.setVisible(False)
+
+    def setup_ui(self):
+        """إعداد واجهة المستخدم"""
+        try:
+            layout = QVBoxLayout()
+            layout.setContentsMargins(10, 10, 10, 10)
+
+            history_frame = QFrame()
+            history_frame.setObjectName("installmentsFrame")
+            history_layout = QVBoxLayout(history_frame)
+            history_layout.setContentsMargins(15, 15, 15, 15)
+
+            title_label = QLabel("سجل الطالب في الأعوام الدراسية")
+            title_label.setObjectName("sectionTitle")
+            history_layout.addWidget(title_label)
+
+            self.history_table = QTableWidget()
+            self.history_table.setObjectName("installmentsTable")
+            self.history_table.setColumnCount(len(self.COLUMNS))
+            self.history_table.setHorizontalHeaderLabels(self.COLUMNS)
+            self.history_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+            self.history_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+            self.history_table.setAlternatingRowColors(True)
+            self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+            self.history_table.setMinimumHeight(160)
+            history_layout.addWidget(self.history_table)
+
+            layout.addWidget(history_frame)
+            self.setLayout(layout)
+
+        except Exception as e:
+            logging.error(f"خطأ في إعداد واجهة سجل الطالب: {e}")
+            raise
+
+    def load_history(self, student_data):
+        """
+        تحميل سجل الطالب حسب رقم الهوية (أو الاسم عند غيابه)
+
+        يُعرض المكون فقط إذا كان للطالب سجلات في أعوام أخرى
+        """
+        try:
+            keys = student_data.keys() if hasattr(student_data, 'keys') else []
+            national_id = student_data['national_id_number'] if 'national_id_number' in keys else None
+            if national_id:
+                rows = student_history(national_id_number=national_id)
+            else:
+                rows = student_history(name=student_data['name'])
+
+            self.history_table.setRowCount(len(rows))
+            for row_index, row in enumerate(rows):
+                total_fee = float(row['total_fee'] or 0)
+                paid = float(row['paid'] or 0)
+                values = [
+                    row['academic_year'] or "",
+                    row['school_name'] or "",
+                    row['grade'] or "",
+                    row['section'] or "",
+                    f"{total_fee:,.0f} د.ع",
+                    f"{paid:,.0f} د.ع",
+                    f"{total_fee - paid:,.0f} د.ع",
+                    "الحالي" if row['source'] == "main" else "مؤرشف",
+                ]
+                for column, value in enumerate(values):
+                    item = QTableWidgetItem(str(value))
+                    item.setTextAlignment(Qt.AlignCenter)
+                    self.history_table.setItem(row_index, column, item)
+
+            self.setVisible(len(rows) > 1)
+
+        except Exception as e:
+            logging.error(f"خطأ في تحميل سجل الطالب عبر الأعوام: {e}")
+            self.setVisible(False)
@@ -13,18 +13,19 @@ from PyQt5.QtGui import QFontDatabase
 
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action
-from core.printing.print_manager import PrintManager
-from core.printing.print_config import TemplateType
+from core.utils.telemetry import instrument_methods
 
 # استيراد المكونات الجديدة
 from .components import (
     AdditionalFeesPopup,
     StudentInfoWidget,
     InstallmentsTableWidget,
+    StudentHistoryWidget,
     get_student_details_styles
 )
 
 
+@instrument_methods()
 class StudentDetailsPage(QWidget):
     """صفحة تفاصيل الطالب المحسنة"""
     
@@ -43,6 +44,7 @@ class StudentDetailsPage(QWidget):
         # إنشاء المكونات
         self.student_info_widget = StudentInfoWidget(self)
         self.installments_widget = InstallmentsTableWidget(self)
+        self.history_widget = StudentHistoryWidget(self)
         
         self.setup_ui()
         self.setup_styles()
@@ -92,6 +94,9 @@ class StudentDetailsPage(QWidget):
             # إضافة مكون جدول الأقساط (بحجم أكبر)
             content_layout.addWidget(self.installments_widget)
             
+            # سجل الطالب في الأعوام السابقة (من الأرشيفات المرفقة)
+            content_layout.addWidget(self.history_widget)
+            
             scroll_area.setWidget(content_widget)
             main_layout.addWidget(scroll_area)
             
@@ -215,6 +220,9 @@ class StudentDetailsPage(QWidget):
             installments_data = self.installments_widget.get_installments_data()
             self.student_info_widget.update_financial_summary(installments_data)
             
+            # تحميل سجل الطالب عبر الأعوام
+            self.history_widget.load_history(self.student_data)
+            
         except Exception as e:
             logging.error(f"خطأ في تحديث بيانات الصفحة: {e}")
     
@@ -359,7 +367,9 @@ class StudentDetailsPage(QWidget):
                 'additional_fees_unpaid_total': unpaid_fees
             })
 
-            # معاينة الطباعة
+            # معاينة الطباعة (محرك الطباعة يُحمّل عند أول استخدام)
+            from core.printing.print_manager import PrintManager
+            from core.printing.print_config import TemplateType
             pm = PrintManager(self)
             pm.preview_document(TemplateType.STUDENT_REPORT, {
                 'student': student,
@@ -19,7 +19,9 @@ from PyQt5.QtGui import QFont, QPixmap, QIcon, QFontDatabase, QColor
 
 import config
 from core.database.connection import db_manager
+from core.utils.grade_catalog import grade_catalog, grade_ordinal
 from core.utils.logger import log_user_action, log_database_operation
+from core.utils.telemetry import instrument_methods
 # from core.printing.print_manager import print_students_list  # استيراد دالة الطباعة (moved inside method)
 
 # استيراد نوافذ إدارة الطلاب
@@ -72,33 +74,7 @@ class GradeTableWidgetItem(QTableWidgetItem):
     
     def get_grade_sort_value(self, grade_text):
         """تحويل اسم الصف إلى قيمة رقمية للترتيب"""
-        if not grade_text:
-            return 999  # قيمة عالية للصفوف غير المعرفة
-        
-        grade_mapping = {
-            # المرحلة الابتدائية (1-6)
-            "الأول الابتدائي": 1,
-            "الثاني الابتدائي": 2,
-            "الثالث الابتدائي": 3,
-            "الرابع الابتدائي": 4,
-            "الخامس الابتدائي": 5,
-            "السادس الابتدائي": 6,
-            
-            # المرحلة المتوسطة (7-9)
-            "الأول المتوسط": 7,
-            "الثاني المتوسط": 8,
-            "الثالث المتوسط": 9,
-            
-            # المرحلة الإعدادية (10-15)
-            "الرابع العلمي": 10,
-            "الرابع الأدبي": 11,
-            "الخامس العلمي": 12,
-            "الخامس الأدبي": 13,
-            "السادس العلمي": 14,
-            "السادس الأدبي": 15
-        }
-        
-        return grade_mapping.get(grade_text, 999)
+        return grade_ordinal(grade_text)
     
     def __lt__(self, other):
         """مقارنة مخصصة للترتيب حسب الصف"""
@@ -158,6 +134,7 @@ class ArabicTableWidgetItem(QTableWidgetItem):
             return super().__lt__(other)
 
 
+@instrument_methods()
 class StudentsPage(QWidget):
     """صفحة إدارة الطلاب"""
     
@@ -254,11 +231,7 @@ class StudentsPage(QWidget):
             
             self.grade_combo = QComboBox()
             self.grade_combo.setObjectName("filterCombo")
-            self.grade_combo.addItems(["جميع الصفوف", "الأول الابتدائي", "الثاني الابتدائي", 
-                                      "الثالث الابتدائي", "الرابع الابتدائي", "الخامس الابتدائي", 
-                                      "السادس الابتدائي", "الأول المتوسط", "الثاني المتوسط", 
-                                      "الثالث المتوسط", "الرابع العلمي", "الرابع الأدبي",
-                                      "الخامس العلمي", "الخامس الأدبي", "السادس العلمي", "السادس الأدبي"])
+            self.grade_combo.addItem("جميع الصفوف")
             filters_layout.addWidget(self.grade_combo)
             
             # فلتر الشعبة
@@ -268,7 +241,7 @@ class StudentsPage(QWidget):
             
             self.section_combo = QComboBox()
             self.section_combo.setObjectName("filterCombo")
-            self.section_combo.addItems(["جميع الشعب", "أ", "ب", "ج", "د", "هـ", "و", "ز", "ح", "ط", "ي"])
+            self.section_combo.addItem("جميع الشعب")
             filters_layout.addWidget(self.section_combo)
             
             # فلتر الحالة
@@ -504,7 +477,8 @@ class StudentsPage(QWidget):
             self.refresh_button.clicked.connect(self.refresh)
             self.clear_filters_button.clicked.connect(self.clear_filters)
             
-            # ربط الفلاتر
+            # ربط الفلاتر (تحديث قوائم الصفوف والشعب قبل تطبيق فلتر المدرسة)
+            self.school_combo.currentTextChanged.connect(self.update_grade_filters)
             self.school_combo.currentTextChanged.connect(self.apply_filters)
             self.grade_combo.currentTextChanged.connect(self.apply_filters)
             self.section_combo.currentTextChanged.connect(self.apply_filters)
@@ -524,7 +498,7 @@ class StudentsPage(QWidget):
             
             # جلب المدارس من قاعدة البيانات
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
@@ -536,6 +510,25 @@ class StudentsPage(QWidget):
         except Exception as e:
             logging.error(f"خطأ في تحميل المدارس: {e}")
     
+    def update_grade_filters(self):
+        """تعبئة فلتري الصف والشعبة من دليل الصفوف للمدرسة المختارة مع الإبقاء على الاختيار"""
+        try:
+            school_id = self.school_combo.currentData()
+            for combo, all_text, values in (
+                (self.grade_combo, "جميع الصفوف", grade_catalog.grades(school_id)),
+                (self.section_combo, "جميع الشعب", grade_catalog.sections(school_id)),
+            ):
+                current = combo.currentText()
+                combo.blockSignals(True)
+                combo.clear()
+                combo.addItem(all_text)
+                combo.addItems(values)
+                combo.setCurrentIndex(max(combo.findText(current), 0))
+                combo.blockSignals(False)
+            
+        except Exception as e:
+            logging.error(f"خطأ في تحديث فلاتر الصفوف: {e}")
+    
     def load_students(self):
         """تحميل قائمة الطلاب"""
         try:
@@ -755,6 +748,7 @@ class StudentsPage(QWidget):
         """تحديث البيانات"""
         try:
             log_user_action("تحديث صفحة الطلاب")
+            self.update_grade_filters()
             self.load_students()
             
         except Exception as e:
@@ -887,9 +881,15 @@ class StudentsPage(QWidget):
         """الحصول على قائمة الطلاب بالترتيب الحالي المعروض في الجدول"""
         try:
             ordered_students = []
+            # فحص مستوى التسجيل مرة واحدة بدلاً من بناء رسالة لكل صف
+            debug = logging.getLogger().isEnabledFor(logging.DEBUG)
             
-            logging.debug(f"get_students_in_current_order: عدد صفوف الجدول: {self.students_table.rowCount()}")
-            logging.debug(f"get_students_in_current_order: عدد الطلاب في current_students: {len(self.current_students)}")
+            if debug:
+                logging.debug("get_students_in_current_order: عدد صفوف الجدول: %s", self.students_table.rowCount())
+                logging.debug("get_students_in_current_order: عدد الطلاب في current_students: %s", len(self.current_students))
+            
+            # فهرس الطلاب حسب المعرف بدلاً من البحث الخطي لكل صف
+            students_by_id = {student['id']: student for student in self.current_students}
             
             # المرور عبر صفوف الجدول بالترتيب الحالي
             for row in range(self.students_table.rowCount()):
@@ -897,23 +897,21 @@ class StudentsPage(QWidget):
                 id_item = self.students_table.item(row, 0)
                 if id_item:
                     student_id = int(id_item.text())
-                    logging.debug(f"get_students_in_current_order: الصف {row}, معرف الطالب: {student_id}")
                     
                     # البحث عن بيانات الطالب الكاملة
-                    student_data = None
-                    for student in self.current_students:
-                        if student['id'] == student_id:
-                            # تحويل sqlite3.Row إلى قاموس عادي
-                            student_data = dict(student)
-                            logging.debug(f"get_students_in_current_order: وُجد الطالب {student_id}: {student_data.get('name', 'بدون اسم')}")
-                            break
-                    
-                    if student_data:
+                    student = students_by_id.get(student_id)
+                    if student is not None:
+                        # تحويل sqlite3.Row إلى قاموس عادي
+                        student_data = dict(student)
+                        if debug:
+                            logging.debug("get_students_in_current_order: الصف %s، وُجد الطالب %s: %s",
+                                          row, student_id, student_data.get('name', 'بدون اسم'))
                         ordered_students.append(student_data)
                     else:
-                        logging.warning(f"get_students_in_current_order: لم يتم العثور على بيانات الطالب {student_id}")
+                        logging.warning("get_students_in_current_order: لم يتم العثور على بيانات الطالب %s", student_id)
             
-            logging.debug(f"get_students_in_current_order: عدد الطلاب المُرتبين: {len(ordered_students)}")
+            if debug:
+                logging.debug("get_students_in_current_order: عدد الطلاب المُرتبين: %s", len(ordered_students))
             return ordered_students
             
         except Exception as e:
@@ -17,6 +17,7 @@ from PyQt5.QtGui import QFont, QFontDatabase
 import config
 from core.database.connection import db_manager
 from core.utils.logger import log_user_action, log_database_operation
+from core.utils.telemetry import instrument_methods
 
 # استيراد نوافذ إدارة المعلمين
 from .add_teacher_dialog import AddTeacherDialog
@@ -24,6 +25,7 @@ from .edit_teacher_dialog import EditTeacherDialog
 from ..shared.salary_details_dialog import SalaryDetailsDialog
 
 
+@instrument_methods()
 class TeachersPage(QWidget):
     """صفحة إدارة المعلمين"""
     
@@ -367,7 +369,7 @@ class TeachersPage(QWidget):
             self.school_combo.addItem("جميع المدارس", None)
             
             query = "SELECT id, name_ar FROM schools ORDER BY name_ar"
-            schools = db_manager.execute_query(query)
+            schools = db_manager.execute_cached_query(query)
             
             if schools:
                 for school in schools:
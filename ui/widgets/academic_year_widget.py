@@ -6,10 +6,10 @@
 
 import logging
 from PyQt5.QtWidgets import QWidget, QHBoxLayout, QLabel, QFrame
-from PyQt5.QtCore import Qt, QTimer, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
 
-from core.utils.settings_manager import get_academic_year
+from core.utils.settings_manager import get_academic_year, subscribe_setting
 
 
 class AcademicYearWidget(QWidget):
@@ -17,6 +17,8 @@ class AcademicYearWidget(QWidget):
     
     # إشارة عند تغيير العام الدراسي
     academic_year_changed = pyqtSignal(str)
+    # إشارة داخلية لنقل إشعار مدير الإعدادات إلى خيط الواجهة
+    _academic_year_pushed = pyqtSignal(str)
     
     def __init__(self, parent=None, show_label=True, auto_refresh=True):
         super().__init__(parent)
@@ -99,16 +101,19 @@ class AcademicYearWidget(QWidget):
             logging.error(f"خطأ في إعداد أنماط ويدجت العام الدراسي: {e}")
     
     def setup_auto_refresh(self):
-        """إعداد التحديث التلقائي"""
+        """الاشتراك في تغيير العام الدراسي بدلاً من الاستعلام الدوري"""
         try:
-            # تحديث كل 30 ثانية
-            self.refresh_timer = QTimer()
-            self.refresh_timer.timeout.connect(self.refresh_academic_year)
-            self.refresh_timer.start(30000)  # 30 ثانية
+            self._academic_year_pushed.connect(self.set_academic_year)
+            self._unsubscribe = subscribe_setting(self.on_setting_changed, 'academic_year')
             
         except Exception as e:
             logging.error(f"خطأ في إعداد التحديث التلقائي: {e}")
     
+    def on_setting_changed(self, key: str, value):
+        """يُستدعى من مدير الإعدادات (قد يكون من خيط آخر)"""
+        if value:
+            self._academic_year_pushed.emit(value)
+    
     def load_academic_year(self):
         """تحميل العام الدراسي الحالي"""
         try:
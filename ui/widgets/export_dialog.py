@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+واجهة التصدير المتدفق المشتركة بين الصفحات
+اختيار الأعمدة عبر ColumnSelectionDialog، ثم التصدير في خيط خلفي مع شريط تقدم
+"""
+
+import logging
+import os
+from datetime import datetime
+from typing import Any, Sequence
+
+from PyQt5.QtWidgets import QFileDialog, QMessageBox, QProgressDialog
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
+
+from core.export import (
+    ExportDefinition, XLSX_AVAILABLE, open_readonly_connection, export_to_file
+)
+from core.utils.logger import log_user_action
+from ui.widgets.column_selection_dialog import ColumnSelectionDialog
+
+
+class StreamingExportWorker(QThread):
+    """خيط تصدير يقرأ من اتصال قراءة فقط ويكتب الملف على دفعات"""
+
+    progress = pyqtSignal(int, int)  # (الصفوف المكتوبة، الإجمالي)
+    export_finished = pyqtSignal(str, int)  # (مسار الملف، عدد الصفوف)
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, definition: ExportDefinition, output_path: str,
+                 where_clause: str = "", params: Sequence[Any] = (),
+                 selected_keys=None, file_format: str = "csv"):
+        super().__init__()
+        self.definition = definition
+        self.output_path = output_path
+        self.where_clause = where_clause
+        self.params = tuple(params)
+        self.selected_keys = selected_keys
+        self.file_format = file_format
+        self._cancelled = False
+
+    def cancel(self):
+        """طلب إيقاف التصدير"""
+        self._cancelled = True
+
+    def run(self):
+        conn = None
+        try:
+            conn = open_readonly_connection()
+            written, _ = export_to_file(
+                conn, self.definition, self.output_path,
+                where_clause=self.where_clause,
+                params=self.params,
+                selected_keys=self.selected_keys,
+                file_format=self.file_format,
+                progress_callback=self.progress.emit,
+                cancel_check=lambda: self._cancelled
+            )
+            self.export_finished.emit(self.output_path, written)
+        except InterruptedError:
+            self._remove_partial_file()
+            self.error_occurred.emit("تم إلغاء التصدير")
+        except Exception as e:
+            logging.error(f"خطأ في التصدير المتدفق: {e}")
+            self._remove_partial_file()
+            self.error_occurred.emit(str(e))
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _remove_partial_file(self):
+        try:
+            if os.path.exists(self.output_path):
+                os.remove(self.output_path)
+        except OSError:
+            pass
+
+
+def run_streaming_export(parent, definition: ExportDefinition,
+                         where_clause: str = "", params: Sequence[Any] = ()):
+    """
+    تشغيل التصدير من صفحة: اختيار الأعمدة والملف ثم التصدير مع شريط تقدم
+
+    Args:
+        parent: الصفحة المستدعية
+        definition: تعريف التقرير
+        where_clause: شرط الفلترة الخاص بالصفحة
+        params: معاملات الشرط
+    """
+    dialog = ColumnSelectionDialog(definition.column_titles(), parent=parent)
+    dialog.setWindowTitle("تحديد الأعمدة للتصدير")
+    if dialog.exec_() != ColumnSelectionDialog.Accepted:
+        return None
+    selected_keys = dialog.get_selected_columns()
+    if not selected_keys:
+        QMessageBox.warning(parent, "تحذير", "يرجى اختيار عمود واحد على الأقل")
+        return None
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filters = "CSV Files (*.csv)"
+    if XLSX_AVAILABLE:
+        filters = "Excel Files (*.xlsx);;" + filters
+    filename, selected_filter = QFileDialog.getSaveFileName(
+        parent,
+        f"حفظ {definition.title}",
+        f"{definition.file_prefix}_{timestamp}.{'xlsx' if XLSX_AVAILABLE else 'csv'}",
+        filters + ";;All Files (*)"
+    )
+    if not filename:
+        return None
+
+    file_format = "xlsx" if filename.lower().endswith(".xlsx") or (
+        "xlsx" in selected_filter and not filename.lower().endswith(".csv")) else "csv"
+    if not filename.lower().endswith(f".{file_format}"):
+        filename += f".{file_format}"
+
+    progress_dialog = QProgressDialog("جاري التصدير...", "إلغاء", 0, 100, parent)
+    progress_dialog.setWindowTitle(definition.title)
+    progress_dialog.setWindowModality(Qt.WindowModal)
+    progress_dialog.setMinimumDuration(300)
+
+    worker = StreamingExportWorker(definition, filename, where_clause, params,
+                                   selected_keys, file_format)
+
+    def on_progress(written, total):
+        progress_dialog.setMaximum(max(total, 1))
+        progress_dialog.setValue(min(written, max(total, 1)))
+        progress_dialog.setLabelText(f"تم تصدير {written:,} من {total:,} سجل")
+
+    def on_finished(path, written):
+        progress_dialog.close()
+        log_user_action(f"تصدير {definition.title}", f"{written} سجل")
+        reply = QMessageBox.question(
+            parent, "تم بنجاح",
+            f"تم تصدير {written:,} سجل بنجاح إلى:\n{path}\n\nهل تريد فتح الملف الآن؟",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.Yes
+        )
+        if reply == QMessageBox.Yes:
+            try:
+                os.startfile(path)  # فتح الملف بالبرنامج الافتراضي (Excel)
+            except Exception:
+                QMessageBox.information(parent, "معلومات", f"تم حفظ الملف في:\n{path}")
+
+    def on_error(message):
+        progress_dialog.close()
+        QMessageBox.critical(parent, "خطأ", f"حدث خطأ في تصدير التقرير:\n{message}")
+
+    worker.progress.connect(on_progress)
+    worker.export_finished.connect(on_finished)
+    worker.error_occurred.connect(on_error)
+    progress_dialog.canceled.connect(worker.cancel)
+
+    # الاحتفاظ بمرجع للخيط حتى انتهائه
+    parent._export_worker = worker
+    worker.start()
+    return worker